@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""Define the helpers shared by the database benchmark management commands.
+
+Copyright (C) 2021 Gitcoin Core
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.management.base import CommandError
+from django.db import connection, transaction
+
+
+def ensure_benchmark_database():
+    '''
+        the benchmarks insert synthetic rows, they only run in development (DEBUG) or against a test database
+    '''
+    if not settings.DEBUG and not connection.settings_dict['NAME'].startswith('test_'):
+        raise CommandError('benchmarks only run with DEBUG set or against a test database')
+
+
+@contextmanager
+def rolled_back():
+    '''
+        runs the block in a transaction which is rolled back, nothing a benchmark inserts is kept
+    '''
+    ensure_benchmark_database()
+    with transaction.atomic():
+        yield
+        transaction.set_rollback(True)
+
+
+def analyze(table):
+    with connection.cursor() as cursor:
+        cursor.execute(f'ANALYZE {table}')
+
+
+def timed(func, repeat):
+    '''
+        returns the result of the last call of func and the best of `repeat` timings in seconds
+    '''
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return result, round(min(timings), 4)
@@ -759,6 +759,9 @@ def callback(request):
 
 METATX_GAS_PRICE_THRESHOLD = float(env('METATX_GAS_PRICE_THRESHOLD', default='10000.0'))
 
+# columnar contribution snapshots used as CLR inputs (see grants.clr_snapshot)
+CLR_SNAPSHOT_DIR = env('CLR_SNAPSHOT_DIR', default='/tmp/clr_snapshots')
+
 GA_PRIVATE_KEY_PATH = env('GA_PRIVATE_KEY_PATH', default='')
 GA_PRIVATE_KEY = ''
 if GA_PRIVATE_KEY_PATH:
@@ -0,0 +1,235 @@
+# -*- coding: utf-8 -*-
+"""Define the engine which confirms pending payments against the chains' explorers.
+
+Copyright (C) 2021 Gitcoin Core
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from django.db import connection
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# (connect, read) timeout of an explorer request, the sync modules used to wait forever
+EXPLORER_TIMEOUT = (5, 30)
+
+# requests per second made to a single explorer host, shared by every chain which uses the host
+DEFAULT_RATE_LIMIT = 5
+HOST_RATE_LIMITS = {
+    'api.viewblock.io': 2,
+    'sochain.com': 2,
+    'api.etherscan.io': 4,
+    'api-rinkeby.etherscan.io': 4,
+    'mainnet-algorand.api.purestake.io': 8,
+}
+
+# retries of an explorer request which failed to connect, timed out or was answered with one of RETRY_STATUSES
+MAX_RETRIES = 3
+RETRY_BACKOFF = 0.5
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class RateLimiter:
+    '''
+        Spaces out the requests made to a host so it sees at most `rate` of them per second
+    '''
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate
+        self.next_at = 0.0
+        self.lock = threading.Lock()
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            wait_for = self.next_at - now
+            self.next_at = max(now, self.next_at) + self.interval
+        if wait_for > 0:
+            time.sleep(wait_for)
+
+
+class ExplorerClient:
+    '''
+        Makes explorer requests through a pooled session and a rate limiter per host, retrying failed requests
+        with exponential backoff and jitter
+    '''
+
+    def __init__(self, timeout=EXPLORER_TIMEOUT, max_retries=MAX_RETRIES, backoff=RETRY_BACKOFF, pool_size=10):
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.pool_size = pool_size
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def host(self, url):
+        '''
+            returns the (session, rate limiter) of the url's host, created on first use
+        '''
+        hostname = urlsplit(url).hostname
+        with self._lock:
+            if hostname not in self._hosts:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                rate_limiter = RateLimiter(HOST_RATE_LIMITS.get(hostname, DEFAULT_RATE_LIMIT))
+                self._hosts[hostname] = (session, rate_limiter)
+            return self._hosts[hostname]
+
+    def retry_delay(self, attempt, response=None):
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after and retry_after.isdigit():
+            return int(retry_after)
+        return self.backoff * 2 ** attempt * random.uniform(0.5, 1.5)
+
+    def request(self, method, url, **kwargs):
+        '''
+            requests.request with the host's session, returns the last response when the retries ran out and
+            raises the last connection error or timeout
+        '''
+        session, rate_limiter = self.host(url)
+        kwargs.setdefault('timeout', self.timeout)
+        attempt = 0
+        while True:
+            rate_limiter.wait()
+            try:
+                response = session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt >= self.max_retries:
+                    raise
+                logger.warning(f'explorer request failed, retrying: {method} {url} - {e}')
+                time.sleep(self.retry_delay(attempt))
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt >= self.max_retries:
+                    return response
+                logger.warning(f'explorer request failed, retrying: {method} {url} - {response.status_code}')
+                time.sleep(self.retry_delay(attempt, response))
+            attempt += 1
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+
+explorer = ExplorerClient()
+
+
+class ChainAdapter:
+    '''
+        How the engine syncs one chain's pending payments
+
+        attrs:
+            name        :   the chain, ie. the tenant of a contribution or the payout type of a fulfillment
+            sync        :   callable which checks one pending payment against the chain's explorer and saves it
+            max_workers :   payments of the chain synced at once. The sync functions check an explorer
+                            transaction isn't used by another payment before saving theirs, so two payments of
+                            a chain synced at once could both claim the same transaction
+    '''
+
+    def __init__(self, name, sync, max_workers=1):
+        self.name = name
+        self.sync = sync
+        self.max_workers = max_workers
+
+
+class ChainMetrics:
+
+    def __init__(self, name):
+        self.name = name
+        self.synced = 0
+        self.failed = 0
+        self.seconds = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, synced):
+        with self._lock:
+            if synced:
+                self.synced += 1
+            else:
+                self.failed += 1
+
+    @property
+    def throughput(self):
+        '''
+            payments synced per second
+        '''
+        return self.synced / self.seconds if self.seconds else 0.0
+
+    def __str__(self):
+        return (
+            f'{self.name}: {self.synced} synced, {self.failed} failed in {self.seconds:.1f}s '
+            f'({self.throughput:.2f}/s)'
+        )
+
+
+class SyncEngine:
+    '''
+        Syncs the pending payments of every chain at once, each chain in its own lane so a slow explorer only
+        delays its own chain
+    '''
+
+    def __init__(self, adapters):
+        self.adapters = {adapter.name: adapter for adapter in adapters}
+
+    def _sync_one(self, adapter, item, metrics):
+        try:
+            adapter.sync(item)
+            metrics.record(True)
+        except Exception as e:
+            metrics.record(False)
+            logger.error(f'error syncing {adapter.name} payment {getattr(item, "pk", item)} - {e}')
+        finally:
+            # every worker thread opens its own database connection
+            connection.close()
+
+    def _sync_chain(self, adapter, items):
+        metrics = ChainMetrics(adapter.name)
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=adapter.max_workers) as executor:
+            for item in items:
+                executor.submit(self._sync_one, adapter, item, metrics)
+        metrics.seconds = time.monotonic() - started
+        logger.info(f'synced pending payments - {metrics}')
+        return metrics
+
+    def run(self, items_by_chain):
+        '''
+            syncs {chain name: [pending payment]}, chains without an adapter are skipped
+
+            returns:
+                [ChainMetrics] in the order of items_by_chain
+        '''
+        lanes = [
+            (self.adapters[name], list(items)) for name, items in items_by_chain.items() if name in self.adapters
+        ]
+        lanes = [(adapter, items) for adapter, items in lanes if items]
+        if not lanes:
+            return []
+
+        with ThreadPoolExecutor(max_workers=len(lanes)) as executor:
+            futures = [executor.submit(self._sync_chain, adapter, items) for adapter, items in lanes]
+        return [future.result() for future in futures]
@@ -0,0 +1,248 @@
+# -*- coding: utf-8 -*-
+"""Define the in-memory redis client shared by the unit tests.
+
+Copyright (C) 2021 Gitcoin Core
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+import threading
+import time
+
+from redis.exceptions import ResponseError
+
+
+def encode(value):
+    return value if isinstance(value, bytes) else str(value).encode()
+
+
+class FakeRedis:
+    """Just enough of the redis client for the indexes and counters kept in redis.
+
+    Values are stored and returned as bytes like the real client. Keys don't expire, the ttls that were set (in
+    seconds from now) are kept in `ttls` instead.
+
+    """
+
+    def __init__(self, data=None):
+        self.data = {key: encode(value) for key, value in (data or {}).items()}
+        self.ttls = {}
+        self.locks = {}
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    # keys
+
+    def exists(self, *keys):
+        return sum(key in self.data for key in keys)
+
+    def delete(self, *keys):
+        deleted = 0
+        for key in keys:
+            deleted += self.data.pop(key, None) is not None
+            self.ttls.pop(key, None)
+        return deleted
+
+    def expire(self, key, seconds):
+        if key not in self.data:
+            return False
+        self.ttls[key] = seconds
+        return True
+
+    def expireat(self, key, when):
+        return self.expire(key, int(when) - int(time.time()))
+
+    def rename(self, key, new_key):
+        if key not in self.data:
+            raise ResponseError('no such key')
+        self.data[new_key] = self.data.pop(key)
+        self.ttls.pop(new_key, None)
+        if key in self.ttls:
+            self.ttls[new_key] = self.ttls.pop(key)
+        return True
+
+    # strings
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def mget(self, keys):
+        return [self.data.get(key) for key in keys]
+
+    def set(self, key, value, ex=None, nx=False):
+        if nx and key in self.data:
+            return None
+        self.data[key] = encode(value)
+        self.ttls.pop(key, None)
+        if ex:
+            self.ttls[key] = ex
+        return True
+
+    def incr(self, key, amount=1):
+        self.data[key] = encode(int(self.data.get(key, 0)) + amount)
+        return int(self.data[key])
+
+    # hashes
+
+    def hset(self, key, field=None, value=None, mapping=None):
+        values = self.data.setdefault(key, {})
+        mapping = dict(mapping or {})
+        if field is not None:
+            mapping[field] = value
+        added = 0
+        for field, value in mapping.items():
+            added += encode(field) not in values
+            values[encode(field)] = encode(value)
+        return added
+
+    def hget(self, key, field):
+        return self.data.get(key, {}).get(encode(field))
+
+    def hmget(self, key, fields):
+        return [self.hget(key, field) for field in fields]
+
+    def hgetall(self, key):
+        return dict(self.data.get(key, {}))
+
+    def hscan_iter(self, key, count=None):
+        return iter(list(self.hgetall(key).items()))
+
+    def hsetnx(self, key, field, value):
+        if self.hget(key, field) is not None:
+            return False
+        return bool(self.hset(key, field, value))
+
+    def hincrby(self, key, field, amount=1):
+        values = self.data.setdefault(key, {})
+        values[encode(field)] = encode(int(values.get(encode(field), 0)) + amount)
+        return int(values[encode(field)])
+
+    def hincrbyfloat(self, key, field, amount=1.0):
+        values = self.data.setdefault(key, {})
+        values[encode(field)] = encode(float(values.get(encode(field), 0)) + float(amount))
+        return float(values[encode(field)])
+
+    def hdel(self, key, *fields):
+        values = self.data.get(key, {})
+        deleted = sum(values.pop(encode(field), None) is not None for field in fields)
+        if key in self.data and not values:
+            self.delete(key)
+        return deleted
+
+    # sets
+
+    def sadd(self, key, *members):
+        values = self.data.setdefault(key, set())
+        added = sum(encode(member) not in values for member in members)
+        values.update(encode(member) for member in members)
+        return added
+
+    def smembers(self, key):
+        return set(self.data.get(key, set()))
+
+    def sismember(self, key, member):
+        return encode(member) in self.data.get(key, set())
+
+    def sscan_iter(self, key, count=None):
+        return iter(self.smembers(key))
+
+    # sorted sets, {member: score}
+
+    def zadd(self, key, mapping):
+        members = self.data.setdefault(key, {})
+        added = sum(encode(member) not in members for member in mapping)
+        members.update({encode(member): float(score) for member, score in mapping.items()})
+        return added
+
+    def zscore(self, key, member):
+        return self.data.get(key, {}).get(encode(member))
+
+    def zcard(self, key):
+        return len(self.data.get(key, {}))
+
+    def _ranked(self, key):
+        return sorted(self.data.get(key, {}).items(), key=lambda item: (item[1], item[0]))
+
+    def zremrangebyrank(self, key, start, end):
+        ranked = self._ranked(key)
+        end = len(ranked) + end if end < 0 else end
+        removed = ranked[start:end + 1]
+        for member, _ in removed:
+            del self.data[key][member]
+        if key in self.data and not self.data[key]:
+            self.delete(key)
+        return len(removed)
+
+    def zrangebyscore(self, key, min_score, max_score, withscores=False):
+        rows = [(member, score) for member, score in self._ranked(key) if float(min_score) <= score <= float(max_score)]
+        return rows if withscores else [member for member, _ in rows]
+
+    def zrevrangebyscore(self, key, max_score, min_score, start=None, num=None, withscores=False):
+        rows = [
+            (member, score) for member, score in reversed(self._ranked(key))
+            if float(min_score) <= score <= float(max_score)
+        ]
+        if start is not None:
+            rows = rows[start:start + num]
+        return rows if withscores else [member for member, _ in rows]
+
+
+    # locks, only exclusive between the threads sharing the fake
+
+    def lock(self, name, timeout=None):
+        return self.locks.setdefault(name, threading.Lock())
+
+
+class FakePipeline:
+    """Buffers the commands until execute().
+
+    After watch() the commands run immediately until multi(), like a watching redis pipeline.
+
+    """
+
+    def __init__(self, redis):
+        self.redis = redis
+        self.watching = False
+        self.commands = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.reset()
+
+    def __getattr__(self, name):
+        command = getattr(self.redis, name)
+        if self.watching:
+            return command
+
+        def queue(*args, **kwargs):
+            self.commands.append((command, args, kwargs))
+            return self
+        return queue
+
+    def watch(self, *keys):
+        self.watching = True
+
+    def multi(self):
+        self.watching = False
+
+    def execute(self):
+        commands, self.commands = self.commands, []
+        return [command(*args, **kwargs) for command, args, kwargs in commands]
+
+    def reset(self):
+        self.watching = False
+        self.commands = []
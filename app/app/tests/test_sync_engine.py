@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+"""Handle sync engine related tests.
+
+Copyright (C) 2021 Gitcoin Core
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from app.sync_engine import ChainAdapter, ExplorerClient, RateLimiter, SyncEngine
+from test_plus.test import TestCase
+
+
+class FlakyExplorerHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        self.server.calls += 1
+        status = 503 if self.server.calls <= self.server.failures else 200
+        self.send_response(status)
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'{}')
+
+    def log_message(self, *args):
+        pass
+
+
+class ExplorerClientTest(TestCase):
+    """Define tests for the explorer requests."""
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), FlakyExplorerHandler)
+        self.server.calls = 0
+        self.server.failures = 2
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f'http://127.0.0.1:{self.server.server_address[1]}/tx'
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_retries_unavailable_explorer(self):
+        """Test a request answered with a retryable status is made again."""
+        response = ExplorerClient(backoff=0).get(self.url)
+
+        assert response.status_code == 200
+        assert self.server.calls == 3
+
+    def test_returns_last_response_when_retries_run_out(self):
+        """Test the last response is returned once the retries ran out."""
+        response = ExplorerClient(backoff=0, max_retries=1).get(self.url)
+
+        assert response.status_code == 503
+        assert self.server.calls == 2
+
+    def test_rate_limiter_spaces_out_requests(self):
+        """Test a host is requested at most at its rate."""
+        rate_limiter = RateLimiter(20)
+        started = time.monotonic()
+        for _ in range(5):
+            rate_limiter.wait()
+
+        assert time.monotonic() - started >= 0.2
+
+
+class SyncEngineTest(TestCase):
+    """Define tests for syncing the chains' pending payments."""
+
+    def test_slow_chain_does_not_hold_up_other_chains(self):
+        """Test every chain is synced in its own lane."""
+        fast_synced = threading.Event()
+
+        def sync_slow(item):
+            if not fast_synced.wait(timeout=5):
+                raise Exception('the fast chain was synced after the slow one')
+
+        engine = SyncEngine([
+            ChainAdapter('SLOW', sync_slow, max_workers=1),
+            ChainAdapter('FAST', lambda item: fast_synced.set(), max_workers=1),
+        ])
+        slow, fast = engine.run({'SLOW': [1], 'FAST': [1], 'UNKNOWN': [1]})
+
+        assert (slow.name, slow.synced, slow.failed) == ('SLOW', 1, 0)
+        assert (fast.name, fast.synced, fast.failed) == ('FAST', 1, 0)
+
+    def test_chain_payments_are_synced_one_at_a_time(self):
+        """Test a chain's payments don't race each other to claim the same transaction by default."""
+        running = []
+        overlapped = threading.Event()
+        lock = threading.Lock()
+
+        def sync(item):
+            with lock:
+                running.append(item)
+                if len(running) > 1:
+                    overlapped.set()
+            time.sleep(0.01)
+            with lock:
+                running.remove(item)
+
+        metrics, = SyncEngine([ChainAdapter('ETH', sync)]).run({'ETH': [1, 2, 3, 4]})
+
+        assert metrics.synced == 4
+        assert not overlapped.is_set()
+
+    def test_failed_payments_are_counted(self):
+        """Test a payment which fails to sync doesn't stop the rest of its chain."""
+        def sync(item):
+            if item == 2:
+                raise Exception('explorer error')
+
+        metrics, = SyncEngine([ChainAdapter('CELO', sync)]).run({'CELO': [1, 2, 3]})
+
+        assert (metrics.synced, metrics.failed) == (2, 1)
+        assert metrics.throughput > 0
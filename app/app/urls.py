@@ -872,6 +872,7 @@
 #     url(r'^api/v0.1/users_csv/', dashboard.views.output_users_to_csv, name='users_csv'),
 #     url(r'^api/v0.1/bounty_mentor/', dashboard.views.bounty_mentor, name='bounty_mentor'),
 #     url(r'^api/v0.1/users_fetch/', dashboard.views.users_fetch, name='users_fetch'),
+#     url(r'^api/v0.1/users_typeahead/', dashboard.views.users_typeahead, name='users_typeahead'),
 # ]
 
 if settings.ENABLE_SILK:
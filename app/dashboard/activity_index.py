@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""Define the bulk writes of the ActivityIndex.
+
+Copyright (C) 2021 Gitcoin Core
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+import threading
+from contextlib import contextmanager
+
+from django.apps import apps
+
+from dashboard.timelines import add_to_timelines
+
+# rows inserted per bulk_create
+INDEX_BATCH_SIZE = 1000
+
+# the activities indexed under their profile & the platform instead of their related objects
+PLATFORM_ACTIVITY_TYPES = ['leaderboard_rank', 'consolidated_leaderboard_rank']
+
+# the activities shown in the feeds, which the reindex_activities command indexes
+INDEXED_ACTIVITY_TYPES = [
+    # grants
+    'new_grant', 'update_grant', 'killed_grant', 'new_grant_contribution', 'new_grant_subscription', 'flagged_grant',
+    # kudos
+    'new_kudos', 'created_kudos', 'receive_kudos',
+    # quests
+    'played_quest', 'beat_quest', 'created_quest',
+    # tips
+    'new_tip', 'receive_tip',
+    # profiles
+    'joined', 'wall_post', 'status_update',
+    # hackathons & bounties
+    'hackathon_registration', 'hackathon_new_hacker', 'hypercharge_bounty', 'new_bounty', 'start_work', 'stop_work',
+    'work_submitted', 'work_done', 'worker_approved', 'worker_rejected', 'worker_applied', 'increased_bounty',
+    'killed_bounty', 'bounty_abandonment_escalation_to_mods', 'bounty_abandonment_warning',
+    'bounty_removed_slashed_by_staff', 'bounty_removed_by_staff', 'bounty_removed_by_funder', 'new_crowdfund',
+] + PLATFORM_ACTIVITY_TYPES
+
+_deferred = threading.local()
+
+
+def activity_index_keys(activity):
+    '''
+        returns the ActivityIndex keys of an activity, read from its foreign key ids without fetching the objects
+    '''
+    keys = []
+    for prefix, object_id in [
+        ('profile', activity.profile_id),
+        ('profile', activity.other_profile_id),
+        ('grant', activity.grant_id),
+        ('tip', activity.tip_id),
+        ('hackathon', activity.hackathonevent_id),
+        ('bounty', activity.bounty_id),
+        ('kudo', activity.kudos_id),
+        ('project', activity.project_id),
+    ]:
+        if object_id:
+            keys.append(f'{prefix}:{object_id}')
+    return keys
+
+
+def platform_activity_index_keys(activity):
+    return [f'profile:{activity.profile_id}', f'platform:{activity.profile_id}']
+
+
+def index_keys(activity):
+    '''
+        returns the keys an activity is indexed under, by its activity_type
+    '''
+    if activity.activity_type in PLATFORM_ACTIVITY_TYPES:
+        return platform_activity_index_keys(activity)
+    return activity_index_keys(activity)
+
+
+def write_activity_index(indexed_activities):
+    '''
+        inserts the ActivityIndex rows of the activities with bulk_create and adds them to their timelines,
+        or buffers them until the end of the enclosing deferred_activity_index block
+
+        args:
+            indexed_activities  :   [(Activity, [str])] - activities and their ActivityIndex keys
+    '''
+    indexed_activities = [(activity, keys) for activity, keys in indexed_activities if keys]
+    buffer = getattr(_deferred, 'buffer', None)
+    if buffer is not None:
+        buffer.extend(indexed_activities)
+        if len(buffer) >= INDEX_BATCH_SIZE:
+            _flush_deferred()
+        return
+
+    ActivityIndex = apps.get_model('dashboard', 'ActivityIndex')
+    ActivityIndex.objects.bulk_create([
+        ActivityIndex(key=key, activity=activity, created_on=activity.created_on)
+        for activity, keys in indexed_activities
+        for key in keys
+    ], batch_size=INDEX_BATCH_SIZE)
+    add_to_timelines(indexed_activities)
+
+
+def _flush_deferred():
+    indexed_activities, _deferred.buffer = _deferred.buffer, None
+    if indexed_activities:
+        # activities removed as duplicates of a later one since they were buffered are not indexed
+        Activity = apps.get_model('dashboard', 'Activity')
+        existing = set(Activity.objects.filter(
+            pk__in=[activity.pk for activity, _ in indexed_activities]
+        ).values_list('pk', flat=True))
+        indexed_activities = [(activity, keys) for activity, keys in indexed_activities if activity.pk in existing]
+    try:
+        write_activity_index(indexed_activities)
+    finally:
+        _deferred.buffer = []
+
+
+@contextmanager
+def deferred_activity_index():
+    '''
+        batches the index writes of the activities indexed in the block (populate_activity_index, ...) into
+        bulk inserts of INDEX_BATCH_SIZE activities, the rest is written when the block exits
+    '''
+    if getattr(_deferred, 'buffer', None) is not None:
+        # nested in another block which will write the rows
+        yield
+        return
+
+    _deferred.buffer = []
+    try:
+        yield
+    finally:
+        # the activities created before an error are indexed too
+        _flush_deferred()
+        _deferred.buffer = None
+
+
+def index_activities(activities):
+    '''
+        writes the ActivityIndex rows of the activities, picking their keys by activity_type
+    '''
+    write_activity_index([(activity, index_keys(activity)) for activity in activities])
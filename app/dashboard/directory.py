@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+"""Define the batched serialization of the profiles of the users directory.
+
+Copyright (C) 2021 Gitcoin Core
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+from django.conf import settings
+from django.contrib.postgres.search import TrigramSimilarity
+from django.db.models import Count
+from django.db.models.functions import Length
+
+from avatar.models import BaseAvatar
+from dashboard.models import (
+    Activity, BountyFulfillment, Earning, HackathonProject, HackathonRegistration, Profile, TribeMember,
+)
+from dashboard.profile_stats import grouped, leaderboard_stats, rating_stats, verification_stats
+
+PROFILE_FIELDS = [
+    'id', 'actions_count', 'created_on', 'handle', 'hide_profile', 'show_job_status', 'job_location', 'job_salary',
+    'job_search_status', 'job_type', 'linkedin_url', 'resume', 'remote', 'keywords', 'organizations', 'is_org',
+]
+
+# pg_trgm can't use its index to match fewer characters, shorter searches only look for handle prefixes
+TRIGRAM_MIN_LENGTH = 3
+
+JOB_STATUS_FIELDS = [
+    'job_salary', 'job_location', 'job_type', 'linkedin_url', 'resume', 'job_search_status', 'remote', 'job_status',
+]
+
+
+def _counts(queryset, group_by):
+    return {key: row['count'] for key, row in grouped(queryset, group_by, count=Count('id')).items()}
+
+
+def _first_avatars(pks):
+    # the active avatar of each profile, or its first one
+    avatars = BaseAvatar.objects.filter(profile__in=pks).order_by('profile_id', '-active', 'pk').distinct('profile_id')
+    return {avatar.profile_id: avatar for avatar in avatars}
+
+
+def _hackathon_details(pks, hackathon_id):
+    details = {pk: {} for pk in pks}
+
+    # the last registration of each profile
+    registrations = HackathonRegistration.objects.filter(hackathon_id=hackathon_id, registrant__in=pks).order_by(
+        'registrant_id', '-pk'
+    ).distinct('registrant_id').values('registrant_id', 'looking_team_members', 'looking_project')
+    for registration in registrations:
+        details[registration['registrant_id']].update({
+            'looking_team_members': registration['looking_team_members'],
+            'looking_project': registration['looking_project'],
+        })
+
+    keys = {f'profile:{pk}': pk for pk in pks}
+    intros = Activity.objects.filter(
+        activities_index__key__in=list(keys), hackathonevent_id=hackathon_id, activity_type='hackathon_new_hacker',
+    ).order_by('activities_index__key', '-pk').distinct('activities_index__key').values_list(
+        'activities_index__key', 'metadata'
+    )
+    for key, metadata in intros:
+        # only the registered hackers have an intro
+        if 'looking_project' in details[keys[key]]:
+            details[keys[key]]['intro'] = (metadata or {}).get('intro_text')
+
+    # the first project of each profile
+    memberships = HackathonProject.profiles.through.objects.filter(
+        hackathonproject__hackathon_id=hackathon_id, profile_id__in=pks
+    ).select_related('hackathonproject').order_by('profile_id', 'hackathonproject_id').distinct('profile_id')
+    for membership in memberships:
+        project = membership.hackathonproject
+        details[membership.profile_id].update({
+            'project_name': project.name,
+            'project_logo': project.logo.url if project.logo else '',
+        })
+    return details
+
+
+def serialize_directory_profiles(profiles, current_profile, network, hackathon_id=''):
+    '''
+        serializes a page of the users directory with a fixed number of grouped queries, whatever its size
+
+        args:
+            profiles        :   [Profile] - the profiles of the page
+            current_profile :   Profile - the profile the follows are checked for
+            network         :   str - the network of the completed bounties
+            hackathon_id    :   str - adds the registrations & projects of the hackathon
+    '''
+    profiles = [profile for profile in profiles if profile]
+    pks = [profile.pk for profile in profiles]
+    if not pks:
+        return []
+    people = [profile.pk for profile in profiles if not profile.is_org]
+    orgs = [profile.pk for profile in profiles if profile.is_org]
+
+    follower_counts = _counts(TribeMember.objects.filter(org__in=pks), 'org')
+    following = set(
+        TribeMember.objects.filter(org__in=pks, profile=current_profile).values_list('org_id', flat=True)
+    )
+    sent_earnings = _counts(Earning.objects.filter(from_profile__in=people), 'from_profile')
+    earnings = _counts(Earning.objects.filter(to_profile__in=people), 'to_profile')
+    earnings.update(_counts(Earning.objects.filter(org_profile__in=orgs), 'org_profile'))
+    avatars = _first_avatars(pks)
+    hackathon_details = _hackathon_details(pks, hackathon_id) if hackathon_id else {}
+
+    stats = {pk: {} for pk in people}
+    if people:
+        # same as Profile.get_fulfilled_bounties
+        work_done = grouped(
+            BountyFulfillment.objects.filter(
+                profile__in=people, bounty__current_bounty=True, bounty__admin_override_and_hide=False,
+                bounty__accepted=True, bounty__network=network
+            ), 'profile', count=Count('bounty', distinct=True)
+        )
+        for pk in people:
+            stats[pk]['work_done'] = work_done.get(pk, {}).get('count', 0)
+        stat_profiles = {
+            profile.pk: {'id': profile.pk, 'handle': profile.handle, 'user_id': profile.user_id, 'is_org': False}
+            for profile in profiles if not profile.is_org
+        }
+        for collector in [leaderboard_stats, rating_stats, verification_stats]:
+            collector(stat_profiles, stats)
+
+    all_users = []
+    for user in profiles:
+        profile_json = {k: getattr(user, k) for k in PROFILE_FIELDS}
+        profile_json['is_following'] = user.pk in following
+        profile_json['follower_count'] = follower_counts.get(user.pk, 0)
+        profile_json['desc'] = user.get_desc_for_count(
+            sent_earnings.get(user.pk, 0) + earnings.get(user.pk, 0)
+        )
+        profile_json.update(hackathon_details.get(user.pk, {}))
+
+        if user.data.get('location', ''):
+            profile_json['country'] = user.data.get('location', '')
+
+        if user.is_org:
+            profile_json['count_bounties_on_repo'] = user.as_dict.get('count_bounties_on_repo')
+            sum_eth = user.as_dict.get('sum_usd_on_repos')
+            profile_json['sum_usd_on_repos'] = round(sum_eth if sum_eth is not None else 0, 2)
+            profile_json['tribe_description'] = user.tribe_description
+            profile_json['rank_org'] = user.rank_org
+        else:
+            user_stats = stats[user.pk]
+            profile_json['job_status'] = user.job_status_verbose if user.job_search_status else None
+            profile_json['previously_worked'] = False # user.previous_worked_count > 0
+            profile_json['position_contributor'] = user_stats['scoreboard_position_contributor']
+            profile_json['position_funder'] = user_stats['scoreboard_position_funder']
+            profile_json['rank_coder'] = user.rank_coder
+            profile_json['work_done'] = user_stats['work_done']
+            profile_json['verification'] = user_stats['verification']
+            profile_json['avg_rating'] = user_stats['avg_rating']
+
+            if not user.show_job_status:
+                for key in JOB_STATUS_FIELDS:
+                    del profile_json[key]
+
+        if user.pk in avatars:
+            profile_json['avatar_id'] = avatars[user.pk].pk
+            profile_json['avatar_url'] = avatars[user.pk].avatar_url
+        if user.data:
+            profile_json['blog'] = user.data['blog']
+
+        all_users.append(profile_json)
+    return all_users
+
+
+def typeahead_profiles(keyword, limit=10):
+    '''
+        returns the handles & avatars of the visible profiles matching a partially typed search, the handles starting
+        with it first (through the pattern index of handle), then the closest trigram matches of search_text
+    '''
+    keyword = keyword.strip().lower().lstrip('@')
+    if not keyword:
+        return []
+    profiles = Profile.objects.visible().exclude(handle='gitcoinbot')
+
+    prefix_matches = profiles.filter(handle__startswith=keyword).order_by(Length('handle'), 'handle')
+    handles = list(prefix_matches.values_list('handle', flat=True)[:limit])
+    if len(handles) < limit and len(keyword) >= TRIGRAM_MIN_LENGTH:
+        handles += list(
+            profiles.search(keyword).exclude(handle__startswith=keyword).annotate(
+                similarity=TrigramSimilarity('handle', keyword)
+            ).order_by('-similarity', 'handle').values_list('handle', flat=True)[:limit - len(handles)]
+        )
+    return [{'handle': handle, 'avatar_url': f'{settings.BASE_URL}dynamic/avatar/{handle}'} for handle in handles]
@@ -0,0 +1,56 @@
+'''
+    Copyright (C) 2021 Gitcoin Core
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Affero General Public License as published
+    by the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+    GNU Affero General Public License for more details.
+
+    You should have received a copy of the GNU Affero General Public License
+    along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+'''
+import time
+
+from django.core.management.base import BaseCommand
+
+from dashboard.models import Profile
+
+
+class Command(BaseCommand):
+
+    help = 'fills search_text of the profiles created before the search_text_trigger existed, in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000, help='profiles updated per statement')
+        parser.add_argument('--sleep', type=float, default=0, help='seconds to wait between batches')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        profiles = Profile.objects.order_by('pk').values_list('pk', flat=True)
+
+        started = time.monotonic()
+        last_pk = 0
+        scanned = updated = 0
+        while True:
+            # keyset batches, each batch costs the same however deep in the table it is
+            pks = list(profiles.filter(pk__gt=last_pk)[:batch_size])
+            if not pks:
+                break
+            last_pk = pks[-1]
+            scanned += len(pks)
+
+            # search_text_trigger recomputes search_text whenever the column is written
+            updated += Profile.objects.filter(pk__in=pks, search_text='').update(search_text='')
+
+            elapsed = time.monotonic() - started
+            print(f'{scanned} profiles scanned, {updated} updated in {elapsed:.1f}s (last pk {last_pk})')
+            if options['sleep']:
+                time.sleep(options['sleep'])
+
+        print('backfill of search_text complete')
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""Define the benchmark_profile_search management command.
+
+Copyright (C) 2021 Gitcoin Core
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.core.paginator import Paginator
+from django.db.models import Q
+
+from app.benchmark import analyze, rolled_back, timed
+from dashboard.directory import typeahead_profiles
+from dashboard.models import Profile
+
+SYLLABLES = [
+    'ka', 'zu', 'mi', 'ro', 'te', 'lan', 'dev', 'eth', 'coin', 'sol', 'dao', 'net', 'hex', 'byte', 'pix', 'nova',
+    'xel', 'qu', 'an', 'or', 'bit', 'mon', 'ray', 'vox',
+]
+
+KEYWORDS = [
+    'python', 'javascript', 'solidity', 'rust', 'go', 'react', 'design', 'devops', 'security', 'machine learning',
+    'writing', 'community', 'data science', 'zero knowledge', 'smart contracts', 'typescript',
+]
+
+DEFAULT_SEARCHES = ['k', 'ka', 'dev', 'ethcoin', 'solidity', 'zero know', 'qqqq']
+
+
+def legacy_search(profiles, keyword):
+    '''
+        the directory search as it was before profiles were searched through search_text, kept for comparison
+    '''
+    return profiles.filter(Q(handle__icontains=keyword) | Q(keywords__icontains=keyword)).distinct()
+
+
+def trigram_search(profiles, keyword):
+    return profiles.search(keyword).order_by('-handle_match', '-earnings_count', 'id')
+
+
+class Command(BaseCommand):
+
+    help = (
+        'benchmarks the users directory search against synthetic profiles (inserted in a rolled back transaction), '
+        'development only: refuses to run unless DEBUG is set or the database is a test database'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profiles', type=int, default=100000)
+        parser.add_argument('--searches', type=str, nargs='+', default=DEFAULT_SEARCHES)
+        parser.add_argument('--page-size', type=int, default=20)
+        parser.add_argument('--repeat', type=int, default=3)
+        parser.add_argument('--seed', type=int, default=0)
+        # print the query plan of the trigram search for every search
+        parser.add_argument('--explain', action='store_true')
+
+    def handle(self, *args, **options):
+
+        rng = random.Random(options['seed'])
+        page_size = options['page_size']
+
+        with rolled_back():
+            print(f"- inserting {options['profiles']} profiles at {round(time.time(),1)}")
+            Profile.objects.bulk_create([
+                Profile(
+                    handle=f"{''.join(rng.sample(SYLLABLES, rng.randint(1, 3)))}{i}",
+                    keywords=rng.sample(KEYWORDS, rng.randint(0, 4)),
+                    data={},
+                ) for i in range(options['profiles'])
+            ], batch_size=5000)
+            analyze('dashboard_profile')
+
+            profiles = Profile.objects.visible()
+            for keyword in options['searches']:
+                for name, search in [('legacy', legacy_search), ('trigram', trigram_search)]:
+                    def first_page():
+                        page = Paginator(search(profiles, keyword).values_list('pk', flat=True), page_size).get_page(1)
+                        return page.paginator.count, list(page)
+                    (count, _), best = timed(first_page, options['repeat'])
+                    print(f"- {name} '{keyword}': {count} results, best {best}s")
+
+                results, best = timed(lambda: typeahead_profiles(keyword), options['repeat'])
+                print(f"- typeahead '{keyword}': best {best}s, {[result['handle'] for result in results[:5]]}")
+
+                if options['explain']:
+                    print(trigram_search(profiles, keyword)[:page_size].explain(analyze=True))
@@ -17,10 +17,10 @@
 '''
 
 from django.core.management.base import BaseCommand
-from django.db.models import F
 from django.utils import timezone
 
-from dashboard.models import Profile, UserAction
+from dashboard.models import Profile
+from dashboard.profile_stats import dirty_profile_ids, rollup
 from dashboard.tasks import profile_dict
 
 
@@ -30,9 +30,14 @@ class Command(BaseCommand):
 
     def handle(self, *args, **options):
         start_time = timezone.now()-timezone.timedelta(hours=1)
-        profiles = Profile.objects.filter(modified_on__gt=start_time)
-        profiles = profiles | Profile.objects.filter(pk__in=UserAction.objects.filter(created_on__gt=start_time).values_list('pk', flat=True))
-        profiles = profiles.filter(modified_on__gt=F('last_calc_date'))
-        print(profiles.count())
-        for instance in profiles:
-            profile_dict.delay(instance.pk)
+        profile_ids = dirty_profile_ids(start_time)
+        print(len(profile_ids))
+
+        # the stats of the touched profiles are rolled up in bulk, the rest of Profile.as_dict is
+        # only recalculated once it's stale (see Profile.frontend_calc_stale)
+        rollup(profile_ids)
+        stale = Profile.objects.filter(
+            pk__in=profile_ids, last_calc_date__lt=timezone.now() - timezone.timedelta(hours=72)
+        ).values_list('pk', flat=True)
+        for pk in stale:
+            profile_dict.delay(pk)
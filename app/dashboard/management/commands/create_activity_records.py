@@ -18,6 +18,7 @@
 
 from django.core.management.base import BaseCommand
 
+from dashboard.activity_index import deferred_activity_index
 from dashboard.helpers import record_bounty_activity
 from dashboard.models import Activity, ActivityIndex, Bounty, Interest
 from dashboard.views import record_bounty_activity as record_bounty_activity_interest
@@ -73,12 +74,11 @@ def handle(self, *args, **options):
         force_refresh = options['force_refresh']
         if force_refresh:
             activities = Activity.objects.all()
-            for activity in activities:
-                activityIndex = ActivityIndex.objects.filter(activity=activity)
-                if activityIndex:
-                    activityIndex.delete()
+            ActivityIndex.objects.filter(activity__in=activities).delete()
             activities.delete()
         bounties = Bounty.objects.current()
-        for bounty in bounties:
-            if force_refresh or not bounty.activities.count():
-                create_activities(bounty)
+        # the index rows of the activities are written in bulk
+        with deferred_activity_index():
+            for bounty in bounties:
+                if force_refresh or not bounty.activities.count():
+                    create_activities(bounty)
@@ -0,0 +1,30 @@
+'''
+    Copyright (C) 2021 Gitcoin Core
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Affero General Public License as published
+    by the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+    GNU Affero General Public License for more details.
+
+    You should have received a copy of the GNU Affero General Public License
+    along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+'''
+from django.core.management.base import BaseCommand
+
+from dashboard.view_counts import BUFFERED_COUNTERS, flush_view_counts
+
+
+class Command(BaseCommand):
+
+    help = 'writes the activity and offer views buffered in redis to the database'
+
+    def handle(self, *args, **options):
+        for counter in BUFFERED_COUNTERS:
+            flushed = flush_view_counts(counter)
+            print(f'{counter}: flushed the views of {flushed} objects')
@@ -0,0 +1,96 @@
+'''
+    Copyright (C) 2021 Gitcoin Core
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Affero General Public License as published
+    by the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+    GNU Affero General Public License for more details.
+
+    You should have received a copy of the GNU Affero General Public License
+    along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+'''
+import time
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from dashboard.activity_index import INDEXED_ACTIVITY_TYPES, index_activities
+from dashboard.models import Activity, ActivityIndex
+
+# the Activity fields the index keys are built from
+INDEX_KEY_FIELDS = [
+    'id', 'created_on', 'activity_type', 'profile', 'other_profile', 'grant', 'tip', 'hackathonevent', 'bounty',
+    'kudos', 'project',
+]
+
+
+def parse_date(value):
+    return timezone.make_aware(datetime.strptime(value, '%Y-%m-%d'))
+
+
+class Command(BaseCommand):
+
+    help = 'rebuilds or repairs the activity index of the activities created in a time range, in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'mode', type=str, choices=['repair', 'rebuild'],
+            help='repair: index the activities which are not indexed, rebuild: replace the index of every activity'
+        )
+        parser.add_argument('--days', type=int, default=7, help='index the activities of the last n days')
+        parser.add_argument('--start', type=parse_date, help='index the activities created from this date (Y-m-d)')
+        parser.add_argument('--end', type=parse_date, help='index the activities created before this date (Y-m-d)')
+        parser.add_argument('--batch-size', type=int, default=1000, help='activities indexed per transaction')
+
+    def handle(self, *args, **options):
+        rebuild = options['mode'] == 'rebuild'
+        end = options['end'] or timezone.now()
+        start = options['start'] or end - timedelta(days=options['days'])
+        batch_size = options['batch_size']
+
+        activities = Activity.objects.filter(
+            created_on__gte=start, created_on__lt=end, activity_type__in=INDEXED_ACTIVITY_TYPES
+        ).only(*INDEX_KEY_FIELDS).order_by('pk')
+
+        if rebuild:
+            # the index rows left behind by deleted activities
+            deleted, _ = ActivityIndex.objects.filter(
+                activity__isnull=True, created_on__gte=start, created_on__lt=end
+            ).delete()
+            print(f'deleted {deleted} orphaned index rows')
+
+        started = time.monotonic()
+        last_pk = 0
+        scanned = indexed = 0
+        while True:
+            # keyset batches, each batch costs the same however deep in the range it is
+            batch = list(activities.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+            scanned += len(batch)
+
+            pks = [activity.pk for activity in batch]
+            with transaction.atomic():
+                if rebuild:
+                    ActivityIndex.objects.filter(activity_id__in=pks).delete()
+                else:
+                    already_indexed = set(
+                        ActivityIndex.objects.filter(activity_id__in=pks).values_list('activity_id', flat=True)
+                    )
+                    batch = [activity for activity in batch if activity.pk not in already_indexed]
+                index_activities(batch)
+            indexed += len(batch)
+
+            elapsed = time.monotonic() - started
+            print(f'{scanned} activities scanned, {indexed} indexed in {elapsed:.1f}s (last pk {last_pk})')
+
+        print(f'{options["mode"]} of the activities from {start} to {end} complete')
@@ -0,0 +1,48 @@
+'''
+    Copyright (C) 2021 Gitcoin Core
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Affero General Public License as published
+    by the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+    GNU Affero General Public License for more details.
+
+    You should have received a copy of the GNU Affero General Public License
+    along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+'''
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from dashboard.profile_stats import ROLLUP_BATCH_SIZE, dirty_profile_ids, rollup
+
+
+class Command(BaseCommand):
+
+    help = 'rolls up the stats of the recently touched profiles, or of every profile, into Profile.as_dict'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='roll up the stats of every profile')
+        parser.add_argument('--hours', type=int, default=1, help='roll up the profiles touched in the last n hours')
+        parser.add_argument(
+            '--batch-size', type=int, default=ROLLUP_BATCH_SIZE, help='profiles rolled up per set of queries'
+        )
+
+    def handle(self, *args, **options):
+        profile_ids = None
+        if not options['full']:
+            profile_ids = dirty_profile_ids(timezone.now() - timezone.timedelta(hours=options['hours']))
+            print(f'{len(profile_ids)} profiles touched in the last {options["hours"]} hours')
+
+        started = time.monotonic()
+
+        def progress(total):
+            print(f'rolled up {total} profiles in {round(time.monotonic() - started, 1)}s')
+
+        rollup(profile_ids, batch_size=options['batch_size'], progress=progress)
@@ -22,6 +22,7 @@
 from django.core.management.base import BaseCommand
 from django.utils import timezone
 
+from app.sync_engine import ChainAdapter, SyncEngine
 from dashboard.models import BountyFulfillment
 from dashboard.utils import sync_payout
 
@@ -50,10 +51,10 @@ def handle(self, *args, **options):
             'casper_ext',
             'cosmos_ext'
         ]
-        for ext_payout_type in ext_payout_types:
-            ext_pending_fulfillments = pending_fulfillments.filter(payout_type=ext_payout_type)
-            for fulfillment in ext_pending_fulfillments.all():
-                sync_payout(fulfillment)
+        pending_by_chain = {}
+        ext_pending_fulfillments = pending_fulfillments.filter(payout_type__in=ext_payout_types)
+        for fulfillment in ext_pending_fulfillments.select_related('bounty'):
+            pending_by_chain.setdefault(fulfillment.payout_type, []).append(fulfillment)
 
         # QR
         qr_pending_fulfillments = pending_fulfillments.filter(payout_type='qr')
@@ -63,5 +64,12 @@ def handle(self, *args, **options):
             qr_pending_fulfillments.filter(modified_on__lt=timeout_period).update(payout_status='expired')
 
             fulfillments = qr_pending_fulfillments.filter(payout_status='pending')
-            for fulfillment in fulfillments.all():
-                sync_payout(fulfillment)
+            for fulfillment in fulfillments.select_related('bounty'):
+                # QR payouts are synced against the explorer of the token's chain
+                token_name = fulfillment.token_name or fulfillment.bounty.token_name
+                pending_by_chain.setdefault(f'qr_{token_name}', []).append(fulfillment)
+
+        # every chain's explorer is queried at once, a slow explorer only holds up its own chain
+        engine = SyncEngine([ChainAdapter(chain, sync_payout) for chain in pending_by_chain])
+        for metrics in engine.run(pending_by_chain):
+            print(metrics)
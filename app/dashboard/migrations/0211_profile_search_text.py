@@ -0,0 +1,44 @@
+# Generated by Django 2.2.24 on 2022-07-25 09:12
+
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+
+# the column is added with a constant default, which doesn't rewrite the table. The existing rows are filled by the
+# backfill_profile_search_text command and the index is built concurrently by 0212
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0210_auto_20220718_1306'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='profile',
+            name='search_text',
+            field=models.TextField(blank=True, default='', help_text='Used for the directory search. Generated using [handle, keywords]'),
+        ),
+        migrations.RunSQL(
+            sql='''
+              CREATE FUNCTION dashboard_profile_search_text() RETURNS trigger AS $$
+              BEGIN
+                NEW.search_text := lower(concat_ws(' ', NEW.handle, array_to_string(NEW.keywords, ' ')));
+                RETURN NEW;
+              END
+              $$ LANGUAGE plpgsql;
+
+              CREATE TRIGGER search_text_trigger
+              BEFORE INSERT OR UPDATE OF handle, keywords, search_text
+              ON dashboard_profile
+              FOR EACH ROW EXECUTE PROCEDURE
+              dashboard_profile_search_text();
+            ''',
+
+            reverse_sql = '''
+              DROP TRIGGER IF EXISTS search_text_trigger
+              ON dashboard_profile;
+              DROP FUNCTION IF EXISTS dashboard_profile_search_text();
+            '''
+        ),
+    ]
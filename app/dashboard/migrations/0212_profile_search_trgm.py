@@ -0,0 +1,36 @@
+# Generated by Django 2.2.24 on 2022-07-25 09:14
+
+import django.contrib.postgres.indexes
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction, it builds the index without locking out writes
+    atomic = False
+
+    dependencies = [
+        ('dashboard', '0211_profile_search_text'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunSQL(
+                    sql='''
+                      CREATE INDEX CONCURRENTLY IF NOT EXISTS dashboard_profile_search_trgm
+                      ON dashboard_profile USING gin (search_text gin_trgm_ops);
+                    ''',
+                    reverse_sql='DROP INDEX CONCURRENTLY IF EXISTS dashboard_profile_search_trgm;',
+                ),
+            ],
+            state_operations=[
+                migrations.AddIndex(
+                    model_name='profile',
+                    index=django.contrib.postgres.indexes.GinIndex(
+                        fields=['search_text'], name='dashboard_profile_search_trgm', opclasses=['gin_trgm_ops']
+                    ),
+                ),
+            ],
+        ),
+    ]
@@ -35,9 +35,10 @@
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.humanize.templatetags.humanize import naturalday, naturaltime
 from django.contrib.postgres.fields import ArrayField, JSONField
+from django.contrib.postgres.indexes import GinIndex
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import connection, models
-from django.db.models import Count, F, Q, Subquery, Sum, UniqueConstraint
+from django.db.models import Case, Count, F, Q, Subquery, Sum, UniqueConstraint, Value, When
 from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
 from django.dispatch import receiver
 from django.forms.models import model_to_dict
@@ -56,6 +57,7 @@
 from avatar.models import SocialAvatar
 from avatar.utils import get_user_github_avatar_image
 from bs4 import BeautifulSoup
+from dashboard.activity_index import activity_index_keys, platform_activity_index_keys, write_activity_index
 from dashboard.idena_utils import get_idena_status
 from dashboard.tokens import addr_to_token, token_by_name
 from economy.models import ConversionRate, SuperModel, get_0_time
@@ -2708,44 +2710,12 @@ def token_name(self):
 
     # helper function to populate profiles activity index
     def populate_activity_index(_activity):
-        keys = []
-        keys.append(f'profile:{_activity.profile.pk}')
-
-        if _activity.other_profile:
-            keys.append(f'profile:{_activity.other_profile.pk}')
-        if _activity.grant:
-            keys.append(f'grant:{_activity.grant.pk}')
-        if _activity.tip:
-            keys.append(f'tip:{_activity.tip.pk}')
-        if _activity.hackathonevent:
-            keys.append(f'hackathon:{_activity.hackathonevent.pk}')
-        if _activity.bounty:
-            keys.append(f'bounty:{_activity.bounty.pk}')
-        if _activity.kudos:
-            keys.append(f'kudo:{_activity.kudos.pk}')
-        if _activity.project:
-            keys.append(f'project:{_activity.project.pk}')
-
-        for key in keys:
-            ActivityIndex.objects.create(
-                key=key,
-                activity=_activity,
-                created_on=_activity.created_on
-            )
+        write_activity_index([(_activity, activity_index_keys(_activity))])
 
 
     # helper function to populate platform activity index
     def populate_platform_activity_index(_activity):
-        keys = []
-        keys.append(f'profile:{_activity.profile.pk}')
-        keys.append(f'platform:{_activity.profile.pk}')
-
-        for key in keys:
-            ActivityIndex.objects.create(
-                key=key,
-                activity=_activity,
-                created_on=_activity.created_on
-            )
+        write_activity_index([(_activity, platform_activity_index_keys(_activity))])
 
 
     def to_dict(self, fields=None, exclude=None):
@@ -2886,6 +2856,31 @@ def hidden(self):
         """Filter results to only hidden profiles."""
         return self.filter(hide_profile=True)
 
+    def search(self, keyword):
+        """Filter results to the profiles whose handle or keywords contain the keyword.
+
+        The search runs against the trigram indexed search_text (kept up to date by the search_text_trigger).
+
+        Args:
+            keyword (str): The text to search for.
+
+        Returns:
+            dashboard.models.ProfileQuerySet: The matching profiles annotated with `handle_match` (2 when the handle
+                is the keyword, 1 when it starts with it), ordering by it is left to the caller.
+
+        """
+        keyword = keyword.strip().lower().lstrip('@')
+        if not keyword:
+            return self
+        return self.filter(search_text__contains=keyword).annotate(
+            handle_match=Case(
+                When(handle=keyword, then=Value(2)),
+                When(handle__startswith=keyword, then=Value(1)),
+                default=Value(0),
+                output_field=models.IntegerField(),
+            )
+        )
+
 
 class ProfileManager(models.Manager):
     def get_queryset(self):
@@ -2999,6 +2994,9 @@ class Profile(SuperModel):
         ('', 'Neither'),
     ]
 
+    class Meta:
+        indexes = (GinIndex(fields=['search_text'], name='dashboard_profile_search_trgm', opclasses=['gin_trgm_ops']),)
+
     user = models.OneToOneField(User, on_delete=models.SET_NULL, null=True, blank=True)
     data = JSONField()
     handle = models.CharField(max_length=255, db_index=True, unique=True)
@@ -3050,6 +3048,9 @@ class Profile(SuperModel):
     )
 
     keywords = ArrayField(models.CharField(max_length=200), blank=True, default=list)
+    search_text = models.TextField(
+        default='', blank=True, help_text=_('Used for the directory search. Generated using [handle, keywords]')
+    )
     organizations = ArrayField(models.CharField(max_length=200), blank=True, default=list)
     organizations_fk = models.ManyToManyField('dashboard.Profile', blank=True)
     profile_organizations = models.ManyToManyField(Organization, blank=True)
@@ -3610,6 +3611,9 @@ def no_times_been_removed_by_staff(self):
         return user_actions.count()
 
     def get_desc(self, funded_bounties, fulfilled_bounties):
+        return self.get_desc_for_count(funded_bounties.count() + fulfilled_bounties.count())
+
+    def get_desc_for_count(self, total_funded_participated):
         role = 'newbie'
         if self.persona_is_funder and self.persona_is_hunter:
             role = 'funder/coder'
@@ -3620,7 +3624,6 @@ def get_desc(self, funded_bounties, fulfilled_bounties):
         if self.is_org:
             role = 'organization'
 
-        total_funded_participated = funded_bounties.count() + fulfilled_bounties.count()
         plural = 's' if total_funded_participated != 1 else ''
 
         return f"@{self.handle} is a {role} who has participated in {total_funded_participated} " \
@@ -4502,10 +4505,8 @@ def to_dict(self):
             sum_usd_on_repos = self.get_sum(bounties=orgs_bounties, currency='usd')
             works_with_org = self.get_who_works_with(work_type='org', bounties=orgs_bounties)
 
-        total_funded = funded_bounties.count()
         total_fulfilled = fulfilled_bounties.count() + self.tips.count()
         desc = self.desc
-        no_times_been_removed = self.no_times_been_removed_by_funder() + self.no_times_been_removed_by_staff() + self.no_times_slashed_by_staff()
 
         org_works_with = []
         if self.is_org:
@@ -4528,8 +4529,6 @@ def to_dict(self):
             'works_with_org': works_with_org,
             'sum_eth_collected': sum_eth_collected,
             'sum_eth_funded': sum_eth_funded,
-            'funded_bounties_count': total_funded,
-            'no_times_been_removed': no_times_been_removed,
             'sum_usd_on_repos': sum_usd_on_repos,
             'count_bounties_on_repo': count_bounties_on_repo,
             'sum_all_funded_tokens': sum_all_funded_tokens,
@@ -4547,42 +4546,28 @@ def to_dict(self):
             active_bounties = Bounty.objects.none()
         params['active_bounties'] = list(active_bounties.values_list('pk', flat=True))
 
-        all_activities = self.get_various_activities()
-        # commenting this out because we believe its responsible for the long-running query we're seeing on RR1 & RR2
-        # params['activities'] = list(all_activities.values_list('pk', flat=True))
-        counts = {}
-        if not all_activities or all_activities.count() == 0:
-            params['none'] = True
-        else:
-            counts = all_activities.values('activity_type').order_by('activity_type').annotate(the_count=Count('activity_type'))
-            counts = {ele['activity_type']: ele['the_count'] for ele in counts}
-        params['activities_counts'] = counts
+        if self.is_org:
+            # the activities of organizations are matched on their repos, the others are rolled up by profile_stats
+            all_activities = self.get_various_activities()
+            counts = {}
+            if not all_activities or all_activities.count() == 0:
+                params['none'] = True
+            else:
+                counts = all_activities.values('activity_type').order_by('activity_type').annotate(
+                    the_count=Count('activity_type')
+                )
+                counts = {ele['activity_type']: ele['the_count'] for ele in counts}
+            params['activities_counts'] = counts
 
         params['tips'] = list(self.tips.filter(**query_kwargs).send_happy_path().values_list('pk', flat=True))
-        params['scoreboard_position_contributor'] = self.get_contributor_leaderboard_index()
-        params['scoreboard_position_funder'] = self.get_funder_leaderboard_index()
-        if self.is_org:
-            params['scoreboard_position_org'] = self.get_org_leaderboard_index()
 
         context = params
         profile = self
 
-        context['avg_rating'] = profile.get_average_star_rating()
-        context['avg_rating_scaled'] = profile.get_average_star_rating(20)
-        context['verification'] = bool(profile.get_my_verified_check)
-        context['avg_rating'] = profile.get_average_star_rating()
+        # the counts, totals, ratings & leaderboard positions shared with the bulk rollup of calc_profile
+        from dashboard.profile_stats import rollup_profile_stats
+        context.update(rollup_profile_stats([self.pk]).get(self.pk, {}))
         context['total_kudos_count'] = profile.get_my_kudos.count() + profile.get_sent_kudos.count() + profile.get_org_kudos.count()
-        context['total_kudos_sent_count'] = profile.sent_kudos.count()
-        context['total_kudos_received_count'] = profile.received_kudos.count()
-        context['total_grant_created'] = profile.grants.count()
-        context['total_grant_contributions'] = profile.grant_contributor.filter(subscription_contribution__success=True).values_list('subscription_contribution').count() + profile.grant_phantom_funding.count()
-        context['total_grant_actions'] = context['total_grant_created'] + context['total_grant_contributions']
-
-        context['total_tips_sent'] = profile.get_sent_tips.count()
-        context['total_tips_received'] = profile.get_my_tips.count()
-
-        context['total_quest_attempts'] = profile.quest_attempts.count()
-        context['total_quest_success'] = profile.quest_attempts.filter(success=True).count()
 
         # portfolio
         portfolio_bounties = profile.fulfilled.filter(bounty__network='mainnet', bounty__current_bounty=True)
@@ -4597,20 +4582,6 @@ def to_dict(self):
 
         context['portfolio'] = list(portfolio_bounties.values_list('pk', flat=True))
         context['portfolio_keywords'] = sorted_portfolio_keywords
-        earnings_to = Earning.objects.filter(to_profile=profile, network='mainnet', success=True, value_usd__isnull=False)
-        earnings_from = Earning.objects.filter(from_profile=profile, network='mainnet', success=True, value_usd__isnull=False)
-        from django.contrib.contenttypes.models import ContentType
-        earnings_to = earnings_to.exclude(source_type=ContentType.objects.get(app_label='kudos', model='kudostransfer'))
-        context['earnings_total'] = round(sum(earnings_to.values_list('value_usd', flat=True)))
-        context['spent_total'] = round(sum(earnings_from.values_list('value_usd', flat=True)))
-        context['earnings_count'] = earnings_to.count()
-        context['spent_count'] = earnings_from.count()
-        context['hackathons_participated_in'] = self.interested.filter(bounty__event__isnull=False).distinct('bounty__event').count()
-        context['hackathons_funded'] = funded_bounties.filter(event__isnull=False).distinct('event').count()
-        if context['earnings_total'] > 1000:
-            context['earnings_total'] = f"{round(context['earnings_total']/1000)}k"
-        if context['spent_total'] > 1000:
-            context['spent_total'] = f"{round(context['spent_total']/1000)}k"
 
         for key, val in self.override_dict.items():
             context[key] = val
@@ -0,0 +1,338 @@
+# -*- coding: utf-8 -*-
+"""Define the set based rollup of the profile statistics stored in Profile.as_dict.
+
+Copyright (C) 2021 Gitcoin Core
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+import json
+import logging
+
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection
+from django.db.models import Count, Max, Q, Sum, Value
+from django.db.models.functions import Lower, Replace
+
+from cacheops import invalidate_model
+from dashboard.models import (
+    ActivityIndex, Bounty, Earning, FeedbackEntry, Interest, Profile, Tip, UserAction, UserVerificationModel,
+)
+from grants.models import Grant, PhantomFunding, Subscription
+from kudos.models import KudosTransfer
+from marketing.models import LeaderboardRank
+from quests.models import QuestAttempt
+
+logger = logging.getLogger(__name__)
+
+# profiles rolled up per batch, each batch costs one query per statistic
+ROLLUP_BATCH_SIZE = 1000
+
+REMOVED_ACTIONS = ['bounty_removed_by_funder', 'bounty_removed_by_staff', 'bounty_removed_slashed_by_staff']
+
+LEADERBOARD_POSITIONS = {
+    'scoreboard_position_contributor': 'weekly_earners',
+    'scoreboard_position_funder': 'weekly_payers',
+    'scoreboard_position_org': 'weekly_orgs',
+}
+
+RATINGS = [
+    'code_quality_rating', 'communication_rating', 'recommendation_rating', 'satisfaction_rating', 'speed_rating',
+]
+
+
+def grouped(queryset, group_by, **aggregates):
+    '''
+        returns {group_by value: row of aggregates} with a single GROUP BY query
+    '''
+    rows = queryset.nocache().order_by().values(group_by).annotate(**aggregates)
+    return {row[group_by]: row for row in rows}
+
+
+def _format_total(total):
+    if total > 1000:
+        return f"{round(total / 1000)}k"
+    return total
+
+
+def kudos_stats(profiles, stats):
+    pks = list(profiles)
+    sent = grouped(KudosTransfer.objects.filter(sender_profile__in=pks), 'sender_profile', count=Count('id'))
+    received = grouped(
+        KudosTransfer.objects.filter(recipient_profile__in=pks), 'recipient_profile', count=Count('id')
+    )
+    for pk in pks:
+        stats[pk]['total_kudos_sent_count'] = sent.get(pk, {}).get('count', 0)
+        stats[pk]['total_kudos_received_count'] = received.get(pk, {}).get('count', 0)
+
+
+def grant_stats(profiles, stats):
+    pks = list(profiles)
+    created = grouped(Grant.objects.filter(admin_profile__in=pks), 'admin_profile', count=Count('id'))
+    # one row per successful contribution of the profile's subscriptions
+    contributions = grouped(
+        Subscription.objects.filter(contributor_profile__in=pks, subscription_contribution__success=True),
+        'contributor_profile', count=Count('subscription_contribution')
+    )
+    phantom = grouped(PhantomFunding.objects.filter(profile__in=pks), 'profile', count=Count('id'))
+    for pk in pks:
+        total_created = created.get(pk, {}).get('count', 0)
+        total_contributions = contributions.get(pk, {}).get('count', 0) + phantom.get(pk, {}).get('count', 0)
+        stats[pk]['total_grant_created'] = total_created
+        stats[pk]['total_grant_contributions'] = total_contributions
+        stats[pk]['total_grant_actions'] = total_created + total_contributions
+
+
+def tip_stats(profiles, stats):
+    handles = [profile['handle'].lower() for profile in profiles.values() if profile['handle']]
+    sent = grouped(
+        Tip.objects.annotate(sender=Lower('from_username')).filter(sender__in=handles), 'sender', count=Count('id')
+    )
+    received = grouped(
+        Tip.objects.annotate(receiver=Lower('username')).filter(receiver__in=handles), 'receiver', count=Count('id')
+    )
+    for pk, profile in profiles.items():
+        handle = (profile['handle'] or '').lower()
+        stats[pk]['total_tips_sent'] = sent.get(handle, {}).get('count', 0)
+        stats[pk]['total_tips_received'] = received.get(handle, {}).get('count', 0)
+
+
+def quest_stats(profiles, stats):
+    pks = list(profiles)
+    attempts = grouped(
+        QuestAttempt.objects.filter(profile__in=pks), 'profile',
+        count=Count('id'), success=Count('id', filter=Q(success=True))
+    )
+    for pk in pks:
+        stats[pk]['total_quest_attempts'] = attempts.get(pk, {}).get('count', 0)
+        stats[pk]['total_quest_success'] = attempts.get(pk, {}).get('success', 0)
+
+
+def earning_stats(profiles, stats):
+    pks = list(profiles)
+    earnings = Earning.objects.filter(network='mainnet', success=True, value_usd__isnull=False)
+    kudos_transfer = ContentType.objects.get_by_natural_key('kudos', 'kudostransfer')
+    earned = grouped(
+        earnings.filter(to_profile__in=pks).exclude(source_type=kudos_transfer), 'to_profile',
+        count=Count('id'), total=Sum('value_usd')
+    )
+    spent = grouped(earnings.filter(from_profile__in=pks), 'from_profile', count=Count('id'), total=Sum('value_usd'))
+    for pk in pks:
+        stats[pk]['earnings_total'] = _format_total(round(earned.get(pk, {}).get('total') or 0))
+        stats[pk]['spent_total'] = _format_total(round(spent.get(pk, {}).get('total') or 0))
+        stats[pk]['earnings_count'] = earned.get(pk, {}).get('count', 0)
+        stats[pk]['spent_count'] = spent.get(pk, {}).get('count', 0)
+
+
+def bounty_stats(profiles, stats):
+    pks = list(profiles)
+    participated = grouped(
+        Interest.objects.filter(profile__in=pks, bounty__event__isnull=False), 'profile',
+        count=Count('bounty__event', distinct=True)
+    )
+
+    # funded bounties are matched on the owner's github username, with or without a leading @
+    owners = {profile['handle'].lower(): pk for pk, profile in profiles.items() if profile['handle']}
+    funded = grouped(
+        Bounty.objects.current().filter(network=Profile.get_network()).annotate(
+            owner=Replace(Lower('bounty_owner_github_username'), Value('@'), Value(''))
+        ).filter(owner__in=list(owners)), 'owner',
+        count=Count('id'), events=Count('event', distinct=True)
+    )
+    for pk in pks:
+        stats[pk]['hackathons_participated_in'] = participated.get(pk, {}).get('count', 0)
+        stats[pk]['funded_bounties_count'] = 0
+        stats[pk]['hackathons_funded'] = 0
+    for owner, pk in owners.items():
+        stats[pk]['funded_bounties_count'] = funded.get(owner, {}).get('count', 0)
+        stats[pk]['hackathons_funded'] = funded.get(owner, {}).get('events', 0)
+
+
+def action_stats(profiles, stats):
+    pks = list(profiles)
+    removed = grouped(
+        UserAction.objects.filter(profile__in=pks, action__in=REMOVED_ACTIONS), 'profile', count=Count('id')
+    )
+    for pk in pks:
+        stats[pk]['no_times_been_removed'] = removed.get(pk, {}).get('count', 0)
+
+
+def leaderboard_stats(profiles, stats):
+    pks = list(profiles)
+    latest = LeaderboardRank.objects.filter(
+        active=True, product='all', profile__in=pks, leaderboard__in=list(LEADERBOARD_POSITIONS.values())
+    ).nocache().order_by().values('profile', 'leaderboard').annotate(latest=Max('id')).values_list('latest', flat=True)
+    ranks = {
+        (profile, leaderboard): rank for profile, leaderboard, rank in
+        LeaderboardRank.objects.filter(pk__in=latest).values_list('profile', 'leaderboard', 'rank')
+    }
+    for pk, profile in profiles.items():
+        for key, leaderboard in LEADERBOARD_POSITIONS.items():
+            if key == 'scoreboard_position_org' and not profile['is_org']:
+                continue
+            stats[pk][key] = ranks.get((pk, leaderboard), 0)
+
+
+def rating_stats(profiles, stats):
+    pks = list(profiles)
+    aggregates = {'count': Count('id'), 'rating': Sum('rating')}
+    for rating in RATINGS:
+        aggregates[rating] = Sum(rating)
+        aggregates[f'{rating}_count'] = Count('id', filter=~Q(**{rating: 0}))
+    feedbacks = grouped(FeedbackEntry.objects.filter(receiver_profile__in=pks), 'receiver_profile', **aggregates)
+
+    def average_rating(row, scale):
+        count = row.get('count', 0)
+        average = {'overall': row['rating'] * scale / count if count else 0}
+        for rating in RATINGS:
+            rated = row.get(f'{rating}_count', 0)
+            average[rating] = row[rating] * scale / rated if rated else 0
+        average['total_rating'] = count
+        return average
+
+    for pk in pks:
+        row = feedbacks.get(pk, {})
+        stats[pk]['avg_rating'] = average_rating(row, 1)
+        stats[pk]['avg_rating_scaled'] = average_rating(row, 20)
+
+
+def verification_stats(profiles, stats):
+    user_ids = [profile['user_id'] for profile in profiles.values() if profile['user_id']]
+    verified = set(UserVerificationModel.objects.filter(user__in=user_ids).values_list('user_id', flat=True))
+    for pk, profile in profiles.items():
+        stats[pk]['verification'] = profile['user_id'] in verified
+
+
+def activity_stats(profiles, stats):
+    # the activities of organizations are matched on their repos, they're only counted by Profile.to_dict
+    keys = {f'profile:{pk}': pk for pk, profile in profiles.items() if not profile['is_org']}
+    rows = ActivityIndex.objects.filter(key__in=list(keys), activity__isnull=False).nocache().order_by().values(
+        'key', 'activity__activity_type'
+    ).annotate(the_count=Count('id'))
+    counts = {pk: {} for pk in keys.values()}
+    for row in rows:
+        counts[keys[row['key']]][row['activity__activity_type']] = row['the_count']
+    for pk, activities_counts in counts.items():
+        stats[pk]['activities_counts'] = activities_counts
+        stats[pk]['none'] = not activities_counts
+
+
+# the statistics of Profile.as_dict rolled up with grouped queries, each collector adds its keys to the stats of
+# every profile of the batch
+STAT_COLLECTORS = [
+    kudos_stats,
+    grant_stats,
+    tip_stats,
+    quest_stats,
+    earning_stats,
+    bounty_stats,
+    action_stats,
+    leaderboard_stats,
+    rating_stats,
+    verification_stats,
+    activity_stats,
+]
+
+
+def rollup_profile_stats(profile_ids):
+    '''
+        computes the rolled up statistics of the profiles, with one query per collector whatever the number of profiles
+
+        returns:
+            {int: dict} - the statistics of each profile
+    '''
+    profiles = {
+        profile['id']: profile
+        for profile in Profile.objects.filter(pk__in=profile_ids).nocache().values('id', 'handle', 'user_id', 'is_org')
+    }
+    stats = {pk: {} for pk in profiles}
+    if profiles:
+        for collector in STAT_COLLECTORS:
+            collector(profiles, stats)
+    return stats
+
+
+def write_profile_stats(stats):
+    '''
+        merges the statistics into Profile.as_dict with one UPDATE per batch, override_dict keeps precedence
+    '''
+    rows = [(pk, json.dumps(profile_stats)) for pk, profile_stats in stats.items()]
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), ROLLUP_BATCH_SIZE):
+            batch = rows[start:start + ROLLUP_BATCH_SIZE]
+            values = ', '.join(['(%s, %s::jsonb)'] * len(batch))
+            cursor.execute(
+                f"UPDATE dashboard_profile AS t "
+                f"SET as_dict = COALESCE(t.as_dict, '{{}}'::jsonb) || v.stats "
+                f"|| COALESCE(t.override_dict, '{{}}'::jsonb) "
+                f"FROM (VALUES {values}) AS v(id, stats) WHERE t.id = v.id",
+                [value for row in batch for value in row]
+            )
+
+
+def dirty_profile_ids(since):
+    '''
+        returns the profiles whose statistics may have changed since the timestamp
+    '''
+    profile_ids = set(Profile.objects.filter(modified_on__gt=since).values_list('pk', flat=True))
+    profile_ids.update(UserAction.objects.filter(created_on__gt=since).values_list('profile_id', flat=True))
+    for profile_field in ['to_profile_id', 'from_profile_id']:
+        profile_ids.update(Earning.objects.filter(modified_on__gt=since).values_list(profile_field, flat=True))
+    profile_ids.update(FeedbackEntry.objects.filter(created_on__gt=since).values_list('receiver_profile_id', flat=True))
+    profile_ids.update(QuestAttempt.objects.filter(modified_on__gt=since).values_list('profile_id', flat=True))
+    profile_ids.update(
+        ActivityIndex.objects.filter(created_on__gt=since, key__startswith='profile:').values_list('key', flat=True)
+    )
+    profile_ids.discard(None)
+    return sorted({int(str(pk).replace('profile:', '')) for pk in profile_ids})
+
+
+def rollup(profile_ids=None, batch_size=ROLLUP_BATCH_SIZE, progress=None):
+    '''
+        rolls up and writes the statistics of the profiles, or of every profile, in batches of batch_size
+
+        returns:
+            int - the number of profiles rolled up
+    '''
+    if profile_ids is None:
+        batches = _all_profile_batches(batch_size)
+    else:
+        profile_ids = list(profile_ids)
+        batches = (profile_ids[start:start + batch_size] for start in range(0, len(profile_ids), batch_size))
+
+    total = 0
+    for batch in batches:
+        stats = rollup_profile_stats(batch)
+        write_profile_stats(stats)
+        total += len(stats)
+        if progress:
+            progress(total)
+
+    if total:
+        # the rows were updated without the orm
+        invalidate_model(Profile)
+    logger.info(f'rolled up the stats of {total} profiles')
+    return total
+
+
+def _all_profile_batches(batch_size):
+    last_pk = 0
+    while True:
+        batch = list(
+            Profile.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:batch_size]
+        )
+        if not batch:
+            return
+        yield batch
+        last_pk = batch[-1]
@@ -33,8 +33,8 @@
     Activity, Bounty, BountyFulfillment, BountyInvites, HackathonEvent, HackathonProject, Interest, Profile,
     ProfileSerializer, SearchHistory, TribeMember, UserDirectory,
 )
-from .tasks import increment_view_count
 from .utils import add_param_to_querySet
+from .view_counts import record_content_views
 
 logger = logging.getLogger(__name__)
 
@@ -566,8 +566,7 @@ def get_queryset(self):
         # increment view counts
         pks = [ele.pk for ele in queryset]
         if len(pks):
-            view_type = 'individual' if len(pks) == 1 else 'list'
-            increment_view_count.delay(pks, queryset[0].content_type, self.request.user.id, view_type)
+            record_content_views(queryset[0].content_type, pks)
 
         return queryset
 
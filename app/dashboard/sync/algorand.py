@@ -3,7 +3,7 @@
 from django.conf import settings
 from django.utils import timezone
 
-import requests
+from app.sync_engine import explorer
 from dashboard.sync.helpers import record_payout_activity, txn_already_used
 
 API_KEY = settings.ALGORAND_API_KEY
@@ -17,7 +17,7 @@ def get_algorand_txn_status(fulfillment):
     amount = fulfillment.payout_amount
 
     url = f'https://api.algoexplorer.io/v2/transactions/pending/{txnid}?format=json'
-    response = requests.get(url).json()
+    response = explorer.get(url).json()
     if response:
 
         if response.get('confirmed-round') and response.get('txn') and response.get('txn').get('txn'):
@@ -55,7 +55,7 @@ def get_algorand_txn_status_paid_explorer(fulfillment):
     }
 
     url = f'https://mainnet-algorand.api.purestake.io/idx2/v2/transactions/{txnid}'
-    response = requests.get(url=url, headers=headers).json()
+    response = explorer.get(url=url, headers=headers).json()
     
     if response:
         if response.get("current-round") and response.get("transaction"):
@@ -2,7 +2,7 @@
 
 from django.utils import timezone
 
-import requests
+from app.sync_engine import explorer
 from dashboard.sync.helpers import record_payout_activity
 
 logger = logging.getLogger(__name__)
@@ -30,7 +30,7 @@ def get_binance_txn_status(fulfillment):
             'params': [ txnid ]
         }
 
-        binance_response = requests.post(binance_url, json=data).json()
+        binance_response = explorer.post(binance_url, json=data).json()
 
         result = binance_response['result']
 
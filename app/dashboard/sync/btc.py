@@ -2,7 +2,7 @@
 
 from django.utils import timezone
 
-import requests
+from app.sync_engine import explorer
 from dashboard.sync.helpers import record_payout_activity, txn_already_used
 from economy.models import Token
 from oogway import Net, validate
@@ -33,7 +33,7 @@ def find_txn_on_btc_explorer(fulfillment, network='mainnet'):
 
         if txlist != []:
             for txn in txlist:
-                blockstream_response = requests.get(blockstream_url+txn).json()
+                blockstream_response = explorer.get(blockstream_url+txn).json()
                 if (
                     blockstream_response['vin'][0]['prevout']['scriptpubkey_address'] == str(funderAddress) and
                     blockstream_response['vout'][0]['scriptpubkey_address'] == str(payeeAddress) and
@@ -53,7 +53,7 @@ def get_btc_txn_status(txnid, network='mainnet'):
     else:
         blockstream_url = f'https://blockstream.info/testnet/api/tx/{txnid}'
 
-    blockstream_response = requests.get(blockstream_url)
+    blockstream_response = explorer.get(blockstream_url)
 
     if blockstream_response.status_code == 200:
         return True
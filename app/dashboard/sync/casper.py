@@ -2,7 +2,7 @@
 
 from django.utils import timezone
 
-import requests
+from app.sync_engine import explorer
 from dashboard.sync.helpers import record_payout_activity
 
 logger = logging.getLogger(__name__)
@@ -25,7 +25,7 @@ def get_casper_txn_status(fulfillment):
             'params': [ txnid ]
         }
         casper_rpc_url = 'http://3.142.224.108:7777/rpc'
-        casper_response = requests.post(casper_rpc_url, json=data).json()
+        casper_response = explorer.post(casper_rpc_url, json=data).json()
 
         result = casper_response['result']
 
@@ -1,6 +1,6 @@
 from django.utils import timezone
 
-import requests
+from app.sync_engine import explorer
 from dashboard.sync.helpers import record_payout_activity, txn_already_used
 from economy.models import Token
 
@@ -19,7 +19,7 @@ def find_txn_on_celo_explorer(fulfillment, network='mainnet'):
     payeeAddress = fulfillment.fulfiller_address
 
     blockscout_url = f'https://explorer.celo.org/api?module=account&action=tokentx&address={funderAddress}'
-    blockscout_response = requests.get(blockscout_url).json()
+    blockscout_response = explorer.get(blockscout_url).json()
     if blockscout_response['message'] and blockscout_response['result']:
         for txn in blockscout_response['result']:
             if (
@@ -38,7 +38,7 @@ def get_celo_txn_status(txnid, network='mainnet'):
 
     blockscout_url = f'https://explorer.celo.org/api?module=transaction&action=gettxinfo&txhash={txnid}'
 
-    blockscout_response = requests.get(blockscout_url).json()
+    blockscout_response = explorer.get(blockscout_url).json()
 
     if blockscout_response['status'] and blockscout_response['result']:
 
@@ -1,6 +1,6 @@
 from django.utils import timezone
 
-import requests
+from app.sync_engine import explorer
 from dashboard.sync.helpers import record_payout_activity, txn_already_used
 
 BASE_URL = 'https://api.cosmos.network'
@@ -16,13 +16,13 @@ def get_cosmos_txn_status(fulfillment):
     if token_name != 'ATOM' or not txnid:
         return None
 
-    response = requests.get(f'{BASE_URL}/cosmos/tx/v1beta1/txs/{txnid}').json()
+    response = explorer.get(f'{BASE_URL}/cosmos/tx/v1beta1/txs/{txnid}').json()
 
     tx_response = response.get('tx')
 
     if tx_response and tx_response['body']['messages'][0]['@type'] == '/cosmos.bank.v1beta1.MsgSend':
         tx_response = tx_response['body']['messages'][0]
-        block_tip = requests.get(
+        block_tip = explorer.get(
             f'{BASE_URL}/blocks/latest'
         ).json()['block']['header']['height']
         confirmations = int(block_tip) - int(response['tx_response']['height'])
@@ -1,6 +1,6 @@
 from django.utils import timezone
 
-import requests
+from app.sync_engine import explorer
 from dashboard.sync.helpers import record_payout_activity, txn_already_used
 from economy.models import Token
 
@@ -18,7 +18,7 @@ def find_txn_on_etc_explorer(fulfillment, network='mainnet'):
     payeeAddress = fulfillment.fulfiller_address
 
     blockscout_url = f'https://blockscout.com/etc/{network}/api?module=account&action=txlist&address={funderAddress}'
-    blockscout_response = requests.get(blockscout_url).json()
+    blockscout_response = explorer.get(blockscout_url).json()
     if blockscout_response['message'] and blockscout_response['result']:
         for txn in blockscout_response['result']:
             if (
@@ -36,7 +36,7 @@ def get_etc_txn_status(txnid, network='mainnet'):
         return None
 
     blockscout_url = f'https://blockscout.com/etc/{network}/api?module=transaction&action=gettxinfo&txhash={txnid}'
-    blockscout_response = requests.get(blockscout_url).json()
+    blockscout_response = explorer.get(blockscout_url).json()
 
     if blockscout_response['status'] and blockscout_response['result']:
 
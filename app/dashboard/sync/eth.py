@@ -5,6 +5,7 @@
 from django.utils import timezone
 
 import requests
+from app.sync_engine import explorer
 from bs4 import BeautifulSoup
 from dashboard.sync.helpers import record_payout_activity
 
@@ -34,7 +35,7 @@ def get_eth_txn_status(fulfillment):
             etherscan_url = f'https://api-rinkeby.etherscan.io/api?module=transaction&action=gettxreceiptstatus&txhash={txnid}&apikey={API_KEY}'
 
         # Make request
-        etherscan_response = requests.get(etherscan_url, headers=headers)
+        etherscan_response = explorer.get(etherscan_url, headers=headers)
         # Raise exception if status != 200
         etherscan_response.raise_for_status()
         # retaining raw data for the purpose of logging it in case of error
@@ -95,7 +96,7 @@ def sync_eth_payout(fulfillment):
 def getReplacedTX(tx):
     try:
         ethurl = "https://etherscan.io/tx/"
-        response = requests.get(ethurl + tx + '/', headers=headers)
+        response = explorer.get(ethurl + tx + '/', headers=headers)
         soup = BeautifulSoup(response.content, "html.parser")
         p = soup.find("span", "u-label u-label--sm u-label--warning rounded")
         if not p:
@@ -3,7 +3,7 @@
 from django.conf import settings
 from django.utils import timezone
 
-import requests
+from app.sync_engine import explorer
 from dashboard.sync.helpers import record_payout_activity, txn_already_used
 from economy.models import Token
 
@@ -35,7 +35,7 @@ def find_txn_on_filecoin_explorer(fulfillment):
         "method": "filscan.MessageByAddress"
     }
 
-    response = requests.post(url, headers=headers, data=json.dumps(data)).json()
+    response = explorer.post(url, headers=headers, data=json.dumps(data)).json()
     if (
         response and
         'result' in response and
@@ -70,7 +70,7 @@ def get_filecoin_txn_status(fulfillment):
         "method": "filscan.MessageDetails"
     }
 
-    filscan_response = requests.post(url, headers=headers, data=json.dumps(data)).json()
+    filscan_response = explorer.post(url, headers=headers, data=json.dumps(data)).json()
     if filscan_response and 'result' in filscan_response:
         txn = filscan_response['result']
         if 'exit_code' in txn:
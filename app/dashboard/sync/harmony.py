@@ -3,7 +3,7 @@
 from django.conf import settings
 from django.utils import timezone
 
-import requests
+from app.sync_engine import explorer
 from dashboard.sync.helpers import record_payout_activity, txn_already_used
 
 
@@ -21,7 +21,7 @@ def find_txn_on_harmony_explorer(fulfillment):
     url = f'https://explorer.hmny.io:8888/address?id={payeeAddress}&pageIndex=0&pageSize=20'
 
 
-    response = requests.get(url).json()
+    response = explorer.get(url).json()
     if (
         response and
         'address' in response and
@@ -57,7 +57,7 @@ def get_harmony_txn_status(fulfillment):
     url = f'https://explorer.hmny.io:8888/tx?id={txnid}'
 
 
-    response = requests.get(url).json()
+    response = explorer.get(url).json()
     if (response and 'tx' in response):
         tx = response['tx']
 
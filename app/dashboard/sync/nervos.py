@@ -1,6 +1,6 @@
 from django.utils import timezone
 
-import requests
+from app.sync_engine import explorer
 from dashboard.sync.helpers import record_payout_activity
 
 HEADERS = {
@@ -21,11 +21,11 @@ def get_nervos_txn_status(txnid, network='mainnet'):
     explorer_url = f'{base_url}/transactions/{txnid}'
     tip_block_number_url = f'{base_url}/statistics/tip_block_number'
 
-    tx_response = requests.get(explorer_url, headers=HEADERS)
+    tx_response = explorer.get(explorer_url, headers=HEADERS)
 
     if tx_response.status_code == 200:
         tx_data = tx_response.json()['data']['attributes']
-        tip_block_number = requests.get(
+        tip_block_number = explorer.get(
             tip_block_number_url, headers=HEADERS
         ).json()['data']['attributes']['tip_block_number']
         confirmations = tip_block_number - int(tx_data['block_number'])
@@ -4,7 +4,7 @@
 from django.conf import settings
 from django.utils import timezone
 
-import requests
+from app.sync_engine import explorer
 from dashboard.sync.helpers import record_payout_activity
 
 logger = logging.getLogger(__name__)
@@ -19,7 +19,7 @@ def get_polkadot_txn_status(txnid, token_name):
         # subscan_url = f'https://polkadot.subscan.io/api/open/extrinsic'
         # payload = { "hash": txnid }
         # headers = { 'Content-Type': 'application/json'}
-        # subscan_response = requests.post(subscan_url, headers=headers, data=json.dumps(payload)).json()
+        # subscan_response = explorer.post(subscan_url, headers=headers, data=json.dumps(payload)).json()
 
         # if subscan_response:
         #     status = subscan_response.get('data').get('extrinsic').get('success')
@@ -30,7 +30,7 @@ def get_polkadot_txn_status(txnid, token_name):
             polkascan_url = f'https://explorer-32.polkascan.io/api/v1/kusama/extrinsic/{txnid}'
 
         headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 6.1; WOW64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/41.0. 2272.118 Safari/537.36.'}
-        polkascan_response = requests.get(polkascan_url, headers=headers).json()
+        polkascan_response = explorer.get(polkascan_url, headers=headers).json()
 
         if polkascan_response:
             status = polkascan_response.get('data').get('attributes')
@@ -3,7 +3,7 @@
 from django.conf import settings
 from django.utils import timezone
 
-import requests
+from app.sync_engine import explorer
 from dashboard.sync.helpers import record_payout_activity, txn_already_used
 
 
@@ -19,7 +19,7 @@ def find_txn_on_rsk_explorer(fulfillment):
 
     url = f'https://blockscout.com/rsk/mainnet/api?module=account&action=txlist&address={funderAddress}'
 
-    response = requests.get(url).json()
+    response = explorer.get(url).json()
 
     if response['message'] and response['result']:
         for txn in response['result']:
@@ -52,7 +52,7 @@ def get_rsk_txn_status(fulfillment):
 
     url = f'https://blockscout.com/rsk/mainnet/api?module=transaction&action=gettxinfo&txhash={txnid}'
 
-    response = requests.get(url).json()
+    response = explorer.get(url).json()
    
     if response['status'] and response['result']:
         txn = response['result']
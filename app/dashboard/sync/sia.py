@@ -1,6 +1,6 @@
 from django.utils import timezone
 
-import requests
+from app.sync_engine import explorer
 from dashboard.sync.helpers import record_payout_activity, txn_already_used
 
 BASE_URL = 'https://siastats.info:3500/navigator-api'
@@ -17,7 +17,7 @@ def find_txn_on_sia_explorer(fulfillment):
 
     url = f'{BASE_URL}/hash/{funderAddress}'
 
-    response = requests.get(url).json()
+    response = explorer.get(url).json()
 
     if response:
         last100_txns = response[1]['last100Transactions']
@@ -40,10 +40,10 @@ def get_sia_txn_status(txnid, network='mainnet'):
     tx_url = f'{BASE_URL}/hash/{txnid}'
     stats_url = f'{BASE_URL}/status'
 
-    tx_response = requests.get(tx_url).json()
+    tx_response = explorer.get(tx_url).json()
 
     if tx_response:
-        last_block = requests.get(stats_url).json()[0]['lastblock'] # or consensusblock ?
+        last_block = explorer.get(stats_url).json()[0]['lastblock'] # or consensusblock ?
 
         confirmations = last_block - tx_response[1]['Height']
 
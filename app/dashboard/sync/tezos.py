@@ -1,6 +1,6 @@
 from django.utils import timezone
 
-import requests
+from app.sync_engine import explorer
 from dashboard.sync.helpers import record_payout_activity, txn_already_used
 
 BASE_URL = 'https://api.tzkt.io/v1'
@@ -18,7 +18,7 @@ def find_txn_on_tezos_explorer(fulfillment):
 
     url = f'{BASE_URL}/accounts/{funderAddress}'
 
-    response = requests.get(url).json()
+    response = explorer.get(url).json()
 
     if response:
         for txn in response['operations']:
@@ -44,12 +44,12 @@ def get_tezos_txn_status(fulfillment):
     if token_name != 'XTZ' or not txnid:
         return None
 
-    tx_response = requests.get(f'{BASE_URL}/operations/{txnid}').json()
+    tx_response = explorer.get(f'{BASE_URL}/operations/{txnid}').json()
 
     # a valid response will return a list whereas an invalid response will return a dict
     if tx_response and isinstance(tx_response, list) and len(tx_response) > 0:
         tx_response = tx_response[0]
-        block_tip = requests.get(f'{BASE_URL}/head').json()['level']
+        block_tip = explorer.get(f'{BASE_URL}/head').json()['level']
         confirmations = block_tip - tx_response['level']
         if (
             tx_response['type'] == 'transaction'
@@ -3,7 +3,7 @@
 from django.conf import settings
 from django.utils import timezone
 
-import requests
+from app.sync_engine import explorer
 from dashboard.sync.helpers import record_payout_activity, txn_already_used
 
 API_KEY = settings.XINFIN_API_KEY
@@ -19,7 +19,7 @@ def find_txn_on_xinfin_explorer(fulfillment):
         return None
 
     url = f'https://xdc.network/publicAPI?module=account&action=txlist&address={funderAddress}&page=0&pageSize=10&apikey={API_KEY}'
-    response = requests.get(url).json()
+    response = explorer.get(url).json()
 
     if response['message'] and response['result']:
         for txn in response['result']:
@@ -51,7 +51,7 @@ def get_xinfin_txn_status(fulfillment):
         return None
 
     url = f'https://explorer.xinfin.network/publicAPI?module=transaction&action=gettxdetails&txhash={txnid}&apikey={API_KEY}'
-    response = requests.get(url).json()
+    response = explorer.get(url).json()
 
     if response['status'] == '0':
         return 'expired'
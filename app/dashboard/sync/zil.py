@@ -4,7 +4,7 @@
 from django.conf import settings
 from django.utils import timezone
 
-import requests
+from app.sync_engine import explorer
 from dashboard.sync.helpers import record_payout_activity, txn_already_used
 from economy.models import Token
 
@@ -26,7 +26,7 @@ def find_txn_on_zil_explorer(fulfillment, network='mainnet'):
     payeeAddress = fulfillment.fulfiller_address
 
     url = f'https://api.viewblock.io/v1/zilliqa/addresses/{funderAddress}/txs?network={network}'
-    response = requests.get(url, headers=headers).json()
+    response = explorer.get(url, headers=headers).json()
     if len(response):
         for txn in response:
             if (
@@ -45,7 +45,7 @@ def get_zil_txn_status(txnid, network='mainnet'):
         return None
 
     url = f'https://api.viewblock.io/v1/zilliqa/txs/{txnid}?network={network}'
-    view_block_response = requests.get(url, headers=headers).json()
+    view_block_response = explorer.get(url, headers=headers).json()
     if view_block_response:
 
         response = {
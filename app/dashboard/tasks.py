@@ -22,6 +22,7 @@
     Activity, Bounty, Earning, ObjectView, Passport, PassportStamp, Profile, TransactionHistory, UserAction,
 )
 from dashboard.utils import get_tx_status_and_details
+from dashboard.view_counts import record_content_views
 from economy.models import EncodeAnything
 from marketing.mails import func_name, grant_update_email, send_mail
 from passport_score.models import GR15TrustScore
@@ -348,11 +349,9 @@ def increment_view_count(self, pks, content_type, user_id, view_type, retry: boo
     user = None
     if user_id:
         user = User.objects.get(pk=user_id)
-    redis = RedisService().redis
+    # views are counted in the request with record_content_views, this task is kept for queued messages
+    record_content_views(content_type, pks)
     for pk in pks:
-        key = f"{content_type}_{pk}"
-        print(key)
-        result = redis.incr(key)
         if pk and view_type == 'individual' and individual_storage:
             try:
                 ObjectView.objects.create(
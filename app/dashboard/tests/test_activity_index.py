@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""Handle activity index related tests.
+
+Copyright (C) 2021 Gitcoin Core
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from django.core.management import call_command
+
+from app.tests.fake_redis import FakeRedis
+from dashboard import timelines
+from dashboard.activity_index import _flush_deferred, deferred_activity_index
+from dashboard.models import Activity, ActivityIndex
+from dashboard.tests.factories.profile_factory import ProfileFactory
+from test_plus.test import TestCase
+
+
+class ActivityIndexTest(TestCase):
+    """Define tests for the bulk writes of the activity index."""
+
+    def setUp(self):
+        self.patch = patch.object(timelines, 'RedisService', return_value=SimpleNamespace(redis=FakeRedis()))
+        self.patch.start()
+        self.profile = ProfileFactory()
+        self.other_profile = ProfileFactory()
+
+    def tearDown(self):
+        self.patch.stop()
+
+    def create_activity(self, activity_type='status_update', **kwargs):
+        return Activity.objects.create(
+            profile=self.profile, activity_type=activity_type, metadata={'title': str(Activity.objects.count())},
+            **kwargs
+        )
+
+    def keys(self, activity):
+        return sorted(ActivityIndex.objects.filter(activity=activity).values_list('key', flat=True))
+
+    def test_populate_activity_index(self):
+        """Test an activity is indexed under its profiles & related objects."""
+        activity = self.create_activity(other_profile=self.other_profile)
+        activity.populate_activity_index()
+        leaderboard = self.create_activity('leaderboard_rank')
+        leaderboard.populate_platform_activity_index()
+
+        assert self.keys(activity) == sorted([f'profile:{self.profile.pk}', f'profile:{self.other_profile.pk}'])
+        assert self.keys(leaderboard) == [f'platform:{self.profile.pk}', f'profile:{self.profile.pk}']
+
+    def test_deferred_index_is_written_in_bulk(self):
+        """Test the index rows of a block are written when it exits with one insert."""
+        with deferred_activity_index():
+            activities = [self.create_activity() for _ in range(5)]
+            for activity in activities:
+                activity.populate_activity_index()
+            assert ActivityIndex.objects.count() == 0
+
+            with self.assertNumQueries(2):
+                # the check for activities deleted meanwhile and the insert
+                _flush_deferred()
+
+        assert ActivityIndex.objects.filter(activity__in=activities).count() == 5
+
+    def test_reindex_repair(self):
+        """Test a repair indexes the activities without index rows and keeps the others."""
+        indexed = self.create_activity()
+        indexed.populate_activity_index()
+        missing = self.create_activity(other_profile=self.other_profile)
+        not_shown = self.create_activity('updated_avatar')
+
+        call_command('reindex_activities', 'repair', '--batch-size', '1')
+
+        assert ActivityIndex.objects.filter(activity=indexed).count() == 1
+        assert self.keys(missing) == sorted([f'profile:{self.profile.pk}', f'profile:{self.other_profile.pk}'])
+        assert self.keys(not_shown) == []
+
+    def test_reindex_rebuild(self):
+        """Test a rebuild replaces the index rows of the activities and drops the orphaned ones."""
+        activity = self.create_activity()
+        ActivityIndex.objects.create(key='profile:0', activity=activity, created_on=activity.created_on)
+        ActivityIndex.objects.create(key='profile:0', activity=None, created_on=activity.created_on)
+
+        call_command('reindex_activities', 'rebuild')
+
+        assert self.keys(activity) == [f'profile:{self.profile.pk}']
+        assert not ActivityIndex.objects.filter(activity__isnull=True).exists()
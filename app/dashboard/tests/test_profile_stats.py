@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""Handle profile stats rollup related tests.
+
+Copyright (C) 2021 Gitcoin Core
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+from datetime import timedelta
+
+from django.core.management import call_command
+from django.utils import timezone
+
+from dashboard.models import FeedbackEntry, Profile, Tip, UserAction
+from dashboard.profile_stats import rollup_profile_stats
+from dashboard.tests.factories.profile_factory import ProfileFactory
+from marketing.models import LeaderboardRank
+from quests.models import QuestAttempt
+from test_plus.test import TestCase
+
+
+class ProfileStatsTest(TestCase):
+    """Define tests for the set based rollup of the profile stats."""
+
+    def setUp(self):
+        self.profile = ProfileFactory()
+        self.other_profile = ProfileFactory()
+
+    def create_tip(self, **kwargs):
+        return Tip.objects.create(
+            emails=[], github_url='https://github.com/gitcoinco/web/issues/305',
+            expires_date=timezone.now() + timedelta(days=1), **kwargs
+        )
+
+    def create_stats(self):
+        self.create_tip(username=self.profile.handle.upper(), from_username=self.other_profile.handle)
+        self.create_tip(username=self.profile.handle, from_username=self.other_profile.handle)
+        QuestAttempt.objects.create(profile=self.profile, success=True)
+        QuestAttempt.objects.create(profile=self.profile)
+        FeedbackEntry.objects.create(receiver_profile=self.profile, rating=4, speed_rating=5)
+        FeedbackEntry.objects.create(receiver_profile=self.profile, rating=2)
+        UserAction.objects.create(profile=self.profile, action='bounty_removed_by_staff')
+        for rank, created_on in [(3, timezone.now() - timedelta(days=1)), (1, timezone.now())]:
+            LeaderboardRank.objects.create(
+                profile=self.profile, leaderboard='weekly_earners', product='all', active=True, amount=1, rank=rank,
+                github_username=self.profile.handle, created_on=created_on
+            )
+
+    def test_rollup_matches_profile_methods(self):
+        """Test the rolled up stats match the ones of the per profile methods."""
+        self.create_stats()
+
+        stats = rollup_profile_stats([self.profile.pk, self.other_profile.pk])
+
+        profile_stats = stats[self.profile.pk]
+        assert profile_stats['total_tips_received'] == self.profile.get_my_tips.count() == 2
+        assert stats[self.other_profile.pk]['total_tips_sent'] == self.other_profile.get_sent_tips.count() == 2
+        assert profile_stats['total_quest_attempts'] == 2
+        assert profile_stats['total_quest_success'] == 1
+        assert profile_stats['avg_rating'] == self.profile.get_average_star_rating()
+        assert profile_stats['avg_rating_scaled'] == self.profile.get_average_star_rating(20)
+        assert profile_stats['no_times_been_removed'] == 1
+        assert profile_stats['scoreboard_position_contributor'] == self.profile.get_contributor_leaderboard_index()
+        assert profile_stats['scoreboard_position_funder'] == 0
+        assert 'scoreboard_position_org' not in profile_stats
+        assert profile_stats['earnings_total'] == 0
+        assert profile_stats['verification'] is False
+        assert stats[self.other_profile.pk]['none'] is True
+
+    def test_rollup_queries_do_not_grow_with_profiles(self):
+        """Test a rollup runs one set of queries whatever the number of profiles."""
+        profiles = [self.profile.pk, self.other_profile.pk] + [ProfileFactory().pk for _ in range(10)]
+        self.create_stats()
+
+        # warms the content type cache
+        rollup_profile_stats(profiles[:1])
+
+        # the profiles, then the grouped queries of the collectors
+        with self.assertNumQueries(18):
+            rollup_profile_stats(profiles[:2])
+        with self.assertNumQueries(18):
+            stats = rollup_profile_stats(profiles)
+
+        assert len(stats) == len(profiles)
+
+    def test_command_merges_stats_into_as_dict(self):
+        """Test the rollup keeps the other keys of as_dict and the admin overrides."""
+        self.create_stats()
+        Profile.objects.filter(pk=self.profile.pk).update(
+            as_dict={'portfolio': [1], 'total_quest_attempts': 0}, override_dict={'total_tips_received': 100}
+        )
+
+        call_command('rollup_profile_stats', '--full', '--batch-size', '1')
+
+        as_dict = Profile.objects.get(pk=self.profile.pk).as_dict
+        assert as_dict['portfolio'] == [1]
+        assert as_dict['total_quest_attempts'] == 2
+        assert as_dict['total_tips_received'] == 100
+        assert Profile.objects.get(pk=self.other_profile.pk).as_dict['total_tips_sent'] == 2
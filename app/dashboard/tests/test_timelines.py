@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""Handle activity timeline related tests.
+
+Copyright (C) 2021 Gitcoin Core
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from django.utils import timezone
+
+from app.tests.fake_redis import FakeRedis
+from dashboard import timelines
+from dashboard.models import Activity, ActivityIndex
+from dashboard.tests.factories.profile_factory import ProfileFactory
+from test_plus.test import TestCase
+
+
+class TimelinesTest(TestCase):
+    """Define tests for the cursor pagination of the activity feeds."""
+
+    def setUp(self):
+        self.redis = FakeRedis()
+        self.patch = patch.object(timelines, 'RedisService', return_value=SimpleNamespace(redis=self.redis))
+        self.patch.start()
+        self.profile = ProfileFactory()
+        now = timezone.now()
+        # two activities share a created_on to check ties are paginated by pk
+        created = [now - timedelta(minutes=minutes) for minutes in [1, 2, 3, 3, 4, 5, 6, 7]]
+        self.activities = []
+        for index, created_on in enumerate(created):
+            activity = Activity.objects.create(
+                profile=self.profile, activity_type='status_update', metadata={'title': str(index)},
+                created_on=created_on, hidden=index == 5
+            )
+            ActivityIndex.objects.create(
+                key=f'profile:{self.profile.pk}', activity=activity, created_on=activity.created_on
+            )
+            self.activities.append(activity)
+
+    def tearDown(self):
+        self.patch.stop()
+
+    def expected(self):
+        activities = Activity.objects.filter(pk__in=[a.pk for a in self.activities], hidden=False)
+        return list(activities.order_by('-created_on', '-pk').values_list('pk', flat=True))
+
+    def read_feed(self, activities, timeline, page_size=3):
+        pks = []
+        page, cursor = timelines.paginate_activities(activities, page_size=page_size, timeline=timeline)
+        pks += [activity.pk for activity in page]
+        while cursor:
+            page, cursor = timelines.paginate_activities(
+                activities, cursor=cursor, page_size=page_size, timeline=timeline
+            )
+            pks += [activity.pk for activity in page]
+        return pks
+
+    def profile_activities(self):
+        return Activity.objects.filter(activities_index__key=f'profile:{self.profile.pk}', hidden=False)
+
+    def test_timeline_pages(self):
+        """Test the feed is read from the timeline built on its first page, with the hidden activity skipped."""
+        timeline = f'profile:{self.profile.pk}'
+
+        assert self.read_feed(self.profile_activities(), timeline) == self.expected()
+        assert self.redis.zcard(timelines.timeline_key(timeline)) == len(self.activities)
+        assert self.redis.ttls == {timelines.timeline_key(timeline): timelines.TIMELINE_TTL}
+
+    def test_capped_timeline_continues_from_the_database(self):
+        """Test the activities older than a capped timeline are read with a keyset query."""
+        timeline = f'profile:{self.profile.pk}'
+        with patch.object(timelines, 'TIMELINE_MAX_LENGTH', 4):
+            timelines.build_timeline(timeline)
+            assert self.redis.zcard(timelines.timeline_key(timeline)) == 4
+
+            assert self.read_feed(self.profile_activities(), timeline) == self.expected()
+
+    def test_new_activities_are_added_to_existing_timelines(self):
+        """Test an indexed activity lands on the timelines of its keys which exist."""
+        timelines.build_timeline(f'profile:{self.profile.pk}')
+        activity = Activity.objects.create(profile=self.profile, activity_type='status_update', metadata={})
+        activity.populate_activity_index()
+
+        page, _ = timelines.paginate_activities(
+            self.profile_activities(), page_size=1, timeline=f'profile:{self.profile.pk}'
+        )
+        assert page == [activity]
+        assert self.redis.exists(timelines.timeline_key('grants')) == 0
+
+    def test_rebuilt_timeline_replaces_the_old_one(self):
+        """Test a rebuild swaps the whole timeline instead of merging into it."""
+        key = timelines.timeline_key(f'profile:{self.profile.pk}')
+        self.redis.zadd(key, {'000000000000': 1})
+
+        timelines.build_timeline(f'profile:{self.profile.pk}')
+
+        assert b'000000000000' not in self.redis.data[key]
+        assert self.redis.zcard(key) == len(self.activities)
+        assert f'{key}:tmp' not in self.redis.data
+
+    def test_keyset_pages_without_timeline(self):
+        """Test the feeds without a timeline are paginated on (created_on, pk)."""
+        activities = Activity.objects.filter(pk__in=[a.pk for a in self.activities], hidden=False)
+
+        assert self.read_feed(activities, None) == self.expected()
+
+    def test_malformed_cursor_reads_the_first_page(self):
+        """Test a cursor which can't be decoded is ignored."""
+        assert timelines.decode_cursor('not a cursor') is None
+        assert timelines.decode_cursor(timelines.encode_cursor((10, 2))) == (10, 2)
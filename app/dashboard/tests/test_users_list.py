@@ -21,12 +21,14 @@
 from datetime import timedelta
 
 from django.contrib.auth.models import User
+from django.db import connection
 from django.db.models import Count, Q
 from django.test.client import RequestFactory
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 
-from dashboard.models import Bounty, BountyFulfillment, Profile
-from dashboard.views import users_fetch
+from dashboard.models import Bounty, BountyFulfillment, FeedbackEntry, Profile, TribeMember
+from dashboard.views import users_fetch, users_typeahead
 from test_plus.test import TestCase
 
 CURRENT_USERNAME = "asdfasdf"
@@ -112,3 +114,72 @@ def test_default_users_ordering_with_previous_workers_at_the_top(self):
         ).order_by('-worked_with')
 
         #assert all_profiles.values('user__username', 'worked_with')[0] == {'user__username': 'user1', 'worked_with': 1}
+
+    def fetch(self, limit):
+        request = self.request.get(f'/api/v0.1/users_fetch?user={self.current_user.id}&limit={limit}')
+        request.user = self.current_user
+        with CaptureQueriesContext(connection) as queries:
+            response = json.loads(users_fetch(request).content)
+        return response, len(queries)
+
+    def test_user_list_queries_do_not_grow_with_page_size(self):
+        """Test a page of the users directory is fetched with a fixed number of queries."""
+        setup_bounties()
+        current_profile = self.current_user.profile
+        for profile in Profile.objects.exclude(pk=current_profile.pk):
+            TribeMember.objects.create(profile=current_profile, org=profile)
+            FeedbackEntry.objects.create(receiver_profile=profile, rating=4)
+
+        small_page, small_page_queries = self.fetch(2)
+        full_page, full_page_queries = self.fetch(21)
+
+        assert len(small_page['data']) == 2
+        assert len(full_page['data']) == 21
+        assert small_page_queries == full_page_queries
+        users = [user for user in full_page['data'] if user['id'] != current_profile.pk]
+        assert all(user['is_following'] and user['follower_count'] == 1 for user in users)
+        assert all(user['avg_rating']['overall'] == 4 for user in users)
+
+    def test_user_list_search(self):
+        """Test the directory search matches handles & keywords through search_text."""
+        Profile.objects.filter(handle='7').update(keywords=['Solidity', 'rust'])
+        request = self.request.get(f'/api/v0.1/users_fetch?user={self.current_user.id}&search=SOLID')
+        request.user = self.current_user
+
+        assert Profile.objects.get(handle='7').search_text == '7 solidity rust'
+        assert [user['handle'] for user in json.loads(users_fetch(request).content)['data']] == ['7']
+        assert Profile.objects.search('asdf').get().handle == CURRENT_USERNAME
+
+    def test_user_list_empty_search(self):
+        """Test a search with nothing to search for lists every profile instead of failing to order them."""
+        everyone = self.request.get(f'/api/v0.1/users_fetch?user={self.current_user.id}')
+        everyone.user = self.current_user
+        expected = [user['handle'] for user in json.loads(users_fetch(everyone).content)['data']]
+
+        for search in ['@', '%20%20']:
+            request = self.request.get(f'/api/v0.1/users_fetch?user={self.current_user.id}&search={search}')
+            request.user = self.current_user
+            response = users_fetch(request)
+
+            assert response.status_code == 200
+            assert [user['handle'] for user in json.loads(response.content)['data']] == expected
+
+    def test_users_typeahead(self):
+        """Test the typeahead returns the handles starting with the search first, then the other matches."""
+        for handle in ['malice', 'alicorn', 'alice']:
+            Profile.objects.create(data={}, hide_profile=False, handle=handle)
+        Profile.objects.create(data={}, hide_profile=True, handle='alicia')
+
+        response = json.loads(users_typeahead(self.request.get('/api/v0.1/users_typeahead?term=@Ali')).content)
+
+        assert [user['handle'] for user in response['data']] == ['alice', 'alicorn', 'malice']
+        assert response['data'][0]['avatar_url'].endswith('dynamic/avatar/alice')
+
+    def test_users_typeahead_limit(self):
+        """Test an invalid limit falls back to the default and the limit is clamped between 1 and 50."""
+        for handle in ['alice', 'alicorn']:
+            Profile.objects.create(data={}, hide_profile=False, handle=handle)
+
+        for limit, expected in [('abc', 2), ('-5', 1), ('0', 1), ('1000', 2)]:
+            request = self.request.get(f'/api/v0.1/users_typeahead?term=ali&limit={limit}')
+            assert len(json.loads(users_typeahead(request).content)['data']) == expected
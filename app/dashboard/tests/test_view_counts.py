@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""Handle view count related tests.
+
+Copyright (C) 2021 Gitcoin Core
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from django.utils import timezone
+
+from app.tests.fake_redis import FakeRedis
+from dashboard import view_counts
+from test_plus.test import TestCase
+from townsquare.models import Offer
+
+
+class ViewCountsTest(TestCase):
+    """Define tests for the buffered view counters."""
+
+    def setUp(self):
+        self.redis = FakeRedis()
+        self.patch = patch.object(view_counts, 'RedisService', return_value=SimpleNamespace(redis=self.redis))
+        self.patch.start()
+        self.offers = [
+            Offer.objects.create(
+                url='https://gitcoin.co',
+                valid_from=timezone.now() - timedelta(days=1),
+                valid_to=timezone.now() + timedelta(days=1),
+                key='daily',
+                view_count=10,
+            ) for _ in range(3)
+        ]
+
+    def tearDown(self):
+        self.patch.stop()
+
+    def view_counts(self):
+        return [Offer.objects.get(pk=offer.pk).view_count for offer in self.offers]
+
+    def test_views_are_written_by_the_flush(self):
+        """Test views are only buffered when recorded and written to the database in one flush."""
+        first, second, third = [offer.pk for offer in self.offers]
+        view_counts.record_views('offer', [first, second])
+        view_counts.record_views('offer', [first, None])
+
+        assert self.view_counts() == [10, 10, 10]
+        assert view_counts.flush_view_counts('offer') == 2
+        assert self.view_counts() == [12, 11, 10]
+        assert self.redis.data == {}
+        assert view_counts.flush_view_counts('offer') == 0
+
+    def test_flush_finishes_a_failed_flush_first(self):
+        """Test views left behind by a failed flush are written and views recorded meanwhile are kept."""
+        first, second, _ = [offer.pk for offer in self.offers]
+        view_counts.record_views('offer', [first])
+        self.redis.rename(view_counts.pending_views_key('offer'), view_counts.flushing_views_key('offer'))
+        view_counts.record_views('offer', [second])
+
+        assert view_counts.flush_view_counts('offer') == 1
+        assert self.view_counts() == [11, 10, 10]
+        assert view_counts.flush_view_counts('offer') == 1
+        assert self.view_counts() == [11, 11, 10]
+
+    def test_flush_drains_the_buffer_before_writing(self):
+        """Test a flush whose UPDATE fails doesn't leave its views to be counted again by the next one."""
+        view_counts.record_views('offer', [self.offers[0].pk])
+
+        with patch.object(view_counts, '_update_view_counts', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                view_counts.flush_view_counts('offer')
+
+        assert self.redis.data == {}
+        assert view_counts.flush_view_counts('offer') == 0
+
+    def test_record_content_views(self):
+        """Test the views of SuperModel objects are counted in the keys get_view_count reads."""
+        view_counts.record_content_views('grant', [1, 2, 1])
+
+        assert self.redis.data == {'grant_1': b'2', 'grant_2': b'1'}
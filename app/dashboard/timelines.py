@@ -0,0 +1,233 @@
+# -*- coding: utf-8 -*-
+"""Define the activity timelines and the cursor pagination of the activity feeds.
+
+Copyright (C) 2021 Gitcoin Core
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+import base64
+from datetime import datetime, timedelta
+
+from django.db.models import Q
+from django.utils import timezone
+
+from app.services import RedisService
+from redis.exceptions import WatchError
+
+# A timeline is a redis sorted set per ActivityIndex key (profile:1, grant:2, ...) holding the pks of its activities
+# scored by their created_on, the most recent TIMELINE_MAX_LENGTH of them. The aggregated timelines hold the
+# activities of every key starting with the prefix, {prefix: timeline}
+AGGREGATED_TIMELINES = {
+    'grant:': 'grants',
+    'kudo:': 'kudos',
+}
+TIMELINE_MAX_LENGTH = 10000
+
+# a timeline nobody adds to expires and is rebuilt from the ActivityIndex on its next read, which also drops the
+# activities deleted since it was built
+TIMELINE_TTL = 60 * 60 * 24 * 7
+
+# timeline reads made to fill a page whose activities are mostly filtered out (hidden, trending, ...) before
+# returning a short page
+MAX_TIMELINE_READS = 5
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def timeline_key(name):
+    return f'timeline:{name}'
+
+
+def timeline_names(index_keys):
+    '''
+        returns the timelines an activity indexed under index_keys belongs to
+    '''
+    names = set(index_keys)
+    for key in index_keys:
+        for prefix, name in AGGREGATED_TIMELINES.items():
+            if key.startswith(prefix):
+                names.add(name)
+    return names
+
+
+def to_position(created_on, pk):
+    '''
+        returns the (microseconds since epoch, pk) position of an activity in the timelines
+    '''
+    return (created_on - EPOCH) // timedelta(microseconds=1), pk
+
+
+def encode_cursor(position):
+    return base64.urlsafe_b64encode(f'{position[0]}:{position[1]}'.encode()).decode()
+
+
+def decode_cursor(cursor):
+    '''
+        returns the position encoded in the cursor, None for a missing or malformed cursor
+    '''
+    if not cursor:
+        return None
+    try:
+        timestamp, pk = base64.urlsafe_b64decode(cursor.encode()).decode().split(':')
+        return int(timestamp), int(pk)
+    except ValueError:
+        return None
+
+
+def _member(pk):
+    # members are zero padded so activities created in the same microsecond are ordered by pk
+    return f'{pk:012d}'
+
+
+def add_to_timelines(indexed_activities):
+    '''
+        adds the activities to the timelines of their index keys
+
+        timelines which do not exist yet (or expired) are left alone, they are built from the ActivityIndex on their
+        next read. The existence check and the writes are one transaction so an expiring timeline is never
+        recreated with only the new activities
+
+        args:
+            indexed_activities  :   [(Activity, [str])] - activities and their ActivityIndex keys
+    '''
+    entries = {}
+    for activity, index_keys in indexed_activities:
+        score = to_position(activity.created_on, activity.pk)[0]
+        for name in timeline_names(index_keys):
+            entries.setdefault(timeline_key(name), {})[_member(activity.pk)] = score
+    if not entries:
+        return
+
+    redis = RedisService().redis
+    with redis.pipeline() as pipeline:
+        while True:
+            try:
+                pipeline.watch(*entries)
+                existing = [key for key in entries if pipeline.exists(key)]
+                if not existing:
+                    return
+                pipeline.multi()
+                for key in existing:
+                    pipeline.zadd(key, entries[key])
+                    pipeline.zremrangebyrank(key, 0, -TIMELINE_MAX_LENGTH - 1)
+                    pipeline.expire(key, TIMELINE_TTL)
+                pipeline.execute()
+                return
+            except WatchError:
+                # a timeline was built, changed or expired underneath us, check which ones exist again
+                continue
+
+
+def build_timeline(name):
+    '''
+        fills the timeline with the most recent activities of the ActivityIndex
+
+        it's built in a temporary key renamed over the timeline, so readers never see a partly written timeline and
+        a concurrent build replaces it instead of being merged into it
+    '''
+    from dashboard.models import Activity
+
+    prefix = next((prefix for prefix, timeline in AGGREGATED_TIMELINES.items() if timeline == name), None)
+    activities = Activity.objects.filter(
+        activities_index__key__startswith=prefix
+    ) if prefix else Activity.objects.filter(activities_index__key=name)
+    rows = activities.order_by('-created_on', '-pk').values_list('pk', 'created_on')[:TIMELINE_MAX_LENGTH]
+
+    mapping = {_member(pk): to_position(created_on, pk)[0] for pk, created_on in rows}
+    if not mapping:
+        return
+    key = timeline_key(name)
+    pipeline = RedisService().redis.pipeline()
+    pipeline.delete(f'{key}:tmp')
+    pipeline.zadd(f'{key}:tmp', mapping)
+    pipeline.expire(f'{key}:tmp', TIMELINE_TTL)
+    pipeline.rename(f'{key}:tmp', key)
+    pipeline.execute()
+
+
+def read_timeline(name, position, count):
+    '''
+        returns up to count positions of the timeline which come after position (newest first) and whether the
+        timeline holds every activity of its key (it's only capped once it reached TIMELINE_MAX_LENGTH)
+    '''
+    redis = RedisService().redis
+    key = timeline_key(name)
+    if not redis.exists(key):
+        if position is not None:
+            # the timeline expired since the previous page, which is read from the database instead
+            return [], False
+        build_timeline(name)
+
+    max_score = '+inf' if position is None else position[0]
+    entries = []
+    offset = 0
+    while len(entries) < count:
+        rows = redis.zrevrangebyscore(key, max_score, '-inf', start=offset, num=count, withscores=True)
+        for member, score in rows:
+            entry = (int(score), int(member))
+            # skip the activities of the cursor's microsecond which were on the previous page
+            if position is None or entry < position:
+                entries.append(entry)
+        if len(rows) < count:
+            break
+        offset += len(rows)
+    return entries[:count], redis.zcard(key) < TIMELINE_MAX_LENGTH
+
+
+def paginate_activities(activities, cursor=None, page_size=10, timeline=None):
+    '''
+        returns a page of the activities, newest first, starting after the cursor
+
+        page N costs as much as page 1: the activities are read from the timeline when one is given, and past the
+        end of a capped timeline (or without one) with a keyset query on (created_on, pk)
+
+        args:
+            activities  :   Activity queryset, the filters of the feed
+            cursor      :   str - the cursor returned with the previous page
+            timeline    :   str - name of the timeline holding the activities of the feed, if any
+
+        returns:
+            ([Activity], str) - the activities and the cursor of the next page, None on the last page
+    '''
+    position = decode_cursor(cursor)
+    page = []
+
+    if timeline:
+        for _ in range(MAX_TIMELINE_READS):
+            entries, complete = read_timeline(timeline, position, page_size * 2)
+            found = activities.in_bulk([pk for _, pk in entries])
+            for entry in entries:
+                position = entry
+                if entry[1] in found:
+                    page.append(found[entry[1]])
+                    if len(page) == page_size:
+                        return page, encode_cursor(position)
+            if len(entries) < page_size * 2:
+                if complete:
+                    return page, None
+                # the rest of the feed is older than the timeline
+                break
+        else:
+            return page, encode_cursor(position)
+
+    remaining = page_size - len(page)
+    if position:
+        created_on = EPOCH + timedelta(microseconds=position[0])
+        activities = activities.filter(Q(created_on__lt=created_on) | Q(created_on=created_on, pk__lt=position[1]))
+    rows = list(activities.order_by('-created_on', '-pk')[:remaining])
+    page += rows
+    if len(rows) < remaining:
+        return page, None
+    return page, encode_cursor(to_position(rows[-1].created_on, rows[-1].pk))
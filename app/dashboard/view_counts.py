@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""Define the buffered view counters of activities, offers and SuperModel objects.
+
+Copyright (C) 2021 Gitcoin Core
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+import logging
+
+from django.apps import apps
+from django.db import connection, transaction
+
+from app.services import RedisService
+from cacheops import invalidate_obj
+
+logger = logging.getLogger(__name__)
+
+# the counters whose views are buffered in redis and written to the model's view_count column by
+# flush_view_counts, {counter: (model, invalidate cached objects after the flush)}
+BUFFERED_COUNTERS = {
+    'activity': ('dashboard.Activity', True),
+    'offer': ('townsquare.Offer', False),
+}
+
+# rows updated by a single UPDATE of a flush
+FLUSH_BATCH_SIZE = 1000
+
+
+def pending_views_key(counter):
+    return f'view_counts:pending:{counter}'
+
+
+def flushing_views_key(counter):
+    return f'view_counts:flushing:{counter}'
+
+
+def record_views(counter, pks):
+    '''
+        adds a view of every pk to the counter's buffer, which flush_view_counts writes to the database
+
+        args:
+            counter :   one of BUFFERED_COUNTERS
+            pks     :   [int]
+    '''
+    pks = [pk for pk in pks if pk]
+    if not pks:
+        return
+    key = pending_views_key(counter)
+    pipeline = RedisService().redis.pipeline(transaction=False)
+    for pk in pks:
+        pipeline.hincrby(key, pk, 1)
+    pipeline.execute()
+
+
+def record_content_views(content_type, pks):
+    '''
+        adds a view of every pk to the redis counters SuperModel.get_view_count reads (grants, kudos, bounties, ...)
+    '''
+    pks = [pk for pk in pks if pk]
+    if not pks:
+        return
+    pipeline = RedisService().redis.pipeline(transaction=False)
+    for pk in pks:
+        pipeline.incr(f'{content_type}_{pk}')
+    pipeline.execute()
+
+
+def _update_view_counts(table, views):
+    '''
+        adds the views to the table's view_count column with one UPDATE ... FROM (VALUES ...) per batch
+    '''
+    with connection.cursor() as cursor:
+        for start in range(0, len(views), FLUSH_BATCH_SIZE):
+            batch = views[start:start + FLUSH_BATCH_SIZE]
+            values = ', '.join(['(%s, %s)'] * len(batch))
+            cursor.execute(
+                f'UPDATE {table} AS t SET view_count = t.view_count + v.views '
+                f'FROM (VALUES {values}) AS v(id, views) WHERE t.id = v.id',
+                [value for row in batch for value in row]
+            )
+
+
+def flush_view_counts(counter):
+    '''
+        writes the views buffered since the last flush to the database, invalidating each changed object once
+
+        the buffer is renamed, then read & deleted in one transaction before anything is written so views recorded
+        during the flush go to the next one and a failed UPDATE or invalidation can't count them twice, a buffer
+        left behind between the rename and the read is flushed first
+
+        returns:
+            int - objects whose view count changed
+    '''
+    model_label, invalidate = BUFFERED_COUNTERS[counter]
+    model = apps.get_model(model_label)
+    redis = RedisService().redis
+    pending_key = pending_views_key(counter)
+    flushing_key = flushing_views_key(counter)
+
+    if not redis.exists(flushing_key):
+        if not redis.exists(pending_key):
+            return 0
+        redis.rename(pending_key, flushing_key)
+
+    pipeline = redis.pipeline()
+    pipeline.hgetall(flushing_key)
+    pipeline.delete(flushing_key)
+    buffered, _ = pipeline.execute()
+
+    views = [(int(pk), int(count)) for pk, count in buffered.items() if int(count)]
+    if views:
+        with transaction.atomic():
+            _update_view_counts(model._meta.db_table, views)
+        if invalidate:
+            for obj in model.objects.filter(pk__in=[pk for pk, _ in views]):
+                invalidate_obj(obj)
+
+    logger.info(f'flushed the views of {len(views)} {counter} objects')
+    return len(views)
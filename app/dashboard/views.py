@@ -80,14 +80,16 @@
 from dashboard import ethelo
 from dashboard.brightid_utils import get_brightid_status
 from dashboard.context import quickstart as qs
+from dashboard.directory import serialize_directory_profiles, typeahead_profiles
 from dashboard.idena_utils import (
     IdenaNonce, get_handle_by_idena_token, idena_callback_url, next_validation_time, signature_address,
 )
-from dashboard.tasks import calculate_trust_bonus, increment_view_count, update_trust_bonus
+from dashboard.tasks import calculate_trust_bonus, update_trust_bonus
 from dashboard.utils import (
     ProfileHiddenException, ProfileNotFoundException, build_profile_pairs, get_bounty_from_invite_url,
     get_ens_contract_addresss, get_orgs_perms, get_poap_earliest_owned_token_timestamp, profile_helper,
 )
+from dashboard.view_counts import record_content_views
 from economy.utils import ConversionRateNotFoundError, convert_amount, convert_token_to_usdt
 from eth_account.messages import defunct_hash_message
 from eth_utils import is_address, is_same_address
@@ -1030,7 +1032,8 @@ def output_users_to_csv(request):
 @require_GET
 def users_fetch(request):
     """Handle displaying users."""
-    q = request.GET.get('search', '')
+    # normalised like ProfileQuerySet.search, so a search with nothing to search for isn't ranked by handle_match
+    q = request.GET.get('search', '').strip().lower().lstrip('@')
     skills = request.GET.get('skills', '')
     persona = request.GET.get('persona', '')
     limit = int(request.GET.get('limit', 20))
@@ -1069,7 +1072,7 @@ def users_fetch(request):
             ).exclude(hide_profile=True)
 
     if q:
-        profile_list = profile_list.filter(Q(handle__icontains=q) | Q(keywords__icontains=q)).distinct()
+        profile_list = profile_list.search(q)
 
     if tribe:
 
@@ -1108,7 +1111,7 @@ def users_fetch(request):
         profile_list = Profile.objects.filter(is_org=True).order_by('-follower_count', 'id')
 
         if q:
-            profile_list = profile_list.filter(Q(handle__icontains=q) | Q(keywords__icontains=q))
+            profile_list = profile_list.search(q)
 
         all_pages = Paginator(profile_list, limit)
         this_page = all_pages.page(page)
@@ -1119,10 +1122,12 @@ def users_fetch(request):
         if hackathon_id:
             profile_list = profile_list.order_by('-hackathon_registration__created_on', 'id')
         else:
+            # the handles matching the search come first
+            ranking = ['-handle_match'] if q else []
             try:
-                profile_list = profile_list.order_by(order_by, '-earnings_count', 'id')
+                profile_list = profile_list.order_by(*ranking, order_by, '-earnings_count', 'id')
             except profile_list.FieldError:
-                profile_list = profile_list.order_by('-earnings_count', 'id')
+                profile_list = profile_list.order_by(*ranking, '-earnings_count', 'id')
 
         profile_list = profile_list.values_list('pk', flat=True)
         all_pages = Paginator(profile_list, limit)
@@ -1132,87 +1137,8 @@ def users_fetch(request):
 
         this_page = profile_list
 
-    all_users = []
     params = dict()
-
-    for user in this_page:
-        if not user:
-            continue
-        followers = TribeMember.objects.filter(org=user)
-
-        is_following = True if followers.filter(profile=current_profile).count() else False
-        profile_json = {
-            k: getattr(user, k) for k in
-            ['id', 'actions_count', 'created_on', 'handle', 'hide_profile',
-            'show_job_status', 'job_location', 'job_salary', 'job_search_status',
-            'job_type', 'linkedin_url', 'resume', 'remote', 'keywords',
-            'organizations', 'is_org']}
-
-        profile_json['is_following'] = is_following
-
-        follower_count = followers.count()
-        profile_json['follower_count'] = follower_count
-        profile_json['desc'] = user.desc
-
-        if hackathon_id:
-            registration = HackathonRegistration.objects.filter(hackathon_id=hackathon_id, registrant=user).last()
-            if registration:
-                profile_json['looking_team_members'] = registration.looking_team_members
-                profile_json['looking_project'] = registration.looking_project
-
-                activity = Activity.objects.filter(
-                    activities_index__key=f'profile:{user.pk}',
-                    hackathonevent_id=hackathon_id,
-                    activity_type='hackathon_new_hacker',
-                )
-
-                if activity.exists():
-                    profile_json['intro'] = activity.metadata['intro_text']
-
-        if hackathon_id and user:
-            project = HackathonProject.objects.filter(hackathon_id=hackathon_id, profiles=user).first()
-            if project:
-                profile_json['project_name'] = project.name
-                profile_json['project_logo'] = project.logo.url if project.logo else ''
-
-        if user.data.get('location', ''):
-            profile_json['country'] = user.data.get('location', '')
-
-
-        if user.is_org:
-            profile_dict = user.__dict__
-            profile_json['count_bounties_on_repo'] = profile_dict.get('as_dict').get('count_bounties_on_repo')
-            sum_eth = profile_dict.get('as_dict').get('sum_usd_on_repos')
-            profile_json['sum_usd_on_repos'] = round(sum_eth if sum_eth is not None else 0, 2)
-            profile_json['tribe_description'] = user.tribe_description
-            profile_json['rank_org'] = user.rank_org
-        else:
-            count_work_completed = user.get_fulfilled_bounties(network=network).count()
-
-            profile_json['job_status'] = user.job_status_verbose if user.job_search_status else None
-            profile_json['previously_worked'] = False # user.previous_worked_count > 0
-            profile_json['position_contributor'] = user.get_contributor_leaderboard_index()
-            profile_json['position_funder'] = user.get_funder_leaderboard_index()
-            profile_json['rank_coder'] = user.rank_coder
-            profile_json['work_done'] = count_work_completed
-            profile_json['verification'] = user.get_my_verified_check
-            profile_json['avg_rating'] = user.get_average_star_rating()
-
-            if not user.show_job_status:
-                for key in ['job_salary', 'job_location', 'job_type',
-                            'linkedin_url', 'resume', 'job_search_status',
-                            'remote', 'job_status']:
-                    del profile_json[key]
-
-        if user.avatar_baseavatar_related.exists():
-            user_avatar = user.avatar_baseavatar_related.first()
-            profile_json['avatar_id'] = user_avatar.pk
-            profile_json['avatar_url'] = user_avatar.avatar_url
-        if user.data:
-            user_data = user.data
-            profile_json['blog'] = user_data['blog']
-
-        all_users.append(profile_json)
+    all_users = serialize_directory_profiles(this_page, current_profile, network, hackathon_id)
 
     # dumping and loading the json here quickly passes serialization issues - definitely can be a better solution
     params['data'] = json.loads(json.dumps(all_users, default=str))
@@ -1239,6 +1165,17 @@ def users_fetch(request):
     return JsonResponse(params, status=200, safe=False)
 
 
+@require_GET
+def users_typeahead(request):
+    """Return the handles and avatars of the profiles matching a partially typed search."""
+    q = request.GET.get('term', '')
+    try:
+        limit = max(1, min(int(request.GET.get('limit', 10)), 50))
+    except ValueError:
+        limit = 10
+    return JsonResponse({'data': typeahead_profiles(q, limit)}, status=200)
+
+
 @require_POST
 def bounty_mentor(request):
 
@@ -5043,7 +4980,7 @@ def hackathon(request, hackathon='', panel='prizes'):
 
     try:
         hackathon_event = HackathonEvent.objects.filter(slug__iexact=hackathon).prefetch_related('sponsor_profiles').latest('id')
-        increment_view_count.delay([hackathon_event.pk], hackathon_event.content_type, request.user.id, 'individual')
+        record_content_views(hackathon_event.content_type, [hackathon_event.pk])
     except HackathonEvent.DoesNotExist:
         return redirect(reverse('get_hackathons'))
 
@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""Define the in-process ConversionRate cache used by the conversion utilities.
+
+Copyright (C) 2021 Gitcoin Core
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+import threading
+import time
+
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+import numpy as np
+from economy.models import ConversionRate
+
+# how often a cached series checks for rates written since it was loaded (get_prices runs every few minutes)
+REFRESH_INTERVAL = 60
+
+# how often a cached series is read again in full, which picks up edited or deleted rates
+RELOAD_INTERVAL = 60 * 60
+
+
+def to_timestamp(value):
+    '''
+        returns the unix timestamp of a datetime, naive datetimes are in the default timezone (as in a query)
+    '''
+    if timezone.is_naive(value):
+        value = timezone.make_aware(value, timezone.get_default_timezone())
+    return value.timestamp()
+
+
+class RateSeries:
+    '''
+        Every rate of a currency pair as two arrays sorted by time
+
+        attrs:
+            timestamps  :   np.array of unix timestamps (float64)
+            rates       :   np.array of to_amount / from_amount (float64)
+            max_pk      :   the largest ConversionRate.pk in the series, newer rates have a larger pk
+    '''
+
+    def __init__(self, timestamps, rates, max_pk=0):
+        self.timestamps = np.asarray(timestamps, dtype=np.float64)
+        self.rates = np.asarray(rates, dtype=np.float64)
+        self.max_pk = max_pk
+        self.loaded_at = self.checked_at = time.time()
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def merge(self, timestamps, rates, max_pk):
+        '''
+            returns a new series with the rates added, a rate at the same time as an existing one is ordered after it
+        '''
+        timestamps = np.concatenate([self.timestamps, np.asarray(timestamps, dtype=np.float64)])
+        rates = np.concatenate([self.rates, np.asarray(rates, dtype=np.float64)])
+        order = np.argsort(timestamps, kind='stable')
+        series = RateSeries(timestamps[order], rates[order], max(self.max_pk, max_pk))
+        series.loaded_at = self.loaded_at
+        return series
+
+    def rate(self, timestamp=None):
+        '''
+            returns the latest rate at or before the timestamp, the latest rate when there is none (or no timestamp)
+            and None for an empty series
+        '''
+        if not len(self):
+            return None
+        if timestamp is None:
+            return float(self.rates[-1])
+        index = int(np.searchsorted(self.timestamps, to_timestamp(timestamp), side='right')) - 1
+        return float(self.rates[index])
+
+    def rates_at(self, timestamps):
+        '''
+            the vectorised rate(), timestamps is an np.array of unix timestamps with NaN for the latest rate
+        '''
+        indexes = np.searchsorted(self.timestamps, timestamps, side='right') - 1
+        indexes[np.isnan(timestamps)] = -1
+        return self.rates[indexes]
+
+
+class ConversionRateCache:
+    '''
+        Rate series by (from_currency, to_currency), loaded from the database on first use
+
+        A series only reads the rates written after it was loaded (by pk) every REFRESH_INTERVAL, and is reloaded in
+        full every RELOAD_INTERVAL.
+    '''
+
+    def __init__(self, refresh_interval=REFRESH_INTERVAL, reload_interval=RELOAD_INTERVAL):
+        self.refresh_interval = refresh_interval
+        self.reload_interval = reload_interval
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def _read(self, from_currency, to_currency, after_pk=0):
+        rows = ConversionRate.objects.filter(
+            from_currency=from_currency, to_currency=to_currency, pk__gt=after_pk
+        ).order_by('timestamp', 'pk').values_list('pk', 'timestamp', 'from_amount', 'to_amount')
+
+        timestamps, rates, max_pk = [], [], after_pk
+        for pk, timestamp, from_amount, to_amount in rows.iterator():
+            timestamps.append(timestamp.timestamp())
+            rates.append(float(to_amount) / float(from_amount))
+            max_pk = max(max_pk, pk)
+        return timestamps, rates, max_pk
+
+    def series(self, from_currency, to_currency):
+        key = (from_currency, to_currency)
+        series = self._series.get(key)
+        now = time.time()
+        if series is not None and now - series.checked_at < self.refresh_interval:
+            return series
+
+        with self._lock:
+            series = self._series.get(key)
+            if series is None or now - series.loaded_at >= self.reload_interval:
+                series = RateSeries(*self._read(from_currency, to_currency))
+            elif now - series.checked_at >= self.refresh_interval:
+                timestamps, rates, max_pk = self._read(from_currency, to_currency, after_pk=series.max_pk)
+                if timestamps:
+                    series = series.merge(timestamps, rates, max_pk)
+                series.checked_at = now
+            self._series[key] = series
+
+        return series
+
+    def rate(self, from_currency, to_currency, timestamp=None):
+        return self.series(from_currency, to_currency).rate(timestamp)
+
+    def invalidate(self, from_currency=None, to_currency=None):
+        '''
+            drops the pair's series (every series when no pair is given), it is read again on next use
+        '''
+        with self._lock:
+            if from_currency is None:
+                self._series.clear()
+            else:
+                self._series.pop((from_currency, to_currency), None)
+
+
+conversion_rates = ConversionRateCache()
+
+
+@receiver(post_save, sender=ConversionRate, dispatch_uid="invalidate_conversion_rate_cache")
+def invalidate_conversion_rate_cache(sender, instance, **kwargs):
+    """Reload the pair on its next use in the process which wrote the rate (ie. get_prices)."""
+    conversion_rates.invalidate(instance.from_currency, instance.to_currency)
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""Handle economy rate cache related tests.
+
+Copyright (C) 2021 Gitcoin Core
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+from datetime import datetime, timedelta
+
+from django.utils import timezone
+
+import numpy as np
+from economy.models import ConversionRate
+from economy.rate_cache import ConversionRateCache, RateSeries
+from economy.utils import ConversionRateNotFoundError, convert_amount, convert_amounts
+from test_plus.test import TestCase
+
+
+class RateSeriesTest(TestCase):
+    """Define tests for the rate series lookups."""
+
+    def setUp(self):
+        self.start = timezone.now() - timedelta(days=10)
+        self.series = RateSeries(
+            [(self.start + timedelta(days=day)).timestamp() for day in [0, 2, 2, 5]], [10.0, 20.0, 21.0, 50.0]
+        )
+
+    def test_rate(self):
+        """Test the rate is the latest at or before the time, and the latest rate otherwise."""
+        assert self.series.rate() == 50.0
+        assert self.series.rate(self.start) == 10.0
+        assert self.series.rate(self.start + timedelta(days=1)) == 10.0
+        assert self.series.rate(self.start + timedelta(days=2)) == 21.0
+        assert self.series.rate(self.start + timedelta(days=30)) == 50.0
+        assert self.series.rate(self.start - timedelta(days=1)) == 50.0
+        assert RateSeries([], []).rate() is None
+
+    def test_rates_at_matches_rate(self):
+        """Test the vectorised lookup returns the same rates as looking up each time."""
+        times = [self.start + timedelta(hours=hours) for hours in range(-24, 24 * 8, 7)]
+        timestamps = np.array([when.timestamp() for when in times] + [np.nan])
+
+        assert self.series.rates_at(timestamps).tolist() == [self.series.rate(when) for when in times] + [50.0]
+
+    def test_merge(self):
+        """Test merged rates are ordered by time and after existing rates at the same time."""
+        merged = self.series.merge([(self.start + timedelta(days=day)).timestamp() for day in [1, 5]], [15.0, 55.0], 9)
+
+        assert merged.rates.tolist() == [10.0, 15.0, 20.0, 21.0, 50.0, 55.0]
+        assert merged.max_pk == 9
+
+
+class ConversionRateCacheTest(TestCase):
+    """Define tests for converting through the rate cache."""
+
+    def setUp(self):
+        """Perform setup for the testcase."""
+        for to_amount, timestamp in [(5, datetime(2018, 1, 1)), (2, datetime(2019, 1, 1)), (3, None)]:
+            ConversionRate.objects.create(
+                from_amount=1,
+                to_amount=to_amount,
+                source='etherdelta',
+                from_currency='ETH',
+                to_currency='USDT',
+                **({'timestamp': timestamp} if timestamp else {})
+            )
+
+    def test_convert_amounts_matches_convert_amount(self):
+        """Test the bulk conversion returns what converting each amount does."""
+        amounts = [1, 2.5, 3, 4, 10]
+        currencies = ['ETH', 'ETH', 'USDT', 'WETH', 'ETH']
+        timestamps = [datetime(2018, 6, 1), None, datetime(2017, 1, 1), datetime(2019, 6, 1), datetime(2010, 1, 1)]
+
+        converted = convert_amounts(amounts, currencies, 'USDT', timestamps)
+
+        assert converted.tolist() == [
+            convert_amount(amount, currency, 'USDT', timestamp)
+            for amount, currency, timestamp in zip(amounts, currencies, timestamps)
+        ]
+        assert converted.tolist() == [5.0, 7.5, 3.0, 8.0, 30.0]
+
+    def test_convert_amounts_without_rate(self):
+        """Test the bulk conversion raises like convert_amount when a currency has no rate."""
+        with self.assertRaises(ConversionRateNotFoundError):
+            convert_amounts([1, 2], ['ETH', 'UNKNOWN'], 'USDT')
+
+    def test_new_rates_are_picked_up(self):
+        """Test rates written after a series was loaded are read on its next refresh."""
+        cache = ConversionRateCache(refresh_interval=0)
+        assert cache.rate('ETH', 'USDT') == 3.0
+
+        ConversionRate.objects.create(
+            from_amount=1, to_amount=4, source='etherdelta', from_currency='ETH', to_currency='USDT'
+        )
+
+        assert cache.rate('ETH', 'USDT') == 4.0
+        assert cache.rate('ETH', 'USDT', datetime(2018, 6, 1)) == 5.0
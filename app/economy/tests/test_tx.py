@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+"""Handle economy tx related tests.
+
+Copyright (C) 2021 Gitcoin Core
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+import json
+import threading
+from collections import Counter
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from django.utils import timezone
+
+from economy.tx import get_bulk_checkout_address, grants_transactions_validator
+from test_plus.test import TestCase
+from web3 import HTTPProvider, Web3
+
+BULK_CHECKOUT = get_bulk_checkout_address('mainnet')
+DAI = '0x6B175474E89094C44Da98b954EedeAC495271d0F'
+DONOR = '0x00000000000000000000000000000000000000d0'
+DONATION_SENT_TOPIC = Web3.sha3(text='DonationSent(address,uint256,address,address)').hex()
+BLOCK_HASH = '0x' + 'ab' * 32
+
+
+def tx_hash(n):
+    return '0x' + f'{n:064x}'
+
+
+def grant_address(n):
+    return '0x' + f'{n:040x}'
+
+
+def pad_address(address):
+    return '0x' + address[2:].lower().rjust(64, '0')
+
+
+def donation_log(tx, index, dest, amount, token=DAI):
+    return {
+        'address': BULK_CHECKOUT,
+        'topics': [DONATION_SENT_TOPIC, pad_address(token), '0x' + f'{amount:064x}', pad_address(DONOR)],
+        'data': pad_address(dest),
+        'blockNumber': '0x10',
+        'blockHash': BLOCK_HASH,
+        'transactionHash': tx,
+        'transactionIndex': '0x0',
+        'logIndex': hex(index),
+        'removed': False,
+    }
+
+
+def receipt(tx, status=1, logs=(), gas_used=21000):
+    return {
+        'transactionHash': tx,
+        'transactionIndex': '0x0',
+        'blockHash': BLOCK_HASH,
+        'blockNumber': '0x10',
+        'from': DONOR,
+        'to': BULK_CHECKOUT,
+        'cumulativeGasUsed': hex(gas_used),
+        'gasUsed': hex(gas_used),
+        'contractAddress': None,
+        'logs': list(logs),
+        'logsBloom': '0x' + '00' * 256,
+        'status': hex(status),
+    }
+
+
+class StubRPCHandler(BaseHTTPRequestHandler):
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        if isinstance(request, list):
+            body = [self.server.respond(call) for call in request]
+        else:
+            body = self.server.respond(request)
+        body = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class StubRPCServer(ThreadingHTTPServer):
+    """A local JSON-RPC node which knows a fixed set of receipts and transactions."""
+
+    def __init__(self, receipts, transactions):
+        super().__init__(('127.0.0.1', 0), StubRPCHandler)
+        self.receipts = receipts
+        self.transactions = transactions
+        self.calls = Counter()
+        self.lock = threading.Lock()
+
+    def respond(self, call):
+        method, params = call['method'], call['params']
+        with self.lock:
+            self.calls[(method, params[0])] += 1
+        result = None
+        if method == 'eth_getTransactionReceipt':
+            result = self.receipts.get(params[0])
+        elif method == 'eth_getTransactionByHash':
+            result = self.transactions.get(params[0])
+        return {'jsonrpc': '2.0', 'id': call['id'], 'result': result}
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.server_address[1]}'
+
+
+def contribution(pk, tx, grant, amount, created_on=None):
+    return SimpleNamespace(
+        pk=pk,
+        split_tx_id=tx,
+        created_on=created_on or timezone.now(),
+        normalized_data={'token_symbol': 'DAI', 'admin_address': grant_address(grant)},
+        subscription=SimpleNamespace(network='mainnet', amount_per_period=Decimal(amount)),
+    )
+
+
+class GrantsTransactionsValidatorTest(TestCase):
+    """Define tests for the batch BulkCheckout validator against a stub RPC node."""
+
+    def setUp(self):
+        checkout, dropped, replacement, failed, pending = [tx_hash(n) for n in range(1, 6)]
+        self.server = StubRPCServer(
+            receipts={
+                checkout: receipt(checkout, logs=[
+                    donation_log(checkout, 0, grant_address(1), 10 * 10 ** 18),
+                    donation_log(checkout, 1, grant_address(2), 5 * 10 ** 18),
+                ]),
+                replacement: receipt(replacement, logs=[donation_log(replacement, 0, grant_address(1), 10 * 10 ** 18)]),
+                failed: receipt(failed, status=0, gas_used=50000),
+            },
+            transactions={failed: {'hash': failed, 'gas': hex(50000)}},
+        )
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.w3 = Web3(HTTPProvider(self.server.url))
+        self.replaced = {dropped: replacement}
+
+        self.contributions = [
+            contribution(1, checkout, grant=1, amount='10'),
+            contribution(2, checkout, grant=2, amount='5'),
+            contribution(3, checkout, grant=3, amount='10'),
+            contribution(4, dropped, grant=1, amount='10'),
+            contribution(5, failed, grant=1, amount='10'),
+            contribution(6, pending, grant=1, amount='10'),
+            contribution(7, pending, grant=1, amount='10', created_on=timezone.now() - timezone.timedelta(days=5)),
+            contribution(8, '0x123', grant=1, amount='10'),
+        ]
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def validate(self):
+        with patch('economy.tx.get_token', return_value={'addr': DAI, 'decimals': 18}), \
+                patch('economy.tx.getReplacedTX', side_effect=self.replaced.get):
+            return grants_transactions_validator(self.contributions, self.w3, max_workers=4)
+
+    def test_validates_every_contribution(self):
+        """Test every contribution gets the response grants_transaction_validator gives it."""
+        responses = self.validate()
+
+        results = {
+            pk: (response['status'], response['validation']['passed'], response['validation']['comment'])
+            for pk, response in responses.items()
+        }
+        assert results == {
+            1: ('success', True, 'BulkCheckout. Success'),
+            2: ('success', True, 'BulkCheckout. Success'),
+            3: (
+                'success', False,
+                'DonationSent event with expected recipient, amount, and token was not found in transaction logs'
+            ),
+            4: ('success', True, 'BulkCheckout. Success'),
+            5: ('error', False, 'Transaction failed. Out of gas'),
+            6: ('pending', False, 'Transaction is still pending'),
+            7: ('dropped', False, 'Transaction receipt not found. Transaction may still be pending or was dropped'),
+            8: ('unknown', False, 'Invalid transaction hash in split_tx_id'),
+        }
+        assert responses[1]['originator'][0].lower() == DONOR
+        assert responses[1]['tx_cleared'] and responses[1]['split_tx_confirmed']
+        assert responses[5]['tx_cleared'] and not responses[6]['tx_cleared']
+
+    def test_failed_replacement_lookup_only_fails_its_transaction(self):
+        """Test a replacement which can't be looked up leaves its contributions unknown and validates the others."""
+        def replaced(tx):
+            if tx == tx_hash(2):
+                raise Exception('database error')
+            return self.replaced.get(tx)
+
+        with patch('economy.tx.get_token', return_value={'addr': DAI, 'decimals': 18}), \
+                patch('economy.tx.getReplacedTX', side_effect=replaced):
+            responses = grants_transactions_validator(self.contributions, self.w3, max_workers=4)
+
+        assert responses[4]['status'] == 'unknown'
+        assert not responses[4]['tx_cleared']
+        assert responses[1]['status'] == 'success' and responses[1]['validation']['passed']
+        assert responses[5]['status'] == 'error'
+        assert responses[6]['status'] == 'pending'
+
+    def test_looks_up_each_transaction_once(self):
+        """Test contributions sharing a checkout transaction only fetch its receipt once."""
+        self.validate()
+
+        assert self.server.calls[('eth_getTransactionReceipt', tx_hash(1))] == 1
+        assert self.server.calls[('eth_getTransactionReceipt', tx_hash(5))] == 1
+        assert self.server.calls[('eth_getTransactionByHash', tx_hash(4))] == 1
+        assert sum(self.server.calls.values()) == 6
@@ -1,6 +1,8 @@
+from concurrent.futures import ThreadPoolExecutor
 from decimal import Decimal
 
 from django.conf import settings
+from django.db import connection
 from django.utils import timezone
 
 from dashboard.abi import erc20_abi
@@ -141,35 +143,30 @@ def check_for_replaced_tx(tx_hash, network, datetime=None, chain='std'):
     return tx_hash, status, timestamp
 
 
-def grants_transaction_validator(contribution, w3, chain='std'):
-    """
-    This function is used to validate contributions sent on L1 & Polygon L2 through the BulkCheckout contract.
-    This contract can be found here:
-      - On GitHub: https://github.com/gitcoinco/BulkTransactions/blob/master/contracts/BulkCheckout.sol
-      - On mainnet: https://etherscan.io/address/0x7d655c57f71464b6f83811c55d84009cd9f5221c
-      - On Polygon mainnet: https://polygonscan.com/address/0xb99080b9407436eBb2b8Fe56D45fFA47E9bb8877
-      - On Polygon testnet: https://mumbai.polygonscan.com/address/0x3E2849E2A489C8fE47F52847c42aF2E8A82B9973
+# number of transactions whose receipts grants_transactions_validator fetches at once
+VALIDATOR_MAX_WORKERS = 8
 
-    To facilitate testing on Rinkeby and Mumbai, we pass in a web3 instance instead of using the mainnet
-    instance defined at the top of this file
-    """
+# a checkout without a receipt this many days after the contribution was made is considered dropped (as in
+# dashboard.utils.get_tx_status)
+DROPPED_DAYS = 4
+
+# use a 5% tolerance when checking amounts to account for floating point error
+TRANSFER_TOLERANCE = 0.05
 
-    # Get specific info about this contribution that we use later
-    tx_hash = contribution.split_tx_id
-    network = contribution.subscription.network
 
+def get_bulk_checkout_address(network, chain='std'):
     if network == 'mainnet' and chain == 'polygon':
-        bulk_checkout_address = '0xb99080b9407436eBb2b8Fe56D45fFA47E9bb8877'
+        return '0xb99080b9407436eBb2b8Fe56D45fFA47E9bb8877'
     elif network == 'testnet' and chain == 'polygon':
-        bulk_checkout_address = '0x3E2849E2A489C8fE47F52847c42aF2E8A82B9973'
-    else:
-        bulk_checkout_address = '0x7d655c57f71464B6f83811C55D84009Cd9f5221C'
+        return '0x3E2849E2A489C8fE47F52847c42aF2E8A82B9973'
+    return '0x7d655c57f71464B6f83811C55D84009Cd9f5221C'
 
-    # Get bulk checkout contract instance
-    bulk_checkout_contract = w3.eth.contract(address=bulk_checkout_address, abi=bulk_checkout_abi)
 
-    # Response that calling function uses to set fields on Contribution. Set the defaults here
-    response = {
+def get_validator_response():
+    """
+    Response that calling function uses to set fields on Contribution, with the defaults set
+    """
+    return {
         # We set `passed` to `True` if matching transfer is found for this contribution. The
         # `comment` field is used to provide details when false
         'validation': {
@@ -188,6 +185,104 @@ def grants_transaction_validator(contribution, w3, chain='std'):
         'split_tx_confirmed': False
     }
 
+
+def get_expected_donation(contribution, network, chain='std'):
+    """
+    Returns the recipient, token address and the (min, max) amount range of the DonationSent event that is
+    expected for the contribution
+    """
+    token_symbol = contribution.normalized_data['token_symbol']
+    token = get_token(token_symbol, network, chain)
+    expected_recipient = contribution.normalized_data['admin_address'].lower()
+    expected_token = token['addr'].lower() # we compare by token address
+    # equivalent to parse_token_amount, without looking the token up again
+    expected_amount = int(contribution.subscription.amount_per_period * 10 ** token['decimals'])
+
+    expected_amount_min = int(expected_amount * (1 - TRANSFER_TOLERANCE))
+    expected_amount_max = int(expected_amount * (1 + TRANSFER_TOLERANCE))
+
+    return expected_recipient, expected_token, expected_amount_min, expected_amount_max
+
+
+def has_expected_donation(parsed_logs, expected_donation):
+    """
+    Loop through each DonationSent event to find one that matches the expected donation
+    """
+    expected_recipient, expected_token, expected_amount_min, expected_amount_max = expected_donation
+    for event in parsed_logs:
+        is_correct_recipient = event['args']['dest'].lower() == expected_recipient
+        is_correct_token = event['args']['token'].lower() == expected_token
+
+        transfer_amount = event['args']['amount']
+        is_correct_amount = transfer_amount >= expected_amount_min and transfer_amount <= expected_amount_max
+
+        if is_correct_recipient and is_correct_token and is_correct_amount:
+            return True
+
+    return False
+
+
+def set_donation_validation(response, contribution, parsed_logs, network, chain='std'):
+    """
+    Sets the validation of a contribution sent in a successful BulkCheckout transaction
+    """
+    # Return if no donation logs were found
+    if (len(parsed_logs) == 0):
+        response['validation']['comment'] = 'No DonationSent events found in this BulkCheckout transaction'
+        return response
+
+    if has_expected_donation(parsed_logs, get_expected_donation(contribution, network, chain)):
+        # We found the event log corresponding to the contribution parameters
+        response['validation']['passed'] = True
+        response['validation']['comment'] = 'BulkCheckout. Success'
+        return response
+
+    # Transaction was successful, but the expected contribution was not included in the transaction
+    response['validation']['comment'] = 'DonationSent event with expected recipient, amount, and token was not found in transaction logs'
+    return response
+
+
+def set_failed_tx_validation(response, receipt, tx_info):
+    """
+    Sets the validation of a contribution sent in a mined transaction which failed, trying to find out why
+    """
+    response['tx_cleared'] = True
+    response['split_tx_confirmed'] = True
+
+    gas_limit = tx_info['gas']
+    gas_used = receipt['gasUsed']
+    if gas_limit == gas_used:
+        response['validation']['comment'] = 'Transaction failed. Out of gas'
+    elif gas_used > 0.99 * gas_limit:
+        # Some out of gas failures don't use all gas, e.g. https://etherscan.io/tx/0xac37f5bc0e9b75dd0f296b8569f72181a066458b9bee1bbed088ec2298fb4344
+        response['validation']['comment'] = 'Transaction failed. Likely out of gas. Check Etherscan or Tenderly for more details'
+    else:
+        response['validation']['comment'] = 'Transaction failed. Unknown reason. See Etherscan or Tenderly for more details'
+    return response
+
+
+def grants_transaction_validator(contribution, w3, chain='std'):
+    """
+    This function is used to validate contributions sent on L1 & Polygon L2 through the BulkCheckout contract.
+    This contract can be found here:
+      - On GitHub: https://github.com/gitcoinco/BulkTransactions/blob/master/contracts/BulkCheckout.sol
+      - On mainnet: https://etherscan.io/address/0x7d655c57f71464b6f83811c55d84009cd9f5221c
+      - On Polygon mainnet: https://polygonscan.com/address/0xb99080b9407436eBb2b8Fe56D45fFA47E9bb8877
+      - On Polygon testnet: https://mumbai.polygonscan.com/address/0x3E2849E2A489C8fE47F52847c42aF2E8A82B9973
+
+    To facilitate testing on Rinkeby and Mumbai, we pass in a web3 instance instead of using the mainnet
+    instance defined at the top of this file
+    """
+
+    # Get specific info about this contribution that we use later
+    tx_hash = contribution.split_tx_id
+    network = contribution.subscription.network
+
+    # Get bulk checkout contract instance
+    bulk_checkout_contract = w3.eth.contract(address=get_bulk_checkout_address(network, chain), abi=bulk_checkout_abi)
+
+    response = get_validator_response()
+
     # Return if tx_hash is not valid
     if not tx_hash or len(tx_hash) != 66:
         # Set to True so this doesn't run again, since there's no transaction hash to check
@@ -213,70 +308,9 @@ def grants_transaction_validator(contribution, w3, chain='std'):
         # Parse receipt logs to look for expected transfer info. We don't need to distinguish
         # between ETH and token transfers, and don't need to look at any other receipt parameters,
         # because all contributions are emitted as an event
-        receipt = w3.eth.getTransactionReceipt(tx_hash)
         parsed_logs = bulk_checkout_contract.events.DonationSent().processReceipt(receipt)
 
-        # Return if no donation logs were found
-        if (len(parsed_logs) == 0):
-            response['validation']['comment'] = 'No DonationSent events found in this BulkCheckout transaction'
-            return response
-
-        # Parse out the transfer details we are looking to find in the event logs
-        token_symbol = contribution.normalized_data['token_symbol']
-        expected_recipient = contribution.normalized_data['admin_address'].lower()
-        expected_token = get_token(token_symbol, network, chain)['addr'].lower() # we compare by token address
-        amount_to_use = contribution.subscription.amount_per_period
-
-        expected_amount = parse_token_amount(
-            token_symbol=token_symbol,
-            amount=amount_to_use,
-            network=network,
-            chain=chain
-        )
-        transfer_tolerance = 0.05 # use a 5% tolerance when checking amounts to account for floating point error
-        expected_amount_min = int(expected_amount * (1 - transfer_tolerance))
-        expected_amount_max = int(expected_amount * (1 + transfer_tolerance))
-
-        # Loop through each event to find one that matches
-        for event in parsed_logs:
-            is_correct_recipient = event['args']['dest'].lower() == expected_recipient
-            is_correct_token = event['args']['token'].lower() == expected_token
-
-            transfer_amount = event['args']['amount']
-            is_correct_amount = transfer_amount >= expected_amount_min and transfer_amount <= expected_amount_max
-
-            # if is_correct_recipient:
-            #     print('==========================')
-            #     print(f"subscription {contribution.subscription.amount_per_period_minus_gas_price}")
-            #     print(f"contribution.subscription.amount_per_period  {contribution.subscription.amount_per_period }")
-            #     print(f"contribution.subscription.amount_per_period_minus_gas_price { contribution.subscription.amount_per_period_minus_gas_price}")
-            #     print(f"paid to gitcoin  {float(contribution.subscription.amount_per_period) - float(contribution.subscription.amount_per_period_minus_gas_price) } ")
-
-            #     print(f"tx_hash: {tx_hash}")
-            #     print(f"amount_to_use: {amount_to_use}")
-            #     print(f"expected_amount: {expected_amount}")
-            #     print(f"Expected amount range: {expected_amount_min} - {expected_amount_max}")
-            #     print(f"transfer_amount : {transfer_amount}")
-            #     print(f"is_correct_amount: {is_correct_amount}")
-
-            #     print(f"expected_token: {expected_token}")
-            #     print(f"token from event: {event['args']['token'].lower()}")
-            #     print(f"is_correct_token: {is_correct_token}")
-
-            #     print(f"expected_recipient: {expected_recipient}")
-            #     print(f"recipient from event: {event['args']['dest'].lower()}")
-            #     print(f"is_correct_recipient: {is_correct_recipient}")
-            #     print('==========================')
-
-            if is_correct_recipient and is_correct_token and is_correct_amount:
-                # We found the event log corresponding to the contribution parameters
-                response['validation']['passed'] = True
-                response['validation']['comment'] = 'BulkCheckout. Success'
-                return response
-
-        # Transaction was successful, but the expected contribution was not included in the transaction
-        response['validation']['comment'] = 'DonationSent event with expected recipient, amount, and token was not found in transaction logs'
-        return response
+        return set_donation_validation(response, contribution, parsed_logs, network, chain)
 
     # If we get here, none of the above failure conditions have been met, so we try to find
     # more information about why it failed
@@ -292,25 +326,7 @@ def grants_transaction_validator(contribution, w3, chain='std'):
 
         if receipt.status == 0:
             # Transaction was mined but it failed, try to find out why
-            gas_limit = tx_info['gas']
-            gas_used = receipt['gasUsed']
-            if gas_limit == gas_used:
-                response['tx_cleared'] = True
-                response['split_tx_confirmed'] = True
-                response['validation']['comment'] = 'Transaction failed. Out of gas'
-                return response
-
-            if gas_used > 0.99 * gas_limit:
-                # Some out of gas failures don't use all gas, e.g. https://etherscan.io/tx/0xac37f5bc0e9b75dd0f296b8569f72181a066458b9bee1bbed088ec2298fb4344
-                response['tx_cleared'] = True
-                response['split_tx_confirmed'] = True
-                response['validation']['comment'] = 'Transaction failed. Likely out of gas. Check Etherscan or Tenderly for more details'
-                return response
-
-            response['tx_cleared'] = True
-            response['split_tx_confirmed'] = True
-            response['validation']['comment'] = 'Transaction failed. Unknown reason. See Etherscan or Tenderly for more details'
-            return response
+            return set_failed_tx_validation(response, receipt, tx_info)
 
         # If here, transaction was successful. This code block should never execute because it means
         # the transaction was successful but for some unknown reason it was not parsed above
@@ -324,6 +340,150 @@ def grants_transaction_validator(contribution, w3, chain='std'):
     raise Exception('Unknown transaction validation flow 2')
 
 
+def fetch_concurrently(fetch, tx_hashes, max_workers=VALIDATOR_MAX_WORKERS):
+    """
+    Calls fetch(tx_hash) for every tx hash from a bounded thread pool and returns {tx_hash: result}, the result
+    is the exception raised by fetch when it failed
+    """
+    tx_hashes = list(tx_hashes)
+    if not tx_hashes:
+        return {}
+
+    def fetch_one(tx_hash):
+        try:
+            return tx_hash, fetch(tx_hash)
+        except Exception as e:
+            return tx_hash, e
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(tx_hashes)))) as executor:
+        return dict(executor.map(fetch_one, tx_hashes))
+
+
+def get_receipt_status(receipt, created_on):
+    """
+    The status of a transaction from its receipt, the same statuses as dashboard.utils.get_tx_status returns
+    """
+    if isinstance(receipt, Exception):
+        return 'unknown'
+    if not receipt:
+        drop_dead_date = created_on + timezone.timedelta(days=DROPPED_DAYS)
+        return 'dropped' if timezone.now() > drop_dead_date else 'pending'
+    if 'status' not in receipt.keys():
+        return 'success' if bool(receipt['blockNumber']) and bool(receipt['blockHash']) else 'unknown'
+    if receipt.status == 1:
+        return 'success'
+    if receipt.status == 0:
+        return 'error'
+    return 'unknown'
+
+
+def grants_transactions_validator(contributions, w3, chain='std', max_workers=VALIDATOR_MAX_WORKERS):
+    """
+    Validates many BulkCheckout contributions of one network and chain at once, with the same checks as
+    grants_transaction_validator.
+
+    Contributions are grouped by split_tx_id so that every checkout transaction is looked up once: the receipts,
+    the replacements of the transactions which aren't mined and their receipts are fetched concurrently from a
+    bounded thread pool, and the DonationSent logs of each receipt are parsed once and matched against all of its
+    contributions.
+
+    Returns {contribution.pk: response}, where response is grants_transaction_validator's response with the
+    `status` of the (replacement) transaction as seen at the time of the contribution
+    (success | error | pending | dropped | unknown)
+    """
+    responses = {}
+    contributions_by_tx = {}
+    for contribution in contributions:
+        tx_hash = contribution.split_tx_id
+        if not tx_hash or len(tx_hash) != 66:
+            response = get_validator_response()
+            # Set to True so this doesn't run again, since there's no transaction hash to check
+            response['tx_cleared'] = True
+            response['validation']['comment'] = 'Invalid transaction hash in split_tx_id'
+            response['status'] = 'unknown'
+            responses[contribution.pk] = response
+            continue
+        contributions_by_tx.setdefault(tx_hash, []).append(contribution)
+
+    def fetch_receipt(tx_hash):
+        # returns the receipt of the transaction, or of its replacement when it hasn't been mined
+        try:
+            receipt = w3.eth.getTransactionReceipt(tx_hash)
+        except Exception as e:
+            receipt = e
+        if get_receipt_status(receipt, timezone.now()) not in ['pending', 'dropped', 'unknown']:
+            return tx_hash, receipt
+        try:
+            new_tx = getReplacedTX(tx_hash)
+        except Exception as e:
+            # like a receipt which couldn't be fetched, only this transaction's contributions are left 'unknown'
+            return tx_hash, e
+        finally:
+            # the pool's threads each open their own database connection
+            connection.close()
+        if not new_tx:
+            return tx_hash, receipt
+        try:
+            return new_tx, w3.eth.getTransactionReceipt(new_tx)
+        except Exception as e:
+            return new_tx, e
+
+    # Check for dropped and replaced txns, once per transaction
+    fetched = {
+        tx_hash: (tx_hash, result) if isinstance(result, Exception) else result
+        for tx_hash, result in fetch_concurrently(fetch_receipt, contributions_by_tx.keys(), max_workers).items()
+    }
+    replaced_by = {tx_hash: new_tx for tx_hash, (new_tx, _) in fetched.items() if new_tx != tx_hash}
+    receipts = {new_tx: receipt for new_tx, receipt in fetched.values()}
+
+    # failed transactions are looked up to find out why
+    failed_tx_hashes = {
+        tx_hash for tx_hash in set(receipts.keys())
+        if get_receipt_status(receipts[tx_hash], timezone.now()) == 'error'
+    }
+    tx_infos = fetch_concurrently(w3.eth.getTransaction, failed_tx_hashes, max_workers)
+
+    bulk_checkout_contract = None
+    for tx_hash, tx_contributions in contributions_by_tx.items():
+        tx_hash = replaced_by.get(tx_hash, tx_hash)
+        receipt = receipts[tx_hash]
+        tx_info = tx_infos.get(tx_hash)
+        parsed_logs = None
+
+        for contribution in tx_contributions:
+            network = contribution.subscription.network
+            response = get_validator_response()
+            response['status'] = get_receipt_status(receipt, contribution.created_on)
+            responses[contribution.pk] = response
+
+            if response['status'] == 'success':
+                # Transaction was successful so we know it cleared
+                response['tx_cleared'] = True
+                response['split_tx_confirmed'] = True
+                # Validator currently assumes msg.sender == originator as described above
+                response['originator'] = [ receipt['from'] ]
+                if parsed_logs is None:
+                    if bulk_checkout_contract is None:
+                        bulk_checkout_contract = w3.eth.contract(
+                            address=get_bulk_checkout_address(network, chain), abi=bulk_checkout_abi
+                        )
+                    parsed_logs = bulk_checkout_contract.events.DonationSent().processReceipt(receipt)
+                set_donation_validation(response, contribution, parsed_logs, network, chain)
+
+            elif response['status'] == 'pending':
+                response['validation']['comment'] = 'Transaction is still pending'
+
+            elif response['status'] == 'error' and tx_info and not isinstance(tx_info, Exception):
+                # Transaction was mined but it failed, try to find out why
+                response['originator'] = [ receipt['from'] ]
+                set_failed_tx_validation(response, receipt, tx_info)
+
+            else:
+                response['validation']['comment'] = 'Transaction receipt not found. Transaction may still be pending or was dropped'
+
+    return responses
+
+
 def trim_null_address(address):
     if address == '0x0000000000000000000000000000000000000000':
         return '0x0'
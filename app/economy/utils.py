@@ -17,7 +17,10 @@
 along with this program. If not, see <http://www.gnu.org/licenses/>.
 
 """
-from economy.models import ConversionRate
+from django.conf import settings
+
+import numpy as np
+from economy.rate_cache import conversion_rates, to_timestamp
 
 
 class ConversionRateNotFoundError(Exception):
@@ -26,54 +29,79 @@ class ConversionRateNotFoundError(Exception):
     pass
 
 
+def normalise_currency(currency):
+    """Return the currency whose ConversionRates are used for the provided currency."""
+    # hack to handle WETH
+    if currency == 'WETH':
+        return 'ETH'
+    # hack to handle DAI
+    if currency in settings.STABLE_COINS:
+        return 'USDT'
+    return currency
+
+
 def convert_amount(from_amount, from_currency, to_currency, timestamp=None):
-    from django.conf import settings
     """Convert the provided amount to another current.
 
     Args:
         from_amount (float): The amount to be converted.
         from_currency (str): The currency identifier to convert from.
         to_currency (str): The currency identifier to convert to.
-        timestamp (datetime): First available conversion rate after timestamp. Latest if None.
+        timestamp (datetime): Latest available conversion rate at timestamp, the latest if None or none is older.
 
     Returns:
         float: The amount in to_currency.
 
     """
-
-    # hack to handle WETH
-    if from_currency == 'WETH':
-        from_currency = 'ETH'
-    if to_currency == 'WETH':
-        to_currency = 'ETH'
-
-    # hack to handle DAI
-    if from_currency in settings.STABLE_COINS:
-        from_currency = 'USDT'
-    if to_currency in settings.STABLE_COINS:
-        to_currency = 'USDT'
+    from_currency = normalise_currency(from_currency)
+    to_currency = normalise_currency(to_currency)
 
     if from_currency == to_currency:
         return float(from_amount)
 
-    if timestamp:
-        conversion_rate = ConversionRate.objects.filter(
-            from_currency=from_currency,
-            to_currency=to_currency,
-            timestamp__lte=timestamp
-        ).order_by('-timestamp').first()
-        if not conversion_rate:
-            return convert_amount(from_amount, from_currency, to_currency)
-    else:
-        conversion_rate = ConversionRate.objects.filter(
-            from_currency=from_currency,
-            to_currency=to_currency,
-        ).order_by('-timestamp').first()
-
-    if not conversion_rate:
+    rate = conversion_rates.rate(from_currency, to_currency, timestamp)
+    if rate is None:
         raise ConversionRateNotFoundError(f"ConversionRate {from_currency}/{to_currency} @ {timestamp} not found")
 
-    return (float(conversion_rate.to_amount) / float(conversion_rate.from_amount)) * float(from_amount)
+    return rate * float(from_amount)
+
+
+def convert_amounts(from_amounts, from_currencies, to_currency, timestamps=None):
+    """Convert many amounts at once, with the same result as calling convert_amount on each.
+
+    Args:
+        from_amounts (list of float): The amounts to be converted.
+        from_currencies (str or list of str): The currency of every amount, or one currency for all of them.
+        to_currency (str): The currency identifier to convert to.
+        timestamps (list of datetime): The time of every amount (None for the latest rate), latest rates if None.
+
+    Raises:
+        ConversionRateNotFoundError: When there is no rate for one of the currencies.
+
+    Returns:
+        numpy.ndarray: The amounts in to_currency.
+
+    """
+    from_amounts = np.asarray(from_amounts, dtype=np.float64)
+    if isinstance(from_currencies, str):
+        from_currencies = [from_currencies] * len(from_amounts)
+    when = np.full(len(from_amounts), np.nan)
+    if timestamps is not None:
+        when = np.array([to_timestamp(timestamp) if timestamp else np.nan for timestamp in timestamps])
+
+    to_currency = normalise_currency(to_currency)
+    from_currencies = np.array([normalise_currency(currency) for currency in from_currencies], dtype=object)
+    converted = from_amounts.copy()
+    for from_currency in set(from_currencies.tolist()):
+        if from_currency == to_currency:
+            continue
+        series = conversion_rates.series(from_currency, to_currency)
+        if not len(series):
+            raise ConversionRateNotFoundError(f"ConversionRate {from_currency}/{to_currency} not found")
+        mask = from_currencies == from_currency
+        converted[mask] = series.rates_at(when[mask]) * from_amounts[mask]
+
+    return converted
 
 
 def convert_token_to_usdt(from_token, timestamp=None):
@@ -24,8 +24,12 @@
 from django.utils import timezone
 
 import numpy as np
+from grants import clr_sparse
 from grants.clr_data_src import fetch_contributions, fetch_grants, fetch_summed_contributions
-from grants.models import GrantCLRCalculation
+from grants.clr_snapshot import fetch_snapshot_data
+
+# five potential additional donations plus the base case of 0
+POTENTIAL_DONATIONS = [0, 1, 10, 100, 1000, 10000]
 
 
 def populate_data_for_clr(grants, contributions, clr_round):
@@ -406,6 +410,149 @@ def calculate_clr_for_prediction(bigtot, totals, curr_agg, trust_dict, curr_agg_
     return (grants_clr, 0.0, 0, 0.0)
 
 
+def calculate_clr_predictions(
+    bigtot, totals, curr_agg, trust_dict, curr_agg_sqrts, v_threshold, total_pot, match_cap_per_grant,
+    potential_donations, grant_ids=None
+):
+    '''
+        batched version of calculate_clr_for_prediction which predicts every potential donation for every grant
+
+        each prediction only changes the clr_amount of the grant it is made against, so the distribution of every
+        scenario is the shared raw totals with a single column replaced. The additional pairwise match of every
+        potential donation is computed against the grant's contributors in one pass and the normalisation/cap of
+        all the scenarios of a grant is applied row-wise - totals is never copied or mutated
+
+        args:
+            bigtot              :   float
+            totals              :   raw (un-normalised) totals as returned by calculate_clr
+                {
+                    grantId (int): {
+                        number_contributions (int),
+                        contribution_amount (float),
+                        clr_amount (float),
+                    }
+                }
+            curr_agg            :   {grantId (int): {profileId (str): amount (float)}}
+            trust_dict          :   {profileId (str): trust_bonus (float)}
+            curr_agg_sqrts      :   {grantId (int): {profileId (str): sqrt(amount) (float)}}
+            v_threshold         :   float
+            total_pot           :   float
+            match_cap_per_grant :   float
+            potential_donations :   [amount (int)]
+            grant_ids           :   [grantId (int)] to predict for (defaults to every grant in totals)
+
+        returns:
+            {
+                grantId (int): [predicted clr_amount (float) for each of potential_donations]
+            }
+    '''
+    proj_ids = list(totals.keys())
+    proj_index = {proj: i for i, proj in enumerate(proj_ids)}
+    raw_totals = np.array([float(totals[proj]['clr_amount']) for proj in proj_ids], dtype=np.float64)
+    amount_sqrts = np.sqrt(np.asarray(potential_donations, dtype=np.float64))
+
+    predictions = {}
+    for grant_id in (proj_ids if grant_ids is None else grant_ids):
+        contribz = curr_agg.get(grant_id)
+        if not contribz or grant_id not in proj_index:
+            continue
+
+        # the additional pairwise match for each potential donation against this grant's contributors
+        sqrts = np.array([curr_agg_sqrts[grant_id][k] for k in contribz], dtype=np.float64)
+        thresholds = np.array([v_threshold * float(max(trust_dict[k], 1)) for k in contribz], dtype=np.float64)
+        pt = amount_sqrts[:, None] * sqrts[None, :]
+        deltas = (pt / (pt / thresholds + 1)).sum(axis=1)
+
+        # one row per potential donation, only this grant's column differs between rows
+        col = proj_index[grant_id]
+        scenario_totals = np.tile(raw_totals, (len(amount_sqrts), 1))
+        scenario_totals[:, col] += deltas
+        scenario_bigtots = bigtot - raw_totals[col] + scenario_totals[:, col]
+
+        normalised, is_saturated = _normalise_rows(scenario_bigtots, scenario_totals, total_pot)
+        capped = apply_cap_rows(normalised, match_cap_per_grant, is_saturated)
+
+        predictions[grant_id] = capped[:, col].tolist()
+
+    return predictions
+
+
+def _normalise_rows(bigtots, rows, total_pot):
+    '''
+        row-wise equivalent of normalise (without the cap) where each row is a full distribution with its own bigtot
+
+        returns:
+            normalised rows (np.array), is_saturated per row (np.array of bool)
+    '''
+    is_saturated = bigtots >= total_pot
+    safe_bigtots = np.where(bigtots == 0, 1, bigtots)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        factors = np.where(
+            is_saturated,
+            total_pot / safe_bigtots,
+            1 + np.log(total_pot / safe_bigtots) / 100
+        )
+    return rows * factors[:, None], is_saturated
+
+
+def apply_cap_rows(rows, match_cap_per_grant, should_spread):
+    '''
+        caps every distribution (row) at match_cap_per_grant and, where should_spread, redistributes the excess
+        proportionally across the uncapped grants until no uncapped grant crosses the cap
+
+        each redistribution pass keeps the order of the grants and the total of the row, so after capping the
+        top m grants the rest are all scaled by the same factor
+            K(m) = (total - m * cap) / (sum of the grants outside the top m)
+        and the passes stop at the smallest m (no smaller than the number of grants over the cap to start with)
+        where the largest uncapped grant stays within the cap. That point is found with one sort and one scan
+        of the cumulative sums rather than a pass over the row per cap crossing
+
+        args:
+            rows                :   np.array of clr_amounts (one distribution, or one distribution per row)
+            match_cap_per_grant :   float
+            should_spread       :   bool, or one bool per row
+        returns:
+            np.array of the capped clr_amounts, shaped as rows
+    '''
+    values = np.asarray(rows, dtype=np.float64)
+    rows = np.atleast_2d(values)
+    num_rows, num_grants = rows.shape
+    if not num_grants:
+        return np.array(values)
+    cap = float(match_cap_per_grant)
+    should_spread = np.broadcast_to(np.asarray(should_spread, dtype=bool), (num_rows,))
+
+    order = np.argsort(-rows, axis=1, kind='stable')
+    ordered = np.take_along_axis(rows, order, axis=1)
+    padding = np.zeros((num_rows, 1))
+
+    # for every m: the sum of the grants outside the top m, and the excess of the top m over the cap
+    uncapped = np.concatenate([np.cumsum(ordered[:, ::-1], axis=1)[:, ::-1], padding], axis=1)
+    excess = np.concatenate([padding, np.cumsum(ordered - cap, axis=1)], axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        factors = np.where(uncapped > 0, (uncapped + excess) / uncapped, 1)
+
+    rows_index = np.arange(num_rows)
+    num_capped = np.arange(num_grants + 1)[None, :]
+    first_capped = (ordered >= cap).sum(axis=1)
+    next_uncapped = np.concatenate([ordered, padding], axis=1)
+    stable = (num_capped >= first_capped[:, None]) & ((next_uncapped * factors <= cap) | (uncapped <= 0))
+    final_capped = np.argmax(stable, axis=1)
+
+    # the excess is only spread when there is some to spread and uncapped grants to spread it over
+    spread = (
+        should_spread & (excess[rows_index, first_capped] > 0) & (uncapped[rows_index, first_capped] > 0)
+    )
+    final_capped = np.where(spread, final_capped, first_capped)
+    final_factors = np.where(spread, factors[rows_index, final_capped], 1)
+
+    capped = np.where(num_capped[:, :num_grants] < final_capped[:, None], cap, ordered * final_factors[:, None])
+    result = np.empty_like(capped)
+    np.put_along_axis(result, order, capped, axis=1)
+
+    return result.reshape(values.shape)
+
+
 def normalise(bigtot, totals, total_pot, match_cap_per_grant):
     '''
         given the total amount distributed (bigtot) and the total_pot size normalise the distribution
@@ -439,46 +586,165 @@ def normalise(bigtot, totals, total_pot, match_cap_per_grant):
 
 
 def apply_cap(totals, match_cap_per_grant, should_spread):
-    # work out how much of the pool is remaining after capping each grant
-    remainder = 0   # amount left to be redistributed after cap
-    uncapped = 0    # total amount matched for grants which haven't capped
-
-    # cap each of the clr_amounts
-    for key, t in totals.items():
-        if t['clr_amount'] >= match_cap_per_grant:
-            # grant has exceeded the cap
-            #  - so cap the clr_amount
-            #  - add the extra funds to remainder
-            remainder += t['clr_amount'] - match_cap_per_grant
-            #  - apply the cap
-            t['clr_amount'] = match_cap_per_grant
+    '''
+        caps the clr_amount of each grant in totals (in place) and spreads the remainder, see apply_cap_rows
+    '''
+    keys = list(totals.keys())
+    clr_amounts = apply_cap_rows(
+        [totals[key]['clr_amount'] for key in keys], match_cap_per_grant, should_spread
+    )
+    for key, clr_amount in zip(keys, clr_amounts.tolist()):
+        totals[key]['clr_amount'] = clr_amount
+
+    return totals
+
+
+def build_clr_prediction_curve(potential_donations, potential_clr):
+    '''
+        builds the [[amount, clr_amount, bonus_from_match_amount], ...] curve saved against a GrantCLRCalculation
 
+        args:
+            potential_donations :   [amount (int)] (the first amount is the base case of 0)
+            potential_clr       :   [clr_amount (float)] for each of potential_donations
+        returns:
+            clr_prediction_curve
+    '''
+    clr_prediction_curve = list(zip(potential_donations, potential_clr))
+    base = clr_prediction_curve[0][1]
+
+    # check that we have enough data to set the curve
+    can_estimate = True if (
+        base or clr_prediction_curve[1][1] or clr_prediction_curve[2][1] or clr_prediction_curve[3][1]
+    ) else False
+    if can_estimate:
+        return [[ele[0], ele[1], ele[1] - base if ele[1] != 0 else 0.0] for ele in clr_prediction_curve]
+
+    return [[0.0, 0.0, 0.0] for x in range(0, len(potential_donations))]
+
+
+def calculate_potential_clr(
+    grant_ids, bigtot, totals, curr_grants_clr, curr_agg, trust_dict, curr_agg_sqrts, v_threshold, total_pot,
+    match_cap_per_grant, what='full'
+):
+    '''
+        calculates the clr amount of each grant for every one of POTENTIAL_DONATIONS
+
+        args:
+            grant_ids           :   [grantId (int)]
+            bigtot, totals      :   as returned by calculate_clr
+            curr_grants_clr     :   the normalised current distribution
+            curr_agg, trust_dict, curr_agg_sqrts, v_threshold, total_pot, match_cap_per_grant
+            what                :   full | final (final only keeps the current distribution)
+        returns:
+            {
+                grantId (int): [clr_amount (float) for each of POTENTIAL_DONATIONS]
+            }
+    '''
+    predictions = {}
+    if what != 'final':
+        predictions = calculate_clr_predictions(
+            bigtot, totals, curr_agg, trust_dict, curr_agg_sqrts, v_threshold, total_pot, match_cap_per_grant,
+            POTENTIAL_DONATIONS, grant_ids=[grant_id for grant_id in grant_ids if grant_id in curr_agg]
+        )
+
+    potential_clrs = {}
+    for grant_id in grant_ids:
+        # if no contributions have been made for this grant then the pairwise will fail and there will be no matching
+        # for this grant
+        if not curr_agg.get(grant_id):
+            potential_clrs[grant_id] = [0.0 for x in range(0, len(POTENTIAL_DONATIONS))]
+            continue
+
+        # use the current distribution calc for amount=0
+        grants_clr = curr_grants_clr.get(grant_id)
+        potential_clr = [grants_clr['clr_amount'] if grants_clr else 0.0]
+
+        raw_grants_clr = totals.get(grant_id)
+        if what == 'final' or raw_grants_clr['clr_amount'] == match_cap_per_grant:
+            # final will save the current distribution for every grant (ie without predictions)
+            potential_clr += [0.0 for amount in POTENTIAL_DONATIONS[1:]]
         else:
-            # grant has not exceed cap so add amount to uncapped
-            uncapped += t['clr_amount']
-
-    # check that we have both capped and uncapped grants and that we should be spreading the remainder
-    if should_spread and remainder > 0 and uncapped > 0:
-        # div so we can spread the remainder proportionally
-        per_remainder = remainder / uncapped
-        # reset remainder to check if any grants enter the cap region after spreading the remainder
-        remainder = 0
-        # spread the remainder
-        for key, t in totals.items():
-            if t['clr_amount'] < match_cap_per_grant:
-                t['clr_amount'] += per_remainder * t['clr_amount']
-                # check if the cap is hit after spreading the remainder
-                if t['clr_amount'] >= match_cap_per_grant:
-                    remainder += t['clr_amount'] - match_cap_per_grant
+            potential_clr += predictions[grant_id][1:]
 
-        # apply the cap again (recursively)
-        if remainder > 0:
-            apply_cap(totals, match_cap_per_grant, should_spread)
+        potential_clrs[grant_id] = potential_clr
+
+    return potential_clrs
+
+
+def record_slim_clr_calculations(clr_round, curr_grants_clr):
+    '''
+        updates only the current match estimate on the latest calc of each grant and saves them in bulk
+
+        args:
+            clr_round       :   GrantCLR
+            curr_grants_clr :   the normalised current distribution
+    '''
+    grant_pks = set(
+        clr_round.grants.using('default').filter(pk__in=curr_grants_clr.keys()).values_list('pk', flat=True)
+    )
+    latest_calcs = {}
+    # ordered by pk so that the most recent latest calc of each grant wins
+    latest = clr_round.clr_calculations.using('default').filter(latest=True, grant_id__in=grant_pks).order_by('pk')
+    for latest_calc in latest:
+        latest_calcs[latest_calc.grant_id] = latest_calc
+
+    counter = 0
+    clr_prediction_curves = {}
+    total_count = len(curr_grants_clr.items())
+    for pk, grant_calc in curr_grants_clr.items():
+        counter += 1
+        if counter % 10 == 0 or True:
+            print(f"- {counter}/{total_count} grants iter, pk:{pk}, at {round(time.time(),1)}")
+
+        # update latest calcs with current distribution
+        latest_calc = latest_calcs.get(pk)
+        if not latest_calc:
+            print(f"- - could not find latest clr calc for {pk} ")
+            continue
+        clr_prediction_curve = copy.deepcopy(latest_calc.clr_prediction_curve)
+        clr_prediction_curve[0][1] = grant_calc['clr_amount'] # update only the existing match estimate
+        print(clr_prediction_curve)
+        clr_prediction_curves[pk] = clr_prediction_curve
+
+    print(f"- bulk saving {len(clr_prediction_curves)} slim grant calcs at {round(time.time(),1)}")
+    clr_round.record_clr_prediction_curves(clr_prediction_curves, replace_all=False)
+
+
+def save_round_state(clr_round, round_state, clr_calc_start_time):
+    if not round_state:
+        return
+    from grants.clr_state import save_clr_round_state
+
+    print(f"- saving round state at {round(time.time(),1)}")
+    save_clr_round_state(clr_round, round_state, clr_calc_start_time)
+
+
+# engine name -> (get_totals_by_pair, calculate_clr)
+CLR_ENGINES = {
+    'dict': (get_totals_by_pair, calculate_clr),
+    'sparse': (clr_sparse.get_totals_by_pair, clr_sparse.calculate_clr),
+}
 
-    return totals
 
 @transaction.atomic
-def predict_clr(save_to_db=False, from_date=None, clr_round=None, network='mainnet', only_grant_pk=None, what='full', use_sql=False):
+def predict_clr(
+    save_to_db=False, from_date=None, clr_round=None, network='mainnet', only_grant_pk=None, what='full', use_sql=False,
+    engine='dict', use_snapshot=False, use_replica=False
+):
+    '''
+        engine selects how the pairwise component is calculated:
+            dict    :   nested python dicts of every contributor pair (default)
+            sparse  :   grant x contributor sparse matrix products (see grants.clr_sparse)
+
+        use_snapshot reads the contributions from the round's columnar snapshot (see grants.clr_snapshot), which
+        only fetches the contributions modified since the previous run
+
+        use_replica runs the use_sql aggregation against one of the read replicas
+    '''
+    if engine not in CLR_ENGINES:
+        raise ValueError(f'unknown clr engine {engine}, expected one of {", ".join(CLR_ENGINES)}')
+    engine_get_totals_by_pair, engine_calculate_clr = CLR_ENGINES[engine]
+
     # setup
     counter = 0
     debug_output = []
@@ -491,10 +757,15 @@ def predict_clr(save_to_db=False, from_date=None, clr_round=None, network='mainn
     print(f"- starting fetch_grants at {round(time.time(),1)}")
     grants = fetch_grants(clr_round, network)
 
-    # collect data using sql or django (to group+sum)
-    if use_sql:
+    # collect data using the snapshot, sql or django (to group+sum)
+    if use_snapshot:
+        print(f"- starting snapshot refresh and sum at {round(time.time(),1)}")
+        curr_agg, trust_dict = fetch_snapshot_data(grants, clr_round, network)
+    elif use_sql:
         print(f"- starting get data and sum at {round(time.time(),1)}")
-        curr_agg, trust_dict = fetch_summed_contributions(grants, clr_round, network)
+        curr_agg, trust_dict = fetch_summed_contributions(
+            grants, clr_round, network, using='replica' if use_replica else 'default'
+        )
     else:
         print(f"- starting fetch_contributions at {round(time.time(),1)}")
         contributions = fetch_contributions(clr_round, network)
@@ -512,11 +783,11 @@ def predict_clr(save_to_db=False, from_date=None, clr_round=None, network='mainn
 
     # aggregate pairs and run calculation to get current distribution
     print(f"- starting pairwise component with {len(trust_dict)} contributors at {round(time.time(),1)}")
-    pair_totals, curr_agg_sqrts, pairs_tot = get_totals_by_pair(curr_agg)
+    pair_totals, curr_agg_sqrts, pairs_tot = engine_get_totals_by_pair(curr_agg)
 
     print(f"- starting current distributions calc with {pairs_tot} pairs at {round(time.time(),1)}")
     grant_clr_percentage_cap = clr_round.grant_clr_percentage_cap if clr_round.grant_clr_percentage_cap else 100
-    bigtot, totals = calculate_clr(curr_agg, trust_dict, pair_totals, curr_agg_sqrts, v_threshold, total_pot)
+    bigtot, totals = engine_calculate_clr(curr_agg, trust_dict, pair_totals, curr_agg_sqrts, v_threshold, total_pot)
 
     # $ value of the percentage cap
     match_cap_per_grant = total_pot * (float(grant_clr_percentage_cap) / 100)
@@ -524,27 +795,31 @@ def predict_clr(save_to_db=False, from_date=None, clr_round=None, network='mainn
     # normalise against a deepcopy of the totals to avoid mutations
     curr_grants_clr = normalise(bigtot, copy.deepcopy(totals), total_pot, match_cap_per_grant)
 
+    # keep the intermediate state so that new contributions can be applied incrementally until the next run, it is
+    # saved once the results are recorded so that the contributions it replays are recorded after them
+    round_state = None
+    if save_to_db and not only_grant_pk:
+        from grants.clr_state import CLRRoundState
+
+        round_state = CLRRoundState(
+            clr_round.pk,
+            grants.values_list('pk', flat=True),
+            curr_agg,
+            trust_dict,
+            pair_totals,
+            curr_agg_sqrts,
+            totals,
+            bigtot,
+            v_threshold,
+            total_pot,
+            match_cap_per_grant
+        )
+
     # for slim calc - only update the current distribution and skip calculating predictions
     if what == 'slim':
         print(f"- saving slim grant calc at {round(time.time(),1)}")
-        total_count = len(curr_grants_clr.items())
-        for pk, grant_calc in curr_grants_clr.items():
-            counter += 1
-            if counter % 10 == 0 or True:
-                print(f"- {counter}/{total_count} grants iter, pk:{pk}, at {round(time.time(),1)}")
-
-            # update latest calcs with current distribution
-            grant_calc = curr_grants_clr[pk]
-            grant = clr_round.grants.using('default').get(pk=pk)
-            latest_calc = grant.clr_calculations.using('default').filter(latest=True, grantclr=clr_round).order_by('-pk').first()
-            if not latest_calc:
-                print(f"- - could not find latest clr calc for {grant.pk} ")
-                continue
-            clr_prediction_curve = copy.deepcopy(latest_calc.clr_prediction_curve)
-            clr_prediction_curve[0][1] = grant_calc['clr_amount'] # update only the existing match estimate
-            print(clr_prediction_curve)
-            clr_round.record_clr_prediction_curve(grant, clr_prediction_curve)
-            grant.save()
+        record_slim_clr_calculations(clr_round, curr_grants_clr)
+        save_round_state(clr_round, round_state, clr_calc_start_time)
         # if we are only calculating slim CLR calculations, return here and save 97% compute power
         print(f"- done calculating at {round(time.time(),1)}")
         print(f"\nTotal execution time: {(timezone.now() - clr_calc_start_time)}\n")
@@ -558,74 +833,41 @@ def predict_clr(save_to_db=False, from_date=None, clr_round=None, network='mainn
     # for full calc - calculate the clr for each grant given additional potential_donations
     total_count = grants.count()
 
-    # select all latest results which match this round
-    invalid_clr_calculations = GrantCLRCalculation.objects.filter(latest=True, grantclr=clr_round.pk)
+    # results to be persisted in bulk once every grant has been calculated
+    clr_prediction_curves = {}
 
-    for grant in grants:
-        # exclude grants which will have a result saved in this run
-        invalid_clr_calculations = invalid_clr_calculations.exclude(grant=grant.pk)
+    potential_donations = POTENTIAL_DONATIONS
 
-        # five potential additional donations plus the base case of 0
-        potential_donations = [0, 1, 10, 100, 1000, 10000]
+    print(f"- starting batch predictions at {round(time.time(),1)}")
+    potential_clrs = calculate_potential_clr(
+        [grant.id for grant in grants], bigtot, totals, curr_grants_clr, curr_agg, trust_dict, curr_agg_sqrts,
+        v_threshold, total_pot, match_cap_per_grant, what
+    )
 
+    for grant in grants:
         # debug the run...
         counter += 1
         if counter % 10 == 0 or True:
             print(f"- {counter}/{total_count} grants iter, pk:{grant.id}, at {round(time.time(),1)}")
 
-        # if no contributions have been made for this grant then the pairwise will fail and there will be no matching for this grant
-        if not curr_agg.get(grant.id):
-            grants_clr = None
-            potential_clr = [0.0 for x in range(0, 6)]
-        else:
-            potential_clr = []
-            for amount in potential_donations:
-                # no need to run the calculation multiple times for amount=0 (will always be the same result)
-                if amount == 0:
-                    # use the current distribution calc
-                    grants_clr = curr_grants_clr.get(grant.id)
-                    predicted_clr = grants_clr['clr_amount'] if grants_clr else 0.0
-                else:
-                    raw_grants_clr = totals.get(grant.id)
-                    # final will save the current distribution for every grant (ie without predictions)
-                    if what == 'final' or raw_grants_clr['clr_amount'] == match_cap_per_grant:
-                        # ignore the other ones
-                        grants_clr = None
-                        predicted_clr = 0.0
-                    else:
-                        # calculate clr with additional donation amount
-                        grants_clr, predicted_clr, _, _ = calculate_clr_for_prediction(
-                            bigtot, totals, curr_agg, trust_dict, curr_agg_sqrts, v_threshold, total_pot, grant.id, amount, match_cap_per_grant
-                        )
-
-                # record each point of the prediction
-                potential_clr.append(predicted_clr)
-
         # calculate the prediction curve
-        clr_prediction_curve = list(zip(potential_donations, potential_clr))
-        base = clr_prediction_curve[0][1]
-        grant.last_clr_calc_date = timezone.now()
-        grant.next_clr_calc_date = timezone.now() + timezone.timedelta(minutes=60)
-
-        # check that we have enough data to set the curve
-        can_estimate = True if base or clr_prediction_curve[1][1] or clr_prediction_curve[2][1] or clr_prediction_curve[3][1] else False
-        if can_estimate:
-            clr_prediction_curve  = [[ele[0], ele[1], ele[1] - base if ele[1] != 0 else 0.0] for ele in clr_prediction_curve ]
-        else:
-            clr_prediction_curve = [[0.0, 0.0, 0.0] for x in range(0, 6)]
+        potential_clr = potential_clrs[grant.id]
+        clr_prediction_curve = build_clr_prediction_curve(potential_donations, potential_clr)
 
         print(clr_prediction_curve)
 
-        # save the result of the prediction
-        if save_to_db and from_date > (clr_calc_start_time - timezone.timedelta(hours=1)):
-            clr_round.record_clr_prediction_curve(grant, clr_prediction_curve)
-            grant.save()
+        clr_prediction_curves[grant.id] = clr_prediction_curve
 
-        debug_output.append({'grant': grant.id, "title": grant.title, "clr_prediction_curve": (potential_donations, potential_clr), "grants_clr": grants_clr})
+        debug_output.append({
+            'grant': grant.id, "title": grant.title, "clr_prediction_curve": (potential_donations, potential_clr),
+            "grants_clr": curr_grants_clr.get(grant.id)
+        })
 
-    # update the state on any past results which are no longer included in this round
-    if save_to_db:
-        invalid_clr_calculations.update(latest=False, active=False)
+    # save the results of the predictions, retiring any past results which are no longer included in this round
+    if save_to_db and from_date > (clr_calc_start_time - timezone.timedelta(hours=1)):
+        print(f"- bulk saving {len(clr_prediction_curves)} grant calcs at {round(time.time(),1)}")
+        clr_round.record_clr_prediction_curves(clr_prediction_curves, replace_all=not only_grant_pk)
+    save_round_state(clr_round, round_state, clr_calc_start_time)
 
     print(f"\nTotal execution time: {(timezone.now() - clr_calc_start_time)}\n")
 
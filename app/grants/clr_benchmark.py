@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+"""Define the offline CLR benchmark harness.
+
+Copyright (C) 2021 Gitcoin Core
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+import copy
+import platform
+import resource
+import subprocess
+import time
+import tracemalloc
+
+import numpy as np
+from grants.clr import CLR_ENGINES, POTENTIAL_DONATIONS, aggregate_contributions, calculate_clr_predictions, normalise
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+
+# exponent of the zipf-like popularity of grants and activity of contributors, most contributions go to a handful
+# of grants from a core of very active contributors with a long tail of both
+GRANT_POPULARITY_EXPONENT = 1.1
+CONTRIBUTOR_ACTIVITY_EXPONENT = 0.8
+
+
+def synthetic_round(num_contributions, num_grants=None, num_contributors=None, seed=0):
+    '''
+        Generates an in-memory round with power-law distributed contributors per grant
+
+        args:
+            num_contributions   :   int
+            num_grants          :   int (defaults to one grant per 50 contributions, between 10 and 5000)
+            num_contributors    :   int (defaults to one contributor per 8 contributions)
+            seed                :   int
+        returns:
+            list of lists of grant data, as returned by translate_data
+                [[grant_id (int), user_id (int), contribution_amount (float)]]
+            dictionary of profile_ids and trust scores
+                {user_id (int): trust_score (float)}
+    '''
+    rng = np.random.default_rng(seed)
+    num_grants = num_grants or int(min(max(num_contributions // 50, 10), 5000))
+    num_contributors = num_contributors or max(num_contributions // 8, 2)
+
+    grant_weights = 1 / np.arange(1, num_grants + 1) ** GRANT_POPULARITY_EXPONENT
+    contributor_weights = 1 / np.arange(1, num_contributors + 1) ** CONTRIBUTOR_ACTIVITY_EXPONENT
+
+    grant_weights /= grant_weights.sum()
+    contributor_weights /= contributor_weights.sum()
+
+    grant_ids = rng.choice(num_grants, size=num_contributions, p=grant_weights) + 1
+    user_ids = rng.choice(num_contributors, size=num_contributions, p=contributor_weights) + 1
+    # most contributions are a few dollars with the odd whale
+    amounts = np.round(rng.lognormal(mean=1.5, sigma=1.2, size=num_contributions), 2)
+
+    contributions = [list(row) for row in zip(grant_ids.tolist(), user_ids.tolist(), amounts.tolist())]
+    trust_bonuses = rng.choice([0.5, 1.0, 1.5], size=num_contributors, p=[0.5, 0.3, 0.2])
+    trust_dict = dict(zip(range(1, num_contributors + 1), trust_bonuses.tolist()))
+
+    return contributions, trust_dict
+
+
+class StageTimer:
+    '''
+        Records the wall time and (optionally) the peak traced memory of each stage of a run
+    '''
+
+    def __init__(self, track_memory=True):
+        self.track_memory = track_memory
+        self.stages = {}
+
+    def run(self, stage, func, *args, **kwargs):
+        if self.track_memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+        finally:
+            seconds = time.perf_counter() - start
+            peak = None
+            if self.track_memory:
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+
+        self.stages[stage] = {
+            'seconds': round(seconds, 6),
+            'peak_mb': round(peak / 1024 / 1024, 3) if peak is not None else None,
+        }
+        return result
+
+
+def benchmark_round(num_contributions, engine='dict', seed=0, v_threshold=25.0, total_pot=1000000.0,
+                    cap_percentage=10.0, prediction_grants=100, track_memory=True):
+    '''
+        Runs every stage of predict_clr against a synthetic round without touching the database
+
+        args:
+            num_contributions   :   int
+            engine              :   dict | sparse
+            prediction_grants   :   the number of grants (the most funded first) the prediction stage runs for,
+                                    None predicts every grant
+        returns:
+            {
+                'contributions': int, 'grants': int, 'contributors': int, 'pairs': int, 'engine': str,
+                'stages': {stage: {'seconds': float, 'peak_mb': float}}
+            }
+    '''
+    engine_get_totals_by_pair, engine_calculate_clr = CLR_ENGINES[engine]
+    contributions, trust_dict = synthetic_round(num_contributions, seed=seed)
+    match_cap_per_grant = total_pot * (cap_percentage / 100)
+    timer = StageTimer(track_memory)
+
+    curr_agg = timer.run('aggregate_contributions', aggregate_contributions, contributions)
+    pair_totals, curr_agg_sqrts, pairs_tot = timer.run('get_totals_by_pair', engine_get_totals_by_pair, curr_agg)
+    bigtot, totals = timer.run(
+        'calculate_clr', engine_calculate_clr, curr_agg, trust_dict, pair_totals, curr_agg_sqrts, v_threshold,
+        total_pot
+    )
+    normalised_totals = copy.deepcopy(totals)
+    timer.run('normalise', normalise, bigtot, normalised_totals, total_pot, match_cap_per_grant)
+
+    grant_ids = sorted(curr_agg.keys(), key=lambda grant_id: len(curr_agg[grant_id]), reverse=True)
+    if prediction_grants is not None:
+        grant_ids = grant_ids[:prediction_grants]
+    timer.run(
+        'predictions', calculate_clr_predictions, bigtot, totals, curr_agg, trust_dict, curr_agg_sqrts, v_threshold,
+        total_pot, match_cap_per_grant, POTENTIAL_DONATIONS, grant_ids=grant_ids
+    )
+
+    return {
+        'contributions': num_contributions,
+        'grants': len(curr_agg),
+        'contributors': len({user for contribz in curr_agg.values() for user in contribz}),
+        'pairs': pairs_tot,
+        'engine': engine,
+        'predicted_grants': len(grant_ids),
+        'stages': timer.stages,
+    }
+
+
+def _git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmark(sizes=None, engines=None, seed=0, prediction_grants=100, track_memory=True):
+    '''
+        Benchmarks every combination of round size and engine
+
+        returns:
+            a JSON serialisable report
+                {
+                    'meta': {'revision': str, 'python': str, 'numpy': str, 'seed': int, 'started_at': float,
+                             'max_rss_mb': float},
+                    'runs': [benchmark_round(...)]
+                }
+    '''
+    report = {
+        'meta': {
+            'revision': _git_revision(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'seed': seed,
+            'track_memory': track_memory,
+            'started_at': time.time(),
+        },
+        'runs': [],
+    }
+
+    for num_contributions in sizes or DEFAULT_SIZES:
+        for engine in engines or list(CLR_ENGINES.keys()):
+            print(f"- benchmarking {num_contributions} contributions ({engine} engine) at {round(time.time(),1)}")
+            run = benchmark_round(
+                num_contributions, engine=engine, seed=seed, prediction_grants=prediction_grants,
+                track_memory=track_memory
+            )
+            report['runs'].append(run)
+            stages = ', '.join(f"{stage}: {round(stats['seconds'], 3)}s" for stage, stats in run['stages'].items())
+            print(f"  {run['grants']} grants, {run['contributors']} contributors, {run['pairs']} pairs - {stages}")
+
+    # ru_maxrss is in kilobytes on linux
+    report['meta']['max_rss_mb'] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 3)
+
+    return report
+
+
+def compare_reports(baseline, current):
+    '''
+        returns [(contributions, engine, stage, baseline seconds, current seconds, ratio)] for every stage that was
+        run in both reports
+    '''
+    baseline_stages = {
+        (run['contributions'], run['engine'], stage): stats['seconds']
+        for run in baseline['runs'] for stage, stats in run['stages'].items()
+    }
+
+    comparison = []
+    for run in current['runs']:
+        for stage, stats in run['stages'].items():
+            key = (run['contributions'], run['engine'], stage)
+            if key not in baseline_stages:
+                continue
+            before = baseline_stages[key]
+            ratio = stats['seconds'] / before if before else None
+            comparison.append(key + (before, stats['seconds'], ratio))
+
+    return comparison
@@ -1,8 +1,52 @@
-from django.db import connection
+from django.db import connections, router
 
 from grants.models import Contribution, GrantCollection
 from townsquare.models import SquelchProfile
 
+# number of rows fetched per round trip by fetch_summed_contributions
+SUMMED_CONTRIBUTIONS_CHUNK_SIZE = 2000
+
+# collect contributions with a groupBy sum query, every value is a bound parameter so the statement text is the
+# same for every round
+SUMMED_CONTRIBUTIONS_SQL = '''
+    -- group by ... sum the contributions $ value for each user
+    SELECT
+        grants.use_grant_id as grant_id,
+        grants_contribution.profile_for_clr_id as user_id,
+        SUM(grants_contribution.amount_per_period_usdt * %(multiplier)s),
+        MAX(dashboard_profile.trust_bonus)::FLOAT as trust_bonus,
+        MAX(dashboard_profile.passport_trust_bonus)::FLOAT as passport_trust_bonus
+    FROM grants_contribution
+    INNER JOIN dashboard_profile ON (grants_contribution.profile_for_clr_id = dashboard_profile.id)
+    INNER JOIN grants_subscription ON (grants_contribution.subscription_id = grants_subscription.id)
+    RIGHT JOIN (
+        SELECT
+            grants_grant.id as grant_id,
+            (
+                CASE
+                WHEN grants_grant.defer_clr_to_id IS NOT NULL THEN grants_grant.defer_clr_to_id
+                ELSE grants_grant.id
+                END
+            ) as use_grant_id
+        FROM grants_grant
+    ) grants ON (grants_contribution.grant_id = grants.grant_id)
+    WHERE (
+        grants_contribution.grant_id = ANY(%(grant_ids)s) AND
+        grants_contribution.created_on >= %(start_date)s AND
+        grants_contribution.created_on <= %(end_date)s AND
+        grants_contribution.match = True AND
+        grants_subscription.network = %(network)s AND
+        grants_contribution.success = True AND
+        grants_contribution.amount_per_period_usdt >= 0 AND
+        NOT (
+            grants_contribution.profile_for_clr_id IN (
+                SELECT squelched.profile_id FROM townsquare_squelchprofile squelched WHERE squelched.active = True
+            ) AND grants_contribution.profile_for_clr_id IS NOT NULL
+        )
+    )
+    GROUP BY grants.use_grant_id, grants_contribution.profile_for_clr_id
+'''
+
 
 def fetch_grants(clr_round, network='mainnet'):
     '''
@@ -36,13 +80,14 @@ def fetch_grants(clr_round, network='mainnet'):
     return grants
 
 
-def fetch_contributions(clr_round, network='mainnet'):
+def fetch_contributions(clr_round, network='mainnet', exclude_squelched=True):
     '''
         Fetch contributions that are included in the provided clr_round
 
         Args:
-            network       :   mainnet | rinkeby
-            clr_round     :   GrantCLR
+            network           :   mainnet | rinkeby
+            clr_round         :   GrantCLR
+            exclude_squelched :   drop contributions from squelched profiles (snapshots apply this when they are read)
         Returns:
             contributions :   contributions data object
 
@@ -64,20 +109,28 @@ def fetch_contributions(clr_round, network='mainnet'):
         contributions = contributions.filter(**subscription_filters)
 
     # ignore profiles which have been squelched
-    profiles_to_be_ignored = SquelchProfile.objects.filter(active=True).values_list('profile__pk')
-    contributions = contributions.exclude(profile_for_clr__in=profiles_to_be_ignored)
+    if exclude_squelched:
+        profiles_to_be_ignored = SquelchProfile.objects.filter(active=True).values_list('profile__pk')
+        contributions = contributions.exclude(profile_for_clr__in=profiles_to_be_ignored)
 
     return contributions
 
 
-def fetch_summed_contributions(grants, clr_round, network='mainnet'):
+def fetch_summed_contributions(
+    grants, clr_round, network='mainnet', using='default', chunk_size=SUMMED_CONTRIBUTIONS_CHUNK_SIZE
+):
     '''
         Aggregated contributions grouped by grant and contributor
 
+        the rows are streamed from a server-side cursor in chunks of `chunk_size` so that memory stays flat on
+        large rounds
+
         args:
             grants      :   Grants (to fetch contribs for)
             clr_round   :   GrantCLR
             network     :   mainnet | rinkeby
+            using       :   database alias, or 'replica' to read from one of the PrimaryDBRouter replicas
+            chunk_size  :   number of rows fetched from the cursor at a time
         returns:
             aggregated contributions by pair nested dict
                 {
@@ -89,68 +142,36 @@ def fetch_summed_contributions(grants, clr_round, network='mainnet'):
                 {user_id (str): trust_score (float)}
     '''
 
-    multiplier = clr_round.contribution_multiplier
-    clr_start_date = clr_round.start_date
-    clr_end_date = clr_round.end_date
+    if using == 'replica':
+        # falls back to 'default' when no router is configured (ie. outside of prod)
+        using = router.db_for_read(Contribution)
 
     # only consider contribs from current grant set
-    grantIds = ''
-    for i in range(len(grants)):
-        grantIds += "'" + str(grants[i].id) + "'" + (', ' if i+1 != len(grants) else '')
-
-    # collect contributions with a groupBy sum query
-    summedContribs = f'''
-        -- group by ... sum the contributions $ value for each user
-        SELECT
-            grants.use_grant_id as grant_id,
-            grants_contribution.profile_for_clr_id as user_id,
-            SUM(grants_contribution.amount_per_period_usdt * {float(multiplier)}),
-            MAX(dashboard_profile.trust_bonus)::FLOAT as trust_bonus
-            MAX(dashboard_profile.dpopp_trust_bonus)::FLOAT as dpopp_trust_bonus
-        FROM grants_contribution
-        INNER JOIN dashboard_profile ON (grants_contribution.profile_for_clr_id = dashboard_profile.id)
-        INNER JOIN grants_subscription ON (grants_contribution.subscription_id = grants_subscription.id)
-        RIGHT JOIN (
-            SELECT
-                grants_grant.id as grant_id,
-                (
-                    CASE
-                    WHEN grants_grant.defer_clr_to_id IS NOT NULL THEN grants_grant.defer_clr_to_id
-                    ELSE grants_grant.id
-                    END
-                ) as use_grant_id
-            FROM grants_grant
-        ) grants ON (grants_contribution.grant_id = grants.grant_id)
-        WHERE (
-            grants_contribution.grant_id IN ({grantIds}) AND
-            grants_contribution.created_on >= '{clr_start_date}' AND
-            grants_contribution.created_on <= '{clr_end_date}' AND
-            grants_contribution.match = True AND
-            grants_subscription.network = '{network}' AND
-            grants_contribution.success = True AND
-            grants_contribution.amount_per_period_usdt >= 0 AND
-            NOT (
-                grants_contribution.profile_for_clr_id IN (
-                    SELECT squelched.profile_id FROM townsquare_squelchprofile squelched WHERE squelched.active = True
-                ) AND grants_contribution.profile_for_clr_id IS NOT NULL
-            )
-        )
-        GROUP BY grants.use_grant_id, grants_contribution.profile_for_clr_id;
-    '''
-
-    # open cursor and execute the groupBy sum for the round
-    with connection.cursor() as cursor:
-        curr_agg = {}
-        trust_dict = {}
-        # execute to populate shared state for the round
-        cursor.execute(summedContribs)
-        for _row in cursor.fetchall():
-            if not curr_agg.get(_row[0]):
-                curr_agg[_row[0]] = {}
-            # Use dpopp_trust_bonus is available or trust_bonus otherwise
-            # _row[3] -> trust_bonus use this if dpopp_trust_bonus is null
-            # _row[4] -> dpopp_trust_bonus
-            trust_dict[_row[1]] = _row[4] if _row[4] else _row[3]   
-            curr_agg[_row[0]][_row[1]] = _row[2]
+    grant_ids = [grant.id for grant in grants]
+    params = {
+        'multiplier': clr_round.contribution_multiplier,
+        'grant_ids': grant_ids,
+        'start_date': clr_round.start_date,
+        'end_date': clr_round.end_date,
+        'network': network,
+    }
+
+    # open a server-side cursor and stream the groupBy sum for the round
+    curr_agg = {}
+    trust_dict = {}
+    with connections[using].chunked_cursor() as cursor:
+        cursor.execute(SUMMED_CONTRIBUTIONS_SQL, params)
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            for _row in rows:
+                if not curr_agg.get(_row[0]):
+                    curr_agg[_row[0]] = {}
+                # Use passport_trust_bonus is available or trust_bonus otherwise
+                # _row[3] -> trust_bonus use this if passport_trust_bonus is null
+                # _row[4] -> passport_trust_bonus (dpopp_trust_bonus before it was renamed)
+                trust_dict[_row[1]] = _row[4] if _row[4] else _row[3]
+                curr_agg[_row[0]][_row[1]] = _row[2]
 
     return curr_agg, trust_dict
@@ -0,0 +1,272 @@
+# -*- coding: utf-8 -*-
+"""Define the multi-round CLR scheduler.
+
+Copyright (C) 2021 Gitcoin Core
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+import copy
+import pickle
+import time
+import zlib
+
+from django.db import transaction
+from django.utils import timezone
+
+from app.services import RedisService
+from grants.clr import (
+    CLR_ENGINES, POTENTIAL_DONATIONS, build_clr_prediction_curve, calculate_potential_clr, normalise,
+    record_slim_clr_calculations,
+)
+from grants.clr_data_src import fetch_contributions, fetch_grants
+from grants.models import Contribution
+from passport_score.models import GR15TrustScore
+from townsquare.models import SquelchProfile
+
+# profiles without a GR15TrustScore get the same default as Profile.final_trust_bonus
+DEFAULT_TRUST_BONUS = 0.5
+
+# the rounds data loaded by process_predict_clr_rounds is handed to the per-round tasks through redis, a task that
+# starts after it expired loads its own round
+ROUNDS_DATA_TTL = 60 * 60
+
+
+def load_rounds_data(clr_rounds, network='mainnet'):
+    '''
+        Loads the contributions of every round with a single query and splits them into each round's inputs
+
+        Args:
+            clr_rounds  :   [GrantCLR]
+            network     :   mainnet | rinkeby
+        Returns:
+            {
+                clr_round.pk: {
+                    'grant_ids': [grant_id (int)],
+                    'curr_agg': {grant_id (int): {user_id (int): aggregated_amount (float)}},
+                    'trust_dict': {user_id (int): trust_score (float)},
+                    'v_threshold': float,
+                    'total_pot': float,
+                    'match_cap_per_grant': float,
+                    'load_time': float,
+                    'started_at': datetime the contributions were read at,
+                }
+            }
+    '''
+    if not clr_rounds:
+        return {}
+
+    # the same filters as fetch_contributions, over the union of every round's dates
+    profiles_to_be_ignored = SquelchProfile.objects.filter(active=True).values_list('profile__pk')
+    contributions = Contribution.objects.filter(
+        match=True,
+        created_on__gte=min(clr_round.start_date for clr_round in clr_rounds),
+        created_on__lte=max(clr_round.end_date for clr_round in clr_rounds),
+        success=True,
+        subscription__network='mainnet',
+        profile_for_clr__isnull=False,
+    ).exclude(profile_for_clr__in=profiles_to_be_ignored).values_list(
+        'pk', 'grant_id', 'profile_for_clr_id', 'profile_for_clr__user_id', 'amount_per_period_usdt', 'created_on'
+    )
+    started_at = timezone.now()
+    rows = list(contributions.iterator())
+    trust_by_user = dict(GR15TrustScore.objects.values_list('user_id', 'trust_bonus').iterator())
+
+    rounds_data = {}
+    for clr_round in clr_rounds:
+        start = time.time()
+
+        # grant_id -> the grant the contribution is matched against
+        grant_map = {
+            pk: defer_clr_to_id if defer_clr_to_id else pk
+            for pk, defer_clr_to_id in fetch_grants(clr_round, network).values_list('pk', 'defer_clr_to_id')
+        }
+
+        # subscription filters can reach any related field, resolve them with the database
+        allowed_ids = None
+        if clr_round.subscription_filters:
+            allowed_ids = set(
+                fetch_contributions(clr_round, network).prefetch_related(None).values_list('pk', flat=True)
+            )
+
+        summed = {}
+        trust_dict = {}
+        for pk, grant_id, profile_id, user_id, amount, created_on in rows:
+            if grant_id not in grant_map or not clr_round.start_date <= created_on <= clr_round.end_date:
+                continue
+            if allowed_ids is not None and pk not in allowed_ids:
+                continue
+            key = (grant_map[grant_id], profile_id)
+            summed[key] = summed.get(key, 0) + amount
+            trust_dict[profile_id] = trust_by_user.get(user_id, DEFAULT_TRUST_BONUS)
+
+        curr_agg = {}
+        for (grant_id, profile_id), amount in summed.items():
+            if grant_id not in curr_agg:
+                curr_agg[grant_id] = {}
+            curr_agg[grant_id][profile_id] = amount * clr_round.contribution_multiplier
+
+        total_pot = float(clr_round.total_pot)
+        grant_clr_percentage_cap = clr_round.grant_clr_percentage_cap if clr_round.grant_clr_percentage_cap else 100
+        rounds_data[clr_round.pk] = {
+            'grant_ids': list(grant_map.keys()),
+            'curr_agg': curr_agg,
+            'trust_dict': trust_dict,
+            'v_threshold': float(clr_round.verified_threshold),
+            'total_pot': total_pot,
+            'match_cap_per_grant': total_pot * (float(grant_clr_percentage_cap) / 100),
+            'load_time': time.time() - start,
+            'started_at': started_at,
+        }
+
+    return rounds_data
+
+
+def rounds_data_key(clr_round_pk):
+    return f'clr:rounds_data:{clr_round_pk}'
+
+
+def store_rounds_data(rounds_data):
+    redis = RedisService().redis
+    pipe = redis.pipeline(transaction=False)
+    for clr_round_pk, data in rounds_data.items():
+        payload = zlib.compress(pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL))
+        pipe.set(rounds_data_key(clr_round_pk), payload, ex=ROUNDS_DATA_TTL)
+    pipe.execute()
+
+
+def fetch_round_data(clr_round_pk):
+    payload = RedisService().redis.get(rounds_data_key(clr_round_pk))
+    if not payload:
+        return None
+    return pickle.loads(zlib.decompress(payload))
+
+
+def calculate_round(clr_round, data, what='full', engine='dict', save_to_db=False):
+    '''
+        Runs the CLR calculation for a single round from its entry of load_rounds_data
+
+        When save_to_db is set the results are recorded, followed by the round's state (see predict_clr)
+
+        Returns:
+            result      :   {grant_id: clr_prediction_curve} (full | final)
+                            or the normalised current distribution (slim)
+            timings     :   {stage: seconds}
+    '''
+    curr_agg = data['curr_agg']
+    trust_dict = data['trust_dict']
+    v_threshold = data['v_threshold']
+    total_pot = data['total_pot']
+    match_cap_per_grant = data['match_cap_per_grant']
+    engine_get_totals_by_pair, engine_calculate_clr = CLR_ENGINES[engine]
+    timings = {'load': data['load_time']}
+
+    if len(curr_agg) == 0:
+        return None, timings
+
+    start = time.time()
+    pair_totals, curr_agg_sqrts, _ = engine_get_totals_by_pair(curr_agg)
+    timings['pairwise'] = time.time() - start
+
+    start = time.time()
+    bigtot, totals = engine_calculate_clr(curr_agg, trust_dict, pair_totals, curr_agg_sqrts, v_threshold, total_pot)
+    curr_grants_clr = normalise(bigtot, copy.deepcopy(totals), total_pot, match_cap_per_grant)
+    timings['distribution'] = time.time() - start
+
+    if what == 'slim':
+        result = curr_grants_clr
+    else:
+        start = time.time()
+        potential_clrs = calculate_potential_clr(
+            data['grant_ids'], bigtot, totals, curr_grants_clr, curr_agg, trust_dict, curr_agg_sqrts, v_threshold,
+            total_pot, match_cap_per_grant, what
+        )
+        result = {
+            grant_id: build_clr_prediction_curve(POTENTIAL_DONATIONS, potential_clr)
+            for grant_id, potential_clr in potential_clrs.items()
+        }
+        timings['predictions'] = time.time() - start
+
+    if save_to_db:
+        from grants.clr_state import CLRRoundState, save_clr_round_state
+
+        start = time.time()
+        with transaction.atomic():
+            if what == 'slim':
+                record_slim_clr_calculations(clr_round, result)
+            else:
+                clr_round.record_clr_prediction_curves(result)
+        timings['save'] = time.time() - start
+
+        start = time.time()
+        save_clr_round_state(clr_round, CLRRoundState(
+            clr_round.pk, data['grant_ids'], curr_agg, trust_dict, pair_totals, curr_agg_sqrts, totals, bigtot,
+            v_threshold, total_pot, match_cap_per_grant
+        ), data['started_at'])
+        timings['state'] = time.time() - start
+
+    return result, timings
+
+
+def predict_clr_round(clr_round, data, save_to_db=False, what='full', engine='dict'):
+    '''
+        Calculates a round from its entry of load_rounds_data and reports its timings
+
+        Returns:
+            {stage: seconds}
+    '''
+    if engine not in CLR_ENGINES:
+        raise ValueError(f'unknown clr engine {engine}, expected one of {", ".join(CLR_ENGINES)}')
+
+    result, timings = calculate_round(clr_round, data, what, engine, save_to_db)
+    if result is None:
+        print(f'- no Contributions for CLR {clr_round.round_num}')
+
+    stages = ', '.join(f'{stage}: {round(seconds, 2)}s' for stage, seconds in timings.items())
+    print(f"- round {clr_round.round_num} {clr_round.sub_round_slug} (pk:{clr_round.pk}) - {stages}")
+
+    return timings
+
+
+def predict_clr_rounds(clr_rounds, save_to_db=False, network='mainnet', what='full', engine='dict'):
+    '''
+        Calculates several rounds in this process, sharing a single contributions load between them
+
+        process_predict_clr_rounds runs the same calculation with one celery task per round
+
+        Args:
+            clr_rounds  :   [GrantCLR]
+            save_to_db  :   bool
+            network     :   mainnet | rinkeby
+            what        :   full | final | slim
+            engine      :   dict | sparse
+        Returns:
+            {clr_round.pk: {stage: seconds}}
+    '''
+    if engine not in CLR_ENGINES:
+        raise ValueError(f'unknown clr engine {engine}, expected one of {", ".join(CLR_ENGINES)}')
+
+    clr_rounds = list(clr_rounds)
+    clr_calc_start_time = timezone.now()
+
+    print(f"- loading contributions for {len(clr_rounds)} rounds at {round(time.time(),1)}")
+    rounds_data = load_rounds_data(clr_rounds, network)
+
+    report = {}
+    for clr_round in clr_rounds:
+        report[clr_round.pk] = predict_clr_round(clr_round, rounds_data.pop(clr_round.pk), save_to_db, what, engine)
+
+    print(f"\nTotal execution time: {(timezone.now() - clr_calc_start_time)}\n")
+
+    return report
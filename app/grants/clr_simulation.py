@@ -0,0 +1,253 @@
+# -*- coding: utf-8 -*-
+"""Define the read-only CLR what-if simulations.
+
+Copyright (C) 2021 Gitcoin Core
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+import time
+import uuid
+from collections import OrderedDict
+
+from django.core.cache import cache
+
+from grants.clr import normalise
+from grants.clr_data_src import fetch_grants, fetch_summed_contributions
+from grants.clr_sparse import calculate_clr, get_totals_by_pair
+
+# how long a round's loaded state is reused before it is read from the database again
+SIMULATION_CACHE_TTL = 60 * 10
+
+# number of rounds whose loaded state is kept by each worker, the least recently used one is dropped first
+SIMULATION_CACHE_SIZE = 4
+
+# how long the status and result of a simulation can be polled for
+SIMULATION_RESULT_TTL = 60 * 60
+
+# upper bound on the number of variants a single simulation evaluates
+MAX_VARIANTS = 50
+
+SIMULATION_PARAMS = ['verified_threshold', 'total_pot', 'grant_clr_percentage_cap', 'squelched_profile_ids']
+
+# {(clr_round.pk, network): (loaded_at, SimulationBase)} from least to most recently used
+_SIMULATION_CACHE = OrderedDict()
+
+
+class SimulationBase:
+    '''
+        A round's aggregated contributions loaded once and evaluated against many parameter variants
+
+        attrs:
+            clr_round_pk    :   int
+            grant_ids       :   [grant_id (int)]
+            curr_agg        :   {grant_id (int): {user_id (int): aggregated_amount (float)}}
+            trust_dict      :   {user_id (int): trust_score (float)}
+            params          :   the round's own parameters, every variant is applied on top of them
+            sparse_round    :   SparseRound of the unsquelched round (the pair totals do not depend on the params)
+    '''
+
+    def __init__(self, clr_round_pk, grant_ids, curr_agg, trust_dict, params):
+        self.clr_round_pk = clr_round_pk
+        self.grant_ids = list(grant_ids)
+        self.curr_agg = curr_agg
+        self.trust_dict = trust_dict
+        self.params = params
+        self.sparse_round, self.curr_agg_sqrts, _ = get_totals_by_pair(curr_agg) if curr_agg else (None, {}, 0)
+
+    def distribution(self, variant=None):
+        '''
+            returns {grant_id: clr_amount} for the round with the variant's parameters
+
+            args:
+                variant :   {param: value} for any of SIMULATION_PARAMS, missing params keep the round's value
+        '''
+        params = dict(self.params, **(variant or {}))
+        total_pot = float(params['total_pot'])
+        v_threshold = float(params['verified_threshold'])
+        grant_clr_percentage_cap = float(params['grant_clr_percentage_cap'] or 100)
+        match_cap_per_grant = total_pot * (grant_clr_percentage_cap / 100)
+
+        curr_agg = self.curr_agg
+        sparse_round = self.sparse_round
+        curr_agg_sqrts = self.curr_agg_sqrts
+        squelched = set(params.get('squelched_profile_ids') or [])
+        if squelched:
+            # squelching changes the pairs, the round is rebuilt without the profiles
+            curr_agg = {}
+            for grant_id, contribz in self.curr_agg.items():
+                contribz = {user: amount for user, amount in contribz.items() if user not in squelched}
+                if contribz:
+                    curr_agg[grant_id] = contribz
+            sparse_round, curr_agg_sqrts, _ = get_totals_by_pair(curr_agg) if curr_agg else (None, {}, 0)
+
+        clr_amounts = {grant_id: 0.0 for grant_id in self.grant_ids}
+        if not curr_agg:
+            return clr_amounts
+
+        bigtot, totals = calculate_clr(curr_agg, self.trust_dict, sparse_round, curr_agg_sqrts, v_threshold, total_pot)
+        for grant_id, total in normalise(bigtot, totals, total_pot, match_cap_per_grant).items():
+            clr_amounts[grant_id] = float(total['clr_amount'])
+
+        return clr_amounts
+
+
+def load_simulation_base(clr_round, network='mainnet', refresh=False):
+    '''
+        returns the round's SimulationBase, reading it from a read replica at most every SIMULATION_CACHE_TTL
+    '''
+    key = (clr_round.pk, network)
+    cached = _SIMULATION_CACHE.get(key)
+    if cached and not refresh and time.time() - cached[0] < SIMULATION_CACHE_TTL:
+        _SIMULATION_CACHE.move_to_end(key)
+        return cached[1]
+
+    grants = fetch_grants(clr_round, network)
+    curr_agg, trust_dict = fetch_summed_contributions(grants, clr_round, network, using='replica')
+    curr_agg = {
+        grant_id: {user: float(amount) for user, amount in contribz.items()}
+        for grant_id, contribz in curr_agg.items()
+    }
+    base = SimulationBase(
+        clr_round.pk,
+        sorted(set(grants.values_list('pk', flat=True)) | set(curr_agg.keys())),
+        curr_agg,
+        {user: float(trust or 0) for user, trust in trust_dict.items()},
+        {
+            'verified_threshold': float(clr_round.verified_threshold),
+            'total_pot': float(clr_round.total_pot),
+            'grant_clr_percentage_cap': float(clr_round.grant_clr_percentage_cap or 100),
+            'squelched_profile_ids': [],
+        },
+    )
+    _SIMULATION_CACHE[key] = (time.time(), base)
+    _SIMULATION_CACHE.move_to_end(key)
+    while len(_SIMULATION_CACHE) > SIMULATION_CACHE_SIZE:
+        _SIMULATION_CACHE.popitem(last=False)
+
+    return base
+
+
+def validate_variant(variant):
+    '''
+        returns the variant with its values coerced, raises ValueError for unknown or invalid params
+    '''
+    if not isinstance(variant, dict):
+        raise ValueError('every variant must be an object')
+    unknown = set(variant.keys()) - set(SIMULATION_PARAMS)
+    if unknown:
+        raise ValueError(f'unknown simulation params {", ".join(sorted(unknown))}')
+
+    validated = {}
+    for param, value in variant.items():
+        if param == 'squelched_profile_ids':
+            validated[param] = [int(profile_id) for profile_id in value]
+        else:
+            validated[param] = float(value)
+            if validated[param] < 0:
+                raise ValueError(f'{param} must not be negative')
+    return validated
+
+
+def validate_variants(variants):
+    '''
+        returns the variants with their values coerced, raises ValueError for invalid variants or too many of them
+    '''
+    if not isinstance(variants, list):
+        raise ValueError('variants must be a list')
+    if len(variants) > MAX_VARIANTS:
+        raise ValueError(f'at most {MAX_VARIANTS} variants can be simulated at once')
+    return [validate_variant(variant) for variant in variants]
+
+
+def simulate_clr(clr_round, variants, network='mainnet', refresh=False):
+    '''
+        Evaluates parameter variants against a round without writing anything to the database
+
+        Args:
+            clr_round   :   GrantCLR
+            variants    :   [{param: value}] with any of SIMULATION_PARAMS
+            network     :   mainnet | rinkeby
+            refresh     :   reload the round instead of using the cached state
+        Returns:
+            {
+                'baseline': {param: value},
+                'variants': [
+                    {
+                        'params': {param: value},
+                        'total_delta': float,
+                        'grants': {grant_id: {'baseline': float, 'simulated': float, 'delta': float}},
+                    }
+                ]
+            }
+    '''
+    variants = validate_variants(variants)
+
+    base = load_simulation_base(clr_round, network, refresh=refresh)
+    baseline = base.distribution()
+
+    results = []
+    for variant in variants:
+        distribution = base.distribution(variant)
+        grants = {}
+        for grant_id in base.grant_ids:
+            simulated = distribution.get(grant_id, 0.0)
+            grants[grant_id] = {
+                'baseline': baseline.get(grant_id, 0.0),
+                'simulated': simulated,
+                'delta': simulated - baseline.get(grant_id, 0.0),
+            }
+        results.append({
+            'params': dict(base.params, **variant),
+            'total_delta': sum(grant['delta'] for grant in grants.values()),
+            'grants': grants,
+        })
+
+    return {'baseline': base.params, 'variants': results}
+
+
+def simulation_key(simulation_id):
+    return f'clr:simulation:{simulation_id}'
+
+
+def create_simulation(clr_round):
+    '''
+        records a pending simulation of the round and returns its id, the simulation itself is run by
+        grants.tasks.process_clr_simulation
+    '''
+    simulation_id = uuid.uuid4().hex
+    cache.set(
+        simulation_key(simulation_id), {'clr_round_pk': clr_round.pk, 'status': 'pending'}, SIMULATION_RESULT_TTL
+    )
+    return simulation_id
+
+
+def get_simulation(simulation_id):
+    '''
+        returns {'clr_round_pk', 'status': pending | done | error, 'result' (done), 'error' (error)} or None once
+        the simulation has expired
+    '''
+    return cache.get(simulation_key(simulation_id))
+
+
+def run_simulation(simulation_id, clr_round, variants, network='mainnet', refresh=False):
+    '''
+        runs a simulation created by create_simulation and records its result
+    '''
+    simulation = {'clr_round_pk': clr_round.pk}
+    try:
+        simulation.update(status='done', result=simulate_clr(clr_round, variants, network, refresh=refresh))
+    except (ValueError, TypeError) as e:
+        simulation.update(status='error', error=str(e))
+    cache.set(simulation_key(simulation_id), simulation, SIMULATION_RESULT_TTL)
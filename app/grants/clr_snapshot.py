@@ -0,0 +1,298 @@
+# -*- coding: utf-8 -*-
+"""Define the columnar contribution snapshot used as CLR input.
+
+Copyright (C) 2021 Gitcoin Core
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+import json
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+import numpy as np
+from grants.clr_data_src import fetch_contributions
+from grants.models import Contribution
+from passport_score.models import GR15TrustScore
+from townsquare.models import SquelchProfile
+
+# profiles without a GR15TrustScore get the same default as Profile.final_trust_bonus
+DEFAULT_TRUST_BONUS = 0.5
+
+# one .npy file is written per column so that every column can be memory-mapped on load
+COLUMNS = {
+    'contribution_id': np.int64,
+    'grant_id': np.int64,
+    'profile_id': np.int64,
+    'user_id': np.int64,
+    'amount': np.float64,
+    'trust_bonus': np.float64,
+    'created_on': np.int64,
+}
+
+
+class ContributionSnapshot:
+    '''
+        A round's contributions held as one numpy array per column
+
+        columns:
+            contribution_id :   Contribution.pk
+            grant_id        :   Contribution.grant_id
+            profile_id      :   Contribution.profile_for_clr_id
+            user_id         :   the profile's user_id (-1 when the profile has no user)
+            amount          :   Contribution.amount_per_period_usdt
+            trust_bonus     :   the profile's GR15 trust bonus
+            created_on      :   Contribution.created_on as a unix timestamp
+        meta:
+            contributions_watermark :   contributions modified up to this time are in the snapshot
+            trust_watermark         :   trust bonuses modified up to this time are in the snapshot
+    '''
+
+    def __init__(self, columns=None, meta=None):
+        self.columns = columns if columns is not None else {
+            name: np.empty(0, dtype=dtype) for name, dtype in COLUMNS.items()
+        }
+        self.meta = meta if meta is not None else {}
+
+    def __len__(self):
+        return len(self.columns['contribution_id'])
+
+    @property
+    def contributions_watermark(self):
+        value = self.meta.get('contributions_watermark')
+        return parse_datetime(value) if value else None
+
+    @property
+    def trust_watermark(self):
+        value = self.meta.get('trust_watermark')
+        return parse_datetime(value) if value else None
+
+    def remove(self, contribution_ids):
+        '''
+            drops the rows of the given contributions
+        '''
+        contribution_ids = np.fromiter(contribution_ids, dtype=np.int64)
+        if not len(contribution_ids) or not len(self):
+            return
+        keep = ~np.isin(self.columns['contribution_id'], contribution_ids)
+        self.columns = {name: column[keep] for name, column in self.columns.items()}
+
+    def upsert(self, rows):
+        '''
+            adds (or replaces) contributions
+
+            args:
+                rows    :   iterable of
+                            (contribution_id, grant_id, profile_id, user_id, amount, trust_bonus, created_on)
+        '''
+        rows = list(rows)
+        if not rows:
+            return
+        new_columns = {
+            name: np.array([row[i] for row in rows], dtype=dtype) for i, (name, dtype) in enumerate(COLUMNS.items())
+        }
+        self.remove(new_columns['contribution_id'])
+        self.columns = {
+            name: np.concatenate([self.columns[name], new_columns[name]]) for name in COLUMNS
+        }
+
+    def set_trust_bonus(self, trust_by_user):
+        '''
+            updates the trust bonus column for the given {user_id: trust_bonus}
+        '''
+        if not trust_by_user or not len(self):
+            return
+        user_ids = np.fromiter(trust_by_user.keys(), dtype=np.int64)
+        trust_bonuses = np.fromiter((float(value) for value in trust_by_user.values()), dtype=np.float64)
+        order = np.argsort(user_ids)
+        user_ids, trust_bonuses = user_ids[order], trust_bonuses[order]
+
+        pos = np.clip(np.searchsorted(user_ids, self.columns['user_id']), 0, len(user_ids) - 1)
+        found = user_ids[pos] == self.columns['user_id']
+        trust_bonus = np.array(self.columns['trust_bonus'])
+        trust_bonus[found] = trust_bonuses[pos[found]]
+        self.columns['trust_bonus'] = trust_bonus
+
+    def aggregate(self, grant_map, contribution_multiplier=1, squelched_profile_ids=()):
+        '''
+            sums the snapshot by grant and contributor into the inputs of the CLR engines
+
+            args:
+                grant_map               :   {grant_id: grant_id the contributions are matched against}
+                contribution_multiplier :   GrantCLR.contribution_multiplier
+                squelched_profile_ids   :   profiles whose contributions are ignored
+            returns:
+                curr_agg    :   {grant_id (int): {user_id (int): aggregated_amount (float)}}
+                trust_dict  :   {user_id (int): trust_score (float)}
+        '''
+        if not grant_map or not len(self):
+            return {}, {}
+
+        src = np.fromiter(grant_map.keys(), dtype=np.int64)
+        dst = np.fromiter(grant_map.values(), dtype=np.int64)
+        order = np.argsort(src)
+        src, dst = src[order], dst[order]
+
+        grant_ids = self.columns['grant_id']
+        pos = np.clip(np.searchsorted(src, grant_ids), 0, len(src) - 1)
+        mask = src[pos] == grant_ids
+        if len(squelched_profile_ids):
+            mask &= ~np.isin(self.columns['profile_id'], np.fromiter(squelched_profile_ids, dtype=np.int64))
+
+        matched_grant_ids = dst[pos[mask]]
+        profile_ids = self.columns['profile_id'][mask]
+        amounts = self.columns['amount'][mask]
+        trust_bonuses = self.columns['trust_bonus'][mask]
+        if not len(profile_ids):
+            return {}, {}
+
+        pairs, inverse = np.unique(np.stack([matched_grant_ids, profile_ids], axis=1), axis=0, return_inverse=True)
+        sums = np.bincount(inverse.reshape(-1), weights=amounts) * float(contribution_multiplier)
+
+        curr_agg = {}
+        for (grant_id, profile_id), amount in zip(pairs.tolist(), sums.tolist()):
+            if grant_id not in curr_agg:
+                curr_agg[grant_id] = {}
+            curr_agg[grant_id][profile_id] = amount
+        trust_dict = dict(zip(profile_ids.tolist(), trust_bonuses.tolist()))
+
+        return curr_agg, trust_dict
+
+    def save(self, path):
+        '''
+            writes every column and the meta to a new directory then swaps the `path` symlink over to it, so that
+            a reader loads either the previous snapshot or this one, never a mix of both
+        '''
+        parent = os.path.dirname(path)
+        os.makedirs(parent, exist_ok=True)
+        directory = tempfile.mkdtemp(prefix=f'{os.path.basename(path)}.', dir=parent)
+        for name, column in self.columns.items():
+            np.save(os.path.join(directory, f'{name}.npy'), np.ascontiguousarray(column, dtype=COLUMNS[name]))
+        with open(os.path.join(directory, 'meta.json'), 'w') as meta_file:
+            json.dump(self.meta, meta_file)
+
+        previous = os.path.realpath(path) if os.path.islink(path) else None
+        if os.path.isdir(path) and not os.path.islink(path):
+            # snapshots written before the symlink layout are rebuilt in place
+            shutil.rmtree(path)
+        link_path = f'{directory}.link'
+        os.symlink(os.path.basename(directory), link_path)
+        os.replace(link_path, path)
+        # readers which already memory-mapped the previous columns keep them until they are done
+        if previous:
+            shutil.rmtree(previous, ignore_errors=True)
+
+    @classmethod
+    def load(cls, path, mmap_mode='r'):
+        meta_path = os.path.join(path, 'meta.json')
+        if not os.path.exists(meta_path):
+            return None
+        with open(meta_path) as meta_file:
+            meta = json.load(meta_file)
+        columns = {name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode=mmap_mode) for name in COLUMNS}
+        return cls(columns, meta)
+
+
+def snapshot_path(clr_round, network='mainnet'):
+    return os.path.join(settings.CLR_SNAPSHOT_DIR, f'{network}-{clr_round.pk}')
+
+
+def _trust_bonuses(user_ids=None, modified_after=None):
+    trust_scores = GR15TrustScore.objects.all()
+    if user_ids is not None:
+        trust_scores = trust_scores.filter(user_id__in=user_ids)
+    if modified_after:
+        trust_scores = trust_scores.filter(modified_on__gt=modified_after)
+    return dict(trust_scores.values_list('user_id', 'trust_bonus').iterator())
+
+
+def refresh_contribution_snapshot(clr_round, network='mainnet'):
+    '''
+        Brings the round's snapshot up to date and returns it
+
+        Only contributions and trust bonuses modified since the snapshot's watermarks are read, so that after the
+        first run a refresh costs as much as the number of contributions since the previous one. The watermark is
+        modified_on rather than created_on so contributions that change after they are created (ie. fail validation)
+        are picked up.
+
+        Args:
+            clr_round   :   GrantCLR
+            network     :   mainnet | rinkeby
+        Returns:
+            ContributionSnapshot
+    '''
+    path = snapshot_path(clr_round, network)
+    snapshot = ContributionSnapshot.load(path, mmap_mode=None) or ContributionSnapshot()
+    contributions_watermark = snapshot.contributions_watermark
+    trust_watermark = snapshot.trust_watermark
+    refreshed_at = timezone.now()
+
+    qualifying = fetch_contributions(clr_round, network, exclude_squelched=False).prefetch_related(None).filter(
+        profile_for_clr__isnull=False
+    )
+    if contributions_watermark:
+        # contributions which changed may no longer qualify, drop them before adding back the ones that do
+        changed = Contribution.objects.filter(
+            created_on__gte=clr_round.start_date,
+            created_on__lte=clr_round.end_date,
+            modified_on__gt=contributions_watermark,
+        )
+        snapshot.remove(changed.values_list('pk', flat=True).iterator())
+        qualifying = qualifying.filter(modified_on__gt=contributions_watermark)
+
+    rows = list(qualifying.values_list(
+        'pk', 'grant_id', 'profile_for_clr_id', 'profile_for_clr__user_id', 'amount_per_period_usdt', 'created_on'
+    ).iterator())
+    new_trust = _trust_bonuses(user_ids={row[3] for row in rows if row[3]})
+    snapshot.upsert(
+        (pk, grant_id, profile_id, user_id or -1, float(amount or 0),
+         float(new_trust.get(user_id, DEFAULT_TRUST_BONUS)), int(created_on.timestamp()))
+        for pk, grant_id, profile_id, user_id, amount, created_on in rows
+    )
+
+    if trust_watermark:
+        snapshot.set_trust_bonus(_trust_bonuses(modified_after=trust_watermark))
+
+    snapshot.meta['contributions_watermark'] = refreshed_at.isoformat()
+    snapshot.meta['trust_watermark'] = refreshed_at.isoformat()
+    snapshot.save(path)
+
+    return snapshot
+
+
+def fetch_snapshot_data(grants, clr_round, network='mainnet'):
+    '''
+        Refreshes the round's snapshot and aggregates it for the CLR engines
+
+        Args:
+            grants      :   Grants (to aggregate contribs for)
+            clr_round   :   GrantCLR
+            network     :   mainnet | rinkeby
+        Returns:
+            curr_agg, trust_dict (as returned by fetch_summed_contributions)
+    '''
+    snapshot = refresh_contribution_snapshot(clr_round, network)
+
+    grant_map = {
+        pk: defer_clr_to_id if defer_clr_to_id else pk
+        for pk, defer_clr_to_id in grants.values_list('pk', 'defer_clr_to_id')
+    }
+    squelched_profile_ids = SquelchProfile.objects.filter(active=True).values_list('profile_id', flat=True)
+
+    return snapshot.aggregate(grant_map, clr_round.contribution_multiplier, list(squelched_profile_ids))
@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*-
+"""Define the sparse-matrix CLR engine.
+
+Copyright (C) 2021 Gitcoin Core
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+import numpy as np
+from scipy import sparse
+
+# upper bound on the number of cells materialised at once when scoring the pairs of a single grant
+MAX_BLOCK_CELLS = 4 * 1024 * 1024
+
+
+class SparseRound:
+    '''
+        Holds a round as a sparse grant x contributor matrix of square-rooted aggregated amounts
+
+        attrs:
+            grant_ids       :   [grant_id (int)] - row labels
+            profile_ids     :   [user_id (int)] - column labels
+            profile_index   :   {user_id (int): column (int)}
+            sqrts           :   csr_matrix (grants x contributors) of sqrt(aggregated_amount)
+            pair_totals     :   csr_matrix (contributors x contributors) of sum(sqrt * sqrt) for every pair
+                                of contributors that funded the same grant (the diagonal is always 0)
+    '''
+
+    def __init__(self, curr_agg):
+        self.grant_ids = list(curr_agg.keys())
+        self.profile_index = {}
+        self.profile_ids = []
+
+        rows = []
+        cols = []
+        vals = []
+        for row, contribz in enumerate(curr_agg.values()):
+            for user, amount in contribz.items():
+                col = self.profile_index.get(user)
+                if col is None:
+                    col = len(self.profile_ids)
+                    self.profile_index[user] = col
+                    self.profile_ids.append(user)
+                rows.append(row)
+                cols.append(col)
+                vals.append(float(amount))
+
+        # negative aggregates cannot be square-rooted into a real match, treat them as no contribution
+        vals = np.sqrt(np.maximum(np.asarray(vals, dtype=np.float64), 0))
+        shape = (len(self.grant_ids), len(self.profile_ids))
+        self.sqrts = sparse.csr_matrix((vals, (rows, cols)), shape=shape)
+
+        # sum of the multiple of the pair of sqrts for every pair of users that contribute to the same grant
+        pair_totals = (self.sqrts.T @ self.sqrts).tocsr()
+        pair_totals.setdiag(0)
+        pair_totals.eliminate_zeros()
+        self.pair_totals = pair_totals
+
+    def grant_row(self, row):
+        '''
+            returns the column indices and sqrt values for the contributors of the grant at `row`
+        '''
+        start, end = self.sqrts.indptr[row], self.sqrts.indptr[row + 1]
+        return self.sqrts.indices[start:end], self.sqrts.data[start:end]
+
+    def pair_totals_dict(self):
+        '''
+            returns the pair totals in the nested dict layout produced by grants.clr.get_totals_by_pair
+                {
+                    user_id (str): {
+                        user_id (str): pair_total (float)
+                    }
+                }
+        '''
+        pair_totals = {}
+        upper = sparse.triu(self.pair_totals, k=1).tocoo()
+        for i, j, total in zip(upper.row.tolist(), upper.col.tolist(), upper.data.tolist()):
+            u_k1, u_k2 = self.profile_ids[i], self.profile_ids[j]
+            if u_k1 > u_k2:
+                u_k1, u_k2 = u_k2, u_k1
+            if u_k1 not in pair_totals:
+                pair_totals[u_k1] = {}
+            pair_totals[u_k1][u_k2] = total
+
+        return pair_totals
+
+    def trust_array(self, trust_dict):
+        '''
+            returns the trust bonus of every contributor aligned to the matrix columns
+        '''
+        return np.array([_as_float(trust_dict.get(user)) for user in self.profile_ids], dtype=np.float64)
+
+
+def _as_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def get_totals_by_pair(curr_agg):
+    '''
+        gets pair totals between current round, current round as a sparse matrix product
+
+        args:
+            aggregated contributions by pair nested dict
+                {
+                    grant_id (str): {
+                        user_id (str): aggregated_amount (float)
+                    }
+                }
+
+        returns:
+            SparseRound holding the sqrt matrix and the pair totals
+            curr_agg_sqrts
+                {
+                    grantId (int): {
+                        user_id (float): sqrt(aggregated_amount) (float)
+                    }
+                }
+            pairs_tot
+                int: the number of pairs that make up the round
+    '''
+    sparse_round = SparseRound(curr_agg)
+
+    curr_agg_sqrts = {}
+    pairs_tot = 0
+    for row, proj in enumerate(sparse_round.grant_ids):
+        cols, sqrts = sparse_round.grant_row(row)
+        curr_agg_sqrts[proj] = {sparse_round.profile_ids[col]: sqrt for col, sqrt in zip(cols, sqrts.tolist())}
+        pairs_tot += len(cols) * (len(cols) - 1) // 2
+
+    return sparse_round, curr_agg_sqrts, pairs_tot
+
+
+def grant_pairwise_match(sparse_round, row, trust, v_threshold):
+    '''
+        calculates the (un-normalised) pairwise match for the grant at `row`
+
+        the pairs of the grant are scored in row blocks so that a grant with a very large number of
+        contributors never materialises more than MAX_BLOCK_CELLS cells at once
+
+        args:
+            sparse_round    :   SparseRound
+            row             :   int
+            trust           :   np.array of trust bonuses aligned to the matrix columns
+            v_threshold     :   float
+        returns:
+            float
+    '''
+    cols, sqrts = sparse_round.grant_row(row)
+    n = len(cols)
+    if n < 2:
+        return 0.0
+
+    pair_totals = sparse_round.pair_totals[cols][:, cols]
+    grant_trust = trust[cols]
+    block = max(1, MAX_BLOCK_CELLS // n)
+
+    tot = 0.0
+    for start in range(0, n, block):
+        end = min(n, start + block)
+        pt = pair_totals[start:end].toarray()
+        threshold = v_threshold * np.maximum(grant_trust[start:end, None], grant_trust[None, :])
+        numerator = sqrts[start:end, None] * sqrts[None, :]
+        # a / (pt / t + 1) rewritten as (a * t) / (pt + t) so that a zero trust bonus never divides by zero
+        terms = np.divide(numerator * threshold, pt + threshold, out=np.zeros_like(pt), where=pt > 0)
+        tot += terms.sum()
+
+    # every pair has been visited in both directions
+    return float(tot / 2)
+
+
+def calculate_clr(curr_agg, trust_dict, sparse_round, curr_agg_sqrts, v_threshold, total_pot):
+    '''
+        calculates the clr amount at the given threshold and total pot using the sparse matrix representation
+
+        args:
+            curr_agg
+                {
+                    grant_id (str): {
+                        user_id (str): aggregated_amount (float)
+                    }
+                }
+            trust_dict
+                {
+                    user_id (str): trust_score (float)
+                }
+            sparse_round    :   SparseRound (as returned by get_totals_by_pair)
+            curr_agg_sqrts  :   unused, accepted to mirror grants.clr.calculate_clr
+            v_threshold     :   float
+            total_pot       :   float
+        returns:
+            bigtot
+                float
+            total clr award by grant
+                {proj: {'id': proj, 'number_contributions': _num, 'contribution_amount': _sum, 'clr_amount': tot}}
+    '''
+    bigtot = 0
+    totals = {}
+    trust = sparse_round.trust_array(trust_dict)
+
+    for row, proj in enumerate(sparse_round.grant_ids):
+        contribz = curr_agg[proj]
+        tot = grant_pairwise_match(sparse_round, row, trust, float(v_threshold))
+
+        bigtot += tot
+        totals[proj] = {
+            'id': proj,
+            'number_contributions': len(contribz),
+            'contribution_amount': sum(contribz.values()),
+            'clr_amount': tot
+        }
+
+    return bigtot, totals
@@ -0,0 +1,524 @@
+# -*- coding: utf-8 -*-
+"""Define the incremental CLR round state.
+
+Copyright (C) 2021 Gitcoin Core
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+import copy
+import time
+from datetime import timedelta
+
+from app.services import RedisService
+from grants.clr import POTENTIAL_DONATIONS, build_clr_prediction_curve, calculate_clr_predictions
+from grants.clr_data_src import fetch_contributions
+from grants.clr_sparse import SparseRound
+from grants.models import Contribution
+
+# the state is refreshed by every full predict_clr run, if those stop running the incremental state expires with them
+CLR_ROUND_STATE_TTL = 60 * 60 * 3
+
+# contributions modified within this window before a full run started are counted by the run, the
+# update_clr_round_states tasks still pending for them must not apply them again
+CLR_ROUND_STATE_PENDING_WINDOW = 60 * 60
+
+# commands sent per pipeline round trip when a whole state is written or deleted
+CLR_ROUND_STATE_BATCH_SIZE = 1000
+
+# every full run writes a new version of the state under clr:round_state:{pk}:{version}, clr:round_state:{pk} points at
+# the current one. Each version is made of:
+#   meta                    :   hash of bigtot, v_threshold, total_pot, match_cap_per_grant, expires_at
+#   grants                  :   set of the grant ids included in the round
+#   projects                :   set of the grant ids contributions are matched against (the keys of the totals)
+#   trust                   :   hash of user_id -> trust_score
+#   agg:{grant_id}          :   hash of user_id -> aggregated_amount
+#   totals:{grant_id}       :   hash of number_contributions, contribution_amount, clr_amount
+#   pairs:{user_id}         :   hash of user_id -> pair_total, keyed by the lower user id of the pair
+#   user_grants:{user_id}   :   set of the grant ids the user contributed to
+#   applied                 :   sorted set of the contributions applied to the version, scored by when they were
+TOTALS_FIELDS = ['number_contributions', 'contribution_amount', 'clr_amount']
+
+
+def clr_round_state_key(clr_round_pk):
+    return f'clr:round_state:{clr_round_pk}'
+
+
+def _state_prefix(clr_round_pk, version):
+    return f'{clr_round_state_key(clr_round_pk)}:{version}'
+
+
+def _current_state_prefix(redis, clr_round_pk):
+    version = redis.get(clr_round_state_key(clr_round_pk))
+    return _state_prefix(clr_round_pk, version.decode()) if version else None
+
+
+class CLRRoundState:
+    '''
+        The intermediate state of a predict_clr run, kept so that a single new contribution can be applied
+        without recomputing the whole round
+
+        the state is stored in redis one key per grant and per contributor (see save_clr_round_state), a contribution
+        only loads the part of it that add_contribution reads
+
+        attrs:
+            clr_round_pk        :   int
+            grant_ids           :   set of grant ids included in the round
+            curr_agg            :   {grant_id (int): {user_id (int): aggregated_amount (float)}}
+            trust_dict          :   {user_id (int): trust_score (float)}
+            pair_totals         :   {user_id (int): {user_id (int): pair_total (float)}} (lower id first)
+                                    or a SparseRound which is converted to that layout
+            curr_agg_sqrts      :   {grant_id (int): {user_id (int): sqrt(aggregated_amount) (float)}}
+            totals              :   raw totals as returned by calculate_clr
+            bigtot              :   float
+            grants_by_profile   :   {user_id (int): set of grant ids the user contributed to}
+    '''
+
+    def __init__(
+        self, clr_round_pk, grant_ids, curr_agg, trust_dict, pair_totals, curr_agg_sqrts, totals, bigtot, v_threshold,
+        total_pot, match_cap_per_grant
+    ):
+        self.clr_round_pk = clr_round_pk
+        self.grant_ids = set(grant_ids)
+        # the sparse engine keeps its pair totals as a matrix, the state is updated in the dict layout
+        if isinstance(pair_totals, SparseRound):
+            pair_totals = pair_totals.pair_totals_dict()
+        self.curr_agg = curr_agg
+        self.trust_dict = trust_dict
+        self.pair_totals = pair_totals
+        self.curr_agg_sqrts = curr_agg_sqrts
+        self.totals = totals
+        self.bigtot = bigtot
+        self.v_threshold = v_threshold
+        self.total_pot = total_pot
+        self.match_cap_per_grant = match_cap_per_grant
+
+        self.grants_by_profile = {}
+        for proj, contribz in curr_agg.items():
+            for user in contribz:
+                if user not in self.grants_by_profile:
+                    self.grants_by_profile[user] = set()
+                self.grants_by_profile[user].add(proj)
+
+    def _pair_match(self, sqrt_1, sqrt_2, pair_total, k1, k2):
+        # mirrors the pairwise term of grants.clr.calculate_clr, pairs without a positive total or trust are not matched
+        if pair_total <= 0:
+            return 0.0
+        threshold = self.v_threshold * float(max(self.trust_dict.get(k1) or 0, self.trust_dict.get(k2) or 0))
+        if not threshold:
+            return 0.0
+        return (sqrt_1 * sqrt_2) / (pair_total / threshold + 1)
+
+    def add_contribution(self, proj, user, amount, trust_bonus):
+        '''
+            applies a single contribution to the state
+
+            the pair totals between `user` and the other contributors of `proj` change, so the match of `proj` and
+            of every other grant where `user` is paired with one of those contributors is updated in place
+
+            args:
+                proj        :   grant_id (int) the contribution is matched against
+                user        :   user_id (int)
+                amount      :   float (already multiplied by the round's contribution_multiplier)
+                trust_bonus :   float, only used when the user is new to the round
+            returns:
+                set of grant ids whose clr_amount changed
+        '''
+        if user not in self.trust_dict:
+            self.trust_dict[user] = trust_bonus
+
+        if proj not in self.curr_agg:
+            self.curr_agg[proj] = {}
+            self.curr_agg_sqrts[proj] = {}
+            self.totals[proj] = {'id': proj, 'number_contributions': 0, 'contribution_amount': 0, 'clr_amount': 0}
+
+        contribz = self.curr_agg[proj]
+        sqrts = self.curr_agg_sqrts[proj]
+        is_new_contributor = user not in contribz
+
+        old_sqrt = sqrts.get(user, 0.0)
+        contribz[user] = float(contribz.get(user, 0)) + float(amount)
+        new_sqrt = float(contribz[user]) ** 0.5
+
+        # update the pair totals against this grant's contributors and the pairwise match of this grant
+        deltas = {proj: 0.0}
+        old_pair_totals = {}
+        new_pair_totals = {}
+        for k2, k2_sqrt in sqrts.items():
+            if k2 == user:
+                continue
+            u_k1 = user if k2 > user else k2
+            u_k2 = k2 if k2 > user else user
+            if u_k1 not in self.pair_totals:
+                self.pair_totals[u_k1] = {}
+
+            old_pair_totals[k2] = self.pair_totals[u_k1].get(u_k2, 0)
+            new_pair_totals[k2] = old_pair_totals[k2] + (new_sqrt - old_sqrt) * k2_sqrt
+            self.pair_totals[u_k1][u_k2] = new_pair_totals[k2]
+
+            deltas[proj] += (
+                self._pair_match(new_sqrt, k2_sqrt, new_pair_totals[k2], user, k2) -
+                self._pair_match(old_sqrt, k2_sqrt, old_pair_totals[k2], user, k2)
+            )
+        sqrts[user] = new_sqrt
+
+        # the user's pairs on other grants only change where they are paired with a contributor of this grant
+        for other in self.grants_by_profile.get(user, set()):
+            if other == proj:
+                continue
+            other_sqrts = self.curr_agg_sqrts[other]
+            user_sqrt = other_sqrts[user]
+            candidates = other_sqrts if len(other_sqrts) < len(new_pair_totals) else new_pair_totals
+            delta = 0.0
+            for k2 in candidates:
+                if k2 == user or k2 not in other_sqrts or k2 not in new_pair_totals:
+                    continue
+                delta += (
+                    self._pair_match(user_sqrt, other_sqrts[k2], new_pair_totals[k2], user, k2) -
+                    self._pair_match(user_sqrt, other_sqrts[k2], old_pair_totals[k2], user, k2)
+                )
+            if delta:
+                deltas[other] = delta
+
+        if user not in self.grants_by_profile:
+            self.grants_by_profile[user] = set()
+        self.grants_by_profile[user].add(proj)
+
+        total = self.totals[proj]
+        total['number_contributions'] += 1 if is_new_contributor else 0
+        total['contribution_amount'] = float(total['contribution_amount']) + float(amount)
+        for grant_id, delta in deltas.items():
+            self.totals[grant_id]['clr_amount'] += delta
+            self.bigtot += delta
+
+        return set(deltas.keys())
+
+    def clr_prediction_curves(self, grant_ids):
+        '''
+            returns {grant_id: clr_prediction_curve} for the given grants against the current state
+        '''
+        predictions = calculate_clr_predictions(
+            self.bigtot, self.totals, self.curr_agg, self.trust_dict, self.curr_agg_sqrts, self.v_threshold,
+            self.total_pot, self.match_cap_per_grant, POTENTIAL_DONATIONS, grant_ids=grant_ids
+        )
+
+        curves = {}
+        for grant_id, potential_clr in predictions.items():
+            if self.totals[grant_id]['clr_amount'] == self.match_cap_per_grant:
+                # capped grants only carry the current distribution (see predict_clr)
+                potential_clr = potential_clr[:1] + [0.0 for amount in POTENTIAL_DONATIONS[1:]]
+            curves[grant_id] = build_clr_prediction_curve(POTENTIAL_DONATIONS, potential_clr)
+
+        return curves
+
+
+def _state_structures(prefix, state, expires_at):
+    '''
+        yields (key, {field: value}) for the hashes and (key, set of members) for the sets of a whole state
+    '''
+    yield f'{prefix}:meta', {
+        'bigtot': state.bigtot,
+        'v_threshold': state.v_threshold,
+        'total_pot': state.total_pot,
+        'match_cap_per_grant': state.match_cap_per_grant,
+        'expires_at': expires_at,
+    }
+    yield f'{prefix}:grants', state.grant_ids
+    yield f'{prefix}:projects', set(state.totals.keys())
+    yield f'{prefix}:trust', state.trust_dict
+    for grant_id, contribz in state.curr_agg.items():
+        yield f'{prefix}:agg:{grant_id}', contribz
+    for grant_id, total in state.totals.items():
+        yield f'{prefix}:totals:{grant_id}', {field: float(total[field]) for field in TOTALS_FIELDS}
+    for user, pairs in state.pair_totals.items():
+        yield f'{prefix}:pairs:{user}', pairs
+    for user, grant_ids in state.grants_by_profile.items():
+        yield f'{prefix}:user_grants:{user}', grant_ids
+
+
+def _write_state(redis, prefix, state, expires_at):
+    pipe = redis.pipeline(transaction=False)
+    for count, (key, values) in enumerate(_state_structures(prefix, state, expires_at), 1):
+        if not values:
+            continue
+        if isinstance(values, dict):
+            pipe.hset(key, mapping=values)
+        else:
+            pipe.sadd(key, *values)
+        pipe.expireat(key, expires_at)
+        if count % CLR_ROUND_STATE_BATCH_SIZE == 0:
+            pipe.execute()
+    pipe.execute()
+
+
+def _delete_state(redis, prefix):
+    # the per grant and per user keys are listed from the projects set and the trust hash, those go last
+    keys = []
+    for grant_id in redis.sscan_iter(f'{prefix}:projects', count=CLR_ROUND_STATE_BATCH_SIZE):
+        keys += [f'{prefix}:agg:{grant_id.decode()}', f'{prefix}:totals:{grant_id.decode()}']
+    for user, _ in redis.hscan_iter(f'{prefix}:trust', count=CLR_ROUND_STATE_BATCH_SIZE):
+        keys += [f'{prefix}:pairs:{user.decode()}', f'{prefix}:user_grants:{user.decode()}']
+    for i in range(0, len(keys), CLR_ROUND_STATE_BATCH_SIZE):
+        redis.delete(*keys[i:i + CLR_ROUND_STATE_BATCH_SIZE])
+    redis.delete(*[f'{prefix}:{name}' for name in ['meta', 'grants', 'projects', 'trust', 'applied']])
+
+
+def _decode_totals(grant_id, total):
+    return {
+        'id': grant_id,
+        'number_contributions': int(float(total[b'number_contributions'])),
+        'contribution_amount': float(total[b'contribution_amount']),
+        'clr_amount': float(total[b'clr_amount']),
+    }
+
+
+def _load_state(redis, prefix, clr_round_pk, proj, user):
+    '''
+        loads the part of the state add_contribution reads for a contribution of `user` to `proj`: the contributors
+        of proj with their trust and pair totals with the user, the user's other grants limited to those contributors
+        and the totals of every one of those grants
+
+        returns:
+            CLRRoundState or None when the version has expired
+    '''
+    meta = redis.hgetall(f'{prefix}:meta')
+    if not meta:
+        return None
+    contribz = {int(k): float(v) for k, v in redis.hgetall(f'{prefix}:agg:{proj}').items()}
+    other_grants = sorted(int(grant_id) for grant_id in redis.smembers(f'{prefix}:user_grants:{user}'))
+    other_grants = [grant_id for grant_id in other_grants if grant_id != proj]
+    others = [k2 for k2 in contribz if k2 != user]
+    fields = [user] + others
+
+    pipe = redis.pipeline(transaction=False)
+    for grant_id in other_grants:
+        pipe.hmget(f'{prefix}:agg:{grant_id}', fields)
+    for k2 in others:
+        pipe.hget(f'{prefix}:pairs:{min(user, k2)}', max(user, k2))
+    pipe.hmget(f'{prefix}:trust', fields)
+    for grant_id in [proj] + other_grants:
+        pipe.hgetall(f'{prefix}:totals:{grant_id}')
+    results = iter(pipe.execute())
+
+    curr_agg = {proj: contribz} if contribz else {}
+    for grant_id in other_grants:
+        curr_agg[grant_id] = {k: float(v) for k, v in zip(fields, next(results)) if v is not None}
+    pair_totals = {}
+    for k2 in others:
+        pair_total = next(results)
+        if pair_total is not None:
+            pair_totals.setdefault(min(user, k2), {})[max(user, k2)] = float(pair_total)
+    trust_dict = {k: float(v) for k, v in zip(fields, next(results)) if v is not None}
+    totals = {}
+    for grant_id in [proj] + other_grants:
+        total = next(results)
+        if total:
+            totals[grant_id] = _decode_totals(grant_id, total)
+
+    curr_agg_sqrts = {grant_id: {k: v ** 0.5 for k, v in agg.items()} for grant_id, agg in curr_agg.items()}
+    return CLRRoundState(
+        clr_round_pk, [], curr_agg, trust_dict, pair_totals, curr_agg_sqrts, totals, float(meta[b'bigtot']),
+        float(meta[b'v_threshold']), float(meta[b'total_pot']), float(meta[b'match_cap_per_grant'])
+    )
+
+
+def _load_prediction_state(redis, prefix, clr_round_pk, grant_ids):
+    '''
+        loads the clr_amount of every grant and the contributors of `grant_ids`, which is what
+        CLRRoundState.clr_prediction_curves reads for those grants
+    '''
+    meta = redis.hgetall(f'{prefix}:meta')
+    projects = [int(grant_id) for grant_id in redis.smembers(f'{prefix}:projects')]
+    grant_ids = list(grant_ids)
+
+    pipe = redis.pipeline(transaction=False)
+    for grant_id in projects:
+        pipe.hget(f'{prefix}:totals:{grant_id}', 'clr_amount')
+    for grant_id in grant_ids:
+        pipe.hgetall(f'{prefix}:agg:{grant_id}')
+    results = iter(pipe.execute())
+
+    totals = {grant_id: {'id': grant_id, 'clr_amount': float(next(results) or 0)} for grant_id in projects}
+    curr_agg = {grant_id: {int(k): float(v) for k, v in next(results).items()} for grant_id in grant_ids}
+    users = list({user for contribz in curr_agg.values() for user in contribz})
+    trust_dict = {}
+    if users:
+        trust_dict = {user: float(v or 0) for user, v in zip(users, redis.hmget(f'{prefix}:trust', users))}
+
+    curr_agg_sqrts = {grant_id: {k: v ** 0.5 for k, v in agg.items()} for grant_id, agg in curr_agg.items()}
+    return CLRRoundState(
+        clr_round_pk, [], curr_agg, trust_dict, {}, curr_agg_sqrts, totals, float(meta[b'bigtot']),
+        float(meta[b'v_threshold']), float(meta[b'total_pot']), float(meta[b'match_cap_per_grant'])
+    )
+
+
+def _write_contribution(redis, prefix, state, before, proj, user, amount, contribution_id):
+    '''
+        writes what add_contribution changed in `state` since `before` (a deepcopy of its pair totals, totals and
+        bigtot) as increments of the touched keys, in a single transaction
+    '''
+    expires_at = int(float(redis.hget(f'{prefix}:meta', 'expires_at')))
+    touched = [f'{prefix}:agg:{proj}', f'{prefix}:user_grants:{user}', f'{prefix}:applied']
+
+    pipe = redis.pipeline()
+    pipe.hincrbyfloat(f'{prefix}:agg:{proj}', user, amount)
+    pipe.hsetnx(f'{prefix}:trust', user, state.trust_dict[user])
+    pipe.sadd(f'{prefix}:user_grants:{user}', proj)
+    pipe.sadd(f'{prefix}:projects', proj)
+    pipe.zadd(f'{prefix}:applied', {contribution_id: time.time()})
+
+    before_pairs, before_totals, before_bigtot = before
+    for u_k1, pairs in state.pair_totals.items():
+        for u_k2, pair_total in pairs.items():
+            delta = pair_total - before_pairs.get(u_k1, {}).get(u_k2, 0)
+            if delta:
+                pipe.hincrbyfloat(f'{prefix}:pairs:{u_k1}', u_k2, delta)
+                touched.append(f'{prefix}:pairs:{u_k1}')
+
+    for grant_id, total in state.totals.items():
+        before_total = before_totals.get(grant_id, {})
+        key = f'{prefix}:totals:{grant_id}'
+        for field in TOTALS_FIELDS:
+            delta = float(total[field]) - float(before_total.get(field, 0))
+            if delta or not before_total:
+                pipe.hincrbyfloat(key, field, delta)
+        touched.append(key)
+    pipe.hincrbyfloat(f'{prefix}:meta', 'bigtot', state.bigtot - before_bigtot)
+
+    # keys created by the contribution expire with the rest of the version
+    for key in set(touched):
+        pipe.expireat(key, expires_at)
+    pipe.execute()
+
+
+def _apply_contribution(redis, clr_round, prefix, contribution):
+    '''
+        applies a contribution to the version of the round's state stored under prefix
+
+        returns:
+            set of grant ids whose clr_amount changed, empty when the contribution was already applied to the version
+            or its grant isn't in the round
+    '''
+    grant = contribution.grant
+    profile = contribution.profile_for_clr
+    if redis.zscore(f'{prefix}:applied', contribution.pk) is not None:
+        return set()
+    if not redis.sismember(f'{prefix}:grants', grant.pk):
+        return set()
+
+    proj = grant.defer_clr_to_id if grant.defer_clr_to_id else grant.pk
+    state = _load_state(redis, prefix, clr_round.pk, proj, profile.pk)
+    if not state:
+        return set()
+
+    amount = float(contribution.amount_per_period_usdt) * float(clr_round.contribution_multiplier)
+    before = copy.deepcopy((state.pair_totals, state.totals, state.bigtot))
+    affected = state.add_contribution(proj, profile.pk, amount, profile.final_trust_bonus)
+    _write_contribution(redis, prefix, state, before, proj, profile.pk, amount, contribution.pk)
+
+    return affected
+
+
+def save_clr_round_state(clr_round, state, started_at):
+    '''
+        stores the state of a full predict_clr run as a new version and points the round at it
+
+        the new version is written before the round lock is taken. Under the lock, the contributions applied to the
+        previous version after the run started (which its data may not include) are replayed onto the new one and the
+        ones modified within CLR_ROUND_STATE_PENDING_WINDOW before it started are marked as applied, so that no
+        contribution is lost or counted twice when the versions are swapped
+
+        args:
+            clr_round   :   GrantCLR
+            state       :   CLRRoundState
+            started_at  :   datetime the run started reading the contributions at
+    '''
+    redis = RedisService().redis
+    key = clr_round_state_key(clr_round.pk)
+    version = redis.incr(f'{key}:versions')
+    prefix = _state_prefix(clr_round.pk, version)
+    expires_at = int(time.time()) + CLR_ROUND_STATE_TTL
+    _write_state(redis, prefix, state, expires_at)
+
+    counted = list(Contribution.objects.filter(
+        grant_id__in=state.grant_ids,
+        modified_on__gte=started_at - timedelta(seconds=CLR_ROUND_STATE_PENDING_WINDOW),
+        modified_on__lt=started_at,
+    ).values_list('pk', flat=True))
+
+    curves = {}
+    with redis.lock(f"{key}:lock", timeout=60):
+        if counted:
+            redis.zadd(f'{prefix}:applied', {pk: started_at.timestamp() for pk in counted})
+            redis.expireat(f'{prefix}:applied', expires_at)
+
+        previous = _current_state_prefix(redis, clr_round.pk)
+        replay = []
+        if previous:
+            replay = [int(pk) for pk in redis.zrangebyscore(f'{previous}:applied', started_at.timestamp(), '+inf')]
+        affected = set()
+        contributions = Contribution.objects.select_related('grant', 'profile_for_clr').filter(
+            pk__in=replay, success=True, match=True, profile_for_clr__isnull=False
+        )
+        for contribution in contributions:
+            affected |= _apply_contribution(redis, clr_round, prefix, contribution)
+
+        redis.set(key, version)
+        redis.expireat(key, expires_at)
+        if affected:
+            curves = _load_prediction_state(redis, prefix, clr_round.pk, affected).clr_prediction_curves(affected)
+
+    if curves:
+        clr_round.record_clr_prediction_curves(curves, replace_all=False)
+    if previous:
+        _delete_state(redis, previous)
+
+
+def apply_contribution_to_clr_rounds(contribution_id):
+    '''
+        applies a successful contribution to the stored state of every active round the grant is in and records
+        new prediction curves for the grants that were affected
+
+        rounds without a stored state (ie. predict_clr has not run within CLR_ROUND_STATE_TTL) are skipped and will
+        pick the contribution up on the next full run
+
+        returns:
+            {clr_round_pk: [grant_id]} of the curves that were recorded
+    '''
+    redis = RedisService().redis
+    contribution = Contribution.objects.select_related('grant', 'profile_for_clr').get(pk=contribution_id)
+    grant = contribution.grant
+    profile = contribution.profile_for_clr
+    if not profile or not contribution.success or not contribution.match:
+        return {}
+
+    recorded = {}
+    for clr_round in grant.in_active_clrs.all():
+        # run the contribution through the same filters as the full calculation
+        if not fetch_contributions(clr_round).filter(pk=contribution.pk).exists():
+            continue
+
+        with redis.lock(f"{clr_round_state_key(clr_round.pk)}:lock", timeout=60):
+            prefix = _current_state_prefix(redis, clr_round.pk)
+            if not prefix:
+                continue
+            affected = _apply_contribution(redis, clr_round, prefix, contribution)
+            if not affected:
+                continue
+            curves = _load_prediction_state(redis, prefix, clr_round.pk, affected).clr_prediction_curves(affected)
+
+        clr_round.record_clr_prediction_curves(curves, replace_all=False)
+        recorded[clr_round.pk] = list(curves.keys())
+
+    return recorded
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+"""Define the index of grant admin addresses which are contracts.
+
+Copyright (C) 2021 Gitcoin Core
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+from app.services import RedisService
+
+# code at an address only changes when a contract is deployed to it (or self destructs), re-check weekly
+CONTRACT_INDEX_TTL = 60 * 60 * 24 * 7
+
+# an address which has been queued is not queued again until this expires
+CONTRACT_INDEX_PENDING_TTL = 60 * 5
+
+EMPTY_ADDRESSES = ['', '0x0']
+
+
+def contract_index_key(network, address):
+    return f'grants:is_contract:{network}:{address.lower()}'
+
+
+def fetch_is_contract_address(network, address):
+    '''
+        asks the network whether there is code deployed at the address (an RPC call, never made on a request path)
+
+        returns:
+            bool, None when the network couldn't be asked
+    '''
+    from dashboard.utils import get_web3
+
+    web3 = get_web3(network)
+    try:
+        code = web3.eth.getCode(web3.eth.toChecksumAddress(address))
+    except Exception:
+        return None
+    return code != b''
+
+
+def index_contract_addresses(network, addresses):
+    '''
+        checks every address against the network and stores the result in the index
+
+        an address the network couldn't be asked about is left out of the index (and the results), so it's queued
+        again by a later read instead of being reported as not a contract for CONTRACT_INDEX_TTL
+
+        returns:
+            {address: is_contract_address (bool)}
+    '''
+    redis = RedisService().redis
+    results = {}
+    pipeline = redis.pipeline()
+    for address in set(addresses):
+        if not address or address in EMPTY_ADDRESSES:
+            continue
+        is_contract = fetch_is_contract_address(network, address)
+        if is_contract is None:
+            continue
+        results[address] = is_contract
+        pipeline.set(contract_index_key(network, address), '1' if results[address] else '0', ex=CONTRACT_INDEX_TTL)
+    pipeline.execute()
+
+    return results
+
+
+def get_contract_address_index(grants):
+    '''
+        reads whether each grant's admin_address is a contract from the index with a single round trip
+
+        addresses missing from the index (new, changed or expired) are reported as not being a contract and queued
+        to be indexed in the background
+
+        returns:
+            {grant.pk: is_contract_address (bool)}
+    '''
+    from grants.tasks import update_contract_address_index
+
+    grants = [grant for grant in grants if grant.admin_address and grant.admin_address not in EMPTY_ADDRESSES]
+    if not grants:
+        return {}
+
+    redis = RedisService().redis
+    values = redis.mget([contract_index_key(grant.network, grant.admin_address) for grant in grants])
+
+    index = {}
+    missing = set()
+    for grant, value in zip(grants, values):
+        index[grant.pk] = value in [b'1', '1']
+        if value is None:
+            missing.add((grant.network, grant.admin_address))
+
+    if missing:
+        # only queue the addresses which aren't already waiting to be indexed
+        missing = sorted(missing)
+        pipeline = redis.pipeline()
+        for network, address in missing:
+            pending_key = f'{contract_index_key(network, address)}:pending'
+            pipeline.set(pending_key, '1', ex=CONTRACT_INDEX_PENDING_TTL, nx=True)
+        to_index = {}
+        for (network, address), queued in zip(missing, pipeline.execute()):
+            if queued:
+                to_index.setdefault(network, []).append(address)
+        for network, addresses in to_index.items():
+            update_contract_address_index.delay(network, addresses)
+
+    return index
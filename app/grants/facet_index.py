@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""Define the per round grant facet counts shown by the explorer filters.
+
+Copyright (C) 2021 Gitcoin Core
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+import json
+
+from app.services import RedisService
+from redis.exceptions import WatchError
+
+# an index is rebuilt from the database at least this often, which also clears any drift in the counts
+FACET_INDEX_TTL = 60 * 60 * 24
+
+FACETS = ['type', 'tag', 'region', 'tenant']
+
+
+def facet_index_key(clr_round_pk, network):
+    return f'grants:facets:{network}:{clr_round_pk}'
+
+
+def facet_members_key(clr_round_pk, network):
+    return f'{facet_index_key(clr_round_pk, network)}:members'
+
+
+def grant_facets(grant):
+    '''
+        returns the facets a grant is counted under, ie. ['total', 'type:gr12', 'tag:Ethereum', 'tenant:ETH']
+    '''
+    facets = ['total']
+    if grant.grant_type_id:
+        facets.append(f'type:{grant.grant_type.name}')
+    facets += [f'tag:{tag.name}' for tag in grant.tags.all()]
+    if grant.region:
+        facets.append(f'region:{grant.region}')
+    facets += [f'tenant:{tenant}' for tenant in grant.tenants]
+    return sorted(set(facets))
+
+
+def _round_grants(clr_round, network):
+    from grants.models import Grant
+
+    return Grant.objects.filter(
+        in_active_clrs=clr_round, network=network, hidden=False, active=True
+    ).select_related('grant_type').prefetch_related('tags')
+
+
+def rebuild_facet_index(clr_round, network='mainnet'):
+    '''
+        counts the facets of every grant in the round and replaces the round's index with them
+
+        returns:
+            {facet: count}
+    '''
+    redis = RedisService().redis
+    counts = {'total': 0}
+    members = {}
+    for grant in _round_grants(clr_round, network).iterator(chunk_size=2000):
+        facets = grant_facets(grant)
+        members[grant.pk] = json.dumps(facets)
+        for facet in facets:
+            counts[facet] = counts.get(facet, 0) + 1
+
+    # the index is built under temporary keys and renamed into place, readers never see half of it
+    index_key = facet_index_key(clr_round.pk, network)
+    members_key = facet_members_key(clr_round.pk, network)
+    pipeline = redis.pipeline()
+    pipeline.delete(f'{index_key}:tmp', f'{members_key}:tmp')
+    pipeline.hset(f'{index_key}:tmp', mapping=counts)
+    pipeline.expire(f'{index_key}:tmp', FACET_INDEX_TTL)
+    pipeline.rename(f'{index_key}:tmp', index_key)
+    if members:
+        pipeline.hset(f'{members_key}:tmp', mapping=members)
+        pipeline.expire(f'{members_key}:tmp', FACET_INDEX_TTL)
+        pipeline.rename(f'{members_key}:tmp', members_key)
+    else:
+        pipeline.delete(members_key)
+    pipeline.execute()
+
+    return counts
+
+
+def move_grant_facets(clr_round_pk, network, grant_id, facets):
+    '''
+        changes the facets a grant is counted under in the round's index to `facets` (empty when it left the round)
+
+        only the facets which differ from the ones the grant was last counted under are touched, an index which
+        hasn't been built yet is left alone (the grant is counted when it's built)
+    '''
+    redis = RedisService().redis
+    index_key = facet_index_key(clr_round_pk, network)
+    members_key = facet_members_key(clr_round_pk, network)
+    facets = set(facets)
+    with redis.pipeline() as pipeline:
+        while True:
+            try:
+                pipeline.watch(index_key, members_key)
+                if not pipeline.exists(index_key):
+                    return
+                old_facets = pipeline.hget(members_key, grant_id)
+                old_facets = set(json.loads(old_facets)) if old_facets else set()
+                if old_facets == facets:
+                    return
+                pipeline.multi()
+                for facet in facets - old_facets:
+                    pipeline.hincrby(index_key, facet, 1)
+                for facet in old_facets - facets:
+                    pipeline.hincrby(index_key, facet, -1)
+                if facets:
+                    pipeline.hset(members_key, grant_id, json.dumps(sorted(facets)))
+                else:
+                    pipeline.hdel(members_key, grant_id)
+                pipeline.execute()
+                return
+            except WatchError:
+                # the index changed underneath us (another update or a rebuild), diff against it again
+                continue
+
+
+def update_grant_facets(grant_id, network):
+    '''
+        brings a grant's counts up to date in the index of every active round after it changed
+    '''
+    from grants.models import Grant, GrantCLR
+
+    grant = Grant.objects.filter(pk=grant_id).select_related('grant_type').prefetch_related('tags').first()
+    in_rounds = set()
+    facets = []
+    if grant and grant.active and not grant.hidden:
+        in_rounds = set(grant.in_active_clrs.values_list('pk', flat=True))
+        facets = grant_facets(grant)
+
+    for clr_round_pk in GrantCLR.objects.filter(is_active=True).values_list('pk', flat=True):
+        move_grant_facets(clr_round_pk, network, grant_id, facets if clr_round_pk in in_rounds else [])
+
+
+def get_round_facets(clr_round, network='mainnet'):
+    '''
+        reads the round's facet counts with a single lookup, building the index if it doesn't exist yet
+
+        returns:
+            {
+                'total': int,
+                'type': {grant_type.name: int},
+                'tag': {grant_tag.name: int},
+                'region': {region: int},
+                'tenant': {tenant: int},
+            }
+    '''
+    redis = RedisService().redis
+    counts = redis.hgetall(facet_index_key(clr_round.pk, network))
+    if counts:
+        counts = {
+            (facet.decode() if isinstance(facet, bytes) else facet): int(count) for facet, count in counts.items()
+        }
+    else:
+        counts = rebuild_facet_index(clr_round, network)
+
+    facets = {'total': counts.pop('total', 0)}
+    facets.update({facet: {} for facet in FACETS})
+    for facet, count in counts.items():
+        facet, value = facet.split(':', 1)
+        if count > 0 and facet in facets:
+            facets[facet][value] = count
+
+    return facets
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""Define the benchmark_clr management command.
+
+Copyright (C) 2021 Gitcoin Core
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+import json
+
+from django.core.management.base import BaseCommand
+
+from grants.clr import CLR_ENGINES
+from grants.clr_benchmark import DEFAULT_SIZES, compare_reports, run_benchmark
+
+
+class Command(BaseCommand):
+
+    help = 'benchmarks the CLR calculation against synthetic rounds (offline, the database is never queried)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+        parser.add_argument(
+            '--engines', type=str, nargs='+', default=list(CLR_ENGINES.keys()), choices=list(CLR_ENGINES.keys())
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        # number of grants (most funded first) the prediction stage runs for, 0 = every grant
+        parser.add_argument('--prediction-grants', type=int, default=100)
+        # tracemalloc slows every stage down, skip it for pure timings
+        parser.add_argument('--skip-memory', type=bool, default=False)
+        parser.add_argument('--output', type=str, default='clr_benchmark.json')
+        # a previous report to compare the timings against
+        parser.add_argument('--compare', type=str, default=None)
+
+
+    def handle(self, *args, **options):
+
+        report = run_benchmark(
+            sizes=options['sizes'],
+            engines=options['engines'],
+            seed=options['seed'],
+            prediction_grants=options['prediction_grants'] or None,
+            track_memory=not options['skip_memory'],
+        )
+
+        with open(options['output'], 'w') as output_file:
+            json.dump(report, output_file, indent=2)
+        print(f"- report written to {options['output']}")
+
+        if options['compare']:
+            with open(options['compare']) as baseline_file:
+                baseline = json.load(baseline_file)
+            print(f"\ncompared to {baseline['meta'].get('revision')}:")
+            for contributions, engine, stage, before, after, ratio in compare_reports(baseline, report):
+                change = f"{round(ratio, 2)}x" if ratio is not None else 'n/a'
+                print(f"- {contributions} {engine} {stage}: {round(before, 3)}s -> {round(after, 3)}s ({change})")
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""Define the benchmark_grant_search management command.
+
+Copyright (C) 2021 Gitcoin Core
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+import random
+import time
+
+from django.contrib.postgres.search import SearchVector
+from django.core.management.base import BaseCommand
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils import timezone
+
+from app.benchmark import analyze, rolled_back, timed
+from grants.models import Grant
+
+WORDS = [
+    'ethereum', 'gitcoin', 'public', 'goods', 'open', 'source', 'privacy', 'wallet', 'protocol', 'community',
+    'education', 'climate', 'research', 'tooling', 'library', 'bridge', 'layer', 'zero', 'knowledge', 'proof',
+    'dao', 'governance', 'identity', 'data', 'security', 'audit', 'podcast', 'newsletter', 'translation', 'africa',
+]
+
+DEFAULT_KEYWORDS = ['gitcoin', 'zero knowledge', 'climate research', 'dao tooling', 'eth', 'wallet bridge security']
+
+
+def legacy_search(grants, keyword):
+    '''
+        the keyword search as it was before grants were searched through vector_column, kept for comparison
+    '''
+    grants = grants.annotate(search=SearchVector('description'))
+    grants = grants.filter(Q(title__icontains=keyword) | Q(search=keyword))
+    exact_matches = [grant for grant in grants if grant.title.lower() == keyword.lower()]
+    non_exact_matches = [grant for grant in grants if grant.title.lower() != keyword.lower()]
+    return exact_matches + non_exact_matches
+
+
+def ranked_search(grants, keyword):
+    return grants.search(keyword).order_by('-exact_title_match', '-search_rank', '-created_on')
+
+
+class Command(BaseCommand):
+
+    help = (
+        'benchmarks the grant keyword search against synthetic grants (inserted in a rolled back transaction), '
+        'development only: refuses to run unless DEBUG is set or the database is a test database'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grants', type=int, default=50000)
+        parser.add_argument('--keywords', type=str, nargs='+', default=DEFAULT_KEYWORDS)
+        parser.add_argument('--page-size', type=int, default=6)
+        parser.add_argument('--repeat', type=int, default=3)
+        parser.add_argument('--seed', type=int, default=0)
+        # print the query plan of the ranked search for every keyword
+        parser.add_argument('--explain', action='store_true')
+
+
+    def handle(self, *args, **options):
+
+        rng = random.Random(options['seed'])
+        page_size = options['page_size']
+
+        with rolled_back():
+            print(f"- inserting {options['grants']} grants at {round(time.time(),1)}")
+            now = timezone.now()
+            Grant.objects.bulk_create([
+                Grant(
+                    title=' '.join(rng.sample(WORDS, rng.randint(1, 4))),
+                    slug=f'benchmark-grant-{i}',
+                    description=' '.join(rng.choice(WORDS) for _ in range(rng.randint(20, 200))),
+                    network='mainnet',
+                    active=True,
+                    hidden=False,
+                    last_update=now,
+                ) for i in range(options['grants'])
+            ], batch_size=2000)
+            analyze('grants_grant')
+
+            grants = Grant.objects.filter(network='mainnet', hidden=False, active=True)
+            for keyword in options['keywords']:
+                for name, search in [('legacy', legacy_search), ('ranked', ranked_search)]:
+                    def first_page():
+                        page = Paginator(search(grants, keyword), page_size).get_page(1)
+                        return page.paginator.count, [grant.title for grant in page]
+                    (count, titles), best = timed(first_page, options['repeat'])
+                    print(f"- {name} '{keyword}': {count} results, best {best}s, first page {titles[:3]}")
+
+                if options['explain']:
+                    print(ranked_search(grants, keyword)[:page_size].explain(analyze=True))
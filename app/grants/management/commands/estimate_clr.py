@@ -24,8 +24,9 @@
 from django.utils import timezone
 
 from grants.clr import predict_clr
+from grants.clr_scheduler import predict_clr_rounds
 from grants.models import GrantCLR
-from grants.tasks import process_predict_clr
+from grants.tasks import process_predict_clr, process_predict_clr_rounds
 
 
 class Command(BaseCommand):
@@ -38,7 +39,15 @@ def add_arguments(self, parser):
         parser.add_argument('what', type=str, default="full")
         parser.add_argument('sync', type=str, default="false")
         parser.add_argument('--use-sql', type=bool, default=False)
+        # read the contributions from the round's columnar snapshot (see grants.clr_snapshot)
+        parser.add_argument('--use-snapshot', type=bool, default=False)
+        # run the --use-sql aggregation against a read replica
+        parser.add_argument('--use-replica', type=bool, default=False)
         parser.add_argument('--skip-save', type=bool, default=False)
+        parser.add_argument('--engine', type=str, default='dict', choices=['dict', 'sparse'])
+        # load the contributions of all the rounds at once, then calculate each round in its own celery task (or one
+        # after the other when sync)
+        parser.add_argument('--parallel', action='store_true')
         # slim = just run 0 contribution match upcate calcs
         # full, run [0, 1, 10, 100, calcs across all grants]
 
@@ -49,15 +58,35 @@ def handle(self, *args, **options):
         what = options['what']
         sync = options['sync']
         use_sql = options['use_sql']
+        use_snapshot = options['use_snapshot']
+        use_replica = options['use_replica']
         skip_save = options['skip_save']
-        print (network, clr_pk, what, sync, use_sql)
+        engine = options['engine']
+        parallel = options['parallel']
+        print (network, clr_pk, what, sync, use_sql, engine)
 
         if clr_pk and clr_pk.isdigit():
             active_clr_rounds = GrantCLR.objects.filter(pk=clr_pk)
         else:
             active_clr_rounds = GrantCLR.objects.filter(is_active=True)
 
-        if active_clr_rounds:
+        if active_clr_rounds and parallel and sync == 'true':
+            predict_clr_rounds(
+                active_clr_rounds,
+                save_to_db=True if not skip_save else False,
+                network=network,
+                what=what,
+                engine=engine,
+            )
+        elif active_clr_rounds and parallel:
+            process_predict_clr_rounds.delay(
+                True if not skip_save else False,
+                network,
+                what,
+                engine=engine,
+                clr_round_pks=list(active_clr_rounds.values_list('pk', flat=True)),
+            )
+        elif active_clr_rounds:
             for clr_round in active_clr_rounds:
                 if sync == 'true':
                     # run it sync -> useful for payout / debugging
@@ -68,6 +97,9 @@ def handle(self, *args, **options):
                         network=network,
                         what=what,
                         use_sql=use_sql,
+                        engine=engine,
+                        use_snapshot=use_snapshot,
+                        use_replica=use_replica,
                     )
                 else:
                     # runs it as celery task.
@@ -78,6 +110,9 @@ def handle(self, *args, **options):
                         network=network,
                         what=what,
                         use_sql=use_sql,
+                        engine=engine,
+                        use_snapshot=use_snapshot,
+                        use_replica=use_replica,
                     )
         else:
             print("No active CLRs found")
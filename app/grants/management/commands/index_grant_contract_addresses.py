@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+"""Define the index_grant_contract_addresses management command.
+
+Copyright (C) 2021 Gitcoin Core
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+from django.core.management.base import BaseCommand
+
+from grants.contract_index import index_contract_addresses
+from grants.models import Grant
+
+
+class Command(BaseCommand):
+
+    help = 'checks which grant admin addresses are contracts and stores the result in the contract address index'
+
+    def add_arguments(self, parser):
+        parser.add_argument('network', type=str, default='mainnet', choices=['rinkeby', 'mainnet'])
+
+
+    def handle(self, *args, **options):
+
+        network = options['network']
+
+        addresses = Grant.objects.filter(network=network).exclude(admin_address='0x0').values_list(
+            'admin_address', flat=True
+        ).distinct()
+        results = index_contract_addresses(network, addresses)
+
+        print(f"indexed {len(results)} addresses, {sum(results.values())} of them are contracts")
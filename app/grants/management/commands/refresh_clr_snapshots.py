@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""Define the refresh_clr_snapshots management command.
+
+Copyright (C) 2021 Gitcoin Core
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from grants.clr_snapshot import refresh_contribution_snapshot
+from grants.models import GrantCLR
+
+
+class Command(BaseCommand):
+
+    help = 'brings the columnar contribution snapshots of the CLR rounds up to date'
+
+    def add_arguments(self, parser):
+        parser.add_argument('network', type=str, default='mainnet', choices=['rinkeby', 'mainnet'])
+        parser.add_argument('clr_pk', type=str, default="all")
+
+
+    def handle(self, *args, **options):
+
+        network = options['network']
+        clr_pk = options['clr_pk']
+
+        if clr_pk == "all":
+            active_clr_rounds = GrantCLR.objects.filter(is_active=True)
+        else:
+            active_clr_rounds = GrantCLR.objects.filter(pk=clr_pk)
+
+        if active_clr_rounds:
+            for clr_round in active_clr_rounds:
+                start = time.time()
+                snapshot = refresh_contribution_snapshot(clr_round, network)
+                print(f"- round {clr_round.pk}: {len(snapshot)} contributions in {round(time.time() - start, 2)}s")
+        else:
+            print("No active CLRs found")
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""Define the simulate_clr management command.
+
+Copyright (C) 2021 Gitcoin Core
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+import json
+
+from django.core.management.base import BaseCommand
+
+from grants.clr_simulation import simulate_clr
+from grants.models import GrantCLR
+
+
+class Command(BaseCommand):
+
+    help = 'read-only what-if simulation of a CLR round against a list of parameter variants'
+
+    def add_arguments(self, parser):
+        parser.add_argument('network', type=str, default='mainnet', choices=['rinkeby', 'mainnet'])
+        parser.add_argument('clr_pk', type=int)
+        # path to a JSON list of variants, ie. [{"verified_threshold": 20}, {"squelched_profile_ids": [1, 2]}]
+        parser.add_argument('variants', type=str)
+        parser.add_argument('--output', type=str, default=None)
+
+
+    def handle(self, *args, **options):
+
+        network = options['network']
+
+        clr_round = GrantCLR.objects.filter(pk=options['clr_pk']).first()
+        if not clr_round:
+            print(f"CLR round {options['clr_pk']} not found")
+            return
+
+        with open(options['variants']) as variants_file:
+            variants = json.load(variants_file)
+
+        try:
+            result = simulate_clr(clr_round, variants, network=network)
+        except ValueError as e:
+            print(f"invalid variants: {e}")
+            return
+
+        for variant in result['variants']:
+            print(f"- {variant['params']} - total delta: {round(variant['total_delta'], 2)}")
+
+        if options['output']:
+            with open(options['output'], 'w') as output_file:
+                json.dump(result, output_file, indent=2)
+            print(f"- written to {options['output']}")
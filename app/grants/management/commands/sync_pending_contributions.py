@@ -23,9 +23,10 @@
 from django.core.management.base import BaseCommand
 from django.utils import timezone
 
+from app.sync_engine import ChainAdapter, SyncEngine
 from grants.models import Contribution
 from grants.tasks import update_grant_metadata
-from grants.utils import sync_payout
+from grants.utils import tenant_payout_mapper
 
 
 class Command(BaseCommand):
@@ -43,15 +44,24 @@ def handle(self, *args, **options):
 
         tenants = ['ZCASH', 'ZIL', 'CELO', 'POLKADOT', 'HARMONY', 'BINANCE', 'KUSAMA', 'RSK', 'ALGORAND', 'COSMOS']
 
+        pending_by_tenant = {}
         for tenant in tenants:
             tenant_pending_contributions = pending_contribution.filter(subscription__tenant=tenant)
             contrib_to_be_expired = tenant_pending_contributions.filter(created_on__lt=timeout_period)
+            # .update() skips SuperModel.save, modified_on is bumped so that the CLR snapshots drop these contributions
             contrib_to_be_expired.update(
                 success=False,
-                tx_cleared=False
+                tx_cleared=False,
+                modified_on=timezone.now()
             )
             for contribution in contrib_to_be_expired:
                 update_grant_metadata.delay(contribution.subscription.grant.pk)
 
-            for contribution in tenant_pending_contributions.all():
-                sync_payout(contribution)
+            pending_by_tenant[tenant] = tenant_pending_contributions.select_related(
+                'subscription', 'subscription__grant'
+            )
+
+        # every tenant's explorer is queried at once, a slow explorer only holds up its own tenant
+        engine = SyncEngine([ChainAdapter(tenant, tenant_payout_mapper[tenant]) for tenant in tenants])
+        for metrics in engine.run(pending_by_tenant):
+            print(metrics)
@@ -23,7 +23,7 @@
 from .contribution import Contribution
 from .donation import Donation
 from .flag import Flag, FlagQuerySet
-from .grant import Grant, GrantCLR, GrantPayout, GrantQuerySet
+from .grant import Grant, GrantCLR, GrantPayout, GrantQuerySet, repr_grants
 from .grant_api_key import GrantAPIKey
 from .grant_branding_routing_policy import GrantBrandingRoutingPolicy
 from .grant_category import GrantCategory
@@ -277,38 +277,13 @@ def update_tx_status(self):
                     self.split_tx_id, network, self.created_on, chain=chain
                 )
 
-                # Handle pending txns
-                if split_tx_status in ['pending']:
-                    then = timezone.now() - timezone.timedelta(hours=1)
-                    if self.created_on > then:
-                        print('txn pending')
-                        self.leave_gitcoinbot_comment_for_status('pending')
-                    else:
-                        self.success = False
-                        self.validator_passed = False
-                        self.validator_comment = "txn pending for more than 1 hours, assuming failure"
-                        print(self.validator_comment)
-                        self.leave_gitcoinbot_comment_for_status('dropped')
-                    return
-
-                # Handle dropped txns
-                if split_tx_status in ['dropped', 'unknown', '']:
-                    self.success = False
-                    self.validator_passed = False
-                    self.validator_comment = "txn not found"
-                    print('txn not found')
-                    self.leave_gitcoinbot_comment_for_status('dropped')
+                # Handle pending and dropped txns
+                if not self.handle_split_tx_status(split_tx_status):
                     return
 
                 # Validate that the token transfers occurred
                 response = grants_transaction_validator(self, w3, chain=chain)
-                if len(response['originator']):
-                    self.originated_address = response['originator'][0]
-                self.validator_passed = response['validation']['passed']
-                self.validator_comment = response['validation']['comment']
-                self.tx_cleared = response['tx_cleared']
-                self.split_tx_confirmed = response['split_tx_confirmed']
-                self.success = self.validator_passed
+                self.apply_validator_response(response)
 
             else:
                 # This validator is only for eth_std and eth_zksync, so exit for other contribution types
@@ -318,13 +293,56 @@ def update_tx_status(self):
             # Validator complete!
 
         except Exception as e:
-            self.leave_gitcoinbot_comment_for_status('error')
-            self.validator_passed = False
-            self.validator_comment = str(e)
-            print(f"Exception: {self.validator_comment}")
-            self.tx_cleared = False
-            self.split_tx_confirmed = False
+            self.fail_validation(e)
+        self.leave_validation_comment()
+
+    def handle_split_tx_status(self, split_tx_status):
+        """Handles pending and dropped checkout txns, returns False when there is nothing to validate yet."""
+        # Handle pending txns
+        if split_tx_status in ['pending']:
+            then = timezone.now() - timezone.timedelta(hours=1)
+            if self.created_on > then:
+                print('txn pending')
+                self.leave_gitcoinbot_comment_for_status('pending')
+            else:
+                self.success = False
+                self.validator_passed = False
+                self.validator_comment = "txn pending for more than 1 hours, assuming failure"
+                print(self.validator_comment)
+                self.leave_gitcoinbot_comment_for_status('dropped')
+            return False
+
+        # Handle dropped txns
+        if split_tx_status in ['dropped', 'unknown', '']:
             self.success = False
+            self.validator_passed = False
+            self.validator_comment = "txn not found"
+            print('txn not found')
+            self.leave_gitcoinbot_comment_for_status('dropped')
+            return False
+
+        return True
+
+    def apply_validator_response(self, response):
+        """Sets the result of the BulkCheckout transaction validator on the contribution."""
+        if len(response['originator']):
+            self.originated_address = response['originator'][0]
+        self.validator_passed = response['validation']['passed']
+        self.validator_comment = response['validation']['comment']
+        self.tx_cleared = response['tx_cleared']
+        self.split_tx_confirmed = response['split_tx_confirmed']
+        self.success = self.validator_passed
+
+    def fail_validation(self, e):
+        self.leave_gitcoinbot_comment_for_status('error')
+        self.validator_passed = False
+        self.validator_comment = str(e)
+        print(f"Exception: {self.validator_comment}")
+        self.tx_cleared = False
+        self.split_tx_confirmed = False
+        self.success = False
+
+    def leave_validation_comment(self):
         if self.success:
             print("TODO: do stuff related to successful contribs, like emails")
             self.leave_gitcoinbot_comment_for_status('success')
@@ -332,6 +350,45 @@ def update_tx_status(self):
             print("TODO: do stuff related to failed contribs, like emails")
             self.leave_gitcoinbot_comment_for_status('failed')
 
+    @classmethod
+    def update_tx_statuses(cls, contributions):
+        """Updates tx status for many Ethereum contributions, as update_tx_status does for each of them.
+
+        BulkCheckout contributions are validated in batches by network and chain, so a checkout transaction shared
+        by several contributions is only looked up once.
+        """
+        from dashboard.utils import get_web3
+        from economy.tx import grants_transactions_validator
+
+        batches = {}
+        for contribution in contributions:
+            if contribution.tx_override:
+                continue
+            if contribution.checkout_type in ['eth_std', 'eth_polygon']:
+                chain = contribution.checkout_type.split('_')[-1]
+                batches.setdefault((contribution.subscription.network, chain), []).append(contribution)
+            else:
+                contribution.update_tx_status()
+
+        for (network, chain), batch in batches.items():
+            try:
+                responses = grants_transactions_validator(batch, get_web3(network, chain=chain), chain=chain)
+            except Exception as e:
+                for contribution in batch:
+                    contribution.fail_validation(e)
+                    contribution.leave_validation_comment()
+                continue
+
+            for contribution in batch:
+                response = responses[contribution.pk]
+                try:
+                    if not contribution.handle_split_tx_status(response['status']):
+                        continue
+                    contribution.apply_validator_response(response)
+                except Exception as e:
+                    contribution.fail_validation(e)
+                contribution.leave_validation_comment()
+
 
 @receiver(post_save, sender=Contribution, dispatch_uid="psave_contrib")
 def psave_contrib(sender, instance, **kwargs):
@@ -1,12 +1,15 @@
 import json
+import re
 
 from django.contrib.humanize.templatetags.humanize import naturaltime
 from django.contrib.postgres.fields import ArrayField, JSONField
 from django.contrib.postgres.indexes import GinIndex
-from django.contrib.postgres.search import SearchVector, SearchVectorField
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVectorField
 from django.core import serializers
-from django.db import models
-from django.db.models import Q
+from django.db import models, transaction
+from django.db.models import Case, F, IntegerField, Q, Value, When, prefetch_related_objects
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
 from django.templatetags.static import static
 from django.urls import reverse
 from django.utils import timezone
@@ -270,6 +273,71 @@ def record_clr_prediction_curve(self, grant, clr_prediction_curve):
             latest=True,
         )
 
+    def record_clr_prediction_curves(self, clr_prediction_curves, replace_all=True, batch_size=1000):
+        """Bulk version of record_clr_prediction_curve for the results of a predict_clr run.
+
+        Args:
+            clr_prediction_curves (dict): {grant_id: clr_prediction_curve} for the grants calculated in the run.
+            replace_all (bool): Retire every latest calculation in this round, including grants which are
+                no longer part of it. When False only the latest calculations of the given grants are retired.
+            batch_size (int): The number of rows written per statement.
+
+        The combined curve of each grant is written straight to the clr_prediction_curve column,
+        skipping Grant.save and the side effects it has.
+
+        """
+        latest_calcs = self.clr_calculations.filter(latest=True)
+        if not replace_all:
+            latest_calcs = latest_calcs.filter(grant_id__in=clr_prediction_curves.keys())
+        latest_calcs.update(active=False, latest=False)
+
+        GrantCLRCalculation.objects.bulk_create([
+            GrantCLRCalculation(
+                grantclr=self,
+                grant_id=grant_id,
+                clr_prediction_curve=clr_prediction_curve,
+                active=True if self.is_active else False,
+                latest=True,
+            ) for grant_id, clr_prediction_curve in clr_prediction_curves.items()
+        ], batch_size=batch_size)
+
+        curves_by_grant = {}
+        latest_active_calcs = GrantCLRCalculation.objects.using('default').filter(
+            grant_id__in=clr_prediction_curves.keys(), latest=True, active=True
+        ).order_by('-created_on').values_list('grant_id', 'clr_prediction_curve')
+        for grant_id, clr_prediction_curve in latest_active_calcs:
+            curves_by_grant.setdefault(grant_id, []).append(clr_prediction_curve)
+
+        now = timezone.now()
+        Grant.objects.bulk_update([
+            Grant(
+                pk=grant_id,
+                clr_prediction_curve=sum_clr_prediction_curves(curves_by_grant.get(grant_id, [])),
+                last_clr_calc_date=now,
+                next_clr_calc_date=now + timezone.timedelta(minutes=60),
+            ) for grant_id in clr_prediction_curves.keys()
+        ], ['clr_prediction_curve', 'last_clr_calc_date', 'next_clr_calc_date'], batch_size=batch_size)
+
+
+def sum_clr_prediction_curves(clr_prediction_curves):
+    """Sum the match and bonus columns of the latest curve from each round a grant is in."""
+    # [amount_donated, match amount, bonus_from_match_amount ], etc..
+    # [0.0, 0.0, 0.0], [0.0, 0.0, 0.0], [0.0, 0.0, 0.0], [0.0, 0.0, 0.0], [0.0, 0.0, 0.0], [0.0, 0.0, 0.0]
+    _clr_prediction_curve = []
+    for insert_clr_calc in clr_prediction_curves:
+        if not _clr_prediction_curve:
+            _clr_prediction_curve = insert_clr_calc
+        else:
+            for j in [1,2]:
+                for i in [0,1,2,3,4,5]:
+                    # add the 1 and 2 index of each clr prediction cuve
+                    _clr_prediction_curve[i][j] += insert_clr_calc[i][j]
+
+    if not _clr_prediction_curve:
+        _clr_prediction_curve = [[0.0, 0.0, 0.0] for x in range(0, 6)]
+
+    return _clr_prediction_curve
+
 
 class GrantQuerySet(models.QuerySet):
     """Define the Grant default queryset and manager."""
@@ -300,6 +368,31 @@ def keyword(self, keyword):
             Q(reference_url__icontains=keyword)
         )
 
+    def search(self, keyword):
+        """Full text search of the title and description, ranked in the database.
+
+        The search runs against the GIN indexed vector_column (kept up to date by the vector_column_trigger) and
+        every word of the keyword is matched as a prefix, so partially typed words still find grants.
+
+        Args:
+            keyword (str): The words to search for.
+
+        Returns:
+            dashboard.models.GrantQuerySet: The matching grants annotated with `exact_title_match` (1 when the title
+                is the keyword) and `search_rank`, ordering by them is left to the caller.
+
+        """
+        words = re.findall(r'[^\W_]+', keyword.lower())
+        if not words:
+            return self.none()
+        query = SearchQuery(' & '.join(f'{word}:*' for word in words), config='english', search_type='raw')
+        return self.filter(vector_column=query).annotate(
+            exact_title_match=Case(
+                When(title__iexact=keyword.strip(), then=Value(1)), default=Value(0), output_field=IntegerField()
+            ),
+            search_rank=SearchRank(F('vector_column'), query),
+        )
+
 
 class Grant(SuperModel):
     """Define the structure of a Grant."""
@@ -720,23 +813,11 @@ def calc_clr_round_label(self):
 
     @property
     def calc_clr_prediction_curve(self):
-        # [amount_donated, match amount, bonus_from_match_amount ], etc..
-        # [0.0, 0.0, 0.0], [0.0, 0.0, 0.0], [0.0, 0.0, 0.0], [0.0, 0.0, 0.0], [0.0, 0.0, 0.0], [0.0, 0.0, 0.0]
-        _clr_prediction_curve = []
-        for insert_clr_calc in self.clr_calculations.using('default').filter(latest=True, active=True).order_by('-created_on'):
-            insert_clr_calc = insert_clr_calc.clr_prediction_curve
-            if not _clr_prediction_curve:
-                _clr_prediction_curve = insert_clr_calc
-            else:
-                for j in [1,2]:
-                    for i in [0,1,2,3,4,5]:
-                        # add the 1 and 2 index of each clr prediction cuve
-                        _clr_prediction_curve[i][j] += insert_clr_calc[i][j]
-
-        if not _clr_prediction_curve:
-            _clr_prediction_curve = [[0.0, 0.0, 0.0] for x in range(0, 6)]
-
-        return _clr_prediction_curve
+        return sum_clr_prediction_curves(
+            self.clr_calculations.using('default').filter(latest=True, active=True).order_by('-created_on').values_list(
+                'clr_prediction_curve', flat=True
+            )
+        )
 
 
     def updateActiveSubscriptions(self):
@@ -950,27 +1031,26 @@ def cart_payload(self, build_absolute_uri, user=None):
             'is_on_team': is_grant_team_member(self, user.profile) if user and user.is_authenticated else False,
         }
 
-    def repr(self, user, build_absolute_uri, is_detail = True):
-        from dashboard.utils import get_web3
+    def repr(self, user, build_absolute_uri, is_detail = True, is_contract_address=None, is_favorite=None):
+        """Serialize the grant.
 
+        is_contract_address and is_favorite may be passed in when a page of grants is serialized at once,
+        see repr_grants.
+        """
         grant_type = None
         if self.grant_type:
             grant_type = serializers.serialize('json', [self.grant_type], fields=['name', 'label'])
 
-        active_round_names = list(self.in_active_clrs.values_list('display_text', flat=True))
+        # iterate .all() rather than values_list so that prefetched rounds are reused
+        active_round_names = [clr_round.display_text for clr_round in self.in_active_clrs.all()]
 
         team_members = serializers.serialize('json', self.team_members.all(),
                         fields=['handle', 'url', 'profile__lazy_avatar_url']
                     )
 
-        web3 = get_web3(self.network)
-        is_contract_address = False
-        if self.admin_address != '0x0':
-            try:
-                code = web3.eth.getCode(web3.eth.toChecksumAddress(self.admin_address))
-                is_contract_address = True if code != b'' else False
-            except:
-                is_contract_address = False
+        if is_contract_address is None:
+            from grants.contract_index import get_contract_address_index
+            is_contract_address = get_contract_address_index([self]).get(self.pk, False)
 
         result = {
                 'id': self.id,
@@ -992,7 +1072,10 @@ def repr(self, user, build_absolute_uri, is_detail = True):
                     'handle': self.admin_profile.handle,
                     'avatar_url': self.admin_profile.lazy_avatar_url
                 },
-                'favorite': self.favorite(user) if user.is_authenticated else False,
+                'favorite': (
+                    (is_favorite if is_favorite is not None else self.favorite(user))
+                    if user.is_authenticated else False
+                ),
                 'team_members': json.loads(team_members),
                 'is_on_team': is_grant_team_member(self, user.profile) if user.is_authenticated else False,
                 'clr_prediction_curve': self.clr_prediction_curve,
@@ -1062,21 +1145,84 @@ def repr(self, user, build_absolute_uri, is_detail = True):
     def favorite(self, user):
         return Favorite.objects.filter(user=user, grant=self).exists()
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # remember the loaded admin_address so that save can tell when it changes
+        instance._loaded_admin_address = dict(zip(field_names, values)).get('admin_address')
+        return instance
+
     def save(self, update=True, *args, **kwargs):
         """Override the Grant save to optionally handle modified_on logic."""
 
         self.clr_prediction_curve = self.calc_clr_prediction_curve
         self.clr_round_num = self.calc_clr_round_label
-        self.search_vector = (
-            SearchVector('title', weight='A') + SearchVector('description', weight='B')
-        )
 
         if self.modified_on < (timezone.now() - timezone.timedelta(minutes=15)):
             from grants.tasks import update_grant_metadata
             update_grant_metadata.delay(self.pk)
 
+        if self.admin_address != getattr(self, '_loaded_admin_address', None):
+            from grants.tasks import update_contract_address_index
+            if self.admin_address and self.admin_address != '0x0':
+                update_contract_address_index.delay(self.network, [self.admin_address])
+            self._loaded_admin_address = self.admin_address
+
         from economy.models import get_time
         if update:
             self.modified_on = get_time()
 
         return super(Grant, self).save(*args, **kwargs)
+
+
+def repr_grants(grants, user, build_absolute_uri, is_detail=False):
+    """Serialize a page of grants with Grant.repr, loading every relation of the page at once.
+
+    Returns the same list as calling repr on each grant, with a fixed number of queries however large the page is.
+    """
+    from grants.contract_index import get_contract_address_index
+
+    grants = list(grants)
+    if not grants:
+        return []
+
+    prefetch_related_objects(
+        grants, 'grant_type', 'admin_profile', 'link_to_new_grant', 'in_active_clrs', 'team_members'
+    )
+    contract_address_index = get_contract_address_index(grants)
+
+    favorite_grant_ids = set()
+    if user.is_authenticated:
+        favorite_grant_ids = set(Favorite.objects.filter(
+            user=user, grant__in=grants
+        ).values_list('grant_id', flat=True))
+
+    return [
+        grant.repr(
+            user, build_absolute_uri, is_detail,
+            is_contract_address=contract_address_index.get(grant.pk, False),
+            is_favorite=grant.pk in favorite_grant_ids,
+        )
+        for grant in grants
+    ]
+
+
+def _queue_grant_facet_update(grant):
+    from grants.tasks import update_grant_facet_index
+
+    grant_id, network = grant.pk, grant.network
+    transaction.on_commit(lambda: update_grant_facet_index.delay(grant_id, network))
+
+
+@receiver(post_save, sender=Grant, dispatch_uid="psave_grant_facets")
+@receiver(post_delete, sender=Grant, dispatch_uid="pdelete_grant_facets")
+def psave_grant_facets(sender, instance, **kwargs):
+    _queue_grant_facet_update(instance)
+
+
+@receiver(m2m_changed, sender=Grant.tags.through, dispatch_uid="m2m_grant_tags_facets")
+@receiver(m2m_changed, sender=Grant.in_active_clrs.through, dispatch_uid="m2m_grant_clrs_facets")
+def m2m_grant_facets(sender, instance, action, reverse, **kwargs):
+    # the reverse side (ie. tag.tags.add(grant)) is left to the next save or rebuild of the index
+    if not reverse and action in ['post_add', 'post_remove', 'post_clear']:
+        _queue_grant_facet_update(instance)
@@ -1,6 +1,6 @@
 from django.conf import settings
 
-import requests
+from app.sync_engine import explorer
 from grants.sync.helpers import record_contribution_activity, txn_already_used
 
 API_KEY = settings.ALGORAND_API_KEY
@@ -26,7 +26,7 @@ def get_algorand_txn_status_paid_explorer(contribution):
     }
 
     url = f'https://mainnet-algorand.api.purestake.io/idx2/v2/transactions/{txnid}'
-    response = requests.get(url=url, headers=headers).json()
+    response = explorer.get(url=url, headers=headers).json()
     
     if response:
         if response.get("current-round") and response.get("transaction"):
@@ -63,7 +63,7 @@ def get_algorand_txn_status(contribution):
 
     url = f'https://api.algoexplorer.io/v2/transactions/pending/{txnid}?format=json'
 
-    response = requests.get(url).json()
+    response = explorer.get(url).json()
 
     if response.get('confirmed-round') and response.get('txn') and response.get('txn').get('txn'):
         txn = response["txn"]['txn']
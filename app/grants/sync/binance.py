@@ -1,6 +1,6 @@
 import logging
 
-import requests
+from app.sync_engine import explorer
 from grants.sync.helpers import record_contribution_activity
 
 logger = logging.getLogger(__name__)
@@ -27,7 +27,7 @@ def get_binance_txn_status(contribution):
             'Host': 'gitcoin.co'
         }
 
-        binance_response = requests.post(binance_url, json=data).json()
+        binance_response = explorer.post(binance_url, json=data).json()
 
         result = binance_response['result']
 
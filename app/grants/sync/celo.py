@@ -1,4 +1,4 @@
-import requests
+from app.sync_engine import explorer
 from grants.sync.helpers import is_txn_done_recently, record_contribution_activity, txn_already_used
 
 
@@ -19,7 +19,7 @@ def find_txn_on_celo_explorer(contribution):
     amount = subscription.amount_per_period
 
     blockscout_url = f'https://explorer.celo.org/api?module=account&action=tokentx&address={to_address}'
-    blockscout_response = requests.get(blockscout_url).json()
+    blockscout_response = explorer.get(blockscout_url).json()
 
     if blockscout_response['message'] and blockscout_response['result']:
         for txn in blockscout_response['result']:
@@ -41,7 +41,7 @@ def get_celo_txn_status(txnid):
 
     blockscout_url = f'https://explorer.celo.org/api?module=transaction&action=gettxinfo&txhash={txnid}'
 
-    blockscout_response = requests.get(blockscout_url).json()
+    blockscout_response = explorer.get(blockscout_url).json()
 
     if blockscout_response['status'] and blockscout_response['result']:
 
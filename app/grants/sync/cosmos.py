@@ -1,6 +1,6 @@
 import logging
 
-import requests
+from app.sync_engine import explorer
 from grants.sync.helpers import record_contribution_activity
 
 logger = logging.getLogger(__name__)
@@ -19,13 +19,13 @@ def get_cosmos_txn_status(contribution):
     amount = contribution.subscription.amount_per_period
 
     try:
-        response = requests.get(f'{BASE_URL}/cosmos/tx/v1beta1/txs/{txnid}').json()
+        response = explorer.get(f'{BASE_URL}/cosmos/tx/v1beta1/txs/{txnid}').json()
 
         tx_response = response.get('tx')
 
         if tx_response and tx_response['body']['messages'][0]['@type'] == '/cosmos.bank.v1beta1.MsgSend':
             tx_response = tx_response['body']['messages'][0]
-            block_tip = requests.get(
+            block_tip = explorer.get(
                 f'{BASE_URL}/blocks/latest'
             ).json()['block']['header']['height']
             confirmations = int(block_tip) - int(response['tx_response']['height'])
@@ -1,4 +1,4 @@
-import requests
+from app.sync_engine import explorer
 from grants.sync.helpers import record_contribution_activity, txn_already_used
 
 
@@ -20,7 +20,7 @@ def find_txn_on_harmony_explorer(contribution):
 
     url = f'https://explorer.hmny.io:8888/address?id={to_address}&pageIndex=0&pageSize=20'
 
-    response = requests.get(url).json()
+    response = explorer.get(url).json()
     if (
         response and
         'address' in response and
@@ -56,7 +56,7 @@ def get_harmony_txn_status(contribution, network='mainnet'):
     url = f'https://explorer.hmny.io:8888/tx?id={txnid}'
 
 
-    response = requests.get(url).json()
+    response = explorer.get(url).json()
     if (response and 'tx' in response):
         tx = response['tx']
 
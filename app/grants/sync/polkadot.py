@@ -1,6 +1,6 @@
 import logging
 
-import requests
+from app.sync_engine import explorer
 from grants.sync.helpers import record_contribution_activity
 
 logger = logging.getLogger(__name__)
@@ -33,7 +33,7 @@ def get_polkadot_txn_status(contribution, network='mainnet'):
             polkascan_url = f'https://explorer-32.polkascan.io/api/v1/kusama/extrinsic/{txnid}'
 
         headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 6.1; WOW64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/41.0. 2272.118 Safari/537.36.'}
-        polkascan_response = requests.get(polkascan_url, headers=headers).json()
+        polkascan_response = explorer.get(polkascan_url, headers=headers).json()
 
         if polkascan_response:
             status = polkascan_response.get('data').get('attributes')
@@ -1,4 +1,4 @@
-import requests
+from app.sync_engine import explorer
 from grants.sync.helpers import record_contribution_activity, txn_already_used
 
 
@@ -19,7 +19,7 @@ def find_txn_on_rsk_explorer(contribution):
     # amount = subscription.amount_per_period
 
     url = f'https://blockscout.com/rsk/mainnet/api?module=account&action=txlist&address={to_address}'
-    response = requests.get(url).json()
+    response = explorer.get(url).json()
     if (
         response and
         response['message'] and
@@ -59,7 +59,7 @@ def get_rsk_txn_status(contribution, network='mainnet'):
 
     url = f'https://blockscout.com/rsk/mainnet/api?module=transaction&action=gettxinfo&txhash={txnid}'
 
-    response = requests.get(url).json()
+    response = explorer.get(url).json()
 
     if response['status'] and response['result']:
         txn = response['result']
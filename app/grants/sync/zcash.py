@@ -1,4 +1,4 @@
-import requests
+from app.sync_engine import explorer
 from grants.sync.helpers import is_txn_done_recently, record_contribution_activity, txn_already_used
 
 
@@ -19,7 +19,7 @@ def find_txn_on_zcash_explorer(contribution):
     amount = subscription.amount_per_period
 
     url = f'https://sochain.com/api/v2/address/ZEC/{from_address}'
-    response = requests.get(url).json()
+    response = explorer.get(url).json()
 
     # Check contributors txn history
     if response['status'] == 'success' and response['data'] and response['data']['txs']:
@@ -48,7 +48,7 @@ def find_txn_on_zcash_explorer(contribution):
 
 
     url = f'https://sochain.com/api/v2/address/ZEC/{to_address}'
-    response = requests.get(url).json()
+    response = explorer.get(url).json()
 
     # Check funders txn history
     # if response['status'] == 'success' and response['data'] and response['data']['txs']:
@@ -72,7 +72,7 @@ def is_zcash_txn_successful(txnid):
 
     url = f'https://sochain.com/api/v2/is_tx_confirmed/ZEC/{txnid}'
 
-    response = requests.get(url).json()
+    response = explorer.get(url).json()
 
     if (
         response['status'] == 'success' and
@@ -100,7 +100,7 @@ def is_valid_zcash_txn(contribution):
 
     url = f'https://sochain.com/api/v2/tx/ZEC/{txn_id}'
 
-    response = requests.get(url).json()
+    response = explorer.get(url).json()
 
     if (
         response['status'] == 'success' and
@@ -2,7 +2,7 @@
 
 from django.conf import settings
 
-import requests
+from app.sync_engine import explorer
 from grants.sync.helpers import is_txn_done_recently, record_contribution_activity, txn_already_used
 
 headers = {
@@ -28,7 +28,7 @@ def find_txn_on_zil_explorer(contribution):
     amount = subscription.amount_per_period
 
     url = f'https://api.viewblock.io/v1/zilliqa/addresses/{to_address}/txs?network=mainnet'
-    response = requests.get(url, headers=headers).json()
+    response = explorer.get(url, headers=headers).json()
 
     if len(response):
         for txn in response:
@@ -49,7 +49,7 @@ def get_zil_txn_status(txnid, network='mainnet'):
         return None
 
     url = f'https://api.viewblock.io/v1/zilliqa/txs/{txnid}?network={network}'
-    view_block_response = requests.get(url, headers=headers).json()
+    view_block_response = explorer.get(url, headers=headers).json()
     if view_block_response:
 
         response = {
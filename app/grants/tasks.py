@@ -11,7 +11,7 @@
 
 import boto3
 from app.services import RedisService
-from celery import app
+from celery import app, group
 from celery.utils.log import get_task_logger
 from dashboard.models import Profile
 from grants.ingest import handle_zksync_ingestion
@@ -222,11 +222,12 @@ def process_grant_contribution(self, grant_id, grant_slug, profile_id, package,
         if value_usdt < 1 or subscription.contributor_profile.shadowbanned:
             include_for_clr = False
 
-        subscription.successful_contribution(
+        contribution = subscription.successful_contribution(
             subscription.new_approve_tx_id,
             include_for_clr,
             checkout_type=package.get('checkout_type', None)
         )
+        update_clr_round_states.delay(contribution.pk)
 
         # one time payments
         activity = None
@@ -355,7 +356,45 @@ def recalc_clr(self, grant_id, grant_clr, retry: bool = True) -> None:
 
 
 @app.shared_task(bind=True, max_retries=1)
-def process_predict_clr(self, save_to_db, from_date, clr_round, network, what) -> None:
+def update_clr_round_states(self, contribution_id, retry: bool = True) -> None:
+
+    if settings.FLUSH_QUEUE:
+        return
+
+    from grants.clr_state import apply_contribution_to_clr_rounds
+
+    recorded = apply_contribution_to_clr_rounds(contribution_id)
+    for clr_round_pk, grant_ids in recorded.items():
+        print(f"updated CLR estimates for ROUND: {clr_round_pk} grants: {grant_ids}")
+
+
+@app.shared_task(bind=True, max_retries=1)
+def update_contract_address_index(self, network, addresses, retry: bool = True) -> None:
+
+    if settings.FLUSH_QUEUE:
+        return
+
+    from grants.contract_index import index_contract_addresses
+
+    index_contract_addresses(network, addresses)
+
+
+@app.shared_task(bind=True, max_retries=1)
+def update_grant_facet_index(self, grant_id, network, retry: bool = True) -> None:
+
+    if settings.FLUSH_QUEUE:
+        return
+
+    from grants.facet_index import update_grant_facets
+
+    update_grant_facets(grant_id, network)
+
+
+@app.shared_task(bind=True, max_retries=1)
+def process_predict_clr(
+    self, save_to_db, from_date, clr_round, network, what, use_sql=False, engine='dict', use_snapshot=False,
+    use_replica=False
+) -> None:
     from grants.clr import predict_clr
 
     print(f"CALCULATING CLR estimates for ROUND: {clr_round.round_num} {clr_round.sub_round_slug}")
@@ -366,11 +405,50 @@ def process_predict_clr(self, save_to_db, from_date, clr_round, network, what) -
         clr_round,
         network,
         what=what,
+        use_sql=use_sql,
+        engine=engine,
+        use_snapshot=use_snapshot,
+        use_replica=use_replica,
     )
 
     print(f"finished CLR estimates for {clr_round.round_num} {clr_round.sub_round_slug}")
 
 
+@app.shared_task(bind=True, max_retries=1)
+def process_predict_clr_round(self, clr_round_pk, save_to_db, network, what, engine='dict') -> None:
+    from grants.clr_scheduler import fetch_round_data, load_rounds_data, predict_clr_round
+
+    clr_round = GrantCLR.objects.get(pk=clr_round_pk)
+    data = fetch_round_data(clr_round.pk) or load_rounds_data([clr_round], network)[clr_round.pk]
+
+    predict_clr_round(clr_round, data, save_to_db=save_to_db, what=what, engine=engine)
+
+
+@app.shared_task(bind=True, max_retries=1)
+def process_predict_clr_rounds(self, save_to_db, network, what, engine='dict', clr_round_pks=None) -> None:
+    from grants.clr_scheduler import load_rounds_data, store_rounds_data
+
+    clr_rounds = GrantCLR.objects.filter(is_active=True)
+    if clr_round_pks:
+        clr_rounds = GrantCLR.objects.filter(pk__in=clr_round_pks)
+    clr_rounds = list(clr_rounds)
+    print(f"CALCULATING CLR estimates for {len(clr_rounds)} ROUNDS")
+
+    # the contributions are loaded once for every round, each round is then calculated by its own task
+    store_rounds_data(load_rounds_data(clr_rounds, network))
+    group(
+        process_predict_clr_round.si(clr_round.pk, save_to_db, network, what, engine) for clr_round in clr_rounds
+    ).apply_async()
+
+
+@app.shared_task(bind=True, max_retries=1)
+def process_clr_simulation(self, simulation_id, clr_round_pk, variants, network, refresh=False) -> None:
+    from grants.clr_simulation import run_simulation
+
+    clr_round = GrantCLR.objects.get(pk=clr_round_pk)
+    run_simulation(simulation_id, clr_round, variants, network, refresh=refresh)
+
+
 @app.shared_task(bind=True, max_retries=3)
 def process_grant_creation_email(self, grant_id, profile_id):
     try:
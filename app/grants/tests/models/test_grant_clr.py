@@ -287,6 +287,37 @@ def test_record_clr_prediction_curve_calls_collaborator_with_expected_parameters
             latest=True
         )
 
+    def test_record_clr_prediction_curves_retires_latest_and_updates_grants(self):
+        """Test record_clr_prediction_curves bulk creates the new calcs and writes the grants' curves."""
+
+        grant_clr = GrantCLRFactory(is_active=True)
+        grant = GrantFactory()
+        stale_grant = GrantFactory()
+        stale_calc = GrantCLRCalculation.objects.create(grantclr=grant_clr, grant=stale_grant, active=True, latest=True)
+        clr_prediction_curve = [[amount, 10.0, 5.0] for amount in [0, 1, 10, 100, 1000, 10000]]
+
+        grant_clr.record_clr_prediction_curves({grant.pk: clr_prediction_curve})
+
+        stale_calc.refresh_from_db()
+        grant.refresh_from_db()
+        assert not stale_calc.latest and not stale_calc.active
+        assert grant_clr.clr_calculations.filter(grant=grant, latest=True, active=True).count() == 1
+        assert grant.clr_prediction_curve == clr_prediction_curve
+
+    def test_record_clr_prediction_curves_only_retires_given_grants(self):
+        """Test record_clr_prediction_curves leaves other grants' latest calcs alone when replace_all is False."""
+
+        grant_clr = GrantCLRFactory(is_active=True)
+        grant = GrantFactory()
+        other_calc = GrantCLRCalculation.objects.create(
+            grantclr=grant_clr, grant=GrantFactory(), active=True, latest=True
+        )
+
+        grant_clr.record_clr_prediction_curves({grant.pk: [[0.0, 0.0, 0.0] for x in range(0, 6)]}, replace_all=False)
+
+        other_calc.refresh_from_db()
+        assert other_calc.latest
+
     def test_grant_clr_has_claim_start_date_attribute(self):
         """Test claim_start_date is present."""
 
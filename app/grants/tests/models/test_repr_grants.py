@@ -0,0 +1,66 @@
+from unittest.mock import patch
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+import pytest
+from dashboard.tests.factories import ProfileFactory
+from grants.models.grant import Grant, repr_grants
+from grants.tests.factories import GrantCLRFactory, GrantFactory
+from townsquare.models import Favorite
+
+
+def build_absolute_uri(path):
+    return f'http://testserver{path}'
+
+
+@pytest.fixture
+def user(django_user_model):
+    user = django_user_model.objects.create(username='gitcoin', password='password123')
+    ProfileFactory(user=user, handle='gitcoin')
+    return user
+
+
+def create_grants(count, user):
+    clr_round = GrantCLRFactory(is_active=True)
+    grants = []
+    for _ in range(count):
+        grant = GrantFactory(admin_profile=ProfileFactory())
+        grant.team_members.add(ProfileFactory(), ProfileFactory())
+        grant.in_active_clrs.add(clr_round)
+        grants.append(grant)
+    Favorite.objects.create(user=user, grant=grants[0])
+    return grants
+
+
+@pytest.mark.django_db
+class TestReprGrants:
+    """Test serializing a page of grants at once."""
+
+    @pytest.fixture(autouse=True)
+    def contract_index(self):
+        with patch('grants.contract_index.get_contract_address_index', return_value={}):
+            yield
+
+    def test_matches_repr(self, user):
+        """Test the bulk serializer returns the same JSON as repr on every grant."""
+        create_grants(3, user)
+        grants = Grant.objects.order_by('pk')
+
+        expected = [grant.repr(user, build_absolute_uri, is_detail=False) for grant in grants]
+
+        assert repr_grants(grants, user, build_absolute_uri) == expected
+        assert expected[0]['favorite'] is True
+
+    def test_query_count_does_not_grow_with_the_page(self, user):
+        """Test a page of grants is serialized with a fixed number of queries."""
+        create_grants(2, user)
+        user.profile
+        with CaptureQueriesContext(connection) as small_page:
+            repr_grants(list(Grant.objects.all()), user, build_absolute_uri)
+
+        create_grants(8, user)
+        with CaptureQueriesContext(connection) as large_page:
+            repr_grants(list(Grant.objects.all()), user, build_absolute_uri)
+
+        assert len(large_page) == len(small_page)
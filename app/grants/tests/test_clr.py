@@ -0,0 +1,197 @@
+import random
+
+import pytest
+from grants import clr, clr_sparse
+
+
+def synthetic_round(seed, num_grants=25, num_profiles=120, max_contributors=40):
+    """Build a random (curr_agg, trust_dict) pair where contributors overlap across grants."""
+    rng = random.Random(seed)
+    curr_agg = {}
+    for grant_id in range(1, num_grants + 1):
+        contributors = rng.sample(range(1, num_profiles + 1), rng.randint(0, max_contributors))
+        if contributors:
+            curr_agg[grant_id] = {profile_id: round(rng.uniform(0, 500), 2) for profile_id in contributors}
+    trust_dict = {profile_id: rng.choice([0.5, 1, 1.5]) for profile_id in range(1, num_profiles + 1)}
+    return curr_agg, trust_dict
+
+
+class TestSparseCLREngine:
+    """Test the sparse engine matches the dict engine."""
+
+    @pytest.mark.parametrize('seed', [1, 2, 3, 4])
+    def test_pair_totals_match_dict_engine(self, seed):
+        """Test every pair total of the dict engine is present in the sparse pair matrix."""
+        curr_agg, _ = synthetic_round(seed)
+
+        pair_totals, curr_agg_sqrts, pairs_tot = clr.get_totals_by_pair(curr_agg)
+        sparse_round, sparse_sqrts, sparse_pairs_tot = clr_sparse.get_totals_by_pair(curr_agg)
+
+        assert sparse_pairs_tot == pairs_tot
+        for proj, sqrts in curr_agg_sqrts.items():
+            assert sparse_sqrts[proj] == pytest.approx(sqrts)
+        for k1, pairs in pair_totals.items():
+            for k2, total in pairs.items():
+                i, j = sparse_round.profile_index[k1], sparse_round.profile_index[k2]
+                assert sparse_round.pair_totals[i, j] == pytest.approx(total)
+                assert sparse_round.pair_totals[j, i] == pytest.approx(total)
+
+    @pytest.mark.parametrize('seed', [1, 2, 3, 4])
+    def test_calculate_clr_matches_dict_engine(self, seed):
+        """Test the un-normalised and normalised distributions are identical across engines."""
+        curr_agg, trust_dict = synthetic_round(seed)
+        v_threshold, total_pot = 25.0, 100000.0
+
+        pair_totals, curr_agg_sqrts, _ = clr.get_totals_by_pair(curr_agg)
+        bigtot, totals = clr.calculate_clr(curr_agg, trust_dict, pair_totals, curr_agg_sqrts, v_threshold, total_pot)
+
+        sparse_round, sparse_sqrts, _ = clr_sparse.get_totals_by_pair(curr_agg)
+        sparse_bigtot, sparse_totals = clr_sparse.calculate_clr(
+            curr_agg, trust_dict, sparse_round, sparse_sqrts, v_threshold, total_pot
+        )
+
+        assert sparse_bigtot == pytest.approx(bigtot)
+        assert list(sparse_totals.keys()) == list(totals.keys())
+        for proj, total in totals.items():
+            assert sparse_totals[proj]['number_contributions'] == total['number_contributions']
+            assert sparse_totals[proj]['contribution_amount'] == pytest.approx(total['contribution_amount'])
+            assert sparse_totals[proj]['clr_amount'] == pytest.approx(total['clr_amount'])
+
+        match_cap_per_grant = total_pot * 0.1
+        normalised = clr.normalise(bigtot, totals, total_pot, match_cap_per_grant)
+        sparse_normalised = clr.normalise(sparse_bigtot, sparse_totals, total_pot, match_cap_per_grant)
+        for proj, total in normalised.items():
+            assert sparse_normalised[proj]['clr_amount'] == pytest.approx(total['clr_amount'])
+
+    def test_large_grant_is_scored_in_blocks(self, monkeypatch):
+        """Test splitting a grant's pairs into row blocks does not change its match."""
+        curr_agg, trust_dict = synthetic_round(5, num_grants=3, max_contributors=100)
+        sparse_round, sparse_sqrts, _ = clr_sparse.get_totals_by_pair(curr_agg)
+        _, expected = clr_sparse.calculate_clr(curr_agg, trust_dict, sparse_round, sparse_sqrts, 25.0, 1000.0)
+
+        monkeypatch.setattr(clr_sparse, 'MAX_BLOCK_CELLS', 64)
+        _, blocked = clr_sparse.calculate_clr(curr_agg, trust_dict, sparse_round, sparse_sqrts, 25.0, 1000.0)
+
+        for proj, total in expected.items():
+            assert blocked[proj]['clr_amount'] == pytest.approx(total['clr_amount'])
+
+
+class TestBatchPredictions:
+    """Test calculate_clr_predictions matches calculate_clr_for_prediction."""
+
+    @pytest.mark.parametrize('seed, total_pot, cap_percentage', [
+        (1, 1000000.0, 100),  # unsaturated
+        (2, 500.0, 100),      # saturated
+        (3, 2000.0, 10),      # saturated with capped grants
+        (4, 1000000.0, 0.5),  # unsaturated with capped grants
+    ])
+    def test_predictions_match_per_grant_calculation(self, seed, total_pot, cap_percentage):
+        """Test every point of every curve matches the single grant calculation."""
+        curr_agg, trust_dict = synthetic_round(seed)
+        v_threshold = 25.0
+        match_cap_per_grant = total_pot * (cap_percentage / 100)
+        potential_donations = [0, 1, 10, 100, 1000, 10000]
+
+        pair_totals, curr_agg_sqrts, _ = clr.get_totals_by_pair(curr_agg)
+        bigtot, totals = clr.calculate_clr(curr_agg, trust_dict, pair_totals, curr_agg_sqrts, v_threshold, total_pot)
+
+        predictions = clr.calculate_clr_predictions(
+            bigtot, totals, curr_agg, trust_dict, curr_agg_sqrts, v_threshold, total_pot, match_cap_per_grant,
+            potential_donations
+        )
+
+        assert set(predictions.keys()) == set(curr_agg.keys())
+        for grant_id, curve in predictions.items():
+            for amount, predicted_clr in zip(potential_donations[1:], curve[1:]):
+                _, expected, _, _ = clr.calculate_clr_for_prediction(
+                    bigtot, totals, curr_agg, trust_dict, curr_agg_sqrts, v_threshold, total_pot, grant_id, amount,
+                    match_cap_per_grant
+                )
+                assert predicted_clr == pytest.approx(expected)
+
+    def test_predictions_do_not_mutate_totals(self):
+        """Test the raw totals are left untouched."""
+        curr_agg, trust_dict = synthetic_round(1)
+        pair_totals, curr_agg_sqrts, _ = clr.get_totals_by_pair(curr_agg)
+        bigtot, totals = clr.calculate_clr(curr_agg, trust_dict, pair_totals, curr_agg_sqrts, 25.0, 500.0)
+        before = {proj: dict(total) for proj, total in totals.items()}
+
+        clr.calculate_clr_predictions(
+            bigtot, totals, curr_agg, trust_dict, curr_agg_sqrts, 25.0, 500.0, 50.0, [0, 1, 10], grant_ids=[1, 2]
+        )
+
+        assert totals == before
+
+
+def recursive_apply_cap(totals, match_cap_per_grant, should_spread):
+    """The recursive apply_cap that apply_cap_rows replaced, kept as the reference for its results."""
+    remainder = 0
+    uncapped = 0
+    for t in totals.values():
+        if t['clr_amount'] >= match_cap_per_grant:
+            remainder += t['clr_amount'] - match_cap_per_grant
+            t['clr_amount'] = match_cap_per_grant
+        else:
+            uncapped += t['clr_amount']
+
+    if should_spread and remainder > 0 and uncapped > 0:
+        per_remainder = remainder / uncapped
+        remainder = 0
+        for t in totals.values():
+            if t['clr_amount'] < match_cap_per_grant:
+                t['clr_amount'] += per_remainder * t['clr_amount']
+                if t['clr_amount'] >= match_cap_per_grant:
+                    remainder += t['clr_amount'] - match_cap_per_grant
+        if remainder > 0:
+            recursive_apply_cap(totals, match_cap_per_grant, should_spread)
+
+    return totals
+
+
+class TestApplyCap:
+    """Test the sort based apply_cap matches the recursive redistribution."""
+
+    @pytest.mark.parametrize('seed', range(20))
+    @pytest.mark.parametrize('should_spread', [True, False])
+    def test_matches_recursive_apply_cap(self, seed, should_spread):
+        """Test random (heavy tailed) distributions are capped and spread identically."""
+        rng = random.Random(seed)
+        clr_amounts = [rng.paretovariate(1.2) * 100 for _ in range(rng.randint(1, 60))]
+        clr_amounts += [0.0] * rng.randint(0, 3)
+        match_cap_per_grant = sum(clr_amounts) * rng.choice([0.02, 0.05, 0.1, 0.3])
+
+        expected = recursive_apply_cap(
+            {i: {'clr_amount': amount} for i, amount in enumerate(clr_amounts)}, match_cap_per_grant, should_spread
+        )
+        capped = clr.apply_cap(
+            {i: {'clr_amount': amount} for i, amount in enumerate(clr_amounts)}, match_cap_per_grant, should_spread
+        )
+
+        for i, total in expected.items():
+            assert capped[i]['clr_amount'] == pytest.approx(total['clr_amount'], rel=1e-12)
+
+    @pytest.mark.parametrize('clr_amounts, match_cap_per_grant', [
+        ([], 10.0),                 # no grants
+        ([5.0, 5.0], 10.0),         # nothing to cap
+        ([10.0, 3.0], 10.0),        # exactly at the cap, nothing to spread
+        ([30.0, 20.0], 10.0),       # every grant capped
+        ([40.0, 9.0, 9.0, 1.0], 10.0),  # tied grants cross the cap together
+        ([30.0, 0.0, 0.0], 10.0),   # nothing uncapped to spread over
+    ])
+    def test_edge_cases(self, clr_amounts, match_cap_per_grant):
+        """Test empty, uncapped, fully capped and tied distributions."""
+        expected = recursive_apply_cap(
+            {i: {'clr_amount': amount} for i, amount in enumerate(clr_amounts)}, match_cap_per_grant, True
+        )
+
+        capped = clr.apply_cap_rows(clr_amounts, match_cap_per_grant, True)
+
+        assert capped.tolist() == pytest.approx([total['clr_amount'] for total in expected.values()])
+
+    def test_rows_are_capped_independently(self):
+        """Test each row is capped with its own should_spread."""
+        rows = [[30.0, 5.0, 5.0], [30.0, 5.0, 5.0]]
+
+        capped = clr.apply_cap_rows(rows, 10.0, [True, False])
+
+        assert capped.tolist() == [pytest.approx([10.0, 10.0, 10.0]), pytest.approx([10.0, 5.0, 5.0])]
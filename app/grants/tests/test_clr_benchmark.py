@@ -0,0 +1,33 @@
+from grants import clr_benchmark
+
+
+class TestCLRBenchmark:
+    """Test the offline CLR benchmark harness."""
+
+    def test_synthetic_round_is_reproducible(self):
+        """Test the generator returns the requested number of contributions and is seeded."""
+        contributions, trust_dict = clr_benchmark.synthetic_round(2000, seed=3)
+
+        assert len(contributions) == 2000
+        assert clr_benchmark.synthetic_round(2000, seed=3) == (contributions, trust_dict)
+        assert all(user in trust_dict for _, user, _ in contributions)
+
+    def test_benchmark_round_times_every_stage(self):
+        """Test a run reports the time and peak memory of every stage."""
+        run = clr_benchmark.benchmark_round(1000, engine='sparse', prediction_grants=5)
+
+        assert list(run['stages'].keys()) == [
+            'aggregate_contributions', 'get_totals_by_pair', 'calculate_clr', 'normalise', 'predictions'
+        ]
+        assert all(stats['peak_mb'] is not None for stats in run['stages'].values())
+        assert run['predicted_grants'] == 5
+
+    def test_compare_reports_matches_runs(self):
+        """Test the comparison pairs up the same size, engine and stage."""
+        baseline = {'runs': [{'contributions': 10, 'engine': 'dict', 'stages': {'calculate_clr': {'seconds': 2.0}}}]}
+        current = {'runs': [
+            {'contributions': 10, 'engine': 'dict', 'stages': {'calculate_clr': {'seconds': 1.0}}},
+            {'contributions': 10, 'engine': 'sparse', 'stages': {'calculate_clr': {'seconds': 1.0}}},
+        ]}
+
+        assert clr_benchmark.compare_reports(baseline, current) == [(10, 'dict', 'calculate_clr', 2.0, 1.0, 0.5)]
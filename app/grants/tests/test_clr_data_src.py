@@ -0,0 +1,74 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.utils import timezone
+
+import pytest
+from dashboard.tests.factories import ProfileFactory
+from grants.clr_data_src import fetch_summed_contributions
+from grants.tests.factories import ContributionFactory, GrantCLRFactory, GrantFactory, SubscriptionFactory
+from townsquare.models import SquelchProfile
+
+
+def contribute(grant, profile, amount, network='mainnet', **kwargs):
+    subscription = SubscriptionFactory(
+        grant=grant, contributor_profile=profile, amount_per_period=amount, amount_per_period_usdt=amount,
+        network=network,
+    )
+    return ContributionFactory(subscription=subscription, **kwargs)
+
+
+@pytest.mark.django_db
+class TestFetchSummedContributions:
+    """Test the contributions of a round summed by grant and contributor in the database."""
+
+    def setup_method(self):
+        now = timezone.now()
+        self.clr_round = GrantCLRFactory(
+            start_date=now - timedelta(days=1), end_date=now + timedelta(days=1), contribution_multiplier=Decimal(2)
+        )
+        self.grant, self.other_grant, excluded_grant = GrantFactory(), GrantFactory(), GrantFactory()
+        deferred_grant = GrantFactory(defer_clr_to=self.grant)
+        self.grants = [self.grant, self.other_grant, deferred_grant]
+        self.alice = ProfileFactory(trust_bonus=Decimal('1.2'))
+        self.bob = ProfileFactory(trust_bonus=Decimal('0.5'), passport_trust_bonus=Decimal('1.5'))
+        squelched = ProfileFactory()
+        SquelchProfile.objects.create(profile=squelched, active=True)
+
+        contribute(self.grant, self.alice, 10)
+        contribute(self.grant, self.alice, 5)
+        contribute(self.grant, self.bob, 3)
+        contribute(self.other_grant, self.bob, 7)
+        contribute(deferred_grant, self.alice, 4)
+
+        # contributions which aren't matched
+        contribute(self.grant, self.bob, 100, match=False)
+        contribute(self.grant, self.bob, 100, success=False)
+        contribute(self.grant, self.bob, 100, network='rinkeby')
+        contribute(self.grant, self.bob, 100, created_on=now - timedelta(days=2))
+        contribute(self.grant, squelched, 100)
+        contribute(excluded_grant, self.bob, 100)
+
+    def summed(self, **kwargs):
+        curr_agg, trust_dict = fetch_summed_contributions(self.grants, self.clr_round, **kwargs)
+        curr_agg = {grant_id: {user: float(amount) for user, amount in contribz.items()}
+                    for grant_id, contribz in curr_agg.items()}
+        return curr_agg, trust_dict
+
+    def test_sums_the_matched_contributions(self):
+        """Test the contributions are summed per grant (deferred ones to the grant they defer to) and contributor."""
+        curr_agg, trust_dict = self.summed()
+
+        assert curr_agg == {
+            self.grant.pk: {self.alice.pk: 38.0, self.bob.pk: 6.0},
+            self.other_grant.pk: {self.bob.pk: 14.0},
+        }
+        assert trust_dict == {self.alice.pk: pytest.approx(1.2), self.bob.pk: pytest.approx(1.5)}
+
+    def test_streams_the_rows_in_chunks(self):
+        """Test the rows are the same whatever the number fetched per round trip."""
+        assert self.summed(chunk_size=1) == self.summed()
+
+    def test_replica_falls_back_to_default(self):
+        """Test reading from a replica uses the default database when no router is configured."""
+        assert self.summed(using='replica') == self.summed()
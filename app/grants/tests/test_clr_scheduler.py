@@ -0,0 +1,50 @@
+import copy
+
+import pytest
+from grants import clr, clr_scheduler
+from grants.tests.test_clr import synthetic_round
+
+
+@pytest.fixture
+def round_data():
+    curr_agg, trust_dict = synthetic_round(3)
+    return {
+        'grant_ids': list(range(1, 30)),
+        'curr_agg': curr_agg,
+        'trust_dict': trust_dict,
+        'v_threshold': 25.0,
+        'total_pot': 2000.0,
+        'match_cap_per_grant': 200.0,
+        'load_time': 0.0,
+    }
+
+
+class TestCalculateRound:
+    """Test the scheduler's per-round calculation."""
+
+    def test_curves_match_predict_clr_stages(self, round_data):
+        """Test every grant of the round gets the curve predict_clr would build."""
+        curves, timings = clr_scheduler.calculate_round(None, round_data, engine='sparse')
+
+        curr_agg, trust_dict = round_data['curr_agg'], round_data['trust_dict']
+        pair_totals, curr_agg_sqrts, _ = clr.get_totals_by_pair(curr_agg)
+        bigtot, totals = clr.calculate_clr(curr_agg, trust_dict, pair_totals, curr_agg_sqrts, 25.0, 2000.0)
+        curr_grants_clr = clr.normalise(bigtot, copy.deepcopy(totals), 2000.0, 200.0)
+        potential_clrs = clr.calculate_potential_clr(
+            round_data['grant_ids'], bigtot, totals, curr_grants_clr, curr_agg, trust_dict, curr_agg_sqrts, 25.0,
+            2000.0, 200.0
+        )
+
+        assert set(curves.keys()) == set(round_data['grant_ids'])
+        for grant_id, potential_clr in potential_clrs.items():
+            expected = clr.build_clr_prediction_curve(clr.POTENTIAL_DONATIONS, potential_clr)
+            for point, expected_point in zip(curves[grant_id], expected):
+                assert point == pytest.approx(expected_point)
+        assert {'load', 'pairwise', 'distribution', 'predictions'} <= set(timings.keys())
+
+    def test_slim_returns_current_distribution(self, round_data):
+        """Test slim only returns the normalised current distribution."""
+        curr_grants_clr, timings = clr_scheduler.calculate_round(None, round_data, what='slim')
+
+        assert set(curr_grants_clr.keys()) == set(round_data['curr_agg'].keys())
+        assert 'predictions' not in timings
@@ -0,0 +1,81 @@
+import pytest
+from grants import clr
+from grants.clr_simulation import MAX_VARIANTS, SimulationBase, validate_variant, validate_variants
+from grants.tests.test_clr import synthetic_round
+
+
+@pytest.fixture
+def simulation_base():
+    curr_agg, trust_dict = synthetic_round(1)
+    params = {
+        'verified_threshold': 25.0,
+        'total_pot': 100000.0,
+        'grant_clr_percentage_cap': 10.0,
+        'squelched_profile_ids': [],
+    }
+    return SimulationBase(1, sorted(curr_agg.keys()), curr_agg, trust_dict, params)
+
+
+def expected_distribution(curr_agg, trust_dict, v_threshold, total_pot, cap_percentage):
+    pair_totals, curr_agg_sqrts, _ = clr.get_totals_by_pair(curr_agg)
+    bigtot, totals = clr.calculate_clr(curr_agg, trust_dict, pair_totals, curr_agg_sqrts, v_threshold, total_pot)
+    normalised = clr.normalise(bigtot, totals, total_pot, total_pot * cap_percentage / 100)
+    return {grant_id: total['clr_amount'] for grant_id, total in normalised.items()}
+
+
+class TestSimulationBase:
+    """Test the what-if simulation of a round."""
+
+    @pytest.mark.parametrize('variant', [
+        {},
+        {'verified_threshold': 10.0},
+        {'total_pot': 500.0},
+        {'grant_clr_percentage_cap': 2.5, 'total_pot': 5000.0},
+    ])
+    def test_distribution_matches_predict_clr_math(self, simulation_base, variant):
+        """Test a variant's distribution matches the dict engine run with the same parameters."""
+        params = dict(simulation_base.params, **variant)
+
+        distribution = simulation_base.distribution(variant)
+
+        expected = expected_distribution(
+            simulation_base.curr_agg, simulation_base.trust_dict, params['verified_threshold'], params['total_pot'],
+            params['grant_clr_percentage_cap']
+        )
+        for grant_id, clr_amount in expected.items():
+            assert distribution[grant_id] == pytest.approx(clr_amount)
+
+    def test_squelched_profiles_are_removed(self, simulation_base):
+        """Test squelching profiles matches a round without their contributions and leaves the base untouched."""
+        squelched = [1, 2, 3, 4, 5]
+        curr_agg = {}
+        for grant_id, contribz in simulation_base.curr_agg.items():
+            contribz = {user: amount for user, amount in contribz.items() if user not in squelched}
+            if contribz:
+                curr_agg[grant_id] = contribz
+        before = {grant_id: dict(contribz) for grant_id, contribz in simulation_base.curr_agg.items()}
+
+        distribution = simulation_base.distribution({'squelched_profile_ids': squelched})
+
+        expected = expected_distribution(curr_agg, simulation_base.trust_dict, 25.0, 100000.0, 10.0)
+        for grant_id in simulation_base.grant_ids:
+            assert distribution[grant_id] == pytest.approx(expected.get(grant_id, 0.0))
+        assert simulation_base.curr_agg == before
+
+    def test_validate_variant_rejects_unknown_params(self):
+        """Test variants may only change the simulation params."""
+        assert validate_variant({'total_pot': '10', 'squelched_profile_ids': ['1']}) == {
+            'total_pot': 10.0, 'squelched_profile_ids': [1]
+        }
+        with pytest.raises(ValueError):
+            validate_variant({'contribution_multiplier': 2})
+        with pytest.raises(ValueError):
+            validate_variant({'total_pot': -1})
+
+    def test_validate_variants_bounds_the_request(self):
+        """Test a simulation takes a list of at most MAX_VARIANTS variants."""
+        assert validate_variants([{'total_pot': '10'}]) == [{'total_pot': 10.0}]
+        with pytest.raises(ValueError):
+            validate_variants({'total_pot': 10})
+        with pytest.raises(ValueError):
+            validate_variants([{}] * (MAX_VARIANTS + 1))
@@ -0,0 +1,103 @@
+from grants.clr_snapshot import ContributionSnapshot
+from grants.tests.test_clr import synthetic_round
+
+
+def snapshot_rows(curr_agg, trust_dict, contributions_per_pair=2):
+    """Split every aggregated amount of a synthetic round into several snapshot rows."""
+    rows = []
+    for grant_id, contribz in curr_agg.items():
+        for profile_id, amount in contribz.items():
+            for _ in range(contributions_per_pair):
+                rows.append((
+                    len(rows) + 1, grant_id, profile_id, profile_id + 1000, amount / contributions_per_pair,
+                    trust_dict[profile_id], 1600000000 + len(rows)
+                ))
+    return rows
+
+
+class TestContributionSnapshot:
+    """Test the columnar contribution snapshot."""
+
+    def test_aggregate_sums_by_grant_and_profile(self):
+        """Test aggregating the snapshot rebuilds the round it was built from."""
+        curr_agg, trust_dict = synthetic_round(1)
+        snapshot = ContributionSnapshot()
+        snapshot.upsert(snapshot_rows(curr_agg, trust_dict))
+
+        summed, summed_trust = snapshot.aggregate({grant_id: grant_id for grant_id in curr_agg}, 2)
+
+        assert set(summed.keys()) == set(curr_agg.keys())
+        for grant_id, contribz in curr_agg.items():
+            assert set(summed[grant_id].keys()) == set(contribz.keys())
+            for profile_id, amount in contribz.items():
+                assert abs(summed[grant_id][profile_id] - amount * 2) < 1e-6
+                assert summed_trust[profile_id] == trust_dict[profile_id]
+
+    def test_aggregate_applies_grant_map_and_squelch(self):
+        """Test deferred grants are summed into their target and squelched profiles are dropped."""
+        snapshot = ContributionSnapshot()
+        snapshot.upsert([
+            (1, 10, 1, 101, 5.0, 1.0, 0),
+            (2, 11, 1, 101, 3.0, 1.0, 0),
+            (3, 10, 2, 102, 4.0, 0.5, 0),
+            (4, 12, 3, 103, 9.0, 0.5, 0),
+        ])
+
+        curr_agg, trust_dict = snapshot.aggregate({10: 10, 11: 10}, squelched_profile_ids=[2])
+
+        assert curr_agg == {10: {1: 8.0}}
+        assert trust_dict == {1: 1.0}
+
+    def test_upsert_replaces_and_remove_drops_rows(self):
+        """Test re-adding a contribution replaces its row and removed contributions are gone."""
+        snapshot = ContributionSnapshot()
+        snapshot.upsert([(1, 10, 1, 101, 5.0, 1.0, 0), (2, 10, 2, 102, 4.0, 0.5, 0)])
+        snapshot.upsert([(1, 10, 1, 101, 7.0, 1.0, 0)])
+        snapshot.remove([2])
+
+        assert len(snapshot) == 1
+        assert snapshot.aggregate({10: 10}) == ({10: {1: 7.0}}, {1: 1.0})
+
+    def test_set_trust_bonus_updates_matching_users(self):
+        """Test trust bonuses are only changed for the given users."""
+        snapshot = ContributionSnapshot()
+        snapshot.upsert([(1, 10, 1, 101, 5.0, 0.5, 0), (2, 10, 2, 102, 4.0, 0.5, 0)])
+        snapshot.set_trust_bonus({102: 1.5, 999: 1.0})
+
+        assert snapshot.aggregate({10: 10})[1] == {1: 0.5, 2: 1.5}
+
+    def test_save_and_load_round_trip(self, tmp_path):
+        """Test a saved snapshot loads back memory-mapped with its watermarks."""
+        curr_agg, trust_dict = synthetic_round(2)
+        snapshot = ContributionSnapshot(meta={'contributions_watermark': '2021-09-01T00:00:00+00:00'})
+        snapshot.upsert(snapshot_rows(curr_agg, trust_dict))
+        snapshot.save(str(tmp_path / 'snapshot'))
+
+        loaded = ContributionSnapshot.load(str(tmp_path / 'snapshot'))
+
+        assert len(loaded) == len(snapshot)
+        assert loaded.meta == snapshot.meta
+        grant_map = {grant_id: grant_id for grant_id in curr_agg}
+        assert loaded.aggregate(grant_map) == snapshot.aggregate(grant_map)
+
+    def test_save_swaps_in_the_new_snapshot(self, tmp_path):
+        """Test saving again replaces the whole snapshot and removes the previous one."""
+        curr_agg, trust_dict = synthetic_round(2)
+        rows = snapshot_rows(curr_agg, trust_dict)
+        path = str(tmp_path / 'snapshot')
+        snapshot = ContributionSnapshot(meta={'contributions_watermark': '2021-09-01T00:00:00+00:00'})
+        snapshot.upsert(rows[:10])
+        snapshot.save(path)
+        snapshot.upsert(rows[10:])
+        snapshot.meta['contributions_watermark'] = '2021-09-02T00:00:00+00:00'
+        snapshot.save(path)
+
+        loaded = ContributionSnapshot.load(path)
+
+        assert len(loaded) == len(rows)
+        assert loaded.meta == snapshot.meta
+        assert len(list(tmp_path.iterdir())) == 2  # the symlink and the directory it points at
+
+    def test_load_without_meta_returns_none(self, tmp_path):
+        """Test a missing or partially written snapshot is rebuilt from scratch."""
+        assert ContributionSnapshot.load(str(tmp_path)) is None
@@ -0,0 +1,224 @@
+import copy
+import time
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import pytest
+from app.tests.fake_redis import FakeRedis
+from grants import clr, clr_state
+from grants.clr_state import CLRRoundState
+from grants.tests.test_clr import synthetic_round
+
+
+def build_state(curr_agg, trust_dict, v_threshold=25.0, total_pot=2000.0, match_cap_per_grant=200.0):
+    pair_totals, curr_agg_sqrts, _ = clr.get_totals_by_pair(curr_agg)
+    bigtot, totals = clr.calculate_clr(curr_agg, trust_dict, pair_totals, curr_agg_sqrts, v_threshold, total_pot)
+    return CLRRoundState(
+        1, curr_agg.keys(), curr_agg, trust_dict, pair_totals, curr_agg_sqrts, totals, bigtot, v_threshold, total_pot,
+        match_cap_per_grant
+    )
+
+
+def recalculate(curr_agg, trust_dict, contributions):
+    curr_agg = copy.deepcopy(curr_agg)
+    trust_dict = dict(trust_dict)
+    for contribution in contributions:
+        proj, user = contribution.grant.pk, contribution.profile_for_clr.pk
+        curr_agg[proj][user] = curr_agg[proj].get(user, 0) + float(contribution.amount_per_period_usdt)
+        trust_dict.setdefault(user, contribution.profile_for_clr.final_trust_bonus)
+    pair_totals, curr_agg_sqrts, _ = clr.get_totals_by_pair(curr_agg)
+    return clr.calculate_clr(curr_agg, trust_dict, pair_totals, curr_agg_sqrts, 25.0, 2000.0)
+
+
+def contribution(pk, proj, user, amount, trust_bonus=1.0):
+    return SimpleNamespace(
+        pk=pk, success=True, match=True, amount_per_period_usdt=amount,
+        grant=SimpleNamespace(pk=proj, defer_clr_to_id=None, in_active_clrs=MagicMock()),
+        profile_for_clr=SimpleNamespace(pk=user, final_trust_bonus=trust_bonus),
+    )
+
+
+def stored_totals(redis, prefix):
+    bigtot = float(redis.hget(f'{prefix}:meta', 'bigtot'))
+    projects = [int(grant_id) for grant_id in redis.smembers(f'{prefix}:projects')]
+    return bigtot, {
+        grant_id: clr_state._decode_totals(grant_id, redis.hgetall(f'{prefix}:totals:{grant_id}'))
+        for grant_id in projects
+    }
+
+
+def assert_matches(stored, expected):
+    bigtot, totals = stored
+    expected_bigtot, expected_totals = expected
+    assert bigtot == pytest.approx(expected_bigtot)
+    assert set(totals) == set(expected_totals)
+    for grant_id, total in expected_totals.items():
+        assert totals[grant_id]['number_contributions'] == total['number_contributions']
+        assert totals[grant_id]['contribution_amount'] == pytest.approx(total['contribution_amount'])
+        assert totals[grant_id]['clr_amount'] == pytest.approx(total['clr_amount'])
+
+
+class TestCLRRoundState:
+    """Test applying contributions to a CLRRoundState matches a full recalculation."""
+
+    @pytest.mark.parametrize('proj, user, amount', [
+        (1, None, 25.0),    # existing contributor to the grant
+        (1, 999, 10.0),     # new contributor to the round
+        (2, 'other', 5.0),  # existing contributor of the round, new to the grant
+    ])
+    def test_add_contribution_matches_full_recalculation(self, proj, user, amount):
+        """Test the incremental totals and bigtot match the dict engine run over the updated round."""
+        curr_agg, trust_dict = synthetic_round(7)
+        if user is None:
+            user = next(iter(curr_agg[proj]))
+        elif user == 'other':
+            user = next(k for k in curr_agg[1] if k not in curr_agg[proj])
+
+        state = build_state(copy.deepcopy(curr_agg), dict(trust_dict))
+        affected = state.add_contribution(proj, user, amount, 1.0)
+
+        expected_agg = copy.deepcopy(curr_agg)
+        expected_agg[proj][user] = expected_agg[proj].get(user, 0) + amount
+        expected_trust = dict(trust_dict)
+        expected_trust.setdefault(user, 1.0)
+        pair_totals, curr_agg_sqrts, _ = clr.get_totals_by_pair(expected_agg)
+        bigtot, totals = clr.calculate_clr(expected_agg, expected_trust, pair_totals, curr_agg_sqrts, 25.0, 2000.0)
+
+        assert proj in affected
+        assert state.bigtot == pytest.approx(bigtot)
+        for grant_id, total in totals.items():
+            assert state.totals[grant_id]['number_contributions'] == total['number_contributions']
+            assert state.totals[grant_id]['contribution_amount'] == pytest.approx(total['contribution_amount'])
+            assert state.totals[grant_id]['clr_amount'] == pytest.approx(total['clr_amount'])
+            if grant_id not in affected:
+                unchanged = build_state(curr_agg, trust_dict).totals[grant_id]
+                assert total['clr_amount'] == pytest.approx(unchanged['clr_amount'])
+
+    def test_clr_prediction_curves_only_for_requested_grants(self):
+        """Test curves are returned for the affected grants only."""
+        curr_agg, trust_dict = synthetic_round(7)
+        state = build_state(curr_agg, trust_dict)
+
+        curves = state.clr_prediction_curves([1, 2])
+
+        assert set(curves.keys()) == {1, 2}
+        assert all(len(curve) == len(clr.POTENTIAL_DONATIONS) for curve in curves.values())
+
+
+class TestStoredCLRRoundState:
+    """Test the round state stored in redis stays equal to a full recalculation."""
+
+    def setup_method(self):
+        self.redis = FakeRedis()
+        self.curr_agg, self.trust_dict = synthetic_round(7)
+        self.clr_round = SimpleNamespace(pk=1, contribution_multiplier=1, record_clr_prediction_curves=MagicMock())
+        self.contribution_model = MagicMock()
+        self.contribution_model.objects.filter.return_value.values_list.return_value = []
+        self.patches = [
+            patch.object(clr_state, 'RedisService', return_value=SimpleNamespace(redis=self.redis)),
+            patch.object(clr_state, 'Contribution', self.contribution_model),
+            patch.object(clr_state, 'fetch_contributions'),
+        ]
+        for patcher in self.patches:
+            patcher.start()
+
+    def teardown_method(self):
+        for patcher in self.patches:
+            patcher.stop()
+
+    def build_state(self):
+        return build_state(copy.deepcopy(self.curr_agg), dict(self.trust_dict))
+
+    def write_state(self):
+        prefix = clr_state._state_prefix(1, 1)
+        clr_state._write_state(self.redis, prefix, self.build_state(), int(time.time()) + clr_state.CLR_ROUND_STATE_TTL)
+        return prefix
+
+    def sample_contributions(self):
+        user = next(iter(self.curr_agg[1]))
+        other = next(k for k in self.curr_agg[1] if k not in self.curr_agg[2])
+        return [
+            contribution(101, 1, user, 25.0),           # existing contributor to the grant
+            contribution(102, 2, other, 5.0),           # existing contributor of the round, new to the grant
+            contribution(103, 1, 999, 10.0, 1.5),       # new contributor to the round
+            contribution(104, 2, 999, 40.0, 1.5),       # and again on another grant
+        ]
+
+    def test_write_and_load_round_trip(self):
+        """Test the loaded parts of a stored state are the parts of the state which was written."""
+        state = self.build_state()
+        prefix = self.write_state()
+        user = next(iter(self.curr_agg[1]))
+
+        assert_matches(stored_totals(self.redis, prefix), (state.bigtot, state.totals))
+
+        loaded = clr_state._load_state(self.redis, prefix, 1, 1, user)
+        assert loaded.curr_agg[1] == pytest.approx(self.curr_agg[1])
+        for grant_id, contribz in loaded.curr_agg.items():
+            assert user in contribz
+            assert set(contribz) <= set(self.curr_agg[1])
+            assert loaded.totals[grant_id]['clr_amount'] == pytest.approx(state.totals[grant_id]['clr_amount'])
+        for k2 in self.curr_agg[1]:
+            if k2 != user:
+                pair_total = state.pair_totals[min(user, k2)][max(user, k2)]
+                assert loaded.pair_totals[min(user, k2)][max(user, k2)] == pytest.approx(pair_total)
+
+        predictions = clr_state._load_prediction_state(self.redis, prefix, 1, [1, 2])
+        assert predictions.bigtot == pytest.approx(state.bigtot)
+        assert set(predictions.curr_agg) == {1, 2}
+        assert predictions.curr_agg[2] == pytest.approx(self.curr_agg[2])
+        for grant_id, total in state.totals.items():
+            assert predictions.totals[grant_id]['clr_amount'] == pytest.approx(total['clr_amount'])
+
+    def test_applied_contributions_match_full_recalculation(self):
+        """Test contributions written to redis as increments leave the state a full recalculation would build."""
+        prefix = self.write_state()
+        contributions = self.sample_contributions()
+
+        for applied in contributions:
+            assert clr_state._apply_contribution(self.redis, self.clr_round, prefix, applied)
+        # a contribution already applied to the version is skipped
+        assert clr_state._apply_contribution(self.redis, self.clr_round, prefix, contributions[0]) == set()
+
+        assert_matches(stored_totals(self.redis, prefix), recalculate(self.curr_agg, self.trust_dict, contributions))
+
+    def test_apply_contribution_to_clr_rounds(self):
+        """Test a contribution is applied to the current version of the round and its curves are recorded."""
+        applied = self.sample_contributions()[0]
+        applied.grant.in_active_clrs.all.return_value = [self.clr_round]
+        self.contribution_model.objects.select_related.return_value.get.return_value = applied
+        clr_state.save_clr_round_state(self.clr_round, self.build_state(), datetime.now(timezone.utc))
+
+        recorded = clr_state.apply_contribution_to_clr_rounds(applied.pk)
+
+        assert 1 in recorded[self.clr_round.pk]
+        prefix = clr_state._current_state_prefix(self.redis, self.clr_round.pk)
+        assert_matches(stored_totals(self.redis, prefix), recalculate(self.curr_agg, self.trust_dict, [applied]))
+
+    def test_contribution_during_a_rebuild_is_replayed(self):
+        """Test a contribution applied to the old version while a full run was rebuilding reaches the new one."""
+        clr_state.save_clr_round_state(
+            self.clr_round, self.build_state(), datetime.now(timezone.utc) - timedelta(minutes=10)
+        )
+        old_prefix = clr_state._current_state_prefix(self.redis, self.clr_round.pk)
+
+        # the rebuild read the contributions before this one was made
+        started_at = datetime.now(timezone.utc) - timedelta(seconds=1)
+        rebuilt = self.build_state()
+        applied = self.sample_contributions()[2]
+        applied.grant.in_active_clrs.all.return_value = [self.clr_round]
+        self.contribution_model.objects.select_related.return_value.get.return_value = applied
+        clr_state.apply_contribution_to_clr_rounds(applied.pk)
+
+        self.contribution_model.objects.select_related.return_value.filter.side_effect = (
+            lambda pk__in, **filters: [applied] if applied.pk in pk__in else []
+        )
+        self.clr_round.record_clr_prediction_curves.reset_mock()
+        clr_state.save_clr_round_state(self.clr_round, rebuilt, started_at)
+
+        prefix = clr_state._current_state_prefix(self.redis, self.clr_round.pk)
+        assert prefix == clr_state._state_prefix(self.clr_round.pk, 2)
+        assert_matches(stored_totals(self.redis, prefix), recalculate(self.curr_agg, self.trust_dict, [applied]))
+        assert not [key for key in self.redis.data if key.startswith(f'{old_prefix}:')]
+        self.clr_round.record_clr_prediction_curves.assert_called_once()
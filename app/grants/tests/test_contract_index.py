@@ -0,0 +1,58 @@
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from app.tests.fake_redis import FakeRedis
+from grants import contract_index
+
+
+def grant(pk, admin_address, network='mainnet'):
+    return SimpleNamespace(pk=pk, admin_address=admin_address, network=network)
+
+
+class TestContractAddressIndex:
+    """Test the contract address index never calls the network on reads."""
+
+    def test_reads_the_page_in_bulk(self):
+        """Test indexed addresses are read and unindexed ones are queued once."""
+        redis = FakeRedis({
+            contract_index.contract_index_key('mainnet', '0xA'): b'1',
+            contract_index.contract_index_key('mainnet', '0xB'): b'0',
+        })
+        task = MagicMock()
+
+        with patch.object(contract_index, 'RedisService', return_value=SimpleNamespace(redis=redis)), \
+                patch('grants.tasks.update_contract_address_index', task), \
+                patch.object(contract_index, 'fetch_is_contract_address') as fetch:
+            grants = [grant(1, '0xA'), grant(2, '0xB'), grant(3, '0xC'), grant(4, '0x0')]
+            index = contract_index.get_contract_address_index(grants)
+            contract_index.get_contract_address_index(grants)
+
+        assert index == {1: True, 2: False, 3: False}
+        task.delay.assert_called_once_with('mainnet', ['0xC'])
+        fetch.assert_not_called()
+
+    def test_index_contract_addresses_stores_results(self):
+        """Test indexing stores the result of each address with the TTL."""
+        redis = FakeRedis()
+        is_contract = lambda network, address: address == '0xA'
+
+        with patch.object(contract_index, 'RedisService', return_value=SimpleNamespace(redis=redis)), \
+                patch.object(contract_index, 'fetch_is_contract_address', side_effect=is_contract):
+            results = contract_index.index_contract_addresses('mainnet', ['0xA', '0xB', '0x0'])
+
+        assert results == {'0xA': True, '0xB': False}
+        assert redis.data[contract_index.contract_index_key('mainnet', '0xa')] == b'1'
+        assert redis.data[contract_index.contract_index_key('mainnet', '0xb')] == b'0'
+
+    def test_failed_lookups_are_not_indexed(self):
+        """Test an address the network couldn't be asked about is left for a later read to queue again."""
+        redis = FakeRedis()
+        web3 = MagicMock()
+        web3.eth.getCode.side_effect = ConnectionError
+
+        with patch.object(contract_index, 'RedisService', return_value=SimpleNamespace(redis=redis)), \
+                patch('dashboard.utils.get_web3', return_value=web3):
+            results = contract_index.index_contract_addresses('mainnet', ['0xA'])
+
+        assert results == {}
+        assert redis.data == {}
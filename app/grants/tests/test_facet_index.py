@@ -0,0 +1,89 @@
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from app.tests.fake_redis import FakeRedis
+from grants import facet_index
+
+
+def grant(pk, grant_type='gr12', tags=(), region=None, tenants=('ETH',)):
+    return SimpleNamespace(
+        pk=pk,
+        grant_type_id=1 if grant_type else None,
+        grant_type=SimpleNamespace(name=grant_type),
+        tags=SimpleNamespace(all=lambda: [SimpleNamespace(name=tag) for tag in tags]),
+        region=region,
+        tenants=list(tenants),
+    )
+
+
+class FakeQuerySet(list):
+    def iterator(self, chunk_size=None):
+        return iter(self)
+
+
+class TestFacetIndex:
+    """Test the per round facet counts."""
+
+    def setup_method(self):
+        self.redis = FakeRedis()
+        self.clr_round = SimpleNamespace(pk=7)
+        self.patch = patch.object(facet_index, 'RedisService', return_value=SimpleNamespace(redis=self.redis))
+        self.patch.start()
+
+    def teardown_method(self):
+        self.patch.stop()
+
+    def test_grant_facets(self):
+        """Test a grant is counted under its type, tags, region and tenants."""
+        facets = facet_index.grant_facets(
+            grant(1, tags=['Ethereum', 'Privacy'], region='africa', tenants=['ETH', 'ZCASH'])
+        )
+
+        assert facets == [
+            'region:africa', 'tag:Ethereum', 'tag:Privacy', 'tenant:ETH', 'tenant:ZCASH', 'total', 'type:gr12'
+        ]
+
+    def test_get_round_facets_builds_the_index_once(self):
+        """Test the first read builds the index and later reads are served from it."""
+        grants = FakeQuerySet([
+            grant(1, tags=['Ethereum'], region='africa'),
+            grant(2, tags=['Ethereum', 'Privacy']),
+            grant(3, grant_type='climate', tenants=['ETH', 'CELO']),
+        ])
+
+        with patch.object(facet_index, '_round_grants', return_value=grants) as round_grants:
+            facets = facet_index.get_round_facets(self.clr_round)
+            assert facet_index.get_round_facets(self.clr_round) == facets
+
+        round_grants.assert_called_once()
+        assert facets == {
+            'total': 3,
+            'type': {'gr12': 2, 'climate': 1},
+            'tag': {'Ethereum': 2, 'Privacy': 1},
+            'region': {'africa': 1},
+            'tenant': {'ETH': 3, 'CELO': 1},
+        }
+
+    def test_move_grant_facets_only_touches_changed_facets(self):
+        """Test a grant changing its facets, joining and leaving the round are applied incrementally."""
+        with patch.object(facet_index, '_round_grants', return_value=FakeQuerySet([grant(1, tags=['Ethereum'])])):
+            facet_index.rebuild_facet_index(self.clr_round)
+
+        facet_index.move_grant_facets(7, 'mainnet', 1, facet_index.grant_facets(grant(1, tags=['Privacy'])))
+        facet_index.move_grant_facets(7, 'mainnet', 2, facet_index.grant_facets(grant(2, region='europe')))
+        facets = facet_index.get_round_facets(self.clr_round)
+        assert facets['total'] == 2
+        assert facets['tag'] == {'Privacy': 1}
+        assert facets['region'] == {'europe': 1}
+
+        facet_index.move_grant_facets(7, 'mainnet', 2, [])
+        facets = facet_index.get_round_facets(self.clr_round)
+        assert facets['total'] == 1
+        assert facets['region'] == {}
+        assert facets['type'] == {'gr12': 1}
+
+    def test_move_grant_facets_skips_unbuilt_index(self):
+        """Test an update never creates a partial index for a round which hasn't been built."""
+        facet_index.move_grant_facets(8, 'mainnet', 1, ['total', 'type:gr12'])
+
+        assert self.redis.data == {}
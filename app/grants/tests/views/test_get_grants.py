@@ -27,3 +27,25 @@ def test_with_grants_created(self, grants):
 
         assert response.status_code == 200
         assert len(response.json()['grants']) == 5
+
+    def test_keyword_search_ranks_exact_title_first(self):
+        profile = ProfileFactory()
+        GrantFactory(title='Gitcoin tooling', last_update=datetime.now(), admin_profile=profile)
+        GrantFactory(title='Gitcoin', last_update=datetime.now(), admin_profile=profile)
+        GrantFactory(title='Unrelated', last_update=datetime.now(), admin_profile=profile)
+        client = Client(HTTP_USER_AGENT='chrome')
+        response = client.get('/grants/cards_info', {'keyword': 'gitcoin', 'sort_option': ''})
+
+        assert response.status_code == 200
+        titles = [grant['title'] for grant in response.json()['grants']]
+        assert titles == ['Gitcoin', 'Gitcoin tooling']
+
+    def test_keyword_search_matches_partial_words_of_the_description(self):
+        profile = ProfileFactory()
+        GrantFactory(title='Wallet', description='A privacy preserving wallet', last_update=datetime.now(),
+                     admin_profile=profile)
+        client = Client(HTTP_USER_AGENT='chrome')
+        response = client.get('/grants/cards_info', {'keyword': 'priv'})
+
+        assert response.status_code == 200
+        assert [grant['title'] for grant in response.json()['grants']] == ['Wallet']
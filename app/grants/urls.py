@@ -21,8 +21,8 @@
 
 from grants.views import (
     GrantSubmissionView, add_grant_from_collection, api_toggle_user_sybil, bulk_fund, bulk_grants_for_cart,
-    cancel_grant_v1, cart_thumbnail, clr_grants, clr_matches, collage, collection_thumbnail, contribute_to_grants_v1,
-    contribution_addr_from_all_as_json, contribution_addr_from_grant_as_json,
+    cancel_grant_v1, cart_thumbnail, clr_grants, clr_matches, clr_simulation_result, collage, collection_thumbnail,
+    contribute_to_grants_v1, contribution_addr_from_all_as_json, contribution_addr_from_grant_as_json,
     contribution_addr_from_grant_during_round_as_json, contribution_addr_from_round_as_json,
     contribution_info_from_grant_during_round_as_json, delete_collection, flag, get_clr_sybil_input, get_collection,
     get_collections_list, get_ethereum_cart_data, get_grant_payload, get_grant_tags, get_grants,
@@ -31,7 +31,7 @@
     grants_bulk_add, grants_by_grant_type, grants_cart_view, grants_info, grants_landing, grants_type_redirect,
     hall_of_fame, ingest_contributions, ingest_contributions_view, ingest_merkle_claim_to_clr_match, invoice,
     leaderboard, manage_ethereum_cart_data, matching_funds, profile, remove_grant_from_collection, save_collection,
-    toggle_grant_favorite, upload_sybil_csv, verify_grant,
+    simulate_clr_round, toggle_grant_favorite, upload_sybil_csv, verify_grant,
 )
 from grants.views_api_vc import contributor_statistics, grantee_statistics
 
@@ -123,6 +123,11 @@
 
     # custom API
     path('v1/api/get-clr-data/<int:round_id>', get_clr_sybil_input, name='get_clr_sybil_input'),
+    path('v1/api/clr/<int:round_id>/simulate', simulate_clr_round, name='simulate_clr_round'),
+    path(
+        'v1/api/clr/<int:round_id>/simulate/<str:simulation_id>', clr_simulation_result,
+        name='clr_simulation_result'
+    ),
     path('v1/api/toggle_user_sybil', api_toggle_user_sybil, name='api_toggle_user_sybil'),
     path('v1/api/upload_sybil_csv', upload_sybil_csv, name='upload_sybil_csv'),
     path('v1/api/ingest_merkle_claim_to_clr_match', ingest_merkle_claim_to_clr_match, name='ingest_merkle_claim_to_clr_match'),
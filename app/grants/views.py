@@ -32,7 +32,6 @@
 from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
 from django.contrib.humanize.templatetags.humanize import intword
-from django.contrib.postgres.search import SearchVector
 from django.core.paginator import EmptyPage, Paginator
 from django.db import connection, transaction
 from django.db.models import Q, Subquery
@@ -64,19 +63,21 @@
 from cacheops import cached_view
 from dashboard.brightid_utils import get_brightid_status
 from dashboard.models import Activity, HackathonProject, Profile, SearchHistory
-from dashboard.tasks import increment_view_count
 from dashboard.utils import get_web3
+from dashboard.view_counts import record_content_views
 from economy.models import Token
 from eth_account.messages import defunct_hash_message
 from grants.clr_data_src import fetch_contributions
+from grants.clr_simulation import create_simulation, get_simulation, validate_variants
+from grants.facet_index import get_round_facets
 from grants.ingest import process_bulk_checkout_tx
 from grants.models import (
     CartActivity, CLRMatch, Contribution, Flag, Grant, GrantAPIKey, GrantBrandingRoutingPolicy, GrantCLR,
-    GrantCollection, GrantHallOfFame, GrantPayout, GrantTag, GrantType, Subscription,
+    GrantCollection, GrantHallOfFame, GrantPayout, GrantTag, GrantType, Subscription, repr_grants,
 )
 from grants.serializers import GrantSerializer
 from grants.tasks import (
-    handle_zksync_ingestion_task, process_bsci_sybil_csv, process_grant_creation_admin_email,
+    handle_zksync_ingestion_task, process_bsci_sybil_csv, process_clr_simulation, process_grant_creation_admin_email,
     process_grant_creation_email, process_notion_db_write, update_grant_metadata,
 )
 from grants.utils import (
@@ -545,16 +546,6 @@ def get_grants(request):
     }
     _grants = get_grants_by_filters(**filters)
 
-    if sort == '' and keyword:
-        # return grants result starting with exact title matches
-        exact_matches = [
-            grant for grant in _grants if grant.title.lower() == keyword.lower()
-        ]
-        non_exact_matches = [
-            grant for grant in _grants if grant.title.lower() != keyword.lower()
-        ]
-        _grants = exact_matches + non_exact_matches
-
     if collection_id and collection_id.isnumeric():
         # 4.1 Fetch grants by collection
         _collections = get_collections(
@@ -613,8 +604,7 @@ def get_grants(request):
 
     # Clean up before sending response
     grants_array = []
-    for grant in grants:
-        grant_json = grant.repr(request.user, request.build_absolute_uri, False)
+    for grant_json in repr_grants(grants, request.user, request.build_absolute_uri):
         if not request.user.is_staff:
             del grant_json['sybil_score']
             del grant_json['weighted_risk_score']
@@ -622,7 +612,7 @@ def get_grants(request):
 
     pks = list([grant.pk for grant in grants])
     if len(pks):
-        increment_view_count.delay(pks, grants[0].content_type, request.user.id, 'index')
+        record_content_views(grants[0].content_type, pks)
 
     has_next = False
     next_page_number = False
@@ -635,6 +625,9 @@ def get_grants(request):
         except EmptyPage:
             pass
 
+    # live counts of the round's grants by type, tag, region and tenant for the filters
+    facets = get_round_facets(clr_rounds[0], network) if len(clr_rounds) else {}
+
     return JsonResponse({
         'applied_filters': {
             'grant_types': grant_types,
@@ -645,8 +638,9 @@ def get_grants(request):
             'customer_name': customer_name,
             'collection_id': collection_id
         },
-        'grant_types': get_grant_clr_types(clr_rounds[0], _grants, network) if len(
-            clr_rounds) and _grants else get_grant_type_cache(network),
+        'grant_types': get_grant_clr_types(clr_rounds[0], _grants, network, facets) if len(
+            clr_rounds) and _grants.exists() else get_grant_type_cache(network),
+        'facets': facets,
         'grants': grants_array,
         'collections': [collection.to_json_dict(request.build_absolute_uri) for collection in collections],
         'credentials': {
@@ -785,11 +779,10 @@ def get_grants_by_filters(
 
     if keyword:
         # 13. Grant search by title & description
-        _grants = _grants.annotate(search=SearchVector('description'))
-        keyword_query = Q(title__icontains=keyword)
-        keyword_query |= Q(search=keyword)
-
-        _grants = _grants.filter(keyword_query)
+        _grants = _grants.search(keyword)
+        if not sort:
+            # without an explicit sort, exact title matches come first followed by the best ranked matches
+            _grants = _grants.order_by('-exact_title_match', '-search_rank', '-created_on')
 
     if sort:
         # 14. Sort filtered grants
@@ -869,7 +862,7 @@ def get_grant_types(network, filtered_grants=None):
     return grant_types
 
 
-def get_grant_clr_types(clr_round, active_grants=None, network='mainnet'):
+def get_grant_clr_types(clr_round, active_grants=None, network='mainnet', facets=None):
     grant_types = []
     if not clr_round:
         return []
@@ -894,6 +887,7 @@ def get_grant_clr_types(clr_round, active_grants=None, network='mainnet'):
             'is_visible': _grant_type.is_visible,
             'funding': int(_grant_type.active_clrs_sum),
             'funding_ui': f"${round(int(_grant_type.active_clrs_sum) / 1000)}k",
+            'count': facets['type'].get(_grant_type.name, 0) if facets else None,
         })
 
     return grant_types
@@ -1263,7 +1257,7 @@ def grant_details(request, grant_id, grant_slug):
 
         if not grant.visible:
             raise Http404
-        increment_view_count.delay([grant.pk], grant.content_type, request.user.id, 'individual')
+        record_content_views(grant.content_type, [grant.pk])
         subscriptions = grant.subscriptions.none()
         cancelled_subscriptions = grant.subscriptions.none()
 
@@ -2355,11 +2349,11 @@ def grants_info(request):
     grants = []
 
     try:
-        for grant in Grant.objects.filter(pk__in=pks.split(',')):
-            if slim:
-                grants.append(grant.cart_payload(request.build_absolute_uri, request.user))
-            else:
-                grants.append(grant.repr(request.user, request.build_absolute_uri))
+        _grants = Grant.objects.filter(pk__in=pks.split(','))
+        if slim:
+            grants = [grant.cart_payload(request.build_absolute_uri, request.user) for grant in _grants]
+        else:
+            grants = repr_grants(_grants, request.user, request.build_absolute_uri, is_detail=True)
     except Exception as e:
         print(e)
         response = {
@@ -2618,7 +2612,7 @@ def remove_grant_from_collection(request, collection_id):
     collection.grants.remove(grant)
     collection.generate_cache()
 
-    grants = [grant.repr(request.user, request.build_absolute_uri) for grant in collection.grants.all()]
+    grants = repr_grants(collection.grants.all(), request.user, request.build_absolute_uri, is_detail=True)
 
     return JsonResponse({
         'grants': grants,
@@ -2637,7 +2631,7 @@ def add_grant_from_collection(request, collection_id):
     collection.grants.add(grant)
     collection.generate_cache()
 
-    grants = [grant.repr(request.user, request.build_absolute_uri) for grant in collection.grants.all()]
+    grants = repr_grants(collection.grants.all(), request.user, request.build_absolute_uri, is_detail=True)
 
     return JsonResponse({
         'grants': grants,
@@ -3088,6 +3082,52 @@ def get_clr_sybil_input(request, round_id):
     return JsonResponse(response)
 
 
+@staff_member_required
+@require_POST
+def simulate_clr_round(request, round_id):
+    '''
+        Read-only what-if simulation of a CLR round
+
+        expects a JSON body of
+            {
+                "network": "mainnet",
+                "refresh": false,
+                "variants": [{"verified_threshold": 20, "total_pot": 500000, "squelched_profile_ids": [1, 2]}]
+            }
+        the simulation runs in a celery task, the returned simulation_id is polled with clr_simulation_result for
+        the per grant deltas of every variant against the round's current parameters
+    '''
+    clr_round = GrantCLR.objects.filter(pk=round_id).first()
+    if not clr_round:
+        return HttpResponseBadRequest("error: round not found")
+
+    try:
+        body = json.loads(request.body)
+        variants = validate_variants(body.get('variants', []))
+    except (ValueError, TypeError) as e:
+        return HttpResponseBadRequest(f"error: {e}")
+
+    simulation_id = create_simulation(clr_round)
+    process_clr_simulation.delay(
+        simulation_id, clr_round.pk, variants, body.get('network', 'mainnet'), refresh=bool(body.get('refresh', False))
+    )
+
+    return JsonResponse({'simulation_id': simulation_id, 'status': 'pending'}, status=202)
+
+
+@staff_member_required
+@require_GET
+def clr_simulation_result(request, round_id, simulation_id):
+    '''
+        Polls a simulation started by simulate_clr_round, answers 202 until it is done
+    '''
+    simulation = get_simulation(simulation_id)
+    if not simulation or simulation['clr_round_pk'] != round_id:
+        raise Http404
+
+    return JsonResponse(simulation, status=202 if simulation['status'] == 'pending' else 200)
+
+
 @csrf_exempt
 def get_trust_bonus(request):
     '''
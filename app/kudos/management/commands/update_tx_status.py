@@ -51,15 +51,17 @@ def process_grants_contribs(self, hours):
         contributions_retry = Contribution.objects.filter(created_on__gt=created_gt, created_on__lt=created_lt, tx_cleared=True, success=False)
 
         print(f"got {contributions.count()} grants contributions to try , {contributions_retry.count()} to retry")
+        # contributions from the same checkout are validated together, their transaction is only looked up once
+        contributions = list(contributions.select_related('subscription'))
+        Contribution.update_tx_statuses(contributions)
         for contrib in contributions:
-            contrib.tx_id
-            contrib.update_tx_status()
             print(f"- syncing contrib / {contrib.pk} / {contrib.subscription.network}")
             contrib.save()
 
         # retry contributions that failed
+        contributions_retry = list(contributions_retry.select_related('subscription'))
+        Contribution.update_tx_statuses(contributions_retry)
         for contrib in contributions_retry:
-            contrib.update_tx_status()
             contrib.save()
 
     # processes all crypto assets
@@ -41,8 +41,8 @@
 import boto3
 from dashboard.models import Activity, Profile, SearchHistory
 from dashboard.notifications import maybe_market_kudos_to_email, maybe_market_kudos_to_github
-from dashboard.tasks import increment_view_count
 from dashboard.utils import get_web3, is_valid_eth_address
+from dashboard.view_counts import record_content_views
 from dashboard.views import record_user_action
 from gas.utils import recommend_min_gas_price_to_confirm_in_time
 from git.utils import get_emails_by_category, get_github_primary_email
@@ -168,7 +168,7 @@ def marketplace(request):
     # increment view counts
     pks = list(token_list.values_list('pk', flat=True))
     if len(pks):
-        increment_view_count.delay(pks, token_list.first().content_type, request.user.id, 'index')
+        record_content_views(token_list.first().content_type, pks)
 
     listings = token_list.order_by(order_by).cache()
     context = {
@@ -252,7 +252,7 @@ def details(request, kudos_id, name):
             contract__address=kudos.contract.address,
         )
         # increment view counts
-        increment_view_count.delay([token.pk], token.content_type, request.user.id, 'individual')
+        record_content_views(token.content_type, [token.pk])
 
         # The real num_cloned_in_wild is only stored in the Gen0 Kudos token
         kudos.num_clones_in_wild = token.num_clones_in_wild
@@ -23,6 +23,7 @@
 from django.db import connection, transaction
 from django.utils import timezone
 
+from dashboard.activity_index import deferred_activity_index
 from dashboard.models import Profile
 from marketing.models import LeaderboardRank
 
@@ -287,5 +288,7 @@ def handle(self, *args, **options):
             cadences.append((QUARTERLY, 'Quarterly'))
         if run_yearly():
             cadences.append((YEARLY, 'Yearly'))
-        for ele in cadences:
-            do_leaderboard_feed(ele[0], ele[1])
+        # the activity index rows of the feeds are written in bulk
+        with deferred_activity_index():
+            for ele in cadences:
+                do_leaderboard_feed(ele[0], ele[1])
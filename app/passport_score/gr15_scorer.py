@@ -1,71 +1,103 @@
-# delay import as this is only available in celery envs
+import numpy as np
 import pandas as pd
 
 
-def compute_apu_scores(
-    gc, stamp_field_names, grouping_fieldnames, grouping_fieldnames_1
-):
-    import datar.all as r
-    from datar.core.factory import func_factory
-
-    @func_factory("agg", "x")
-    def my_paste(x):
-        return ", ".join(x)
-
-
-    @func_factory("agg", "x")
-    def my_len(x):
-        return len(x)
-
-
-    @func_factory("agg", "x")
-    def my_head(x, n=1):
-        return x[0:n]
-
-    grouping_fields = [r.f[fieldname] for fieldname in grouping_fieldnames]
-    grouping_fields_1 = [r.f[fieldname] for fieldname in grouping_fieldnames_1]
-    stamp_fields = [r.f[fieldname] for fieldname in stamp_field_names]
-
-    pca_dat = gc >> r.select(~r.f[grouping_fields_1])
-
-    method_combos = (
-        gc
-        >> r.select(~r.f[grouping_fields])
-        >> r.pivot_longer(
-            cols=[stamp_fields], names_to="Authentication", values_to="Value"
-        )
-        >> r.filter(r.f.Value)
-        >> r.group_by(r.f.user_id)
-        >> r.summarise(
-            Combo=my_paste(r.f.Authentication), Num=my_len(r.f.Authentication)
-        )
-        >> r.group_by(r.f.Combo)
-        >> r.summarise(Count=r.n(), Num=my_head(r.f.Num))
-        >> r.arrange(r.desc(r.f.Count))
-        >> r.group_by(r.f.Num)
-        >> r.mutate(
-            Prop=r.f.Count / r.sum(r.f.Count),
-            Weight=1 - r.f.Prop,
-            Score=r.f.Weight * (1 / pca_dat.shape[1]) + (r.f.Num / pca_dat.shape[1]),
-        )
-        >> r.arrange(r.desc(r.f.Num), r.desc(r.f.Count))
+def encode_stamps(user_ids, stamp_providers, stamp_field_names, users=None):
+    """
+    One-hot encode the stamps of each user as a boolean matrix, 1 row per user and 1 column per provider
+    in stamp_field_names (stamps of other providers are ignored)
+
+    Returns (users, matrix), users being the sorted user ids (or `users` when given, stamps of other users are ignored)
+    """
+    user_ids = np.asarray(user_ids, dtype=np.int64)
+    provider_index = pd.Categorical(stamp_providers, categories=stamp_field_names).codes
+    if users is None:
+        users = np.unique(user_ids)
+    users = np.asarray(users, dtype=np.int64)
+
+    user_index = np.searchsorted(users, user_ids)
+    known = (provider_index >= 0) & (user_index < len(users))
+    known[known] = users[user_index[known]] == user_ids[known]
+
+    matrix = np.zeros((len(users), len(stamp_field_names)), dtype=bool)
+    matrix[user_index[known], provider_index[known]] = True
+    return users, matrix
+
+
+def score_stamp_matrix(matrix, stamp_field_names, num_fields, population=None):
+    """
+    Compute the APU score of each row of the stamp matrix
+
+    The score of a user depends on how common their combination of stamps is among the users with the same number of
+    stamps. The combinations are counted over the rows of the matrix and the rows of `population` (the stamp matrix of
+    the other users, that are not scored)
+
+    Returns a DataFrame with the columns Combo, Count, Num, Prop, Weight & Score for each row, Combo is NaN for rows
+    without stamps
+    """
+    if population is not None and len(population):
+        everyone = np.concatenate([matrix, population])
+    else:
+        everyone = matrix
+
+    # Each combination of stamps is a bitset, the users sharing one are counted by grouping the bitsets
+    bitsets = np.packbits(everyone, axis=1)
+    num = everyone.sum(axis=1)
+    has_stamps = num > 0
+    combos, combo_index, combo_counts = np.unique(
+        bitsets[has_stamps], axis=0, return_inverse=True, return_counts=True
+    )
+    combo_index = combo_index.reshape(-1)
+    users_by_num = np.bincount(num[has_stamps], minlength=everyone.shape[1] + 1)
+
+    # Only the scored rows are returned
+    scored = has_stamps[: len(matrix)]
+    combo_index = combo_index[: scored.sum()]
+    row_num = num[: len(matrix)][scored]
+
+    combo_names = np.array(
+        [
+            ", ".join(np.asarray(stamp_field_names)[combo.astype(bool)])
+            for combo in np.unpackbits(combos, axis=1, count=len(stamp_field_names))
+        ] if len(combos) else [],
+        dtype=object,
     )
 
-    method4_prelim = (
-        gc
-        >> r.select(~r.f[grouping_fields])
-        >> r.pivot_longer(
-            cols=[stamp_fields], names_to="Authentication", values_to="Value"
-        )
-        >> r.filter(r.f.Value)
-        >> r.group_by(r.f.user_id)
-        >> r.summarise(Combo=my_paste(r.f.Authentication))
-        >> r.left_join(method_combos)
+    count = combo_counts[combo_index]
+    prop = count / users_by_num[row_num]
+    weight = 1 - prop
+
+    scores = pd.DataFrame(
+        {
+            "Combo": pd.Series(np.nan, index=range(len(matrix)), dtype=object),
+            "Count": np.nan,
+            "Num": np.nan,
+            "Prop": np.nan,
+            "Weight": np.nan,
+            "Score": np.nan,
+        }
     )
+    scores.loc[scored, "Combo"] = combo_names[combo_index]
+    scores.loc[scored, "Count"] = count
+    scores.loc[scored, "Num"] = row_num
+    scores.loc[scored, "Prop"] = prop
+    scores.loc[scored, "Weight"] = weight
+    scores.loc[scored, "Score"] = weight * (1 / num_fields) + (row_num / num_fields)
+    return scores
+
 
-    method4 = gc >> r.select(r.f.user_id) >> r.left_join(method4_prelim)
+def compute_apu_scores(
+    gc, stamp_field_names, grouping_fieldnames, grouping_fieldnames_1, population=None
+):
+    """
+    Compute the APU score of the users in gc, 1 row per user with a 0/1 column for each provider in stamp_field_names
 
-    method4["Score"].fillna(0, inplace=True)
-    method4 = method4[method4["Combo"].notnull()]
+    Returns a DataFrame with the columns user_id, Combo, Count, Num, Prop, Weight & Score for the users with stamps
+    """
+    num_fields = len(gc.columns.difference(grouping_fieldnames_1))
+    matrix = gc[stamp_field_names].to_numpy() > 0
 
-    return method4
+    scores = score_stamp_matrix(matrix, stamp_field_names, num_fields, population)
+    scores.insert(0, "user_id", gc["user_id"].to_numpy())
+    scores = scores[scores["Combo"].notnull()].reset_index(drop=True)
+    return scores.astype({"Count": int, "Num": int, "Score": float})
@@ -2,26 +2,52 @@
 from datetime import datetime
 
 from django.core.management.base import BaseCommand
+from django.utils import timezone
 
-from passport_score.utils import get_new_trust_bonus, save_gr15_trustbonus_records
+from passport_score.utils import (
+    get_changed_user_ids, get_new_trust_bonus, get_trust_bonus_scores_written_until, get_trust_bonus_watermark,
+    save_gr15_trustbonus_records, set_trust_bonus_watermark,
+)
 
 
 class Command(BaseCommand):
     help = "Calculates the APU score for GR15 based on the currently submitted passports & stamps"
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--incremental",
+            action="store_true",
+            help="only rescore the users whose passport or stamps changed since the last calculation",
+        )
+
     def handle(self, *args, **options):
         try:
             start = datetime.now()
             self.stdout.write(self.style.SUCCESS(f"{datetime.now()} START"))
 
-            df_gr15_trust_bonus = get_new_trust_bonus().round(18)
+            calculation_time = timezone.now()
+            user_ids = None
+            watermark = get_trust_bonus_watermark() if options["incremental"] else None
+            if watermark:
+                scores_written_until = get_trust_bonus_scores_written_until()
+                user_ids = get_changed_user_ids(watermark, scores_written_until)
+                self.stdout.write(self.style.SUCCESS(f"{len(user_ids)} users changed since {watermark}"))
+                if not user_ids:
+                    set_trust_bonus_watermark(calculation_time, scores_written_until)
+                    self.stdout.write(self.style.SUCCESS(f"{datetime.now()} DONE"))
+                    return
+            elif options["incremental"]:
+                self.stdout.write(self.style.WARNING("No previous calculation, rescoring all users"))
+
+            df_gr15_trust_bonus = get_new_trust_bonus(user_ids).round(18)
 
             # df_gr15_trust_bonus_changed = df_gr15_trust_bonus.loc[
             #     df_gr15_trust_bonus.original_trust_bonus != df_gr15_trust_bonus.trust_bonus
             # ]
 
             # save_gr15_trustbonus_records(df_gr15_trust_bonus_changed)
-            save_gr15_trustbonus_records(df_gr15_trust_bonus)
+            scores_written_until = save_gr15_trustbonus_records(df_gr15_trust_bonus)
+            set_trust_bonus_watermark(calculation_time, scores_written_until)
 
             self.stdout.write(self.style.SUCCESS("=" * 80))
             self.stdout.write(self.style.SUCCESS("%s" % df_gr15_trust_bonus))
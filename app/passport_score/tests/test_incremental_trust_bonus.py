@@ -0,0 +1,117 @@
+from django.contrib.auth.models import User
+from django.utils import timezone
+
+import pytest
+from dashboard.models import Passport, PassportStamp
+from passport_score.gr15_providers import providers
+from passport_score.models import GR15TrustScore
+from passport_score.utils import (
+    get_changed_user_ids, get_new_trust_bonus, get_trust_bonus_scores_written_until, get_trust_bonus_watermark,
+    save_gr15_trustbonus_records, set_trust_bonus_watermark,
+)
+from test_plus.test import TestCase
+
+NUM_USERS = 6
+
+CURRENT_PASSWORD = "mimamamemima"
+usernames = [f"incremental_user_{i}" for i in range(NUM_USERS)]
+
+
+def create_stamps(stamps_list):
+    for username, stamp_providers in stamps_list:
+        passport = Passport.objects.get(user__username=username)
+        for provider in stamp_providers:
+            PassportStamp.objects.create(
+                passport=passport,
+                user=passport.user,
+                stamp_id=f"{passport.user.id}_{passport.id}_{provider}",
+                stamp_provider=provider,
+                stamp_credential={"type": "test"},
+            )
+
+
+def run_calculation(user_ids=None):
+    calculation_time = timezone.now()
+    scores_written_until = save_gr15_trustbonus_records(get_new_trust_bonus(user_ids).round(18))
+    set_trust_bonus_watermark(calculation_time, scores_written_until)
+    return calculation_time
+
+
+def scores():
+    return {
+        gr15.user.username: (gr15.last_apu_score, gr15.trust_bonus, sorted(gr15.stamps))
+        for gr15 in GR15TrustScore.objects.select_related("user")
+    }
+
+
+@pytest.mark.django_db
+class TestIncrementalTrustBonus(TestCase):
+    """Test rescoring only the users whose stamps changed since the last calculation."""
+
+    def setUp(self):
+        self.users = [
+            User.objects.create(password=CURRENT_PASSWORD, username=username)
+            for username in usernames
+        ]
+
+        self.passports = [
+            Passport.objects.create(
+                user=user, did=user.username, passport={"type": user.username}
+            )
+            for user in self.users
+        ]
+
+        create_stamps(
+            [
+                ("incremental_user_0", ["Google"]),
+                ("incremental_user_1", ["Google", "Facebook"]),
+                ("incremental_user_2", ["Google", "Facebook"]),
+                ("incremental_user_3", ["Twitter", "Facebook"]),
+                ("incremental_user_4", providers[:10]),
+                ("incremental_user_5", providers),
+            ]
+        )
+
+    def test_watermark(self):
+        """Test the watermark is the start time of the last calculation"""
+        assert get_trust_bonus_watermark() is None
+
+        calculation_time = run_calculation()
+
+        assert get_trust_bonus_watermark() == calculation_time
+        assert get_changed_user_ids(calculation_time, get_trust_bonus_scores_written_until()) == []
+
+    def test_records_are_stamped_with_their_write_time(self):
+        """Test the records written by a calculation are seen as changed by readers which started during it"""
+        calculation_time = run_calculation()
+        scores_written_until = get_trust_bonus_scores_written_until()
+
+        for gr15 in GR15TrustScore.objects.all():
+            assert calculation_time < gr15.modified_on <= scores_written_until
+        assert GR15TrustScore.objects.filter(modified_on__gt=calculation_time).count() == NUM_USERS
+
+    def test_only_changed_users_are_rescored(self):
+        """Test an incremental calculation rescores the changed users like a full calculation would"""
+        watermark = run_calculation()
+        initial_scores = scores()
+
+        create_stamps([("incremental_user_0", ["Facebook"]), ("incremental_user_3", ["Google"])])
+        user_ids = get_changed_user_ids(watermark, get_trust_bonus_scores_written_until())
+        assert user_ids == [self.users[0].id, self.users[3].id]
+
+        run_calculation(user_ids)
+        incremental_scores = scores()
+
+        # The users which did not change keep their records
+        for username in usernames[1:3] + usernames[4:]:
+            assert incremental_scores[username] == initial_scores[username]
+        assert incremental_scores["incremental_user_0"][2] == ["Facebook", "Google"]
+        assert incremental_scores["incremental_user_3"][2] == ["Facebook", "Google", "Twitter"]
+
+        # The changed users are scored with the stamp combinations of every user, the trust bonus of the others is
+        # only refreshed by the next full calculation so it may differ
+        run_calculation()
+        full_scores = scores()
+        for username in ["incremental_user_0", "incremental_user_3"]:
+            assert incremental_scores[username][0] == full_scores[username][0]
+            assert incremental_scores[username][2] == full_scores[username][2]
@@ -4,17 +4,29 @@
 from pprint import pprint
 
 from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 
 import numpy as np
 import pandas as pd
 from dashboard.models import Passport, PassportStamp, Profile
 from passport_score.gr15_providers import providers
+from passport_score.gr15_scorer import compute_apu_scores, encode_stamps
 from passport_score.models import GR15TrustScore
+from perftools.models import JSONStore
 
 MAX_TRUST_BONUS = 1.5
 MIN_TRUST_BONUS = 0.5
 
+# where the start time of the last GR15 trust bonus calculation and the time it finished writing its records are
+# stored (see get_changed_user_ids)
+TRUST_BONUS_WATERMARK_VIEW = "gr15_trust_bonus"
+TRUST_BONUS_WATERMARK_KEY = "watermark"
+
+# GR15TrustScore records written back by a single UPDATE
+TRUST_BONUS_BATCH_SIZE = 5000
+
 
 def get_min_apu_for_user(user_id):
     num_user_stamps = PassportStamp.objects.filter(user_id=user_id).count()
@@ -201,7 +213,7 @@ def handle_submitted_stamps(db_passport, user_id, stamp_list):
 
 
 
-def load_passport_stamps():
+def load_passport_stamps(user_ids=None):
     """
     Load stamps from the grants database & prepares the data for input into the GR15 scoring algorithm
     Will return a dataframe like:
@@ -212,115 +224,65 @@ def load_passport_stamps():
             - 1 - if all the stamps already in GR15TrustScore have been kept by the user
             - 0 - if stamps from GR15TrustScore have been deleted by the user
 
+    Only the stamps of `user_ids` are loaded when given (see get_changed_user_ids)
     """
 
-    # Load stamps and store them into a dataframe
-    stamps_from_db = PassportStamp.objects.values("user_id", "stamp_provider")
-    if stamps_from_db:
-        df = pd.DataFrame(stamps_from_db)
-    else:
-        df = pd.DataFrame.from_dict(
-            {
-                "user_id": [],
-                "stamp_provider": [],
-            }
-        )
-
-    df_stamps_processed_from_db = GR15TrustScore.objects.values("user_id", "stamps")
-    if df_stamps_processed_from_db:
-        df_stamps_processed_last_calculation_round = pd.DataFrame(
-            df_stamps_processed_from_db
-        )
-    else:
-        df_stamps_processed_last_calculation_round = pd.DataFrame.from_dict(
-            {
-                "user_id": [],
-                "stamps": [],
-            }
-        )
+    # Load the current stamps & the stamps scored in the last calculation
+    stamps = PassportStamp.objects.filter(user__isnull=False).values_list("user_id", "stamp_provider")
+    stamps_processed = GR15TrustScore.objects.values_list("user_id", "stamps")
+    if user_ids is not None:
+        stamps = stamps.filter(user_id__in=user_ids)
+        stamps_processed = stamps_processed.filter(user_id__in=user_ids)
 
-    # df_user_stamp_list = df.groupby("user_id")["stamp_provider"].apply(list)
-    # print("User stamp list:\n", df_user_stamp_list)
+    stamps = list(stamps)
+    stamp_user_ids = np.array([user_id for user_id, _ in stamps], dtype=np.int64)
+    stamp_providers = np.array([provider for _, provider in stamps], dtype=object)
 
-    df_stamps = df.copy()
-    df_stamps["is_stamp_preserved"] = 1
     # TODO: removed duplicate stamps
-    df_stamps_processed_last_calculation_round['stamps'] = df_stamps_processed_last_calculation_round.stamps.apply(set).apply(list)
-    df_stamps_processed_last_calculation_round = (
-        df_stamps_processed_last_calculation_round.explode("stamps")
-    )
-    # Drop any rows that will contain NaN provider (these users have no stamps)
-    df_stamps_processed_last_calculation_round.dropna(inplace=True)
-    print(
-        "===> df_stamps_processed_last_calculation_round:\n",
-        df_stamps_processed_last_calculation_round,
-    )
-    # Merge:
-    #   - left - the stamps processed last time
-    #   - right - all the current stamps
-    #   - how='outer'  => this will get us empty cells in the columns of the left
-    #       dataset, which will indicate stamps that have been removed
-    # And we will add a column which is_stamp_preserved will contain 1 is the stamp was present in the previous calc, 0 otherwise
-    df_stamp_overview = df_stamps_processed_last_calculation_round.merge(
-        df_stamps,
-        how="outer",
-        left_on=["user_id", "stamps"],
-        right_on=["user_id", "stamp_provider"],
-    )
-
-    print("===> df_stamp_overview:\n", df_stamp_overview)
-    # Set the value of is_stamp_preserved to 0, in cases where a stamp has been removed compared to the previous calculatioin
-    df_stamp_overview.loc[
-        df_stamp_overview.is_stamp_preserved != 1, "is_stamp_preserved"
-    ] = 0
-
-    print("df_stamp_overview:\n", df_stamp_overview)
-
-    # Get list of all unique provider names
-    # providers = [p for p in df.stamp_provider.unique() if p]
-    print("Providers: ", providers)
+    processed_user_ids, processed_providers = [], []
+    for user_id, user_stamps in stamps_processed:
+        for stamp in set(user_stamps or []):
+            if stamp is not None:
+                processed_user_ids.append(user_id)
+                processed_providers.append(stamp)
+    processed_user_ids = np.array(processed_user_ids, dtype=np.int64)
+
+    # 1 row per user with current stamps or stamps scored last time (these may have removed all their stamps)
+    users = np.unique(np.concatenate([stamp_user_ids, processed_user_ids]))
     print("Providers count: ", len(providers))
+    print("Users count: ", len(users))
 
-    # Insert a column for each provider, set 0 as default and 1 if the user owns that stamp
+    # One-hot encode the providers of each user (stamps of providers which are not configured are not scored)
     # Example:
-    #     user_id   stamp_provider     google facebook twitter      ...
-    #     1         google              1      0        0
-    #     1         facebook            0      1        0
-    #     1         twitter             0      0        1
-    #     2         google              1      0        0
-    #     3         facebook            0      1        0
-    #     3         twitter             0      0        1
-    #   ...
-    for p in providers:
-        df_stamp_overview[p] = 0
-        df_stamp_overview.loc[df_stamp_overview["stamp_provider"] == p, p] = 1
-
-    # Group by user_id, performing max aggrgation withina group.
-    # The result will be that we have 1 row per user, and  each row will contain the
-    # following in the specific provider columns:
-    #       0 if the user DOES NOT HAVE that stamp
-    #       1 if the user has that stamp
-    # The example from above becomes:
     #     user_id   google facebook twitter      ...
     #     1          1      1        1
     #     2          1      0        0
     #     3          0      1        1
     #   ...
-    aggregation_rule = {k: "max" for k in providers}
-
-    def list_exclude_nan(iterable):
-        return list([x for x in iterable if not pd.isna(x)])
-
-    # We will exclude the nan values from the list of providers, we'll only store the new valid ones
-    aggregation_rule["stamp_provider"] = list_exclude_nan
-    # is_stamp_preserved will contain 1 is the stamp was present in the previous calc, 0 otherwise
-    # we want to identify the users that had a stamp removed (we will recalculate the trust bonus even this means lowering the score)
-    # By applying min, we identify thoses users (as they end up having 0)
-    aggregation_rule["is_stamp_preserved"] = min
-    print("grouping ...")
-    prepared_df = df_stamp_overview.groupby(["user_id"]).agg(aggregation_rule)
+    users, stamp_matrix = encode_stamps(stamp_user_ids, stamp_providers, providers, users)
+
+    # is_stamp_preserved will contain 1 is all the stamps present in the previous calc are still present, 0 otherwise
+    # we want to identify the users that had a stamp removed (we will recalculate the trust bonus even this means
+    # lowering the score)
+    df_stamp_overview = pd.DataFrame(
+        {"user_id": processed_user_ids, "stamp_provider": pd.Series(processed_providers, dtype=object)}
+    ).merge(
+        pd.DataFrame({"user_id": stamp_user_ids, "stamp_provider": stamp_providers}).drop_duplicates(),
+        how="left",
+        indicator=True,
+    )
+    is_stamp_removed = (df_stamp_overview["_merge"] == "left_only").to_numpy()
+    is_stamp_preserved = np.ones(len(users), dtype=int)
+    is_stamp_preserved[np.searchsorted(users, df_stamp_overview.user_id.to_numpy()[is_stamp_removed])] = 0
+
+    # The current providers of each user, an empty list for users who removed all their stamps
+    current_stamps = pd.Series(stamp_providers, dtype=object).groupby(stamp_user_ids).agg(list).reindex(users)
+
+    prepared_df = pd.DataFrame(stamp_matrix.astype(int), columns=providers)
+    prepared_df["stamp_provider"] = [stamps if isinstance(stamps, list) else [] for stamps in current_stamps]
+    prepared_df["is_stamp_preserved"] = is_stamp_preserved
+    prepared_df.insert(0, "user_id", users)
     print("prepared_df\n", prepared_df)
-    prepared_df.reset_index(inplace=True)
 
     # Reset the index, we want to have the user_id as separate column
     grouping_fields_1 = ["user_id", "stamp_provider", "is_stamp_preserved"]
@@ -331,11 +293,87 @@ def list_exclude_nan(iterable):
     return (prepared_df, providers, grouping_fields, grouping_fields_1)
 
 
-def calculate_trust_bonus(df_existing_gr15_scores, df_apu_scores):
+def get_changed_user_ids(since, scores_written_until=None):
+    """
+    The users whose passport, stamps or trust score record changed since the timestamp: these are the
+    users rescored by an incremental calculation
+
+    The trust score records written by the last calculation itself (until `scores_written_until`) are not changes
+    """
+    user_ids = set(
+        PassportStamp.objects.filter(modified_on__gt=since, user__isnull=False).values_list("user_id", flat=True)
+    )
+    user_ids.update(
+        Passport.objects.filter(modified_on__gt=since).values_list("user_id", flat=True)
+    )
+    user_ids.update(
+        GR15TrustScore.objects.filter(
+            modified_on__gt=max(since, scores_written_until or since)
+        ).values_list("user_id", flat=True)
+    )
+    user_ids.discard(None)
+    return sorted(user_ids)
+
+
+def load_scored_population(user_ids):
+    """
+    Load the stamp matrix & APU score of the users which are not rescored by an incremental calculation
+
+    Their stamps have not changed since they were last scored, so the stamps recorded in GR15TrustScore are their
+    current stamps. The combinations of these stamps are counted with the ones of the rescored users and the APU
+    median & min are computed over all the scores.
+    """
+    scored = GR15TrustScore.objects.exclude(user_id__in=user_ids).values_list("user_id", "stamps", "last_apu_score")
+
+    scored_user_ids, apu_scores, stamp_user_ids, stamp_providers = [], [], [], []
+    for user_id, stamps, last_apu_score in scored:
+        scored_user_ids.append(user_id)
+        apu_scores.append(float(last_apu_score))
+        for stamp in set(stamps or []):
+            stamp_user_ids.append(user_id)
+            stamp_providers.append(stamp)
+
+    _, population = encode_stamps(
+        stamp_user_ids, np.array(stamp_providers, dtype=object), providers, np.unique(scored_user_ids)
+    )
+    return population, pd.Series(apu_scores, index=scored_user_ids, dtype=float)
+
+
+def _get_trust_bonus_watermark(field):
+    store = JSONStore.objects.filter(view=TRUST_BONUS_WATERMARK_VIEW, key=TRUST_BONUS_WATERMARK_KEY).first()
+    if not store or not store.data.get(field):
+        return None
+    return parse_datetime(store.data[field])
+
+
+def get_trust_bonus_watermark():
+    """The time the last GR15 trust bonus calculation started at, None if it never ran"""
+    return _get_trust_bonus_watermark("timestamp")
+
+
+def get_trust_bonus_scores_written_until():
+    """The time the last GR15 trust bonus calculation finished writing its records, None if it never ran"""
+    return _get_trust_bonus_watermark("scores_written_until")
+
+
+def set_trust_bonus_watermark(timestamp, scores_written_until=None):
+    data = {"timestamp": timestamp.isoformat()}
+    if scores_written_until:
+        data["scores_written_until"] = scores_written_until.isoformat()
+    JSONStore.objects.update_or_create(
+        view=TRUST_BONUS_WATERMARK_VIEW,
+        key=TRUST_BONUS_WATERMARK_KEY,
+        defaults={"data": data},
+    )
+
+
+def calculate_trust_bonus(df_existing_gr15_scores, df_apu_scores, other_apu_scores=None):
     """Calculate the new trust bonus score based on:
 
     df_existing_gr15_scores - the current set of records from the DB (the previous run)
     df_apu_scores - the newly computed APU scores
+    other_apu_scores - the APU scores of the users which are not rescored (incremental calculation), these count
+        towards the APU median & min
     """
     # Set the user_id as index, as we will join on that
     # df_existing_gr15_scores.set_index("user_id", inplace=True)
@@ -351,8 +389,11 @@ def calculate_trust_bonus(df_existing_gr15_scores, df_apu_scores):
     df_gr15_scores.Score.fillna(0.0, inplace=True)
     print("Score:\n", df_gr15_scores.Score)
 
-    apu_median = df_gr15_scores.Score.median()
-    apu_min = df_gr15_scores.Score.min()
+    all_apu_scores = df_gr15_scores.Score.astype(float)
+    if other_apu_scores is not None:
+        all_apu_scores = pd.concat([all_apu_scores, other_apu_scores])
+    apu_median = all_apu_scores.median()
+    apu_min = all_apu_scores.min()
     print("APU median: %s" % apu_median)
     print("APU min: %s" % apu_min)
 
@@ -420,11 +461,11 @@ def calculate_trust_bonus(df_existing_gr15_scores, df_apu_scores):
     return df_gr15_scores
 
 
-def get_new_trust_bonus():
-
-    # delay import as this is only available in newer envs ...
-    from passport_score.gr15_scorer import compute_apu_scores
-
+def get_new_trust_bonus(user_ids=None):
+    """
+    Compute the trust bonus of every user, or only of `user_ids` (incremental calculation). The users which are not
+    rescored still count towards the stamp combination frequencies and the APU median & min.
+    """
     try:
         ###################################################################################
         # Load the data and compute the APU score
@@ -437,11 +478,16 @@ def get_new_trust_bonus():
             stamp_fields,
             grouping_fields,
             grouping_fields_1,
-        ) = load_passport_stamps()
+        ) = load_passport_stamps(user_ids)
+
+        population, other_apu_scores = None, None
+        if user_ids is not None:
+            print("Loading the scores of the users which are not rescored")
+            population, other_apu_scores = load_scored_population(user_ids)
 
         print("Running scorer")
         df_apu_scores = compute_apu_scores(
-            prepared_df, stamp_fields, grouping_fields, grouping_fields_1
+            prepared_df, stamp_fields, grouping_fields, grouping_fields_1, population
         )
 
         df_apu_scores.set_index("user_id", inplace=True)
@@ -488,6 +534,8 @@ def get_new_trust_bonus():
             "trust_bonus_calculation_time",
             "stamps",
         )
+        if user_ids is not None:
+            existing_gr15_scores = existing_gr15_scores.filter(user_id__in=user_ids)
 
         # Create a DataFrame for the data, handle the case when the dataset loaded from DB is empty
         if existing_gr15_scores:
@@ -518,7 +566,7 @@ def get_new_trust_bonus():
         df_existing_gr15_scores[
             "original_trust_bonus"
         ] = df_existing_gr15_scores.trust_bonus
-        df_gr15_scores = calculate_trust_bonus(df_existing_gr15_scores, df_apu_scores)
+        df_gr15_scores = calculate_trust_bonus(df_existing_gr15_scores, df_apu_scores, other_apu_scores)
 
         return df_gr15_scores
     except Exception as exc:
@@ -528,69 +576,93 @@ def get_new_trust_bonus():
         raise CommandError("An unexpected error occured")
 
 
+def _update_gr15_trustbonus_records(records):
+    """Update the records with one UPDATE ... FROM (VALUES ...) per batch, stamped with the time of the batch"""
+    fields = [
+        ("last_apu_score", "numeric"),
+        ("max_apu_score", "numeric"),
+        ("trust_bonus", "numeric"),
+        ("last_apu_calculation_time", "timestamptz"),
+        ("max_apu_calculation_time", "timestamptz"),
+        ("trust_bonus_calculation_time", "timestamptz"),
+        ("stamps", "jsonb"),
+    ]
+    row = "(%s::integer, " + ", ".join(f"%s::{cast}" for _, cast in fields) + ")"
+    assignments = ", ".join(f"{field} = v.{field}" for field, _ in fields)
+    columns = ", ".join(field for field, _ in fields)
+
+    with connection.cursor() as cursor:
+        for start in range(0, len(records), TRUST_BONUS_BATCH_SIZE):
+            batch = records[start:start + TRUST_BONUS_BATCH_SIZE]
+            cursor.execute(
+                f"UPDATE {GR15TrustScore._meta.db_table} AS t SET {assignments}, modified_on = %s "
+                f"FROM (VALUES {', '.join([row] * len(batch))}) AS v(id, {columns}) WHERE t.id = v.id",
+                [timezone.now()] + [value for record in batch for value in record],
+            )
+
+
 def save_gr15_trustbonus_records(df_gr15_scores):
     ###################################################################################
     # Write the new scores back to the DB
     ###################################################################################
-    # Determine the records to be created in the DB (for new users that have submitted their passport) and the ones to be created
+    # modified_on is the time each record is written, so readers of the changed records (the CLR snapshot) see
+    # them whenever they read. The returned time the writes finished at lets an incremental calculation skip the
+    # records written by the previous one (see get_changed_user_ids)
+
+    def column(name):
+        # numpy scalars can't be passed to the DB driver
+        return [value.item() if isinstance(value, np.generic) else value for value in df_gr15_scores[name].tolist()]
+
+    def datetime_column(name):
+        return list(pd.to_datetime(df_gr15_scores[name], utc=True).dt.to_pydatetime())
+
+    # TODO: doe to an issue, this array is acumulating ampty string stamps ...
+    stamps = [
+        sorted({stamp for stamp in current_stamps if stamp}) if isinstance(current_stamps, list) else []
+        for current_stamps in column("current_stamps")
+    ]
+    records = list(zip(
+        column("from_db"),
+        column("id"),
+        df_gr15_scores.index.tolist(),
+        column("last_apu_score"),
+        column("max_apu_score"),
+        column("trust_bonus"),
+        datetime_column("last_apu_calculation_time"),
+        datetime_column("max_apu_calculation_time"),
+        datetime_column("trust_bonus_calculation_time"),
+        stamps,
+    ))
+
+    # Determine the records to be created in the DB (for new users that have submitted their passport) and the ones
+    # to be updated
     new_records = [
         GR15TrustScore(
             user_id=user_id,
-            last_apu_score=data.last_apu_score,
-            max_apu_score=data.max_apu_score,
-            trust_bonus=data.trust_bonus,
-            last_apu_calculation_time=data.last_apu_calculation_time,
-            max_apu_calculation_time=data.max_apu_calculation_time,
-            trust_bonus_calculation_time=data.trust_bonus_calculation_time,
-            stamps=[
-                stamp for stamp in list(set(data.current_stamps)) if stamp
-            ],  # TODO: doe to an issue, this array is acumulating ampty string stamps ...
+            last_apu_score=last_apu_score,
+            max_apu_score=max_apu_score,
+            trust_bonus=trust_bonus,
+            last_apu_calculation_time=last_apu_calculation_time,
+            max_apu_calculation_time=max_apu_calculation_time,
+            trust_bonus_calculation_time=trust_bonus_calculation_time,
+            stamps=user_stamps,
+            modified_on=timezone.now(),
         )
-        for user_id, data in df_gr15_scores.loc[
-            df_gr15_scores.from_db != True
-        ].iterrows()
+        for from_db, _, user_id, last_apu_score, max_apu_score, trust_bonus, last_apu_calculation_time,
+        max_apu_calculation_time, trust_bonus_calculation_time, user_stamps in records
+        if from_db != True
     ]
-
     records_from_db = [
-        GR15TrustScore(
-            id=data.id,
-            user_id=user_id,
-            last_apu_score=data.last_apu_score,
-            max_apu_score=data.max_apu_score,
-            trust_bonus=data.trust_bonus,
-            last_apu_calculation_time=data.last_apu_calculation_time,
-            max_apu_calculation_time=data.max_apu_calculation_time,
-            trust_bonus_calculation_time=data.trust_bonus_calculation_time,
-            stamps=[
-                stamp for stamp in list(set(data.current_stamps)) if stamp
-            ],  # TODO: doe to an issue, this array is acumulating ampty string stamps ...
-        )
-        for user_id, data in df_gr15_scores.loc[
-            df_gr15_scores.from_db == True
-        ].iterrows()
+        (int(record_id), *values[:-1], json.dumps(values[-1]))
+        for from_db, record_id, _, *values in records
+        if from_db == True
     ]
 
-    # print("\nRecords to be updated: \n%s" % records_from_db)
-    print("\nNew records to be created: \n%s" % new_records)
-
     # Bulk creating new records
     print("\nBulk creating new records (count=%s)\n" % len(new_records))
     GR15TrustScore.objects.bulk_create(new_records, batch_size=10000)
 
     # Bulk updating existing records
     print("\nBulk updating existing records (count=%s)\n" % len(records_from_db))
-
-    GR15TrustScore.objects.bulk_update(
-        records_from_db,
-        [
-            "user_id",
-            "last_apu_score",
-            "max_apu_score",
-            "trust_bonus",
-            "last_apu_calculation_time",
-            "max_apu_calculation_time",
-            "trust_bonus_calculation_time",
-            "stamps",
-        ],
-        batch_size=10000
-    )
+    _update_gr15_trustbonus_records(records_from_db)
+    return timezone.now()
@@ -237,9 +237,12 @@ def compute_gr15_apu():
             ].iterrows()
         ]
 
+        # bulk_update skips SuperModel.save, modified_on is set so that the CLR snapshots pick up the new trust bonuses
+        modified_on = timezone.now()
         records_from_db = [
             GR15TrustScore(
                 id=data.id,
+                modified_on=modified_on,
                 user_id=user_id,
                 last_apu_score=data.last_apu_score,
                 max_apu_score=data.max_apu_score,
@@ -274,6 +277,7 @@ def compute_gr15_apu():
                 "trust_bonus",
                 "last_apu_calculation_time",
                 "max_apu_calculation_time",
+                "modified_on",
             ],
         )
     except Exception as exc:
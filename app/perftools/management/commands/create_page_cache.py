@@ -82,6 +82,15 @@ def create_grant_type_cache():
                 )
 
 
+def create_grant_facet_cache():
+    print('create_grant_facet_cache')
+    from grants.facet_index import rebuild_facet_index
+    from grants.models import GrantCLR
+    for clr_round in GrantCLR.objects.filter(is_active=True):
+        for network in ['rinkeby', 'mainnet']:
+            rebuild_facet_index(clr_round, network)
+
+
 def create_grant_active_clr_mapping():
     print('create_grant_active_clr_mapping')
 
@@ -368,6 +377,7 @@ def handle(self, *args, **options):
         operations = []
         operations.append(create_grant_active_clr_mapping)
         operations.append(create_grant_type_cache)
+        operations.append(create_grant_facet_cache)
         operations.append(create_grant_clr_cache)
 
         if not settings.DEBUG:
@@ -23,7 +23,7 @@
 from json import loads as json_parse
 
 from django.conf import settings
-from django.db.models import Count, Q, Subquery
+from django.db.models import Count, Q, Subquery, prefetch_related_objects
 from django.http import Http404, JsonResponse
 from django.shortcuts import redirect
 from django.template.response import TemplateResponse
@@ -38,13 +38,14 @@
 from dashboard.models import Activity, HackathonEvent, Profile, Tip
 from dashboard.notifications import amount_usdt_open_work, open_bounties
 from dashboard.tasks import grant_update_email_task
+from dashboard.timelines import paginate_activities
+from dashboard.view_counts import record_views
 from economy.models import Token
 from marketing.mails import mention_email, new_funding_limit_increase_request, new_token_request, wall_post_email
 from marketing.models import EmailInventory, ImageDropZone
 from perftools.models import JSONStore, StaticJsonEnv
 from ratelimit.decorators import ratelimit
 from retail.helpers import get_ip
-from townsquare.tasks import increment_view_counts
 from townsquare.utils import can_pin
 
 from .forms import FundingLimitIncreaseRequestForm
@@ -786,15 +787,15 @@ def results(request, keyword=None):
     context['avatar_url'] = static('v2/images/results_preview.gif')
     return TemplateResponse(request, 'results.html')
 
-def get_specific_activities(what, trending_only, user, after_pk, request=None, page=1, page_size=10):
+def get_specific_activities(what, trending_only, user, after_pk, request=None, cursor=None, page_size=10):
+    """Return a page of the activities of a feed and the cursor of the next page."""
 
     # 1. Init
     view_count_threshold = 10
-    start_index = (page-1) * page_size
-    end_index = page * page_size
 
     activities = Activity.objects.none()
     filter_applied = False
+    timeline = None
 
     # 2. Choose which filter to index
 
@@ -804,14 +805,11 @@ def get_specific_activities(what, trending_only, user, after_pk, request=None, p
     ):
         activities = Activity.objects.filter(activities_index__key__startswith='grant:')
         filter_applied = True
+        timeline = 'grants'
     elif 'grant:' in what:
         activities = Activity.objects.filter(activities_index__key=what)
         filter_applied = True
-
-    # all Grants
-    if what == 'all_grants':
-        activities = Activity.objects.filter(activities_index__key__startswith='grant:')
-        filter_applied = True
+        timeline = what
 
     # kudos
     if (
@@ -819,14 +817,17 @@ def get_specific_activities(what, trending_only, user, after_pk, request=None, p
     ):
         activities = Activity.objects.filter(activities_index__key__startswith='kudo:')
         filter_applied = True
+        timeline = 'kudos'
     elif 'kudos:' in what:
         activities = Activity.objects.filter(activities_index__key=what.replace('kudos', 'kudo'))
         filter_applied = True
+        timeline = what.replace('kudos', 'kudo')
 
     # hackathon project
     if 'project:' in what:
         activities = Activity.objects.filter(activities_index__key=what)
         filter_applied = True
+        timeline = what
 
     # tribes
     if 'tribe:' in what:
@@ -835,28 +836,31 @@ def get_specific_activities(what, trending_only, user, after_pk, request=None, p
         profile = Profile.objects.filter(handle=handle).first()
         if profile:
             activities = Activity.objects.filter(activities_index__key=f'profile:{profile.pk}')
+            timeline = f'profile:{profile.pk}'
 
     # hackathon activity
     if 'hackathon:' in what:
         activities = Activity.objects.filter(activities_index__key=what)
         filter_applied = True
+        timeline = what
 
     # single activity
     if 'activity:' in what:
         try:
             activities = Activity.objects.filter(pk=what.replace('activity:', ''))
             filter_applied = True
+            timeline = None
         except ValueError:
             # ValueError might be thrown if 'activity' is not a valid pk value (contains for example a string)
             raise Http404
 
     # Defaults
-    if not activities and not filter_applied:
-        # Just use all of the activity and allow the [start_index:end_index] slice to limit the response
+    if not filter_applied:
+        # Just use all of the activity and allow the page_size limit the response
         activities = Activity.objects.all()
 
     # 3. Cross-ref the activity_pks->activity_id with the Activity objects
-    activities = activities.filter(hidden=False).order_by('-created_on')
+    activities = activities.filter(hidden=False)
 
     # 4. Filter out activities based on network
     network = 'rinkeby' if settings.DEBUG else 'mainnet'
@@ -864,55 +868,55 @@ def get_specific_activities(what, trending_only, user, after_pk, request=None, p
     if 'grant:' in what:
         activities = activities.exclude(subscription__network=filter_network)
 
-    # after-pk filters
-    if after_pk:
-        activities = activities.filter(pk__gt=after_pk)
     if trending_only:
         if what == 'everywhere':
             view_count_threshold = 40
         activities = activities.filter(view_count__gt=view_count_threshold)
 
-    # 5. Apply pagination slice and return Activities
-    return activities[start_index:end_index]
+    # after-pk filters, the activities newer than the ones on the page
+    if after_pk:
+        activities = activities.filter(pk__gt=after_pk).order_by('-created_on', '-pk')
+        return list(activities[:page_size]), None
+
+    # 5. Read the page after the cursor, from the timeline of the feed when it has one
+    return paginate_activities(activities, cursor=cursor, page_size=page_size, timeline=timeline)
 
 
 def activity(request):
     """Render the Activity response."""
 
-    page = int(request.GET.get('page', 1)) if request.GET.get('page') and request.GET.get('page').isdigit() else 1
     what = request.GET.get('what', 'everywhere')
     trending_only = int(request.GET.get('trending_only', 0)) if request.GET.get('trending_only') and request.GET.get('trending_only').isdigit() else 0
-    activities = get_specific_activities(what, trending_only, request.user, request.GET.get('after-pk'), request, page=page)
-    activities = activities.prefetch_related('profile', 'likes', 'comments', 'kudos', 'grant', 'subscription', 'hackathonevent', 'pin')
-    activities = activities.cache()
+    page, next_cursor = get_specific_activities(
+        what, trending_only, request.user, request.GET.get('after-pk'), request, cursor=request.GET.get('cursor')
+    )
+    prefetch_related_objects(
+        page, 'profile', 'likes', 'comments', 'kudos', 'grant', 'subscription', 'hackathonevent', 'pin'
+    )
 
     # store last seen
-    if activities.exists():
-        last_pk = activities.first().pk
+    if page:
+        last_pk = page[0].pk
         current_pk = request.session.get(what)
         next_pk = last_pk if (not current_pk or current_pk < last_pk) else current_pk
         request.session[what] = next_pk
-    # pagination
-    next_page = page + 1
-    #p = Paginator(activities, page_size)
-    #page = p.get_page(page)
 
-    page = activities
-    suppress_more_link = not len(page)
+    # pagination
+    suppress_more_link = not next_cursor
 
     # increment view counts
     activities_pks = [obj.pk for obj in page]
     if len(activities_pks):
-        increment_view_counts.delay(activities_pks)
+        record_views('activity', activities_pks)
 
     context = {
         'suppress_more_link': suppress_more_link,
         'what': what,
         'can_pin': can_pin(request, what),
-        'next_page': next_page,
+        'next_cursor': next_cursor,
         'page': page,
         'pinned': None,
-        'target': f'/activity?what={what}&trending_only={trending_only}&page={next_page}',
+        'target': f'/activity?what={what}&trending_only={trending_only}&cursor={next_cursor}',
         'title': _('Activity Feed'),
         'TOKENS': request.user.profile.token_approvals.all() if request.user.is_authenticated and request.user.profile else [],
     }
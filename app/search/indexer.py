@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""Define the bulk indexing of SearchResults into elasticsearch.
+
+Copyright (C) 2021 Gitcoin Core
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+import logging
+import time
+from functools import lru_cache
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.utils import timezone
+
+from elasticsearch import Elasticsearch, helpers
+from grants.models import Grant
+
+logger = logging.getLogger(__name__)
+
+# documents sent to elasticsearch per _bulk request
+BULK_CHUNK_SIZE = 500
+
+# SearchResults read from the database per server side cursor fetch
+ITERATOR_CHUNK_SIZE = 2000
+
+
+@lru_cache(maxsize=None)
+def get_elasticsearch(url=None):
+    '''
+        returns the elasticsearch client shared by the process, the client keeps a connection pool per node
+    '''
+    return Elasticsearch(url or settings.ELASTIC_SEARCH_URL)
+
+
+def grant_content_type_id():
+    return ContentType.objects.get_for_model(Grant).pk
+
+
+def search_result_doc(search_result):
+    '''
+        returns the elasticsearch document of a SearchResult
+    '''
+    source_type = str(ContentType.objects.get_for_id(search_result.source_type_id))
+    source_type = source_type.replace('token', 'kudos').title()
+    return {
+        'title': search_result.title,
+        'description': search_result.description,
+        'full_search': f"{search_result.title} {search_result.description} {source_type}",
+        'url': search_result.url,
+        'pk': search_result.pk,
+        'img_url': search_result.img_url,
+        'timestamp': timezone.now(),
+        'source_type': source_type,
+        # in order to aggregate totals by type an int needs to be indexed as opposed to a string
+        'source_type_id': search_result.source_type_id
+    }
+
+
+def active_grant_ids(grant_ids):
+    '''
+        returns the subset of grant_ids which are active and not hidden, with one query
+    '''
+    if not grant_ids:
+        return set()
+    return set(Grant.objects.filter(pk__in=grant_ids, active=True, hidden=False).values_list('pk', flat=True))
+
+
+def iter_search_result_batches(queryset, batch_size):
+    '''
+        streams the public SearchResults of the queryset in lists of batch_size, dropping the results of grants
+        which are no longer active (one query per batch)
+    '''
+    grant_type_id = grant_content_type_id()
+    rows = queryset.filter(visible_to__isnull=True).order_by('pk').iterator(chunk_size=ITERATOR_CHUNK_SIZE)
+
+    def flush(batch):
+        grants = active_grant_ids([sr.source_id for sr in batch if sr.source_type_id == grant_type_id])
+        return [sr for sr in batch if sr.source_type_id != grant_type_id or sr.source_id in grants]
+
+    batch = []
+    for search_result in rows:
+        batch.append(search_result)
+        if len(batch) >= batch_size:
+            yield flush(batch)
+            batch = []
+    if batch:
+        yield flush(batch)
+
+
+def bulk_index(queryset, index, es=None, chunk_size=BULK_CHUNK_SIZE, thread_count=1, progress=None):
+    '''
+        indexes the SearchResults of the queryset into the index with the _bulk api
+
+        the database is read in the calling thread, a batch of chunk_size * thread_count documents at a time,
+        and each batch is sent by thread_count threads with helpers.parallel_bulk (helpers.streaming_bulk
+        when thread_count is 1)
+
+        args:
+            queryset    :   SearchResult queryset
+            index       :   str - name of the index (or alias) the documents are written to
+            progress    :   callable(indexed, failed, elapsed) called after every batch
+
+        returns:
+            (int, int) - documents indexed, documents which failed
+    '''
+    es = es or get_elasticsearch()
+    indexed = failed = 0
+    start = time.monotonic()
+
+    for batch in iter_search_result_batches(queryset, chunk_size * thread_count):
+        actions = [
+            {'_index': index, '_id': search_result.pk, '_source': search_result_doc(search_result)}
+            for search_result in batch
+        ]
+        if thread_count > 1:
+            results = helpers.parallel_bulk(
+                es, actions, thread_count=thread_count, chunk_size=chunk_size, raise_on_error=False
+            )
+        else:
+            results = helpers.streaming_bulk(es, actions, chunk_size=chunk_size, raise_on_error=False)
+
+        for ok, item in results:
+            if ok:
+                indexed += 1
+            else:
+                failed += 1
+                logger.warning(f'failed to index {item}')
+
+        if progress:
+            progress(indexed, failed, time.monotonic() - start)
+
+    return indexed, failed
+
+
+def print_progress(indexed, failed, elapsed):
+    print(f'{indexed} indexed, {failed} failed in {elapsed:.1f}s ({indexed / max(elapsed, 0.001):.0f} docs/s)')
+
+
+def reindex(alias, es=None, queryset=None, delete_old=True, **kwargs):
+    '''
+        indexes every SearchResult into a new index then points the alias at it in one atomic
+        update, so searches keep hitting the previous index until the new one is complete
+
+        returns:
+            (str, int, int) - name of the new index, documents indexed, documents which failed
+    '''
+    from search.models import SearchResult
+
+    es = es or get_elasticsearch()
+    if es.indices.exists(index=alias) and not es.indices.exists_alias(name=alias):
+        raise ValueError(f'{alias} is an index, the full reindex needs an alias of that name')
+
+    new_index = f"{alias}-{timezone.now().strftime('%Y%m%d%H%M%S')}"
+    es.indices.create(index=new_index)
+    queryset = SearchResult.objects.all() if queryset is None else queryset
+    indexed, failed = bulk_index(queryset, new_index, es=es, **kwargs)
+
+    old_indices = list(es.indices.get_alias(name=alias)) if es.indices.exists_alias(name=alias) else []
+    actions = [{'remove': {'index': old_index, 'alias': alias}} for old_index in old_indices]
+    actions.append({'add': {'index': new_index, 'alias': alias}})
+    es.indices.update_aliases(body={'actions': actions})
+
+    if delete_old:
+        for old_index in old_indices:
+            es.indices.delete(index=old_index)
+    return new_index, indexed, failed
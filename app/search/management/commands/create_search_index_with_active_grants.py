@@ -19,6 +19,7 @@
 from django.core.management.base import BaseCommand
 
 from grants.models import Grant
+from search.indexer import bulk_index, print_progress
 from search.models import SearchResult
 
 
@@ -54,10 +55,5 @@ def handle(self, *args, **options):
         self.create_grant_records()
         print('created new search results for grants')
 
-        for sr in SearchResult.objects.all():
-            print(sr.pk)
-            try:
-                sr.put_on_elasticsearch(index_name)
-            except Exception as e:
-                print('failed:', e)
-        print('indexing complete')
+        indexed, failed = bulk_index(SearchResult.objects.all(), index_name, progress=print_progress)
+        print(f'indexing complete: {indexed} indexed, {failed} failed')
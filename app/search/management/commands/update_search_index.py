@@ -15,9 +15,11 @@
     along with this program. If not, see <http://www.gnu.org/licenses/>.
 
 '''
+from django.conf import settings
 from django.core.management.base import BaseCommand
 from django.utils import timezone
 
+from search.indexer import BULK_CHUNK_SIZE, bulk_index, print_progress, reindex
 from search.models import SearchResult
 
 
@@ -26,23 +28,34 @@ class Command(BaseCommand):
     help = 'uploads latest search results into elasticsearch'
 
     def add_arguments(self, parser):
-        parser.add_argument('sync_type', type=str, choices=['create', 'update'], help='ethereum network to use')
+        parser.add_argument(
+            'sync_type', type=str, choices=['create', 'update', 'reindex'],
+            help='create: index every search result, update: the ones modified in the last hour, '
+                 'reindex: index every search result into a new index and swap the ACTIVE_ELASTIC_INDEX alias to it'
+        )
+        parser.add_argument('--index', type=str, default='search-index', help='index written by create & update')
+        parser.add_argument('--chunk-size', type=int, default=BULK_CHUNK_SIZE, help='documents per bulk request')
+        parser.add_argument('--threads', type=int, default=1, help='concurrent bulk requests')
 
     def handle(self, *args, **options):
         sync_type = options['sync_type']
+        kwargs = {
+            'chunk_size': options['chunk_size'],
+            'thread_count': options['threads'],
+            'progress': print_progress,
+        }
+
+        if sync_type == 'reindex':
+            new_index, indexed, failed = reindex(settings.ACTIVE_ELASTIC_INDEX, **kwargs)
+            print(f'indexing complete: {indexed} indexed, {failed} failed')
+            print(f'{settings.ACTIVE_ELASTIC_INDEX} now points to {new_index}')
+            return
 
         if sync_type == 'create':
-            for sr in SearchResult.objects.all():
-                print(sr.pk)
-                try:
-                    sr.put_on_elasticsearch()
-                except Exception as e:
-                    print('failed:', e)
+            search_results = SearchResult.objects.all()
         elif sync_type == 'update':
             then = timezone.now() - timezone.timedelta(hours=1)
-            for sr in SearchResult.objects.filter(modified_on__gt=then):
-                print(sr.pk)
-                try:
-                    sr.put_on_elasticsearch()
-                except Exception as e:
-                    print('failed:', e)
+            search_results = SearchResult.objects.filter(modified_on__gt=then)
+
+        indexed, failed = bulk_index(search_results, options['index'], **kwargs)
+        print(f'indexing complete: {indexed} indexed, {failed} failed')
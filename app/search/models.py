@@ -2,11 +2,10 @@
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
 from django.db import models
-from django.utils import timezone
 
 from economy.models import SuperModel
-from elasticsearch import Elasticsearch
 from grants.models import Grant
+from search.indexer import get_elasticsearch, grant_content_type_id, search_result_doc
 
 
 class SearchResult(SuperModel):
@@ -32,33 +31,19 @@ def put_on_elasticsearch(self, index='search-index'):
         if self.visible_to:
             return None
 
-        if self.source_type_id == 82:
+        if self.source_type_id == grant_content_type_id():
             active_grant = self.check_for_active_grant()
             if not active_grant:
                 return None
 
-        es = Elasticsearch(settings.ELASTIC_SEARCH_URL)
-        source_type = str(str(self.source_type).replace('token', 'kudos')).title()
-        full_search = f"{self.title} {self.description} {source_type}"
-        doc = {
-            'title': self.title,
-            'description': self.description,
-            'full_search': full_search,
-            'url': self.url,
-            'pk': self.pk,
-            'img_url': self.img_url,
-            'timestamp': timezone.now(),
-            'source_type': source_type,
-            # in order to aggregate totals by type an int needs to be indexed as opposed to a string
-            'source_type_id': self.source_type_id
-        }
-        res = es.index(index=index, id=self.pk, body=doc)
+        es = get_elasticsearch()
+        res = es.index(index=index, id=self.pk, body=search_result_doc(self))
 
 def search_by_type(query, content_type, page=0, num_results=500):
     if not settings.ELASTIC_SEARCH_URL and not settings.ACTIVE_ELASTIC_INDEX:
         return {}
 
-    es = Elasticsearch(settings.ELASTIC_SEARCH_URL)
+    es = get_elasticsearch()
     res = es.search(index=settings.ACTIVE_ELASTIC_INDEX, body={
         "from": page, "size": num_results,
         "query": {
@@ -103,7 +88,7 @@ def search_by_type(query, content_type, page=0, num_results=500):
 def search(query, page=0, num_results=500):
     if not settings.ELASTIC_SEARCH_URL and not settings.ACTIVE_ELASTIC_INDEX:
         return {}
-    es = Elasticsearch(settings.ELASTIC_SEARCH_URL)
+    es = get_elasticsearch()
     # queries for wildcarded paginated results using boosts to lift by title and source_type=grant
     # index name will need updated once index is ready to be searched
     res = es.search(index=settings.ACTIVE_ELASTIC_INDEX, body={
@@ -1,3 +1,174 @@
-from django.test import TestCase
+# -*- coding: utf-8 -*-
+"""Handle search indexing related tests.
 
-# Create your tests here.
+Copyright (C) 2021 Gitcoin Core
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.contrib.contenttypes.models import ContentType
+
+from dashboard.tests.factories.profile_factory import ProfileFactory
+from elasticsearch import Elasticsearch
+from grants.models import Grant
+from grants.tests.factories import GrantFactory
+from search.indexer import bulk_index, reindex
+from search.models import Page, SearchResult
+from test_plus.test import TestCase
+
+
+class StubElasticsearchHandler(BaseHTTPRequestHandler):
+    """Answers the index, alias & _bulk requests of the indexer, keeping the indices in memory."""
+
+    def respond(self, status, body=None):
+        payload = json.dumps(body or {}).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(payload)
+
+    def read_body(self):
+        return self.rfile.read(int(self.headers.get('Content-Length', 0))).decode()
+
+    def do_HEAD(self):
+        path = self.path.split('?')[0].strip('/')
+        if path.startswith('_alias/'):
+            found = path[len('_alias/'):] in self.server.aliases
+        else:
+            found = path in self.server.indices
+        self.respond(200 if found else 404)
+
+    def do_GET(self):
+        alias = self.path.split('?')[0].strip('/')[len('_alias/'):]
+        self.respond(200, {self.server.aliases[alias]: {'aliases': {alias: {}}}})
+
+    def do_PUT(self):
+        self.server.indices[self.path.split('?')[0].strip('/')] = {}
+        self.respond(200, {'acknowledged': True})
+
+    def do_DELETE(self):
+        del self.server.indices[self.path.split('?')[0].strip('/')]
+        self.respond(200, {'acknowledged': True})
+
+    def do_POST(self):
+        path = self.path.split('?')[0].strip('/')
+        body = self.read_body()
+        if path == '_aliases':
+            for action in json.loads(body)['actions']:
+                for kind, alias in action.items():
+                    if kind == 'add':
+                        self.server.aliases[alias['alias']] = alias['index']
+            self.respond(200, {'acknowledged': True})
+            return
+
+        self.server.bulk_requests += 1
+        lines = [json.loads(line) for line in body.splitlines() if line]
+        items = []
+        for action, doc in zip(lines[::2], lines[1::2]):
+            meta = action['index']
+            self.server.indices.setdefault(meta['_index'], {})[meta['_id']] = doc
+            items.append({'index': {'_index': meta['_index'], '_id': meta['_id'], 'status': 201}})
+        self.respond(200, {'took': 1, 'errors': False, 'items': items})
+
+    def log_message(self, *args):
+        pass
+
+
+class SearchIndexerTest(TestCase):
+    """Define tests for the bulk indexing of search results."""
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StubElasticsearchHandler)
+        self.server.indices = {}
+        self.server.aliases = {}
+        self.server.bulk_requests = 0
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.es = Elasticsearch(f'http://127.0.0.1:{self.server.server_address[1]}')
+
+        page_type = ContentType.objects.get_for_model(Page)
+        grant_type = ContentType.objects.get_for_model(Grant)
+        active_grant = GrantFactory(active=True, hidden=False)
+        hidden_grant = GrantFactory(active=True, hidden=True)
+        SearchResult.objects.all().delete()
+
+        self.public = [
+            SearchResult.objects.create(source_type=page_type, source_id=i, title=f'page {i}') for i in range(5)
+        ]
+        self.private = SearchResult.objects.create(
+            source_type=page_type, source_id=5, title='page 5', visible_to=ProfileFactory()
+        )
+        self.active_grant = SearchResult.objects.create(
+            source_type=grant_type, source_id=active_grant.pk, title=active_grant.title
+        )
+        self.hidden_grant = SearchResult.objects.create(
+            source_type=grant_type, source_id=hidden_grant.pk, title=hidden_grant.title
+        )
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def indexed_ids(self, index):
+        return sorted(int(pk) for pk in self.server.indices.get(index, {}))
+
+    def test_bulk_index(self):
+        """Test the public results and the active grants are indexed in chunks."""
+        progress = []
+        indexed, failed = bulk_index(
+            SearchResult.objects.all(), 'search-index', es=self.es, chunk_size=2,
+            progress=lambda *args: progress.append(args)
+        )
+
+        expected = sorted([sr.pk for sr in self.public] + [self.active_grant.pk])
+        assert (indexed, failed) == (6, 0)
+        assert self.indexed_ids('search-index') == expected
+        assert self.server.bulk_requests == 3
+        assert progress[-1][:2] == (6, 0)
+        doc = self.server.indices['search-index'][str(self.public[0].pk)]
+        assert doc['title'] == 'page 0'
+        assert doc['full_search'] == 'page 0  Page'
+
+    def test_parallel_bulk_index(self):
+        """Test the documents are sent by concurrent bulk requests."""
+        indexed, failed = bulk_index(
+            SearchResult.objects.all(), 'search-index', es=self.es, chunk_size=2, thread_count=2
+        )
+
+        assert (indexed, failed) == (6, 0)
+        assert len(self.indexed_ids('search-index')) == 6
+
+    def test_reindex_swaps_the_alias(self):
+        """Test a full reindex writes a new index and moves the alias to it."""
+        self.server.indices['search-index-old'] = {'1': {}}
+        self.server.aliases['search'] = 'search-index-old'
+
+        new_index, indexed, failed = reindex('search', es=self.es)
+
+        assert new_index.startswith('search-')
+        assert self.server.aliases['search'] == new_index
+        assert 'search-index-old' not in self.server.indices
+        assert len(self.indexed_ids(new_index)) == indexed == 6
+
+    def test_reindex_refuses_an_index_named_like_the_alias(self):
+        """Test a full reindex does not run while the alias name is taken by an index."""
+        self.server.indices['search'] = {}
+
+        with self.assertRaises(ValueError):
+            reindex('search', es=self.es)
@@ -1,11 +1,10 @@
 from django.conf import settings
-from django.db import connection, transaction
+from django.db import transaction
 
 from app.services import RedisService
-from cacheops import invalidate_obj
 from celery import app
 from celery.utils.log import get_task_logger
-from dashboard.models import Activity
+from dashboard.view_counts import record_views
 
 logger = get_task_logger(__name__)
 
@@ -24,19 +23,8 @@ def increment_view_counts(self, pks, retry=False):
     if settings.FLUSH_QUEUE:
         return
 
-    if len(pks) == 0:
-        return
-    # update DB directly
-    with connection.cursor() as cursor:
-        id_as_str = ",".join(str(id) for id in pks)
-        query = f"UPDATE dashboard_activity SET view_count = view_count + 1 WHERE id in ({id_as_str});"
-        cursor.execute(query)
-        cursor.close()
-
-    # invalidate cache
-    activities = Activity.objects.filter(pk__in=pks)
-    for obj in activities:
-        invalidate_obj(obj)
+    # views are buffered and written to the DB by flush_view_counts, use record_views instead of queueing this task
+    record_views('activity', pks)
 
 @app.shared_task(bind=True, max_retries=3)
 def increment_offer_view_counts(self, pks, retry=False):
@@ -45,16 +33,7 @@ def increment_offer_view_counts(self, pks, retry=False):
     :param pks:
     :return:
     """
-    if True:
-        if len(pks) == 0:
-            return
-        # update DB directly
-        with connection.cursor() as cursor:
-            id_as_str = ",".join(str(id) for id in pks)
-            if len(id_as_str):
-                query = f"UPDATE townsquare_offer SET view_count = view_count + 1 WHERE id in ({id_as_str});"
-                cursor.execute(query)
-            cursor.close()
+    record_views('offer', pks)
 
 
 @app.shared_task(bind=True, max_retries=3)
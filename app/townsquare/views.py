@@ -16,6 +16,7 @@
 from app.services import RedisService
 from dashboard.helpers import load_files_in_directory
 from dashboard.models import Activity, HackathonEvent, Profile, TribeMember, get_my_earnings_count, get_my_grants
+from dashboard.view_counts import record_views
 from kudos.models import Token
 from marketing.mails import comment_email, mention_email, new_action_request, tip_comment_awarded_email
 from perftools.models import JSONStore
@@ -25,7 +26,6 @@
     Announcement, Comment, Favorite, Flag, Like, MatchRanking, MatchRound, Offer, OfferAction, PinnedPost,
     SuggestedAction,
 )
-from .tasks import increment_offer_view_counts
 from .utils import can_pin, is_user_townsquare_enabled
 
 redis = RedisService().redis
@@ -162,7 +162,7 @@ def get_offers(request):
             'offers': offers,
             'time': next_time_available,
         }
-    increment_offer_view_counts.delay(offer_pks)
+    record_views('offer', offer_pks)
     return offers_by_category
 
 def get_miniclr_info(request):